@@ -17,7 +17,9 @@
 The details on the dataset are in https://archive.ics.uci.edu/ml/datasets/HIGGS
 
 It takes a while as it needs to download 2.8 GB over the network, process, then
-store it into the specified location as a compressed numpy file.
+store it into the specified location as an uncompressed numpy file, which
+train_higgs.py memory-maps. Data previously stored as a compressed numpy file
+is converted without downloading it again.
 
 Usage:
 $ python data_download.py --data_dir=/tmp/higgs_data
@@ -43,17 +45,12 @@ from official.utils.flags import core as flags_core
 URL_ROOT = "https://archive.ics.uci.edu/ml/machine-learning-databases/00280"
 INPUT_FILE = "HIGGS.csv.gz"
 NPZ_FILE = "HIGGS.csv.gz.npz"  # numpy compressed file to contain "data" array.
+NPY_FILE = "HIGGS.npy"  # numpy file of the "data" array, can be memory-mapped.
 
 
-def _download_higgs_data_and_save_npz(data_dir):
-  """Download higgs data and store as a numpy compressed file."""
+def _download_higgs_data():
+  """Download higgs data and return it as a numpy array."""
   input_url = os.path.join(URL_ROOT, INPUT_FILE)
-  np_filename = os.path.join(data_dir, NPZ_FILE)
-  if tf.gfile.Exists(np_filename):
-    raise ValueError("data_dir already has the processed data file: {}".format(
-        np_filename))
-  if not tf.gfile.Exists(data_dir):
-    tf.gfile.MkDir(data_dir)
   # 2.8 GB to download.
   try:
     tf.logging.info("Data downloading...")
@@ -68,10 +65,30 @@ def _download_higgs_data_and_save_npz(data_dir):
       ).as_matrix()
   finally:
     tf.gfile.Remove(temp_filename)
+  return data
+
 
-  # Writing to temporary location then copy to the data_dir (0.8 GB).
+def _download_higgs_data_and_save_npy(data_dir):
+  """Download higgs data and store as an uncompressed numpy file."""
+  np_filename = os.path.join(data_dir, NPY_FILE)
+  if tf.gfile.Exists(np_filename):
+    raise ValueError("data_dir already has the processed data file: {}".format(
+        np_filename))
+  if not tf.gfile.Exists(data_dir):
+    tf.gfile.MkDir(data_dir)
+  npz_filename = os.path.join(data_dir, NPZ_FILE)
+  if tf.gfile.Exists(npz_filename):
+    tf.logging.info("Converting {}...".format(npz_filename))
+    with tf.gfile.Open(npz_filename, "rb") as npz_file:
+      with np.load(npz_file) as npz:
+        data = npz["data"]
+  else:
+    data = _download_higgs_data()
+
+  # Writing to temporary location then copy to the data_dir (1.3 GB).
   f = tempfile.NamedTemporaryFile()
-  np.savez_compressed(f, data=data)
+  np.save(f, data)
+  f.flush()
   tf.gfile.Copy(f.name, np_filename)
   tf.logging.info("Data saved to: {}".format(np_filename))
 
@@ -79,7 +96,7 @@ def _download_higgs_data_and_save_npz(data_dir):
 def main(unused_argv):
   if not tf.gfile.Exists(FLAGS.data_dir):
     tf.gfile.MkDir(FLAGS.data_dir)
-  _download_higgs_data_and_save_npz(FLAGS.data_dir)
+  _download_higgs_data_and_save_npy(FLAGS.data_dir)
 
 
 def define_data_download_flags():
@@ -0,0 +1,135 @@
+# Copyright 2018 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Streaming quantile sketch to compute bucket boundaries of large features.
+
+This is a KLL sketch (Karnin, Lang and Liberty, "Optimal Quantile
+Approximation in Streams", 2016). Items are kept in compactors of increasing
+weight: the items of level h stand for 2^h items of the stream. When a
+compactor is full, it is sorted and every other item, starting at a random
+offset, is promoted to the next level. The rank error of the quantiles is
+about 1.7 / k of the number of items, using O(k) memory.
+
+Values are added in batches of numpy arrays, so that a feature can be
+sketched chunk by chunk, e.g. from a memory-mapped array, without sorting the
+whole column.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+# Ratio of the capacities of two consecutive compactors.
+_CAPACITY_DECAY = 2. / 3
+
+
+class QuantileSketch(object):
+  """Approximates the quantiles of a stream of numbers."""
+
+  def __init__(self, k=2048, seed=None):
+    """Constructor.
+
+    Args:
+      k: The capacity of the largest compactor, which controls the accuracy.
+      seed: Seed of the random offsets of the compactions.
+    """
+    self._k = k
+    self._random = np.random.RandomState(seed)
+    self._compactors = [np.empty(0)]
+    self.count = 0
+    self.min = np.inf
+    self.max = -np.inf
+
+  def _capacity(self, level):
+    depth = len(self._compactors) - level - 1
+    return max(2, int(np.ceil(self._k * _CAPACITY_DECAY ** depth)))
+
+  def _compress(self):
+    """Compacts every compactor holding more items than its capacity.
+
+    Compacting a level may overflow the next one, so the levels are processed
+    from the lowest up, adding a level above the highest one when needed.
+    """
+    level = 0
+    while level < len(self._compactors):
+      items = self._compactors[level]
+      if items.size > self._capacity(level):
+        if level + 1 == len(self._compactors):
+          self._compactors.append(np.empty(0, dtype=items.dtype))
+        items = np.sort(items)
+        # An odd item stays at this level, so that the total weight is kept.
+        kept, items = items[:items.size % 2], items[items.size % 2:]
+        self._compactors[level] = kept
+        self._compactors[level + 1] = np.concatenate(
+            [self._compactors[level + 1], items[self._random.randint(2)::2]])
+      level += 1
+
+  def update(self, values):
+    """Adds a batch of values to the sketch. NaN values are ignored."""
+    values = np.ravel(values)
+    values = values[~np.isnan(values)]
+    if not values.size:
+      return
+    if not self.count:
+      self._compactors = [np.empty(0, dtype=values.dtype)]
+    self.count += values.size
+    self.min = min(self.min, values.min())
+    self.max = max(self.max, values.max())
+    self._compactors[0] = np.concatenate([self._compactors[0], values])
+    self._compress()
+
+  def merge(self, other):
+    """Adds the values of another QuantileSketch, e.g. of another shard."""
+    # pylint: disable=protected-access
+    for level, items in enumerate(other._compactors):
+      if level == len(self._compactors):
+        self._compactors.append(np.empty(0, dtype=items.dtype))
+      self._compactors[level] = np.concatenate([self._compactors[level], items])
+    self.count += other.count
+    self.min = min(self.min, other.min)
+    self.max = max(self.max, other.max)
+    self._compress()
+    return self
+
+  def quantiles(self, fractions):
+    """Returns the approximate quantiles of the values added so far.
+
+    Args:
+      fractions: A list of fractions in [0, 1]. 0 returns the exact minimum and
+        1 the exact maximum.
+
+    Returns:
+      A numpy array of the quantiles, which are values that were added.
+
+    Raises:
+      ValueError: If no value was added.
+    """
+    if not self.count:
+      raise ValueError("Quantiles of an empty sketch are undefined.")
+    items = np.concatenate(self._compactors)
+    weights = np.concatenate([
+        np.full(compactor.size, 2 ** level, dtype=np.int64)
+        for level, compactor in enumerate(self._compactors)])
+    order = np.argsort(items, kind="mergesort")
+    items = items[order]
+    cumulative_weights = np.cumsum(weights[order])
+
+    fractions = np.asarray(fractions, dtype=np.float64)
+    indices = np.searchsorted(cumulative_weights,
+                              fractions * cumulative_weights[-1])
+    result = items[np.minimum(indices, items.size - 1)]
+    result = np.where(fractions <= 0, self.min, result)
+    return np.where(fractions >= 1, self.max, result).astype(items.dtype)
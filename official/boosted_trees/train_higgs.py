@@ -43,6 +43,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import functools
+import multiprocessing.pool
 import os
 
 # pylint: disable=g-bad-import-order
@@ -52,11 +54,26 @@ from absl import flags
 import tensorflow as tf
 # pylint: enable=g-bad-import-order
 
+from official.boosted_trees import quantile_sketch
 from official.utils.flags import core as flags_core
 from official.utils.flags._conventions import help_wrap
 from official.utils.logs import logger
 
 NPZ_FILE = "HIGGS.csv.gz.npz"  # numpy compressed file containing "data" array
+NPY_FILE = "HIGGS.npy"  # numpy file containing "data" array
+
+# Number of rows added at once to the quantile sketches of the features.
+_SKETCH_CHUNK_ROWS = 1000000
+
+
+def _load_npy(npy_filename):
+  """Loads a numpy file, memory-mapped if it is on the local file system."""
+  if "://" not in npy_filename:
+    # Only the rows that are used are read, and only when they are used.
+    return np.load(npy_filename, mmap_mode="r")
+  # gfile allows numpy to read data from network data sources as well.
+  with tf.gfile.Open(npy_filename, "rb") as npy_file:
+    return np.load(npy_file)
 
 
 def read_higgs_data(data_dir, train_start, train_count, eval_start, eval_count):
@@ -70,8 +87,16 @@ def read_higgs_data(data_dir, train_start, train_count, eval_start, eval_count):
     eval_count: An integer, the number of eval examples within the data.
 
   Returns:
-    Numpy array of train data and eval data.
+    Numpy array of train data and eval data. They are slices of a memory-mapped
+    array if data_download.py stored the data as an uncompressed numpy file on
+    the local file system.
   """
+  npy_filename = os.path.join(data_dir, NPY_FILE)
+  if tf.gfile.Exists(npy_filename):
+    data = _load_npy(npy_filename)
+    return (data[train_start:train_start+train_count],
+            data[eval_start:eval_start+eval_count])
+
   npz_filename = os.path.join(data_dir, NPZ_FILE)
   try:
     # gfile allows numpy to read data from network data sources as well.
@@ -86,6 +111,43 @@ def read_higgs_data(data_dir, train_start, train_count, eval_start, eval_count):
           data[eval_start:eval_start+eval_count])
 
 
+def _update_sketch(sketches, chunk, index):
+  sketches[index].update(chunk[:, index])
+
+
+def get_bucket_boundaries(features_np, num_buckets=100):
+  """Returns bucket boundaries of every feature by approximate percentiles.
+
+  The rows of the features are read in chunks, and each chunk is added in
+  parallel to a quantile sketch per feature. Unlike np.percentile, this
+  neither sorts a copy of every column nor needs all the rows in memory, e.g.
+  when the features are memory-mapped.
+
+  Args:
+    features_np: A numpy ndarray (shape=[batch_size, num_features]) for
+        float32 features.
+    num_buckets: The number of buckets by percentiles.
+
+  Returns:
+    A list of the sorted, unique bucket boundaries of every feature.
+  """
+  num_features = features_np.shape[1]
+  sketches = [quantile_sketch.QuantileSketch(seed=i)
+              for i in range(num_features)]
+  pool = multiprocessing.pool.ThreadPool(
+      min(num_features, multiprocessing.cpu_count()))
+  try:
+    for start in range(0, features_np.shape[0], _SKETCH_CHUNK_ROWS):
+      chunk = np.asarray(features_np[start:start+_SKETCH_CHUNK_ROWS])
+      pool.map(functools.partial(_update_sketch, sketches, chunk),
+               range(num_features))
+  finally:
+    pool.terminate()
+  fractions = np.arange(num_buckets) / num_buckets
+  return [np.unique(sketch.quantiles(fractions)).tolist()
+          for sketch in sketches]
+
+
 # This showcases how to make input_fn when the input data is available in the
 # form of numpy arrays.
 def make_inputs_from_np_arrays(features_np, label_np):
@@ -114,9 +176,7 @@ def make_inputs_from_np_arrays(features_np, label_np):
   feature_names = ["feature_%02d" % (i + 1) for i in range(num_features)]
 
   # Create source feature_columns and bucketized_columns.
-  def get_bucket_boundaries(feature):
-    """Returns bucket boundaries for feature by percentiles."""
-    return np.unique(np.percentile(feature, range(0, 100))).tolist()
+  bucket_boundaries = get_bucket_boundaries(features_np)
   source_columns = [
       tf.feature_column.numeric_column(
           feature_name, dtype=tf.float32,
@@ -128,7 +188,7 @@ def make_inputs_from_np_arrays(features_np, label_np):
   bucketized_columns = [
       tf.feature_column.bucketized_column(
           source_columns[i],
-          boundaries=get_bucket_boundaries(features_np_list[i]))
+          boundaries=bucket_boundaries[i])
       for i in range(num_features)
   ]
 
@@ -68,6 +68,30 @@ class BaseTest(tf.test.TestCase):
     self.assertEqual((15, 29), train_data.shape)
     self.assertEqual((5, 29), eval_data.shape)
 
+  def test_read_higgs_data_npy(self):
+    """Tests that read_higgs_data() memory-maps the npy file if present."""
+    with np.load(self.input_npz) as npz:
+      data = npz["data"]
+    # A separate directory, so that other tests keep reading the npz file.
+    npy_dir = tempfile.mkdtemp(dir=self.get_temp_dir())
+    np.save(os.path.join(npy_dir, train_higgs.NPY_FILE), data)
+    train_data, eval_data = train_higgs.read_higgs_data(
+        npy_dir,
+        train_start=0, train_count=15, eval_start=15, eval_count=5)
+    self.assertIsInstance(train_data, np.memmap)
+    self.assertAllEqual(data[:15], train_data)
+    self.assertAllEqual(data[15:20], eval_data)
+
+  def test_get_bucket_boundaries(self):
+    """Tests that bucket boundaries are percentiles of every feature."""
+    features = np.random.RandomState(0).rand(20000, 2).astype(np.float32)
+    features[:, 1] = np.round(features[:, 1] * 3)
+    boundaries = train_higgs.get_bucket_boundaries(features)
+    self.assertEqual(100, len(boundaries[0]))
+    self.assertAllClose(np.percentile(features[:, 0], range(0, 100)),
+                        boundaries[0], atol=0.01)
+    self.assertAllEqual([0, 1, 2, 3], boundaries[1])
+
   def test_make_inputs_from_np_arrays(self):
     """Tests make_inputs_from_np_arrays() function."""
     train_data, _ = train_higgs.read_higgs_data(
@@ -83,6 +83,20 @@ NUM_RATINGS = {
     ML_20M: 20000263
 }
 
+# Compact dtypes of the ratings columns. Timestamps fit in int32 until 2038.
+RATING_DTYPES = {
+    USER_COLUMN: np.int32,
+    ITEM_COLUMN: np.int32,
+    RATING_COLUMN: np.float32,
+    TIMESTAMP_COLUMN: np.int32,
+}
+
+_RATINGS_NPY_FILE = "ratings_{}.npy"
+
+# Size of the chunks the csv files are transformed and parsed in.
+_TRANSFORM_CHUNK_BYTES = 64 * 1024 * 1024
+_PARSE_CHUNK_ROWS = 1000000
+
 
 def _download_and_clean(dataset, data_dir):
   """Download MovieLens dataset in a standard format.
@@ -139,9 +153,20 @@ def _download_and_clean(dataset, data_dir):
     tf.gfile.DeleteRecursively(temp_dir)
 
 
+def _transform_line(line, separator):
+  fields = line.split(separator)
+  fields = ['"{}"'.format(field) if "," in field else field
+            for field in fields]
+  return ",".join(fields)
+
+
 def _transform_csv(input_path, output_path, names, skip_first, separator=","):
   """Transform csv to a regularized format.
 
+  The csv is transformed in chunks of whole lines. Chunks without commas, such
+  as all the chunks of the ratings, only need their separators replaced rather
+  than being split into fields line by line.
+
   Args:
     input_path: The path of the raw csv.
     output_path: The path of the cleaned csv.
@@ -158,16 +183,33 @@ def _transform_csv(input_path, output_path, names, skip_first, separator=","):
     # Write column names to the csv.
     f_out.write(",".join(names).encode("utf-8"))
     f_out.write(b"\n")
-    for i, line in enumerate(f_in):
-      if i == 0 and skip_first:
-        continue  # ignore existing labels in the csv
+    remainder = b""
+    while True:
+      chunk = f_in.read(_TRANSFORM_CHUNK_BYTES)
+      if chunk:
+        # Only transform whole lines, so that no line or character is split.
+        chunk = remainder + chunk
+        end = chunk.rfind(b"\n") + 1
+        chunk, remainder = chunk[:end], chunk[end:]
+      else:
+        chunk, remainder = remainder, b""
+      if not chunk:
+        if not remainder:
+          break
+        continue
 
-      line = line.decode("utf-8", errors="ignore")
-      fields = line.split(separator)
+      if skip_first:
+        chunk = chunk[chunk.find(b"\n") + 1:] if b"\n" in chunk else b""
+        skip_first = False  # ignore existing labels in the csv
+
+      text = chunk.decode("utf-8", errors="ignore")
       if separator != ",":
-        fields = ['"{}"'.format(field) if "," in field else field
-                  for field in fields]
-      f_out.write(",".join(fields).encode("utf-8"))
+        if "," in text:
+          text = "".join(_transform_line(line, separator)
+                         for line in text.splitlines(True))
+        else:
+          text = text.replace(separator, ",")
+      f_out.write(text.encode("utf-8"))
 
 
 def _regularize_1m_dataset(temp_dir):
@@ -245,14 +287,70 @@ def download(dataset, data_dir):
 
 def ratings_csv_to_dataframe(data_dir, dataset):
   with tf.gfile.Open(os.path.join(data_dir, dataset, RATINGS_FILE)) as f:
-    return pd.read_csv(f, encoding="utf-8")
+    return pd.read_csv(f, encoding="utf-8", dtype=RATING_DTYPES)
+
+
+def _ratings_npy_path(data_dir, dataset, column):
+  return os.path.join(data_dir, dataset, _RATINGS_NPY_FILE.format(column))
+
+
+def ratings_csv_to_npy(data_dir, dataset):
+  """Converts the ratings csv to one .npy file per column.
+
+  The csv is parsed in chunks into the compact RATING_DTYPES, so that the
+  ratings can later be loaded without parsing text.
+
+  Args:
+    data_dir: The directory of the datasets.
+    dataset: The name of the dataset.
+  """
+  chunks = {column: [] for column in RATING_COLUMNS}
+  with tf.gfile.Open(os.path.join(data_dir, dataset, RATINGS_FILE)) as f:
+    for chunk in pd.read_csv(f, encoding="utf-8", dtype=RATING_DTYPES,
+                             chunksize=_PARSE_CHUNK_ROWS):
+      for column in RATING_COLUMNS:
+        chunks[column].append(chunk[column].values)
+
+  for column in RATING_COLUMNS:
+    with tf.gfile.Open(_ratings_npy_path(data_dir, dataset, column),
+                       "wb") as f:
+      np.save(f, np.concatenate(chunks[column]))
+
+
+def ratings_npy_to_dataframe(data_dir, dataset):
+  """Loads the ratings from .npy files, converting the csv first if needed."""
+  paths = [_ratings_npy_path(data_dir, dataset, column)
+           for column in RATING_COLUMNS]
+  if not all(tf.gfile.Exists(path) for path in paths):
+    ratings_csv_to_npy(data_dir, dataset)
+
+  columns = {}
+  for column, path in zip(RATING_COLUMNS, paths):
+    with tf.gfile.Open(path, "rb") as f:
+      columns[column] = np.load(f)
+  return pd.DataFrame(columns, columns=RATING_COLUMNS)
 
 
 def csv_to_joint_dataframe(data_dir, dataset):
-  ratings = ratings_csv_to_dataframe(data_dir, dataset)
+  """Joins the ratings and movies of a dataset into a single dataframe.
+
+  Args:
+    data_dir: The directory containing the dataset directories.
+    dataset: The name of the dataset, e.g. ml-1m.
+
+  Returns:
+    A pandas DataFrame with the rating columns and the movie columns of the
+    rated item, in the order of the ratings.
+  """
+  ratings = ratings_npy_to_dataframe(data_dir, dataset)
 
   with tf.gfile.Open(os.path.join(data_dir, dataset, MOVIES_FILE)) as f:
-    movies = pd.read_csv(f, encoding="utf-8")
+    movies = pd.read_csv(f, encoding="utf-8",
+                         dtype={ITEM_COLUMN: RATING_DTYPES[ITEM_COLUMN]})
+
+  # The few distinct genre strings are stored once rather than once per
+  # rating, which also lets integerize_genres encode each of them once.
+  movies[GENRE_COLUMN] = movies[GENRE_COLUMN].astype("category")
 
   df = ratings.merge(movies, on=ITEM_COLUMN)
   df[RATING_COLUMN] = df[RATING_COLUMN].astype(np.float32)
@@ -260,27 +358,46 @@ def csv_to_joint_dataframe(data_dir, dataset):
   return df
 
 
+def genres_to_multi_hot(genres):
+  """Encodes genre strings as a multi-hot matrix.
+
+  Each distinct string is split once, and the rows of the matrix are gathered
+  from the encodings of the distinct strings.
+
+  Args:
+    genres: a pandas Series of "|" separated genre strings.
+
+  Returns:
+    A uint8 array of shape [len(genres), N_GENRE] where entry [i, j] is 1 if
+    row i has the genre GENRES[j].
+  """
+  genres = genres.astype("category")
+  names = pd.Series(genres.cat.categories).str.replace(
+      "Children's", "Children", regex=False)  # naming difference.
+  encodings = names.str.get_dummies(sep="|").reindex(
+      columns=GENRES, fill_value=0).values.astype(np.uint8)
+
+  # Missing values have the code -1, which selects a last row without genres.
+  encodings = np.concatenate([encodings, np.zeros((1, N_GENRE), np.uint8)])
+  return encodings[genres.cat.codes.values]
+
+
 def integerize_genres(dataframe):
   """Replace genre string with a binary vector.
 
+  The genre column is replaced by one uint8 column per genre in GENRES. They
+  hold the multi-hot matrix of genres_to_multi_hot as a single block, which
+  dataframe[GENRES].values returns without building an array per row.
+
   Args:
     dataframe: a pandas dataframe of movie data.
 
   Returns:
     The transformed dataframe.
   """
-  def _map_fn(entry):
-    entry.replace("Children's", "Children")  # naming difference.
-    movie_genres = entry.split("|")
-    output = np.zeros((len(GENRES),), dtype=np.int64)
-    for i, genre in enumerate(GENRES):
-      if genre in movie_genres:
-        output[i] = 1
-    return output
-
-  dataframe[GENRE_COLUMN] = dataframe[GENRE_COLUMN].apply(_map_fn)
-
-  return dataframe
+  multi_hot = pd.DataFrame(genres_to_multi_hot(dataframe[GENRE_COLUMN]),
+                           index=dataframe.index, columns=GENRES)
+  return pd.concat([dataframe.drop(columns=[GENRE_COLUMN]), multi_hot], axis=1)
 
 
 def define_data_download_flags():
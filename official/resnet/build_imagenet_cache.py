@@ -0,0 +1,176 @@
+# Copyright 2018 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Builds a decoded image cache of the ImageNet TFRecords.
+
+Every TFRecord file of --data_dir is converted to a file of fixed length
+records with the same name in --cache_dir. A record is the label followed by
+the uint8 pixels of the image, resized so that its smallest side is
+--image_size and cropped to the central square. imagenet_main.py reads the
+cache when run with --image_cache_dir, so that no JPEG is decoded during
+training.
+
+The cache of the training set takes about 1.28M * image_size^2 * 3 bytes,
+e.g. 98GB for an image size of 160 and 252GB for 256.
+
+Usage:
+  python build_imagenet_cache.py --data_dir=/path/to/imagenet \
+      --cache_dir=/path/to/cache --image_size=160
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import multiprocessing
+import os
+
+from absl import app as absl_app
+from absl import flags
+import numpy as np
+import tensorflow as tf  # pylint: disable=g-bad-import-order
+
+from official.resnet import imagenet_main
+from official.resnet import imagenet_preprocessing
+
+_BATCH_SIZE = 64
+
+
+def _decode_record(raw_record, image_size):
+  # pylint: disable=protected-access
+  image_buffer, label, _ = imagenet_main._parse_example_proto(raw_record)
+  image = imagenet_preprocessing.decode_and_resize_for_cache(
+      image_buffer, image_size, imagenet_main._NUM_CHANNELS)
+  return image, label
+
+
+def _records(images, labels):
+  """Returns the cache records of a batch of images and labels."""
+  if labels.min() < 0 or labels.max() >= 1 << 16:
+    raise ValueError('Labels must be in [0, 65536).')
+  labels = labels.astype('>u2').view(np.uint8).reshape(-1, 2)
+  images = images.reshape(images.shape[0], -1)
+  return np.concatenate([labels, images], axis=1).tobytes()
+
+
+def build_cache_file(sess, input_path, output_path, image_size,
+                     num_parallel_calls):
+  """Writes the cache records of the images of a TFRecord file.
+
+  The records are written to a temporary file that is renamed when complete,
+  so that existing cache files can be skipped when the build is resumed.
+
+  Args:
+    sess: A tf.Session.
+    input_path: Path of the TFRecord file.
+    output_path: Path of the cache file.
+    image_size: The height and width of the cached images.
+    num_parallel_calls: The number of images decoded in parallel.
+
+  Returns:
+    The number of images written.
+  """
+  dataset = tf.data.TFRecordDataset(input_path).map(
+      lambda record: _decode_record(record, image_size),
+      num_parallel_calls=num_parallel_calls)
+  dataset = dataset.batch(_BATCH_SIZE).prefetch(1)
+  next_batch = dataset.make_one_shot_iterator().get_next()
+
+  num_images = 0
+  temp_path = output_path + '.tmp'
+  with tf.gfile.GFile(temp_path, 'wb') as f:
+    while True:
+      try:
+        images, labels = sess.run(next_batch)
+      except tf.errors.OutOfRangeError:
+        break
+      f.write(_records(images, labels))
+      num_images += labels.shape[0]
+  tf.gfile.Rename(temp_path, output_path, overwrite=True)
+  return num_images
+
+
+def build_cache(data_dir, cache_dir, image_size, num_parallel_calls,
+                num_workers=1, worker_index=0):
+  """Builds the cache files of the training and validation sets.
+
+  Args:
+    data_dir: The directory of the ImageNet TFRecords.
+    cache_dir: The directory to write the cache to.
+    image_size: The height and width of the cached images.
+    num_parallel_calls: The number of images decoded in parallel.
+    num_workers: The number of processes building the cache.
+    worker_index: The index of this process, which builds every
+      num_workers-th file.
+
+  Raises:
+    ValueError: If cache_dir has a cache of another image size.
+  """
+  tf.gfile.MakeDirs(cache_dir)
+  cache_info = imagenet_main.read_cache_info(cache_dir)
+  if cache_info is None:
+    imagenet_main.write_cache_info(cache_dir, image_size)
+  elif cache_info['image_size'] != image_size:
+    raise ValueError('{} has a cache of image size {}.'.format(
+        cache_dir, cache_info['image_size']))
+
+  input_paths = (imagenet_main.get_filenames(True, data_dir) +
+                 imagenet_main.get_filenames(False, data_dir))
+  for input_path in input_paths[worker_index::num_workers]:
+    output_path = os.path.join(cache_dir, os.path.basename(input_path))
+    if tf.gfile.Exists(output_path):
+      tf.logging.info('Skipping existing %s', output_path)
+      continue
+    with tf.Graph().as_default(), tf.Session() as sess:
+      num_images = build_cache_file(sess, input_path, output_path, image_size,
+                                    num_parallel_calls)
+    tf.logging.info('Wrote %d images to %s', num_images, output_path)
+
+
+def define_cache_flags():
+  """Defines the flags of build_imagenet_cache.py."""
+  flags.DEFINE_string(
+      name='data_dir', default='/tmp/imagenet',
+      help='The directory of the ImageNet TFRecords.')
+  flags.DEFINE_string(
+      name='cache_dir', default=None,
+      help='The directory to write the cache to.')
+  flags.DEFINE_integer(
+      name='image_size', default=256,
+      help='The size of the smallest side of the cached images, which are '
+           'cropped to squares. 160 makes the cache 60% smaller at some '
+           'cost in accuracy.')
+  flags.DEFINE_integer(
+      name='num_parallel_calls', default=multiprocessing.cpu_count(),
+      help='The number of images decoded in parallel.')
+  flags.DEFINE_integer(
+      name='num_workers', default=1,
+      help='The number of processes building the cache, e.g. on several '
+           'hosts.')
+  flags.DEFINE_integer(
+      name='worker_index', default=0,
+      help='The index of this process in [0, num_workers).')
+  flags.mark_flag_as_required('cache_dir')
+
+
+def main(_):
+  build_cache(flags.FLAGS.data_dir, flags.FLAGS.cache_dir,
+              flags.FLAGS.image_size, flags.FLAGS.num_parallel_calls,
+              flags.FLAGS.num_workers, flags.FLAGS.worker_index)
+
+
+if __name__ == '__main__':
+  tf.logging.set_verbosity(tf.logging.INFO)
+  define_cache_flags()
+  absl_app.run(main)
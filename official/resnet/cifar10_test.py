@@ -165,6 +165,15 @@ class BaseTest(tf.test.TestCase):
         extra_flags=['-resnet_version', '2']
     )
 
+  def test_cifar10_benchmark_input_only_synthetic(self):
+    integration.run_synthetic(
+        main=cifar10_main.run_cifar, tmp_root=self.get_temp_dir(),
+        extra_flags=['-benchmark_input_only',
+                     '-benchmark_input_steps', '2',
+                     '-benchmark_input_warmup_steps', '1',
+                     '-benchmark_input_parallel_batches', '1,2']
+    )
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -18,6 +18,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import functools
+import json
 import os
 
 from absl import app as absl_app
@@ -44,6 +46,11 @@ _SHUFFLE_BUFFER = 10000
 
 DATASET_NAME = 'ImageNet'
 
+# Records of the decoded image cache built by build_imagenet_cache.py are a
+# 2 byte big-endian label followed by the uint8 pixels of the image.
+_CACHE_LABEL_BYTES = 2
+_CACHE_INFO_FILE = 'cache_info.json'
+
 ###############################################################################
 # Data processing
 ###############################################################################
@@ -158,9 +165,58 @@ def parse_record(raw_record, is_training, dtype):
   return image, label
 
 
+def get_cache_record_bytes(image_size):
+  """Returns the size of a record of a decoded image cache."""
+  return _CACHE_LABEL_BYTES + image_size * image_size * _NUM_CHANNELS
+
+
+def write_cache_info(cache_dir, image_size):
+  with tf.gfile.GFile(os.path.join(cache_dir, _CACHE_INFO_FILE), 'w') as f:
+    json.dump({'image_size': image_size, 'num_channels': _NUM_CHANNELS}, f)
+
+
+def read_cache_info(cache_dir):
+  """Returns the dict written by write_cache_info, or None if missing."""
+  path = os.path.join(cache_dir, _CACHE_INFO_FILE)
+  if not tf.gfile.Exists(path):
+    return None
+  with tf.gfile.GFile(path) as f:
+    return json.load(f)
+
+
+def parse_cached_record(raw_record, is_training, dtype, image_size):
+  """Parses a record of a decoded image cache.
+
+  Args:
+    raw_record: scalar Tensor tf.string containing a record of the cache.
+    is_training: A boolean denoting whether the input is for training.
+    dtype: data type to use for images/features.
+    image_size: The height and width of the cached images.
+
+  Returns:
+    Tuple with processed image tensor and label tensor.
+  """
+  record_vector = tf.decode_raw(raw_record, tf.uint8)
+  label = (tf.cast(record_vector[0], tf.int32) * 256 +
+           tf.cast(record_vector[1], tf.int32))
+  image = tf.reshape(record_vector[_CACHE_LABEL_BYTES:],
+                     [image_size, image_size, _NUM_CHANNELS])
+
+  image = imagenet_preprocessing.preprocess_cached_image(
+      image=image,
+      output_height=_DEFAULT_IMAGE_SIZE,
+      output_width=_DEFAULT_IMAGE_SIZE,
+      num_channels=_NUM_CHANNELS,
+      is_training=is_training)
+  image = tf.cast(image, dtype)
+
+  return image, label
+
+
 def input_fn(is_training, data_dir, batch_size, num_epochs=1,
              dtype=tf.float32, datasets_num_private_threads=None,
-             num_parallel_batches=1, parse_record_fn=parse_record):
+             num_parallel_batches=1, parse_record_fn=parse_record,
+             cache_dir=None, shuffle_buffer=_SHUFFLE_BUFFER):
   """Input function which provides batches for train or eval.
 
   Args:
@@ -172,11 +228,30 @@ def input_fn(is_training, data_dir, batch_size, num_epochs=1,
     datasets_num_private_threads: Number of private threads for tf.data.
     num_parallel_batches: Number of parallel batches for tf.data.
     parse_record_fn: Function to use for parsing the records.
+    cache_dir: The directory of a decoded image cache built by
+      build_imagenet_cache.py. If set, images are read from the cache instead
+      of being decoded from the TFRecords of data_dir, and parse_record_fn is
+      ignored.
+    shuffle_buffer: The number of records in the shuffle buffer.
 
   Returns:
     A dataset that can be used for iteration.
   """
-  filenames = get_filenames(is_training, data_dir)
+  if cache_dir:
+    cache_info = read_cache_info(cache_dir)
+    if cache_info is None:
+      raise ValueError('{} is not a decoded image cache. Build it with '
+                       'build_imagenet_cache.py.'.format(cache_dir))
+    image_size = cache_info['image_size']
+    filenames = get_filenames(is_training, cache_dir)
+    read_records_fn = functools.partial(
+        tf.data.FixedLengthRecordDataset,
+        record_bytes=get_cache_record_bytes(image_size))
+    parse_record_fn = functools.partial(parse_cached_record,
+                                        image_size=image_size)
+  else:
+    filenames = get_filenames(is_training, data_dir)
+    read_records_fn = tf.data.TFRecordDataset
   dataset = tf.data.Dataset.from_tensor_slices(filenames)
 
   if is_training:
@@ -189,13 +264,13 @@ def input_fn(is_training, data_dir, batch_size, num_epochs=1,
   # but high enough to provide the benefits of parallelization. You may want
   # to increase this number if you have a large number of CPU cores.
   dataset = dataset.apply(tf.contrib.data.parallel_interleave(
-      tf.data.TFRecordDataset, cycle_length=10))
+      read_records_fn, cycle_length=10))
 
   return resnet_run_loop.process_record_dataset(
       dataset=dataset,
       is_training=is_training,
       batch_size=batch_size,
-      shuffle_buffer=_SHUFFLE_BUFFER,
+      shuffle_buffer=shuffle_buffer,
       parse_record_fn=parse_record_fn,
       num_epochs=num_epochs,
       dtype=dtype,
@@ -325,9 +400,18 @@ def imagenet_model_fn(features, labels, mode, params):
 
 
 def define_imagenet_flags():
+  """Defines the ImageNet flags, including the decoded image cache directory."""
   resnet_run_loop.define_resnet_flags(
       resnet_size_choices=['18', '34', '50', '101', '152', '200'])
   flags.adopt_module_key_flags(resnet_run_loop)
+  flags.DEFINE_string(
+      name='image_cache_dir', default=None,
+      help=flags_core.help_wrap(
+          'Directory of a decoded image cache built by build_imagenet_cache.py '
+          'from --data_dir. If set, training and evaluation read pre-decoded, '
+          'pre-resized images from the cache instead of decoding JPEGs, which '
+          'relieves CPU-bound input pipelines. Random crops are then taken '
+          'from the central square of the images, without bounding boxes.'))
   flags_core.set_defaults(train_epochs=90)
 
 
@@ -340,6 +424,9 @@ def run_imagenet(flags_obj):
   input_function = (flags_obj.use_synthetic_data and
                     get_synth_input_fn(flags_core.get_tf_dtype(flags_obj)) or
                     input_fn)
+  if flags_obj.image_cache_dir and not flags_obj.use_synthetic_data:
+    input_function = functools.partial(
+        input_fn, cache_dir=flags_obj.image_cache_dir)
 
   resnet_run_loop.resnet_main(
       flags_obj, imagenet_model_fn, input_function, DATASET_NAME,
@@ -97,6 +97,31 @@ def _decode_crop_and_flip(image_buffer, bbox, num_channels):
   return cropped
 
 
+def _crop_and_flip(image):
+  """Crops a decoded image to a random part of the image, and randomly flips.
+
+  This is the equivalent of _decode_crop_and_flip for images that were already
+  decoded, e.g. read from a decoded image cache. The whole image is used as the
+  bounding box of the object.
+
+  Args:
+    image: a 3-D image tensor.
+
+  Returns:
+    3-D tensor with cropped image.
+  """
+  bbox_begin, bbox_size, _ = tf.image.sample_distorted_bounding_box(
+      tf.shape(image),
+      bounding_boxes=tf.zeros([1, 0, 4]),
+      min_object_covered=0.1,
+      aspect_ratio_range=[0.75, 1.33],
+      area_range=[0.05, 1.0],
+      max_attempts=100,
+      use_image_if_no_bounding_boxes=True)
+  cropped = tf.slice(image, bbox_begin, bbox_size)
+  return tf.image.random_flip_left_right(cropped)
+
+
 def _central_crop(image, crop_height, crop_width):
   """Performs central crops of the given image list.
 
@@ -258,3 +283,64 @@ def preprocess_image(image_buffer, bbox, output_height, output_width,
   image.set_shape([output_height, output_width, num_channels])
 
   return _mean_image_subtraction(image, _CHANNEL_MEANS, num_channels)
+
+
+def decode_and_resize_for_cache(image_buffer, image_size, num_channels):
+  """Decodes an image and resizes it to a square for a decoded image cache.
+
+  The image is resized with its smallest side equal to `image_size`, and the
+  central square is kept, so that all images of the cache have the same size.
+
+  Args:
+    image_buffer: scalar string Tensor representing the raw JPEG image buffer.
+    image_size: The height and width of the cached image.
+    num_channels: Integer depth of the image buffer for decoding.
+
+  Returns:
+    A uint8 tensor of shape [image_size, image_size, num_channels].
+  """
+  image = tf.image.decode_jpeg(image_buffer, channels=num_channels)
+  shape = tf.shape(image)
+  new_height, new_width = _smallest_size_at_least(
+      shape[0], shape[1], image_size)
+  # Rounding may leave the smallest side one pixel short of image_size.
+  image = _resize_image(image, tf.maximum(new_height, image_size),
+                        tf.maximum(new_width, image_size))
+  image = _central_crop(image, image_size, image_size)
+  image = tf.saturate_cast(tf.round(image), tf.uint8)
+  image.set_shape([image_size, image_size, num_channels])
+  return image
+
+
+def preprocess_cached_image(image, output_height, output_width, num_channels,
+                            is_training=False):
+  """Preprocesses an image read from a decoded image cache.
+
+  The same preprocessing as preprocess_image is applied, but to the resized
+  square images written by decode_and_resize_for_cache, so that no JPEG is
+  decoded. For evaluation, the central crop covers the same fraction of the
+  image as the crop of an image resized to _RESIZE_MIN.
+
+  Args:
+    image: A uint8 tensor of shape [image_size, image_size, num_channels].
+    output_height: The height of the image after preprocessing.
+    output_width: The width of the image after preprocessing.
+    num_channels: Integer depth of the image.
+    is_training: `True` if we're preprocessing the image for training and
+      `False` otherwise.
+
+  Returns:
+    A preprocessed image.
+  """
+  if is_training:
+    image = _crop_and_flip(image)
+  else:
+    image_size = image.get_shape()[0].value
+    image = _central_crop(
+        image, output_height * image_size // _RESIZE_MIN,
+        output_width * image_size // _RESIZE_MIN)
+  image = _resize_image(image, output_height, output_width)
+
+  image.set_shape([output_height, output_width, num_channels])
+
+  return _mean_image_subtraction(image, _CHANNEL_MEANS, num_channels)
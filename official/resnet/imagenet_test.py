@@ -19,8 +19,10 @@ from __future__ import print_function
 
 import unittest
 
+import numpy as np
 import tensorflow as tf  # pylint: disable=g-bad-import-order
 
+from official.resnet import build_imagenet_cache
 from official.resnet import imagenet_main
 from official.utils.testing import integration
 
@@ -280,6 +282,23 @@ class BaseTest(tf.test.TestCase):
         extra_flags=['-v', '2']
     )
 
+  def test_parse_cached_record(self):
+    image_size = 32
+    images = np.random.randint(0, 256, size=(2, image_size, image_size, 3),
+                               dtype=np.uint8)
+    records = build_imagenet_cache._records(images, np.array([615, 3]))
+    record_bytes = imagenet_main.get_cache_record_bytes(image_size)
+    self.assertEqual(2 * record_bytes, len(records))
+
+    for is_training in (True, False):
+      with self.test_session(graph=tf.Graph()) as sess:
+        image, label = imagenet_main.parse_cached_record(
+            tf.constant(records[record_bytes:]), is_training, tf.float32,
+            image_size)
+        image, label = sess.run([image, label])
+      self.assertEqual(3, label)
+      self.assertAllEqual([224, 224, 3], image.shape)
+
   def test_imagenet_end_to_end_synthetic_v1_tiny(self):
     integration.run_synthetic(
         main=imagenet_main.run_imagenet, tmp_root=self.get_temp_dir(),
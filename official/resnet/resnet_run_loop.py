@@ -24,9 +24,11 @@ from __future__ import division
 from __future__ import print_function
 
 import functools
+import itertools
 import math
 import multiprocessing
 import os
+import time
 
 # pylint: disable=g-bad-import-order
 from absl import flags
@@ -219,6 +221,92 @@ def override_flags_and_set_envars_for_gpu_thread_pool(flags_obj):
                                             - num_monitoring_threads)
 
 
+def _time_input_pipeline(input_fn, session_config, num_steps, warmup_steps):
+  """Returns the number of batches per second produced by an input_fn."""
+  with tf.Graph().as_default():
+    next_batch = input_fn().make_one_shot_iterator().get_next()
+    # Runs the input pipeline without copying the batches out of the session.
+    run_batch = tf.group(*tf.contrib.framework.nest.flatten(next_batch))
+    with tf.Session(config=session_config) as sess:
+      for _ in range(warmup_steps):
+        sess.run(run_batch)
+      start_time = time.time()
+      for _ in range(num_steps):
+        sess.run(run_batch)
+      return num_steps / (time.time() - start_time)
+
+
+def benchmark_input_pipeline(flags_obj, input_function, benchmark_logger):
+  """Measures the throughput of the training input pipeline without a model.
+
+  The training input_fn is run on its own for every combination of the values
+  of --benchmark_input_private_threads, --benchmark_input_parallel_batches and
+  --benchmark_input_shuffle_buffers, which default to the value used for
+  training. The images/sec of each configuration is logged with the benchmark
+  logger, so that hosts can be tuned before running the model.
+
+  Args:
+    flags_obj: An object containing parsed flags. See define_resnet_flags()
+      for details.
+    input_function: the function that processes the dataset and returns a
+      dataset, as passed to resnet_main.
+    benchmark_logger: the benchmark logger to log the throughput with.
+
+  Returns:
+    A list of (images/sec, configuration dict) tuples, fastest first.
+  """
+  batch_size = distribution_utils.per_device_batch_size(
+      flags_obj.batch_size, flags_core.get_num_gpus(flags_obj))
+  session_config = tf.ConfigProto(
+      inter_op_parallelism_threads=flags_obj.inter_op_parallelism_threads,
+      intra_op_parallelism_threads=flags_obj.intra_op_parallelism_threads)
+
+  def sweep(values, default):
+    return [int(i) for i in values] or [default]
+  private_threads = sweep(flags_obj.benchmark_input_private_threads,
+                          flags_obj.datasets_num_private_threads)
+  parallel_batches = sweep(flags_obj.benchmark_input_parallel_batches,
+                           flags_obj.datasets_num_parallel_batches)
+  # None keeps the default shuffle buffer of the input_fn.
+  shuffle_buffers = sweep(flags_obj.benchmark_input_shuffle_buffers, None)
+
+  results = []
+  for num_private_threads, num_parallel_batches, shuffle_buffer in (
+      itertools.product(private_threads, parallel_batches, shuffle_buffers)):
+    kwargs = {}
+    if shuffle_buffer is not None:
+      kwargs['shuffle_buffer'] = shuffle_buffer
+    input_fn = functools.partial(
+        input_function,
+        is_training=True,
+        data_dir=flags_obj.data_dir,
+        batch_size=batch_size,
+        num_epochs=None,
+        dtype=flags_core.get_tf_dtype(flags_obj),
+        datasets_num_private_threads=num_private_threads,
+        num_parallel_batches=num_parallel_batches,
+        **kwargs)
+    images_per_sec = batch_size * _time_input_pipeline(
+        input_fn, session_config, flags_obj.benchmark_input_steps,
+        flags_obj.benchmark_input_warmup_steps)
+
+    config = {
+        'datasets_num_private_threads': num_private_threads,
+        'datasets_num_parallel_batches': num_parallel_batches,
+        'shuffle_buffer': shuffle_buffer,
+    }
+    tf.logging.info('Input pipeline %s: %.1f images/sec', config,
+                    images_per_sec)
+    benchmark_logger.log_metric(
+        'input_images_per_sec', images_per_sec, unit='images/sec',
+        extras={k: str(v) for k, v in config.items()})
+    results.append((images_per_sec, config))
+
+  results.sort(key=lambda result: -result[0])
+  tf.logging.info('Fastest input pipeline: %s', results[0][1])
+  return results
+
+
 ################################################################################
 # Functions for running training/eval/validation loops for the model.
 ################################################################################
@@ -512,6 +600,10 @@ def resnet_main(
   benchmark_logger.log_run_info('resnet', dataset_name, run_params,
                                 test_id=flags_obj.benchmark_test_id)
 
+  if flags_obj.benchmark_input_only:
+    benchmark_input_pipeline(flags_obj, input_function, benchmark_logger)
+    return
+
   train_hooks = hooks_helper.get_train_hooks(
       flags_obj.hooks,
       model_dir=flags_obj.model_dir,
@@ -629,6 +721,40 @@ def define_resnet_flags(resnet_size_choices=None):
           'inference. Note, this flag only applies to ImageNet and cannot '
           'be used for CIFAR.'))
 
+  flags.DEFINE_boolean(
+      name='benchmark_input_only', default=False,
+      help=flags_core.help_wrap(
+          'If True, only measure the images/sec of the training input '
+          'pipeline, without the model, for every combination of the '
+          '--benchmark_input_* sweeps, and log it with the benchmark logger.'))
+  flags.DEFINE_integer(
+      name='benchmark_input_steps', default=100,
+      help=flags_core.help_wrap(
+          'The number of batches timed for each input pipeline configuration '
+          'with --benchmark_input_only.'))
+  flags.DEFINE_integer(
+      name='benchmark_input_warmup_steps', default=20,
+      help=flags_core.help_wrap(
+          'The number of batches run before timing each input pipeline '
+          'configuration with --benchmark_input_only, e.g. to fill the '
+          'shuffle buffer.'))
+  flags.DEFINE_list(
+      name='benchmark_input_private_threads', default=[],
+      help=flags_core.help_wrap(
+          'Comma separated values of --datasets_num_private_threads to sweep '
+          'with --benchmark_input_only. 0 uses the global thread pool.'))
+  flags.DEFINE_list(
+      name='benchmark_input_parallel_batches', default=[],
+      help=flags_core.help_wrap(
+          'Comma separated values of --datasets_num_parallel_batches to sweep '
+          'with --benchmark_input_only.'))
+  flags.DEFINE_list(
+      name='benchmark_input_shuffle_buffers', default=[],
+      help=flags_core.help_wrap(
+          'Comma separated shuffle buffer sizes to sweep with '
+          '--benchmark_input_only. The input function must accept a '
+          '`shuffle_buffer` argument.'))
+
   choice_kwargs = dict(
       name='resnet_size', short_name='rs', default='50',
       help=flags_core.help_wrap('The size of the ResNet model to use.'))
@@ -18,11 +18,16 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections
+import multiprocessing
 import os
+import threading
 
 # pylint: disable=g-bad-import-order
 from absl import app as absl_app
 from absl import flags
+import numpy as np
+from six.moves import queue
 import tensorflow as tf
 # pylint: enable=g-bad-import-order
 
@@ -34,6 +39,13 @@ _EXTRA_DECODE_LENGTH = 100
 _BEAM_SIZE = 4
 _ALPHA = 0.6
 
+# Settings of streaming translation (see translate_file_streaming).
+_DECODE_MAX_TOKENS = 4096
+_DECODE_MAX_BATCH_SIZE = 256
+_STREAM_WINDOW_SIZE = 10000
+_ENCODE_CHUNK_SIZE = 64
+_DECODE_QUEUE_SIZE = 64
+
 
 def _get_sorted_inputs(filename):
   """Read and sort lines from the file sorted by decreasing length.
@@ -135,6 +147,209 @@ def translate_file(
         f.write("%s\n" % translations[i])
 
 
+# Subtokenizer of an encoding worker process, set by _init_encode_worker.
+_WORKER_SUBTOKENIZER = None
+
+
+def _init_encode_worker(subtokenizer):
+  global _WORKER_SUBTOKENIZER
+  _WORKER_SUBTOKENIZER = subtokenizer
+
+
+def _encode_in_worker(line):
+  return _encode_and_add_eos(line, _WORKER_SUBTOKENIZER)
+
+
+def _read_windows(input_file, window_size):
+  """Yield lists of at most window_size stripped lines read from input_file."""
+  window = []
+  with tf.gfile.Open(input_file) as f:
+    for line in f:
+      window.append(line.strip())
+      if len(window) == window_size:
+        yield window
+        window = []
+  if window:
+    yield window
+
+
+def _batch_by_token_budget(lengths, max_tokens, max_batch_size):
+  """Split sequences sorted by decreasing length into batches.
+
+  Args:
+    lengths: list of sequence lengths, sorted in decreasing order.
+    max_tokens: maximum number of tokens in a padded batch, i.e. batch size
+      times the length of its longest sequence. A longer sequence forms a batch
+      on its own.
+    max_batch_size: maximum number of sequences in a batch.
+
+  Returns:
+    List of (start, end) ranges of the batches.
+  """
+  batches = []
+  start = 0
+  while start < len(lengths):
+    batch_size = max(1, max_tokens // max(lengths[start], 1))
+    end = min(start + min(batch_size, max_batch_size), len(lengths))
+    batches.append((start, end))
+    start = end
+  return batches
+
+
+class _ReorderBuffer(object):
+  """Writes translations in their original order as they become available.
+
+  Translations arrive sorted by length within windows of the input, so at most
+  a window of translations is buffered.
+  """
+
+  def __init__(self, write_fn):
+    self._write_fn = write_fn
+    self._pending = {}
+    self._next_index = 0
+
+  def add(self, index, translation):
+    self._pending[index] = translation
+    while self._next_index in self._pending:
+      self._write_fn(self._pending.pop(self._next_index))
+      self._next_index += 1
+
+  @property
+  def num_written(self):
+    return self._next_index
+
+
+def translate_file_streaming(
+    estimator, subtokenizer, input_file, output_file=None,
+    print_all_translations=False, max_tokens=_DECODE_MAX_TOKENS,
+    max_batch_size=_DECODE_MAX_BATCH_SIZE, window_size=_STREAM_WINDOW_SIZE,
+    num_encode_workers=None):
+  """Translate lines in file with bounded memory, and save to output file.
+
+  Unlike translate_file, the input is read in windows of window_size lines.
+  The lines of a window are encoded by a pool of processes, sorted by subtoken
+  length and split into batches of at most max_tokens padded subtokens.
+  Outputs are decoded in a background thread and written in the original order,
+  so that the accelerator is not idle while strings are processed.
+
+  Args:
+    estimator: tf.Estimator used to generate the translations.
+    subtokenizer: Subtokenizer object for encoding and decoding source and
+       translated lines.
+    input_file: file containing lines to translate
+    output_file: file that stores the generated translations.
+    print_all_translations: If true, all translations are printed to stdout.
+    max_tokens: maximum number of input subtokens in a padded batch.
+    max_batch_size: maximum number of lines in a batch.
+    window_size: number of lines read, sorted and batched together.
+    num_encode_workers: number of processes used to encode lines. Lines are
+      encoded in the calling process if 0, and by one process per CPU if None.
+
+  Raises:
+    ValueError: if output file is invalid.
+  """
+  if output_file is not None and tf.gfile.IsDirectory(output_file):
+    raise ValueError("File output is a directory, will not save outputs to "
+                     "file.")
+  if num_encode_workers is None:
+    num_encode_workers = multiprocessing.cpu_count()
+  pool = None
+  if num_encode_workers > 0:
+    pool = multiprocessing.Pool(num_encode_workers,
+                                initializer=_init_encode_worker,
+                                initargs=(subtokenizer,))
+
+  # Original line indices of the batches fed to the estimator, in order. The
+  # predictions are returned in the same order.
+  batch_indices = collections.deque()
+  source_lines = {}
+
+  def batch_generator():
+    """Yield padded batches of encoded lines, window by window."""
+    first_index = 0
+    for window_num, lines in enumerate(_read_windows(input_file, window_size)):
+      if pool is not None:
+        encoded = pool.map(_encode_in_worker, lines,
+                           chunksize=_ENCODE_CHUNK_SIZE)
+      else:
+        encoded = [_encode_and_add_eos(line, subtokenizer) for line in lines]
+      order = sorted(range(len(encoded)), key=lambda i: len(encoded[i]),
+                     reverse=True)
+      lengths = [len(encoded[i]) for i in order]
+      batches = _batch_by_token_budget(lengths, max_tokens, max_batch_size)
+      tf.logging.info("Decoding window %d: %d lines in %d batches." %
+                      (window_num + 1, len(lines), len(batches)))
+      for start, end in batches:
+        batch = np.zeros((end - start, lengths[start]), dtype=np.int64)
+        indices = []
+        for row, i in enumerate(order[start:end]):
+          batch[row, :len(encoded[i])] = encoded[i]
+          indices.append(first_index + i)
+          if print_all_translations:
+            source_lines[first_index + i] = lines[i]
+        batch_indices.append(indices)
+        yield batch
+      first_index += len(lines)
+
+  def input_fn():
+    """Created dataset of padded batches of encoded inputs."""
+    ds = tf.data.Dataset.from_generator(
+        batch_generator, tf.int64, tf.TensorShape([None, None]))
+    return ds.prefetch(1)
+
+  output = None
+  if output_file is not None:
+    tf.logging.info("Writing to file %s" % output_file)
+    output = tf.gfile.Open(output_file, "w")
+
+  def write_translation(translation):
+    if output is not None:
+      output.write("%s\n" % translation)
+
+  reorder_buffer = _ReorderBuffer(write_translation)
+  decode_queue = queue.Queue(maxsize=_DECODE_QUEUE_SIZE)
+  decode_errors = []
+
+  def decode_outputs():
+    """Decode batches of outputs from decode_queue until None is received."""
+    while True:
+      item = decode_queue.get()
+      if item is None:
+        return
+      if decode_errors:
+        continue
+      try:
+        indices, outputs = item
+        for index, ids in zip(indices, outputs):
+          translation = _trim_and_decode(ids, subtokenizer)
+          if print_all_translations:
+            tf.logging.info("Translating:\n\tInput: %s\n\tOutput: %s" %
+                            (source_lines.pop(index), translation))
+          reorder_buffer.add(index, translation)
+      except Exception as e:  # pylint: disable=broad-except
+        decode_errors.append(e)
+
+  decode_thread = threading.Thread(target=decode_outputs)
+  decode_thread.daemon = True
+  decode_thread.start()
+  try:
+    for predictions in estimator.predict(
+        input_fn, yield_single_examples=False):
+      decode_queue.put((batch_indices.popleft(), predictions["outputs"]))
+      if decode_errors:
+        break
+  finally:
+    decode_queue.put(None)
+    decode_thread.join()
+    if pool is not None:
+      pool.terminate()
+    if output is not None:
+      output.close()
+  if decode_errors:
+    raise decode_errors[0]
+  tf.logging.info("Translated %d lines." % reorder_buffer.num_written)
+
+
 def translate_text(estimator, subtokenizer, txt):
   """Translate a single string."""
   encoded_txt = _encode_and_add_eos(txt, subtokenizer)
@@ -187,7 +402,14 @@ def main(unused_argv):
       output_file = os.path.abspath(FLAGS.file_out)
       tf.logging.info("File output specified: %s" % output_file)
 
-    translate_file(estimator, subtokenizer, input_file, output_file)
+    if FLAGS.stream:
+      translate_file_streaming(
+          estimator, subtokenizer, input_file, output_file,
+          max_tokens=FLAGS.max_tokens_per_batch,
+          window_size=FLAGS.stream_window_size,
+          num_encode_workers=FLAGS.num_encode_workers)
+    else:
+      translate_file(estimator, subtokenizer, input_file, output_file)
 
 
 def define_translate_flags():
@@ -228,6 +450,26 @@ def define_translate_flags():
       name="file_out", default=None,
       help=flags_core.help_wrap(
           "If --file flag is specified, save translation to this file."))
+  flags.DEFINE_bool(
+      name="stream", default=False,
+      help=flags_core.help_wrap(
+          "If set, translate --file in windows of lines with bounded memory, "
+          "batching lines by subtoken length instead of a fixed batch size."))
+  flags.DEFINE_integer(
+      name="max_tokens_per_batch", default=_DECODE_MAX_TOKENS,
+      help=flags_core.help_wrap(
+          "With --stream, maximum number of input subtokens in a padded "
+          "batch."))
+  flags.DEFINE_integer(
+      name="stream_window_size", default=_STREAM_WINDOW_SIZE,
+      help=flags_core.help_wrap(
+          "With --stream, number of lines sorted by length and batched "
+          "together. Bounds the memory used by the translation."))
+  flags.DEFINE_integer(
+      name="num_encode_workers", default=None,
+      help=flags_core.help_wrap(
+          "With --stream, number of processes encoding the input lines. "
+          "Defaults to the number of CPUs; 0 encodes in the main process."))
 
 
 if __name__ == "__main__":
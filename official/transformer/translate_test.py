@@ -0,0 +1,102 @@
+# Copyright 2018 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Test the streaming file translation in translate.py."""
+
+import os
+
+import tensorflow as tf  # pylint: disable=g-bad-import-order
+
+from official.transformer import translate
+from official.transformer.utils import tokenizer
+
+
+class _CharSubtokenizer(object):
+  """Encodes every character as its own subtoken, after PAD and EOS."""
+
+  def encode(self, line):
+    return [ord(c) + 2 for c in line]
+
+  def decode(self, ids):
+    return "".join(chr(i - 2) for i in ids if i > tokenizer.EOS_ID)
+
+
+class _EchoEstimator(object):
+  """Returns every input batch as its output, recording the batch shapes."""
+
+  def __init__(self):
+    self.batch_shapes = []
+
+  def predict(self, input_fn, yield_single_examples=True):
+    assert not yield_single_examples
+    next_batch = input_fn().make_one_shot_iterator().get_next()
+    with tf.Session() as sess:
+      while True:
+        try:
+          batch = sess.run(next_batch)
+        except tf.errors.OutOfRangeError:
+          return
+        self.batch_shapes.append(batch.shape)
+        yield {"outputs": batch}
+
+
+class TranslateTest(tf.test.TestCase):
+
+  def test_batch_by_token_budget(self):
+    lengths = [10, 8, 8, 5, 5, 5, 5, 2, 2]
+    batches = translate._batch_by_token_budget(
+        lengths, max_tokens=20, max_batch_size=3)
+    self.assertEqual([(0, 2), (2, 4), (4, 7), (7, 9)], batches)
+    for start, end in batches:
+      self.assertLessEqual((end - start) * lengths[start], 20)
+
+  def test_batch_by_token_budget_oversize_input(self):
+    lengths = [50, 30, 4, 4]
+    batches = translate._batch_by_token_budget(
+        lengths, max_tokens=20, max_batch_size=8)
+    # Sequences longer than the budget form batches of their own.
+    self.assertEqual([(0, 1), (1, 2), (2, 4)], batches)
+
+  def test_reorder_buffer(self):
+    written = []
+    reorder_buffer = translate._ReorderBuffer(written.append)
+    reorder_buffer.add(2, "c")
+    reorder_buffer.add(1, "b")
+    self.assertEqual([], written)
+    reorder_buffer.add(0, "a")
+    reorder_buffer.add(3, "d")
+    self.assertEqual(["a", "b", "c", "d"], written)
+    self.assertEqual(4, reorder_buffer.num_written)
+
+  def test_translate_file_streaming_keeps_order(self):
+    lines = ["a", "bbbbbbbb", "cc", "", "dddd", "eeeeeeeeeeee", "f", "ggg"]
+    input_file = os.path.join(self.get_temp_dir(), "input.txt")
+    output_file = os.path.join(self.get_temp_dir(), "output.txt")
+    with tf.gfile.Open(input_file, "w") as f:
+      f.write("\n".join(lines) + "\n")
+
+    estimator = _EchoEstimator()
+    translate.translate_file_streaming(
+        estimator, _CharSubtokenizer(), input_file, output_file,
+        max_tokens=8, max_batch_size=2, window_size=5, num_encode_workers=0)
+
+    with tf.gfile.Open(output_file) as f:
+      self.assertEqual(lines, f.read().splitlines())
+    for batch_size, length in estimator.batch_shapes:
+      self.assertLessEqual(batch_size, 2)
+      self.assertTrue(batch_size * length <= 8 or batch_size == 1)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -80,6 +80,17 @@ class Subtokenizer(object):
     self._cache_size = 2 ** 20
     self._cache = [(None, None)] * self._cache_size
 
+  def __getstate__(self):
+    # The cache is large and cheap to rebuild, so it is not pickled when the
+    # subtokenizer is sent to other processes.
+    state = self.__dict__.copy()
+    del state["_cache"]
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self._cache = [(None, None)] * self._cache_size
+
   @staticmethod
   def init_from_files(
       vocab_file, files, target_vocab_size, threshold, min_count=None,
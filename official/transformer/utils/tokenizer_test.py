@@ -15,6 +15,7 @@
 """Test Subtokenizer and string helper methods."""
 
 import collections
+import pickle
 import tempfile
 
 import tensorflow as tf  # pylint: disable=g-bad-import-order
@@ -53,6 +54,12 @@ class SubtokenizerTest(tf.test.TestCase):
     token_list = subtokenizer._subtoken_ids_to_tokens(encoded_list)
     self.assertEqual([u"testing", u"123"], token_list)
 
+  def test_pickle(self):
+    vocab_list = ["123_", "test", "ing_"]
+    subtokenizer = pickle.loads(pickle.dumps(
+        self._init_subtokenizer(vocab_list)))
+    self.assertEqual([1, 2, 0], subtokenizer.encode("testing 123"))
+
 
 class StringHelperTest(tf.test.TestCase):
 
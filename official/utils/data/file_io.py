@@ -58,6 +58,7 @@ _GARBAGE_COLLECTOR = _GarbageCollector()
 atexit.register(_GARBAGE_COLLECTOR.purge)
 
 _ROWS_PER_CORE = 50000
+_COPY_CHUNK_BYTES = 64 * 1024 * 1024
 
 
 def write_to_temp_buffer(dataframe, buffer_folder, columns):
@@ -102,59 +103,236 @@ def iter_shard_dataframe(df, rows_per_core=1000):
     yield [df_shard[boundaries[j]:boundaries[j+1]] for j in range(num_cores)]
 
 
+# Wire format tags (field number << 3 | wire type) of the tf.train.Example
+# protos. All the fields written are length-delimited (wire type 2).
+_EXAMPLE_FEATURES_TAG = 0x0A  # Example.features
+_FEATURES_ENTRY_TAG = 0x0A  # Features.feature map entry
+_ENTRY_KEY_TAG = 0x0A  # map entry key
+_ENTRY_VALUE_TAG = 0x12  # map entry value
+_FEATURE_FLOAT_LIST_TAG = 0x12  # Feature.float_list
+_FEATURE_INT64_LIST_TAG = 0x1A  # Feature.int64_list
+_LIST_VALUE_TAG = 0x0A  # packed FloatList.value and Int64List.value
+
+
+def _encode_varints(values):
+  """Encodes unsigned integers as protobuf varints.
+
+  Args:
+    values: 1-D array of integers. Negative int64 values are encoded in two's
+      complement as 10 bytes, like protobuf does.
+
+  Returns:
+    A ragged array, i.e. a (data, lengths) tuple with the uint8 encodings of
+    all values concatenated and the number of bytes of each value.
+  """
+  values = np.asarray(values).astype(np.int64).view(np.uint64)
+  lengths = np.ones(values.shape, dtype=np.int64)
+  for shift in range(7, 64, 7):
+    lengths += values >= np.uint64(1 << shift)
+  max_length = int(lengths.max()) if values.size else 0
+  shifts = np.arange(max_length, dtype=np.uint64) * np.uint64(7)
+  groups = ((values[:, np.newaxis] >> shifts) & np.uint64(0x7F)).astype(
+      np.uint8)
+  positions = np.arange(max_length)
+  groups[positions < lengths[:, np.newaxis] - 1] |= 0x80
+  return groups[positions < lengths[:, np.newaxis]], lengths
+
+
+def _constant_ragged(value, n):
+  """Returns a ragged array with the same bytes for all n rows."""
+  value = np.frombuffer(value, dtype=np.uint8)
+  return np.tile(value, n), np.full(n, value.size, dtype=np.int64)
+
+
+def _concat_ragged(parts):
+  """Concatenates ragged arrays with the same number of rows row by row."""
+  lengths = sum(part_lengths for _, part_lengths in parts)
+  starts = np.cumsum(lengths) - lengths
+  data = np.empty(int(lengths.sum()), dtype=np.uint8)
+  offsets_in_row = np.zeros_like(lengths)
+  for part_data, part_lengths in parts:
+    part_starts = np.cumsum(part_lengths) - part_lengths
+    destination = np.repeat(starts + offsets_in_row - part_starts, part_lengths)
+    data[destination + np.arange(part_data.size)] = part_data
+    offsets_in_row += part_lengths
+  return data, lengths
+
+
+def _length_delimited_header(tag, lengths):
+  """Returns the tag and length prefix of length-delimited fields."""
+  return _concat_ragged([_constant_ragged(six.int2byte(tag), lengths.size),
+                         _encode_varints(lengths)])
+
+
+def _encode_feature_column(column, values):
+  """Encodes the Features map entry of a column for all rows.
+
+  Only the short headers of the nested messages are built for each row; the
+  packed values are returned separately so that they are copied only once.
+
+  Args:
+    column: Name of the column.
+    values: Array of shape [n] or [n, k] of integers or floats.
+
+  Returns:
+    Two ragged arrays: the map entry headers and the packed values of each row.
+
+  Raises:
+    ValueError: If the dtype of values is not supported.
+  """
+  n = values.shape[0]
+  values = np.reshape(values, (n, -1))
+  if values.dtype.kind in ("i", "u"):
+    varints, value_lengths = _encode_varints(values.ravel())
+    packed = varints, value_lengths.reshape(values.shape).sum(axis=1)
+    feature_tag = _FEATURE_INT64_LIST_TAG
+  elif values.dtype.kind == "f":
+    floats = np.ascontiguousarray(values, dtype="<f4").view(np.uint8)
+    packed = floats.ravel(), np.full(n, floats.shape[1], dtype=np.int64)
+    feature_tag = _FEATURE_FLOAT_LIST_TAG
+  else:
+    raise ValueError("Invalid dtype")
+
+  # Build the headers from the innermost message outwards.
+  list_header = _length_delimited_header(_LIST_VALUE_TAG, packed[1])
+  list_lengths = list_header[1] + packed[1]
+  feature_header = _length_delimited_header(feature_tag, list_lengths)
+  feature_lengths = feature_header[1] + list_lengths
+  value_header = _length_delimited_header(_ENTRY_VALUE_TAG, feature_lengths)
+  key = column.encode("utf-8") if isinstance(column, six.text_type) else column
+  key = _concat_ragged([
+      _length_delimited_header(_ENTRY_KEY_TAG, np.full(n, len(key))),
+      _constant_ragged(key, n)])
+  entry_lengths = key[1] + value_header[1] + feature_lengths
+  entry_header = _length_delimited_header(_FEATURES_ENTRY_TAG, entry_lengths)
+  header = _concat_ragged([entry_header, key, value_header, feature_header,
+                           list_header])
+  return header, packed
+
+
+def _encode_examples(shard_dict):
+  """Serializes a dict of arrays into tf.train.Example protos column by column.
+
+  The protos are encoded directly in the protobuf wire format from the numpy
+  arrays of whole columns, instead of building a tf.train.Feature per row and
+  column. The result parses to the same Examples as tf.train.Example protos
+  built from the rows, and has the same size.
+
+  Args:
+    shard_dict: A dict mapping column names to arrays of shape [n] or [n, k].
+
+  Returns:
+    A ragged array, i.e. a (data, lengths) tuple with the serialized Examples
+    of all rows concatenated and the length of each.
+  """
+  n = [i for i in shard_dict.values()][0].shape[0]
+  parts = []
+  for column in sorted(shard_dict):
+    parts.extend(_encode_feature_column(column, shard_dict[column]))
+  features_lengths = sum(part_lengths for _, part_lengths in parts)
+  if not parts:
+    features_lengths = np.zeros(n, dtype=np.int64)
+  header = _length_delimited_header(_EXAMPLE_FEATURES_TAG, features_lengths)
+  return _concat_ragged([header] + parts)
+
+
 def _shard_dict_to_examples(shard_dict):
   """Converts a dict of arrays into a list of example bytes."""
-  n = [i for i in shard_dict.values()][0].shape[0]
-  feature_list = [{} for _ in range(n)]
-  for column, values in shard_dict.items():
-    if len(values.shape) == 1:
-      values = np.reshape(values, values.shape + (1,))
-
-    if values.dtype.kind == "i":
-      feature_map = lambda x: tf.train.Feature(
-          int64_list=tf.train.Int64List(value=x))
-    elif values.dtype.kind == "f":
-      feature_map = lambda x: tf.train.Feature(
-          float_list=tf.train.FloatList(value=x))
-    else:
-      raise ValueError("Invalid dtype")
-    for i in range(n):
-      feature_list[i][column] = feature_map(values[i])
-  examples = [
-      tf.train.Example(features=tf.train.Features(feature=example_features))
-      for example_features in feature_list
-  ]
-
-  return [e.SerializeToString() for e in examples]
-
-
-def _serialize_shards(df_shards, columns, pool, writer):
-  """Map sharded dataframes to bytes, and write them to a buffer.
+  data, lengths = _encode_examples(shard_dict)
+  ends = np.cumsum(lengths)
+  data = data.tobytes()
+  return [data[end - length:end] for end, length in zip(ends, lengths)]
+
+
+def _write_shard(shard_dict_and_path):
+  """Serializes a dict of arrays and writes it to a TFRecord file.
 
   Args:
-    df_shards: A list of pandas dataframes. (Should be of similar size)
-    columns: The dataframe columns to be serialized.
-    pool: A multiprocessing pool to serialize in parallel.
-    writer: A TFRecordWriter to write the serialized shards.
+    shard_dict_and_path: A tuple of the dict of arrays and the path to write.
+
+  Returns:
+    The number of records written.
   """
-  # Pandas does not store columns of arrays as nd arrays. stack remedies this.
-  map_inputs = [{c: np.stack(shard[c].values, axis=0) for c in columns}
-                for shard in df_shards]
+  shard_dict, path = shard_dict_and_path
+  examples = _shard_dict_to_examples(shard_dict)
+  with tf.python_io.TFRecordWriter(path) as writer:
+    for example in examples:
+      writer.write(example)
+  return len(examples)
+
+
+def _check_shard_dicts(map_inputs):
+  """Checks the arrays to serialize in the main process.
 
-  # Failure within pools is very irksome. Thus, it is better to thoroughly check
-  # inputs in the main process.
+  Failure within pools is very irksome. Thus, it is better to thoroughly check
+  inputs in the main process.
+
+  Args:
+    map_inputs: A list of dicts mapping column names to arrays.
+  """
   for inp in map_inputs:
     # Check that all fields have the same number of rows.
     assert len(set([v.shape[0] for v in inp.values()])) == 1
     for val in inp.values():
       assert hasattr(val, "dtype")
       assert hasattr(val.dtype, "kind")
-      assert val.dtype.kind in ("i", "f")
+      assert val.dtype.kind in ("i", "u", "f")
       assert len(val.shape) in (1, 2)
-  shard_bytes = pool.map(_shard_dict_to_examples, map_inputs)
-  for s in shard_bytes:
-    for example in s:
-      writer.write(example)
+
+
+def _column_values(dataframe, column):
+  """Returns the feature name and the values of a column to serialize.
+
+  Args:
+    dataframe: A pandas dataframe.
+    column: A column name, or a (name, column names) pair to serialize several
+      columns of the dataframe as the single feature name, e.g. the columns of
+      a multi-hot encoding.
+
+  Returns:
+    The feature name and an array of shape [n] or [n, k] of its values.
+  """
+  if isinstance(column, tuple):
+    name, group = column
+    return name, dataframe[list(group)].values
+  # Pandas does not store columns of arrays as nd arrays. stack remedies this.
+  return column, np.stack(dataframe[column].values, axis=0)
+
+
+def _serialize_shards(df_shards, columns, pool, writer, part_prefix):
+  """Map sharded dataframes to TFRecord files, and append them to a buffer.
+
+  Each shard is serialized and written to its own TFRecord file by a process
+  of the pool. TFRecord files can be concatenated, so the files are then
+  appended to the buffer in order.
+
+  Args:
+    df_shards: A list of pandas dataframes. (Should be of similar size)
+    columns: The dataframe columns to be serialized, see _column_values.
+    pool: A multiprocessing pool to serialize in parallel.
+    writer: A binary tf.gfile.GFile of the buffer.
+    part_prefix: Prefix of the temporary TFRecord files of the shards.
+  """
+  map_inputs = [dict(_column_values(shard, c) for c in columns)
+                for shard in df_shards if len(shard)]
+  _check_shard_dicts(map_inputs)
+
+  part_paths = ["{}.part-{:05d}".format(part_prefix, i)
+                for i in range(len(map_inputs))]
+  try:
+    pool.map(_write_shard, zip(map_inputs, part_paths))
+    for part_path in part_paths:
+      with tf.gfile.GFile(part_path, "rb") as part:
+        while True:
+          chunk = part.read(_COPY_CHUNK_BYTES)
+          if not chunk:
+            break
+          writer.write(chunk)
+  finally:
+    for part_path in part_paths:
+      if tf.gfile.Exists(part_path):
+        tf.gfile.Remove(part_path)
+
 
 def write_to_buffer(dataframe, buffer_path, columns, expected_size=None):
   """Write a dataframe to a binary file for a dataset to consume.
@@ -162,7 +340,9 @@ def write_to_buffer(dataframe, buffer_path, columns, expected_size=None):
   Args:
     dataframe: The pandas dataframe to be serialized.
     buffer_path: The path where the serialized results will be written.
-    columns: The dataframe columns to be serialized.
+    columns: The dataframe columns to be serialized. An entry may also be a
+      (name, column names) pair, to write the values of these columns as a
+      single feature name.
     expected_size: The size in bytes of the serialized results. This is used to
       lazily construct the buffer.
 
@@ -189,10 +369,10 @@ def write_to_buffer(dataframe, buffer_path, columns, expected_size=None):
   count = 0
   pool = multiprocessing.Pool(multiprocessing.cpu_count())
   try:
-    with tf.python_io.TFRecordWriter(buffer_path) as writer:
+    with tf.gfile.GFile(buffer_path, "wb") as writer:
       for df_shards in iter_shard_dataframe(df=dataframe,
                                             rows_per_core=_ROWS_PER_CORE):
-        _serialize_shards(df_shards, columns, pool, writer)
+        _serialize_shards(df_shards, columns, pool, writer, buffer_path)
         count += sum([len(s) for s in df_shards])
         tf.logging.info("{}/{} examples written."
                         .format(str(count).ljust(8), len(dataframe)))
@@ -201,3 +381,98 @@ def write_to_buffer(dataframe, buffer_path, columns, expected_size=None):
 
   tf.logging.info("Buffer write complete.")
   return buffer_path
+
+
+def _fixed_length_column(values, width):
+  """Returns the values of a column as [n, width] in their record dtype."""
+  values = np.reshape(values, (values.shape[0], width))
+  if values.dtype.kind in ("i", "u"):
+    return np.ascontiguousarray(values, dtype=np.int64)
+  return np.ascontiguousarray(values, dtype=np.float32)
+
+
+def write_to_fixed_length_buffer(dataframe, buffer_path, columns):
+  """Write a dataframe to a file of fixed length records.
+
+  Unlike Example protos, the records need no parsing: each row is written as
+  the raw bytes of its values, integer columns as int64 and float columns as
+  float32, in the byte order of the host. The records can be read with
+  make_fixed_length_dataset.
+
+  Args:
+    dataframe: The pandas dataframe to be serialized.
+    buffer_path: The path where the records will be written.
+    columns: The dataframe columns to be serialized, as in write_to_buffer.
+      Columns must have scalars or arrays of the same length in every row.
+
+  Returns:
+    The record spec, a list of (column, dtype, width) tuples describing the
+    layout of a record.
+  """
+  n = len(dataframe)
+  names, arrays = zip(*[_column_values(dataframe, c) for c in columns])
+  _check_shard_dicts([dict(zip(names, arrays))])
+  record_spec = []
+  for column, values in zip(names, arrays):
+    width = int(np.prod(values.shape[1:]))
+    dtype = _fixed_length_column(values[:0], width).dtype
+    record_spec.append((column, dtype, width))
+
+  tf.gfile.MakeDirs(os.path.split(buffer_path)[0])
+  tf.logging.info("Constructing fixed length record buffer: {}"
+                  .format(buffer_path))
+  with tf.gfile.GFile(buffer_path, "wb") as writer:
+    for start in range(0, n, _ROWS_PER_CORE):
+      stop = min(start + _ROWS_PER_CORE, n)
+      writer.write(np.concatenate(
+          [_fixed_length_column(values[start:stop], width).view(np.uint8)
+           for values, (_, _, width) in zip(arrays, record_spec)],
+          axis=1).tobytes())
+  tf.logging.info("Buffer write complete.")
+  return record_spec
+
+
+def fixed_length_record_bytes(record_spec):
+  return sum(np.dtype(dtype).itemsize * width
+             for _, dtype, width in record_spec)
+
+
+def parse_fixed_length_records(records, record_spec):
+  """Splits a batch of fixed length records into features.
+
+  Args:
+    records: A string Tensor of shape [batch_size] of records written by
+      write_to_fixed_length_buffer.
+    record_spec: The record spec returned by write_to_fixed_length_buffer.
+
+  Returns:
+    A dict mapping columns to Tensors of shape [batch_size, width], as returned
+    by tf.parse_example for a tf.FixedLenFeature([width]).
+  """
+  raw = tf.decode_raw(records, tf.uint8)
+  features = {}
+  offset = 0
+  for column, dtype, width in record_spec:
+    itemsize = np.dtype(dtype).itemsize
+    values = raw[:, offset:offset + width * itemsize]
+    features[column] = tf.bitcast(
+        tf.reshape(values, [-1, width, itemsize]), tf.as_dtype(dtype))
+    offset += width * itemsize
+  return features
+
+
+def make_fixed_length_dataset(buffer_path, record_spec, batch_size):
+  """Creates a dataset of batches of features from fixed length records.
+
+  Args:
+    buffer_path: The path of the records.
+    record_spec: The record spec returned by write_to_fixed_length_buffer.
+    batch_size: The number of records in a batch.
+
+  Returns:
+    A tf.data.Dataset of dicts of [batch_size, width] Tensors.
+  """
+  dataset = tf.data.FixedLengthRecordDataset(
+      buffer_path, record_bytes=fixed_length_record_bytes(record_spec))
+  return dataset.batch(batch_size).map(
+      lambda records: parse_fixed_length_records(records, record_spec))
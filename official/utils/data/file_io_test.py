@@ -20,6 +20,7 @@ from __future__ import print_function
 
 import contextlib
 import multiprocessing
+import os
 
 # pylint: disable=wrong-import-order
 import numpy as np
@@ -188,6 +189,47 @@ class BaseTest(tf.test.TestCase):
   def test_serialize_deserialize_2(self):
     self._serialize_deserialize(num_cores=8)
 
+  def test_examples_match_protos(self):
+    shard_dict = {
+        _DUMMY_COL: np.array([0, 1, 300, -2, 2 ** 40], dtype=np.int64),
+        _DUMMY_VEC_COL: np.random.random((5, _DUMMY_VEC_LEN)),
+    }
+    for i, example_bytes in enumerate(
+        file_io._shard_dict_to_examples(shard_dict)):
+      example = tf.train.Example(features=tf.train.Features(feature={
+          _DUMMY_COL: tf.train.Feature(int64_list=tf.train.Int64List(
+              value=[shard_dict[_DUMMY_COL][i]])),
+          _DUMMY_VEC_COL: tf.train.Feature(float_list=tf.train.FloatList(
+              value=shard_dict[_DUMMY_VEC_COL][i])),
+      }))
+      self.assertEqual(example, tf.train.Example.FromString(example_bytes))
+      self.assertEqual(example.ByteSize(), len(example_bytes))
+
+  def test_fixed_length_round_trip(self):
+    num_rows = 7
+    df = pd.DataFrame({
+        _RAW_ROW: np.arange(num_rows),
+        _DUMMY_VEC_COL: [np.random.random(_DUMMY_VEC_LEN)
+                         for _ in range(num_rows)],
+    })
+    group_columns = ["group_{}".format(i) for i in range(3)]
+    group = np.random.randint(0, 2, size=(num_rows, 3)).astype(np.uint8)
+    df = pd.concat([df, pd.DataFrame(group, columns=group_columns)], axis=1)
+    buffer_path = os.path.join(self.get_temp_dir(), "fixed_length")
+    columns = [_RAW_ROW, _DUMMY_VEC_COL, (_DUMMY_COL, group_columns)]
+    record_spec = file_io.write_to_fixed_length_buffer(df, buffer_path, columns)
+    self.assertEqual(8 + 4 * _DUMMY_VEC_LEN + 8 * 3,
+                     file_io.fixed_length_record_bytes(record_spec))
+
+    with self.test_session(graph=tf.Graph()) as sess:
+      dataset = file_io.make_fixed_length_dataset(
+          buffer_path, record_spec, batch_size=num_rows)
+      batch = sess.run(dataset.make_one_shot_iterator().get_next())
+    self.assertAllEqual(np.arange(num_rows)[:, np.newaxis], batch[_RAW_ROW])
+    self.assertAllClose(np.stack(df[_DUMMY_VEC_COL].values),
+                        batch[_DUMMY_VEC_COL])
+    self.assertAllEqual(group, batch[_DUMMY_COL])
+
 
 if __name__ == "__main__":
   tf.test.main()
@@ -39,7 +39,7 @@ def define_benchmark(benchmark_log_dir=True, bigquery_uploader=True):
   flags.DEFINE_enum(
       name="benchmark_logger_type", default="BaseBenchmarkLogger",
       enum_values=["BaseBenchmarkLogger", "BenchmarkFileLogger",
-                   "BenchmarkBigQueryLogger"],
+                   "AsyncBenchmarkFileLogger", "BenchmarkBigQueryLogger"],
       help=help_wrap("The type of benchmark logger to use. Defaults to using "
                      "BaseBenchmarkLogger which logs to STDOUT. Different "
                      "loggers will require other flags to be able to work."))
@@ -57,6 +57,15 @@ def define_benchmark(benchmark_log_dir=True, bigquery_uploader=True):
         name="benchmark_log_dir", short_name="bld", default=None,
         help=help_wrap("The location of the benchmark logging.")
     )
+    flags.DEFINE_float(
+        name="benchmark_log_flush_secs", default=5.0,
+        help=help_wrap("With AsyncBenchmarkFileLogger, maximum number of "
+                       "seconds before logged metrics are written to disk."))
+    flags.DEFINE_integer(
+        name="benchmark_log_aggregation_window", default=0,
+        help=help_wrap("With AsyncBenchmarkFileLogger, number of values of a "
+                       "metric aggregated into one record with their mean, "
+                       "min, max and percentiles. 0 writes every value."))
 
   if bigquery_uploader:
     flags.DEFINE_string(
@@ -88,11 +97,13 @@ def define_benchmark(benchmark_log_dir=True, bigquery_uploader=True):
 
   @flags.multi_flags_validator(
       ["benchmark_logger_type", "benchmark_log_dir"],
-      message="--benchmark_logger_type=BenchmarkFileLogger will require "
-              "--benchmark_log_dir being set")
+      message="--benchmark_logger_type=BenchmarkFileLogger or "
+              "AsyncBenchmarkFileLogger will require --benchmark_log_dir "
+              "being set")
   def _check_benchmark_log_dir(flags_dict):
     benchmark_logger_type = flags_dict["benchmark_logger_type"]
-    if benchmark_logger_type == "BenchmarkFileLogger":
+    if benchmark_logger_type in ("BenchmarkFileLogger",
+                                 "AsyncBenchmarkFileLogger"):
       return flags_dict["benchmark_log_dir"]
     return True
 
@@ -29,6 +29,7 @@ import tensorflow as tf  # pylint: disable=g-bad-import-order
 from official.utils.logs import hooks
 from official.utils.logs import logger
 from official.utils.logs import metric_hook
+from official.utils.logs import step_time_hook
 
 _TENSORS_TO_LOG = dict((x, x) for x in ['learning_rate',
                                         'cross_entropy',
@@ -40,8 +41,8 @@ def get_train_hooks(name_list, use_tpu=False, **kwargs):
 
   Args:
     name_list: a list of strings to name desired hook classes. Allowed:
-      LoggingTensorHook, ProfilerHook, ExamplesPerSecondHook, which are defined
-      as keys in HOOKS
+      LoggingTensorHook, ProfilerHook, ExamplesPerSecondHook,
+      StepTimeBreakdownHook, which are defined as keys in HOOKS
     use_tpu: Boolean of whether computation occurs on a TPU. This will disable
       hooks altogether.
     **kwargs: a dictionary of arguments to the hooks.
@@ -154,10 +155,33 @@ def get_logging_metric_hook(tensors_to_log=None,
       every_n_secs=every_n_secs)
 
 
+def get_step_time_breakdown_hook(every_n_steps=100,
+                                 trace_every_n_steps=10,
+                                 warm_steps=5,
+                                 **kwargs):  # pylint: disable=unused-argument
+  """Function to get StepTimeBreakdownHook.
+
+  Args:
+    every_n_steps: `int`, log the step time breakdown every N steps.
+    trace_every_n_steps: `int`, trace a step every N steps to measure the time
+      spent waiting for input.
+    warm_steps: skip this number of steps before measuring.
+    **kwargs: a dictionary of arguments to StepTimeBreakdownHook.
+
+  Returns:
+    Returns a StepTimeBreakdownHook that logs step time percentiles and the
+    split of the step time between input wait, compute and host overhead.
+  """
+  return step_time_hook.StepTimeBreakdownHook(
+      every_n_steps=every_n_steps, trace_every_n_steps=trace_every_n_steps,
+      warm_steps=warm_steps, metric_logger=logger.get_benchmark_logger())
+
+
 # A dictionary to map one hook name and its corresponding function
 HOOKS = {
     'loggingtensorhook': get_logging_tensor_hook,
     'profilerhook': get_profiler_hook,
     'examplespersecondhook': get_examples_per_second_hook,
     'loggingmetrichook': get_logging_metric_hook,
+    'steptimebreakdownhook': get_step_time_breakdown_hook,
 }
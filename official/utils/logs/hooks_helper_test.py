@@ -63,5 +63,9 @@ class BaseTest(unittest.TestCase):
     test_hook_name = 'LoggingMetricHook'
     self.validate_train_hook_name(test_hook_name, 'loggingmetrichook')
 
+  def test_get_step_time_breakdown_hook(self):
+    self.validate_train_hook_name('StepTimeBreakdownHook',
+                                  'steptimebreakdownhook')
+
 if __name__ == '__main__':
   tf.test.main()
@@ -29,9 +29,12 @@ import multiprocessing
 import numbers
 import os
 import threading
+import time
 import uuid
 
+import numpy as np
 from six.moves import _thread as thread
+from six.moves import queue
 from absl import flags
 import tensorflow as tf
 from tensorflow.python.client import device_lib
@@ -49,6 +52,9 @@ RUN_STATUS_RUNNING = "running"
 
 FLAGS = flags.FLAGS
 
+# Queued to AsyncBenchmarkFileLogger to write the pending metrics.
+_FLUSH = object()
+
 # Don't use it directly. Use get_benchmark_logger to access a logger.
 _benchmark_logger = None
 _logger_lock = threading.Lock()
@@ -67,6 +73,12 @@ def config_benchmark_logger(flag_obj=None):
       _benchmark_logger = BaseBenchmarkLogger()
     elif flag_obj.benchmark_logger_type == "BenchmarkFileLogger":
       _benchmark_logger = BenchmarkFileLogger(flag_obj.benchmark_log_dir)
+    elif flag_obj.benchmark_logger_type == "AsyncBenchmarkFileLogger":
+      _benchmark_logger = AsyncBenchmarkFileLogger(
+          flag_obj.benchmark_log_dir,
+          flush_secs=getattr(flag_obj, "benchmark_log_flush_secs", 5.0),
+          aggregation_window=getattr(
+              flag_obj, "benchmark_log_aggregation_window", 0))
     elif flag_obj.benchmark_logger_type == "BenchmarkBigQueryLogger":
       from official.benchmark import benchmark_uploader as bu  # pylint: disable=g-import-not-at-top
       bq_uploader = bu.BigQueryUploader(gcp_project=flag_obj.gcp_project)
@@ -218,6 +230,187 @@ class BenchmarkFileLogger(BaseBenchmarkLogger):
     self._metric_file_handler.close()
 
 
+class AsyncBenchmarkFileLogger(BenchmarkFileLogger):
+  """Class to log the benchmark information to local disk asynchronously.
+
+  Metrics are put in a bounded queue and written by a background thread, in
+  batches, so that logging does not block the training loop on file I/O. The
+  file is flushed every flush_secs seconds or flush_size metrics. Optionally,
+  every aggregation_window values of a metric are aggregated into a single
+  record whose value is their mean and whose extras hold their count, min,
+  max and percentiles. If writing to the file fails, later metrics are
+  discarded and the error is raised by flush and on_finish.
+  """
+
+  def __init__(self, logging_dir, max_queue_size=10000, flush_secs=5.0,
+               flush_size=100, aggregation_window=0,
+               percentiles=(50, 90, 99)):
+    """Constructor.
+
+    Args:
+      logging_dir: string, the directory to write the log files to.
+      max_queue_size: int, maximum number of metrics waiting to be written.
+        log_metric blocks when the queue is full.
+      flush_secs: float, maximum number of seconds between flushes.
+      flush_size: int, maximum number of metrics written between flushes.
+      aggregation_window: int, number of values of a metric aggregated into one
+        record. Metrics are written as they are logged if 0.
+      percentiles: list of percentiles of the values reported by aggregation.
+    """
+    super(AsyncBenchmarkFileLogger, self).__init__(logging_dir)
+    self._flush_secs = flush_secs
+    self._flush_size = flush_size
+    self._aggregation_window = aggregation_window
+    self._percentiles = percentiles
+    self._windows = {}
+    self._error = None
+    self._queue = queue.Queue(maxsize=max_queue_size)
+    self._writer_thread = threading.Thread(target=self._write_metrics)
+    self._writer_thread.daemon = True
+    self._writer_thread.start()
+
+  def log_metric(self, name, value, unit=None, global_step=None, extras=None):
+    """Queue the benchmark metric information to be written to local file.
+
+    Args:
+      name: string, the name of the metric to log.
+      value: number, the value of the metric. The value will not be logged if it
+        is not a number type.
+      unit: string, the unit of the metric, E.g "image per second".
+      global_step: int, the global_step when the metric is logged.
+      extras: map of string:string, the extra information about the metric.
+    """
+    metric = _process_metric_to_json(name, value, unit, global_step, extras)
+    if metric:
+      self._queue.put((metric, True))
+
+  def log_evaluation_result(self, eval_results):
+    """Queue the evaluation result to be written, without aggregation.
+
+    Args:
+      eval_results: dict, the result of evaluate.
+    """
+    if not isinstance(eval_results, dict):
+      tf.logging.warning("eval_results should be dictionary for logging. "
+                         "Got %s", type(eval_results))
+      return
+    global_step = eval_results[tf.GraphKeys.GLOBAL_STEP]
+    for key in sorted(eval_results):
+      if key != tf.GraphKeys.GLOBAL_STEP:
+        metric = _process_metric_to_json(key, eval_results[key],
+                                         global_step=global_step)
+        if metric:
+          self._queue.put((metric, False))
+
+  def flush(self):
+    """Block until all the queued metrics are written and flushed.
+
+    Metrics in partial aggregation windows are only written by on_finish.
+
+    Raises:
+      Exception: the error that made writing to the log file fail, if any.
+    """
+    self._queue.put(_FLUSH)
+    self._queue.join()
+    self._raise_error()
+
+  def on_finish(self, status):
+    self._queue.put(None)
+    self._writer_thread.join()
+    try:
+      self._metric_file_handler.close()
+    finally:
+      self._raise_error()
+
+  def _raise_error(self):
+    if self._error is not None:
+      raise self._error  # pylint: disable=raising-bad-type
+
+  def _aggregate(self, metric):
+    """Add metric to its window, and return the aggregated window if full."""
+    window = self._windows.setdefault((metric["name"], metric["unit"]), [])
+    window.append(metric)
+    if len(window) < self._aggregation_window:
+      return None
+    del self._windows[(metric["name"], metric["unit"])]
+    return self._aggregated_metric(window)
+
+  def _aggregated_metric(self, window):
+    """Return the record summarizing a window of values of a metric."""
+    values = np.array([metric["value"] for metric in window])
+    stats = [("count", len(values)), ("min", float(values.min())),
+             ("max", float(values.max()))]
+    for percentile, value in zip(self._percentiles,
+                                 np.percentile(values, self._percentiles)):
+      stats.append(("p%g" % percentile, float(value)))
+    aggregated = dict(window[-1])
+    aggregated["value"] = float(values.mean())
+    aggregated["extras"] = window[-1]["extras"] + [
+        {"name": "aggregation_%s" % k, "value": v} for k, v in stats]
+    return aggregated
+
+  def _write(self, metrics):
+    """Write metrics to the log file and flush it."""
+    lines = []
+    for metric in metrics:
+      try:
+        lines.append(json.dumps(metric))
+      except (TypeError, ValueError) as e:
+        tf.logging.warning("Failed to dump metric to log file: "
+                           "name %s, value %s, error %s", metric["name"],
+                           metric["value"], e)
+    if lines and self._error is None:
+      try:
+        self._metric_file_handler.write("\n".join(lines) + "\n")
+        self._metric_file_handler.flush()
+      except Exception as e:  # pylint: disable=broad-except
+        # Keep draining the queue, so that log_metric and flush don't block.
+        tf.logging.error("Failed to write metrics to log file: %s", e)
+        self._error = e
+
+  def _write_metrics(self):
+    """Write queued metrics in batches until None is received."""
+    pending = []
+    deadline = None
+    while True:
+      try:
+        item = self._queue.get(
+            timeout=None if deadline is None else max(
+                0., deadline - time.time()))
+      except queue.Empty:
+        # flush_secs elapsed since the oldest pending metric was queued.
+        self._write(pending)
+        pending = []
+        deadline = None
+        continue
+      try:
+        if item is None or item is _FLUSH:
+          if item is None:
+            # Write the partial windows of aggregated metrics.
+            pending.extend(self._aggregated_metric(window)
+                           for window in self._windows.values())
+            self._windows = {}
+          self._write(pending)
+          pending = []
+          deadline = None
+          if item is None:
+            return
+          continue
+        metric, aggregate = item
+        if aggregate and self._aggregation_window > 0:
+          metric = self._aggregate(metric)
+        if metric:
+          pending.append(metric)
+          if deadline is None:
+            deadline = time.time() + self._flush_secs
+          if len(pending) >= self._flush_size:
+            self._write(pending)
+            pending = []
+            deadline = None
+      finally:
+        self._queue.task_done()
+
+
 class BenchmarkBigQueryLogger(BaseBenchmarkLogger):
   """Class to log the benchmark information to BigQuery data store."""
 
@@ -297,6 +297,67 @@ class BenchmarkFileLoggerTest(tf.test.TestCase):
     self.assertIsNotNone(run_info["machine_config"]["memory_available"])
 
 
+class AsyncBenchmarkFileLoggerTest(tf.test.TestCase):
+
+  def tearDown(self):
+    super(AsyncBenchmarkFileLoggerTest, self).tearDown()
+    tf.gfile.DeleteRecursively(self.get_temp_dir())
+
+  def _read_metrics(self, log_dir):
+    with tf.gfile.GFile(os.path.join(log_dir, "metric.log")) as f:
+      return [json.loads(line) for line in f]
+
+  def test_log_metric_and_flush(self):
+    log_dir = tempfile.mkdtemp(dir=self.get_temp_dir())
+    log = logger.AsyncBenchmarkFileLogger(log_dir, flush_secs=100)
+    log.log_metric("accuracy", 0.999, global_step=1e4, extras={"name": "value"})
+    log.log_metric("loss", 0.02, global_step=1e4)
+    log.flush()
+
+    metrics = self._read_metrics(log_dir)
+    self.assertEqual(["accuracy", "loss"], [m["name"] for m in metrics])
+    self.assertEqual(metrics[0]["value"], 0.999)
+    self.assertEqual(metrics[0]["global_step"], 1e4)
+    self.assertEqual(metrics[0]["extras"], [{"name": "name", "value": "value"}])
+    log.on_finish(logger.RUN_STATUS_SUCCESS)
+
+  def test_aggregation(self):
+    log_dir = tempfile.mkdtemp(dir=self.get_temp_dir())
+    log = logger.AsyncBenchmarkFileLogger(log_dir, aggregation_window=4,
+                                          percentiles=(50,))
+    for step in range(6):
+      log.log_metric("exp_per_sec", step, global_step=step)
+    log.log_evaluation_result({"accuracy": 0.9, tf.GraphKeys.GLOBAL_STEP: 5})
+    log.on_finish(logger.RUN_STATUS_SUCCESS)
+
+    metrics = self._read_metrics(log_dir)
+    self.assertEqual(3, len(metrics))
+    self.assertEqual(1.5, metrics[0]["value"])
+    self.assertEqual(3, metrics[0]["global_step"])
+    self.assertEqual(
+        [{"name": "aggregation_count", "value": 4},
+         {"name": "aggregation_min", "value": 0.},
+         {"name": "aggregation_max", "value": 3.},
+         {"name": "aggregation_p50", "value": 1.5}], metrics[0]["extras"])
+    self.assertEqual("accuracy", metrics[1]["name"])
+    # The partial window is written when finishing.
+    self.assertEqual(4.5, metrics[2]["value"])
+
+  def test_write_error(self):
+    log_dir = tempfile.mkdtemp(dir=self.get_temp_dir())
+    log = logger.AsyncBenchmarkFileLogger(log_dir, max_queue_size=2,
+                                          flush_size=1)
+    with mock.patch.object(log._metric_file_handler, "write",
+                           side_effect=IOError("disk full")):
+      # The writer thread keeps draining the queue, so logging doesn't block.
+      for step in range(10):
+        log.log_metric("loss", 0.1, global_step=step)
+      with self.assertRaises(IOError):
+        log.flush()
+    with self.assertRaises(IOError):
+      log.on_finish(logger.RUN_STATUS_FAILURE)
+
+
 @unittest.skipIf(bigquery is None, 'Bigquery dependency is not installed.')
 class BenchmarkBigQueryLoggerTest(tf.test.TestCase):
 
@@ -0,0 +1,184 @@
+# Copyright 2018 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Session hook that breaks down where the wall time of training steps goes."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+import numpy as np
+import tensorflow as tf  # pylint: disable=g-bad-import-order
+
+from official.utils.logs import logger
+
+_GET_NEXT_OP = "GetNext"
+
+
+def input_wait_secs(step_stats):
+  """Returns the time a step spent waiting for input iterators.
+
+  Args:
+    step_stats: a `StepStats` proto from the `RunMetadata` of a traced step.
+
+  Returns:
+    Length in seconds of the union of the execution intervals of the iterator
+    get_next ops of the step, which block until the input pipeline produces a
+    batch.
+  """
+  intervals = []
+  for dev_stats in step_stats.dev_stats:
+    for node_stats in dev_stats.node_stats:
+      if _GET_NEXT_OP in node_stats.node_name:
+        start = node_stats.all_start_micros
+        intervals.append((start, start + node_stats.all_end_rel_micros))
+  total = 0
+  end = None
+  for interval_start, interval_end in sorted(intervals):
+    if end is None or interval_start > end:
+      total += interval_end - interval_start
+      end = interval_end
+    elif interval_end > end:
+      total += interval_end - end
+      end = interval_end
+  return total / 1e6
+
+
+class StepTimeBreakdownHook(tf.train.SessionRunHook):
+  """Hook to log a breakdown of the step time.
+
+  The wall time of a step is split into the time spent in session.run and the
+  host time between two runs (other hooks and the training loop). Every
+  `trace_every_n_steps` steps, the run is traced to split its time into
+  waiting for the input pipeline (the iterator get_next ops) and compute.
+  Every `every_n_steps` steps, the percentiles of the step time, the mean
+  time of each part and the input-bound ratio, i.e. the fraction of the run
+  time spent waiting for input, are logged. Traced steps, which are slower, are
+  only used for the input-bound ratio.
+  """
+
+  def __init__(self,
+               every_n_steps=100,
+               trace_every_n_steps=10,
+               warm_steps=5,
+               metric_logger=None):
+    """Initializer for StepTimeBreakdownHook.
+
+    Args:
+      every_n_steps: Log stats every n local steps.
+      trace_every_n_steps: Trace a step every n local steps to measure the
+        input wait. The input wait is not measured if 0.
+      warm_steps: The number of global steps to be skipped before measuring.
+      metric_logger: instance of `BenchmarkLogger`, the benchmark logger that
+          hook should use to write the log. If None, BaseBenchmarkLogger will
+          be used.
+
+    Raises:
+      ValueError: if `every_n_steps` is not positive.
+    """
+    if every_n_steps <= 0:
+      raise ValueError("every_n_steps should be positive.")
+    self._logger = metric_logger or logger.BaseBenchmarkLogger()
+    self._every_n_steps = every_n_steps
+    self._trace_every_n_steps = trace_every_n_steps
+    self._warm_steps = warm_steps
+    self._local_step = 0
+    self._last_run_end = None
+    self._reset()
+
+  def _reset(self):
+    self._step_times = []
+    self._run_times = []
+    self._traced_run_time = 0.
+    self._traced_input_wait = 0.
+
+  def begin(self):
+    """Called once before using the session to check global step."""
+    self._global_step_tensor = tf.train.get_global_step()
+    if self._global_step_tensor is None:
+      raise RuntimeError(
+          "Global step should be created to use StepTimeBreakdownHook.")
+
+  def before_run(self, run_context):  # pylint: disable=unused-argument
+    """Called before each call to run().
+
+    Args:
+      run_context: A SessionRunContext object.
+
+    Returns:
+      A SessionRunArgs object requesting the global step, and a trace of the
+      run if the input wait is measured for this step.
+    """
+    self._local_step += 1
+    self._traced = (self._trace_every_n_steps > 0 and
+                    not self._local_step % self._trace_every_n_steps)
+    options = None
+    if self._traced:
+      options = tf.RunOptions(trace_level=tf.RunOptions.SOFTWARE_TRACE)
+    self._run_start = time.time()
+    return tf.train.SessionRunArgs(self._global_step_tensor, options=options)
+
+  def after_run(self, run_context, run_values):  # pylint: disable=unused-argument
+    """Called after each call to run().
+
+    Args:
+      run_context: A SessionRunContext object.
+      run_values: A SessionRunValues object.
+    """
+    run_end = time.time()
+    last_run_end = self._last_run_end
+    self._last_run_end = run_end
+    global_step = run_values.results
+    if global_step <= self._warm_steps:
+      return
+
+    run_time = run_end - self._run_start
+    if self._traced:
+      self._traced_run_time += run_time
+      self._traced_input_wait += input_wait_secs(
+          run_values.run_metadata.step_stats)
+    elif last_run_end is not None:
+      self._step_times.append(run_end - last_run_end)
+      self._run_times.append(run_time)
+
+    if len(self._step_times) >= self._every_n_steps:
+      self._log_stats(global_step)
+      self._reset()
+
+  def _log_stats(self, global_step):
+    """Logs the stats of the steps measured since the last call."""
+    step_times = np.array(self._step_times) * 1000
+    run_time = np.mean(self._run_times) * 1000
+    for percentile in (50, 90, 99):
+      self._logger.log_metric(
+          "step_time_p%d" % percentile, np.percentile(step_times, percentile),
+          unit="ms", global_step=global_step)
+    self._logger.log_metric("step_time_mean", step_times.mean(), unit="ms",
+                            global_step=global_step)
+    self._logger.log_metric("session_run_time_mean", run_time, unit="ms",
+                            global_step=global_step)
+    self._logger.log_metric("host_time_mean", step_times.mean() - run_time,
+                            unit="ms", global_step=global_step)
+    if self._traced_run_time > 0:
+      input_bound_ratio = self._traced_input_wait / self._traced_run_time
+      self._logger.log_metric("input_wait_time_mean",
+                              run_time * input_bound_ratio, unit="ms",
+                              global_step=global_step)
+      self._logger.log_metric("compute_time_mean",
+                              run_time * (1 - input_bound_ratio), unit="ms",
+                              global_step=global_step)
+      self._logger.log_metric("input_bound_ratio", input_bound_ratio,
+                              global_step=global_step)
@@ -0,0 +1,74 @@
+# Copyright 2018 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for step_time_hook."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow as tf  # pylint: disable=g-bad-import-order
+
+from official.utils.logs import step_time_hook
+from official.utils.testing import mock_lib
+
+
+class StepTimeBreakdownHookTest(tf.test.TestCase):
+
+  def setUp(self):
+    self._logger = mock_lib.MockBenchmarkLogger()
+
+  def test_input_wait_secs(self):
+    step_stats = tf.RunMetadata().step_stats
+    for device, node_name, start, duration in [
+        ("cpu", "IteratorGetNext", 100, 50), ("cpu", "conv", 150, 1000),
+        ("gpu", "IteratorGetNext_1", 120, 50), ("gpu", "GetNext", 500, 10)]:
+      dev_stats = step_stats.dev_stats.add(device=device)
+      dev_stats.node_stats.add(node_name=node_name, all_start_micros=start,
+                               all_end_rel_micros=duration)
+    # The intervals of the first two get_next ops overlap.
+    self.assertAlmostEqual(80e-6, step_time_hook.input_wait_secs(step_stats))
+
+  def test_raise_in_non_positive_steps(self):
+    with self.assertRaises(ValueError):
+      step_time_hook.StepTimeBreakdownHook(every_n_steps=0)
+
+  def test_log_step_time_breakdown(self):
+    with tf.Graph().as_default():
+      tf.train.create_global_step()
+      dataset = tf.data.Dataset.range(100).map(lambda x: x + 1)
+      value = dataset.make_one_shot_iterator().get_next()
+      train_op = tf.group(tf.assign_add(tf.train.get_global_step(), 1), value)
+      hook = step_time_hook.StepTimeBreakdownHook(
+          every_n_steps=5, trace_every_n_steps=2, warm_steps=1,
+          metric_logger=self._logger)
+      with tf.train.MonitoredSession(
+          tf.train.ChiefSessionCreator(), [hook]) as mon_sess:
+        for _ in range(12):
+          mon_sess.run(train_op)
+
+    metrics = {m["name"]: m for m in self._logger.logged_metric}
+    self.assertItemsEqual(
+        ["step_time_p50", "step_time_p90", "step_time_p99", "step_time_mean",
+         "session_run_time_mean", "host_time_mean", "input_wait_time_mean",
+         "compute_time_mean", "input_bound_ratio"], metrics)
+    self.assertEqual("ms", metrics["step_time_p50"]["unit"])
+    self.assertLessEqual(metrics["step_time_p50"]["value"],
+                         metrics["step_time_p99"]["value"])
+    self.assertGreaterEqual(metrics["input_bound_ratio"]["value"], 0.)
+    self.assertLessEqual(metrics["input_bound_ratio"]["value"], 1.)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -88,9 +88,12 @@ def _df_to_input_fn(df, name, dataset, data_dir, batch_size, repeat, shuffle):
   buffer_path = _buffer_path(data_dir, dataset, name)
   expected_size = _BUFFER_SIZE[dataset].get(name)
 
+  # integerize_genres stores the multi-hot genres as one column per genre.
+  columns = [(c, movielens.GENRES) if c == movielens.GENRE_COLUMN else c
+             for c in _FEATURE_MAP]
   file_io.write_to_buffer(
-      dataframe=df, buffer_path=buffer_path,
-      columns=list(_FEATURE_MAP.keys()), expected_size=expected_size)
+      dataframe=df, buffer_path=buffer_path, columns=columns,
+      expected_size=expected_size)
 
   def input_fn():
     dataset = tf.data.TFRecordDataset(buffer_path)
@@ -20,6 +20,7 @@ from __future__ import print_function
 import os
 
 import numpy as np
+import pandas as pd
 import tensorflow as tf  # pylint: disable=g-bad-import-order
 
 from official.datasets import movielens
@@ -101,6 +102,27 @@ class BaseTest(tf.test.TestCase):
 
       self.assertAllClose(labels[0], [1.0])
 
+  def test_genres_to_multi_hot(self):
+    genres = movielens.genres_to_multi_hot(
+        pd.Series(["Comedy|Children's", "(no genres listed)", "Comedy"]))
+    expected = np.zeros((3, movielens.N_GENRE), dtype=np.uint8)
+    expected[0, movielens.GENRES.index("Children")] = 1
+    expected[[0, 2], movielens.GENRES.index("Comedy")] = 1
+    self.assertAllEqual(expected, genres)
+
+  def test_integerize_genres(self):
+    df = movielens.integerize_genres(pd.DataFrame({
+        movielens.ITEM_COLUMN: [1, 2],
+        movielens.GENRE_COLUMN: ["Comedy|Children's", "Drama"]}))
+    self.assertNotIn(movielens.GENRE_COLUMN, df.columns)
+    self.assertAllEqual([1, 2], df[movielens.ITEM_COLUMN].values)
+    genres = df[movielens.GENRES].values
+    self.assertEqual((2, movielens.N_GENRE), genres.shape)
+    self.assertEqual(np.uint8, genres.dtype)
+    expected = movielens.genres_to_multi_hot(
+        pd.Series(["Comedy|Children's", "Drama"]))
+    self.assertAllEqual(expected, genres)
+
   def test_end_to_end_deep(self):
     integration.run_synthetic(
         main=movielens_main.main, tmp_root=self.temp_dir,
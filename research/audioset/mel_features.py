@@ -27,7 +27,7 @@ def frame(data, window_length, hop_length):
 
   This is accomplished using stride_tricks, so the original data is not
   copied.  However, there is no zero-padding, so any incomplete frames at the
-  end are not included.
+  end are not included, and data shorter than one frame gives zero frames.
 
   Args:
     data: np.array of dimension N >= 1.
@@ -39,7 +39,8 @@ def frame(data, window_length, hop_length):
     extracted.
   """
   num_samples = data.shape[0]
-  num_frames = 1 + int(np.floor((num_samples - window_length) / hop_length))
+  num_frames = max(
+      0, 1 + int(np.floor((num_samples - window_length) / hop_length)))
   shape = (num_frames, window_length) + data.shape[1:]
   strides = (data.strides[0] * hop_length,) + data.strides
   return np.lib.stride_tricks.as_strided(data, shape=shape, strides=strides)
@@ -209,15 +210,130 @@ def log_mel_spectrogram(data,
     2D np.array of (num_frames, num_mel_bins) consisting of log mel filterbank
     magnitudes for successive frames.
   """
-  window_length_samples = int(round(audio_sample_rate * window_length_secs))
-  hop_length_samples = int(round(audio_sample_rate * hop_length_secs))
-  fft_length = 2 ** int(np.ceil(np.log(window_length_samples) / np.log(2.0)))
-  spectrogram = stft_magnitude(
-      data,
-      fft_length=fft_length,
-      hop_length=hop_length_samples,
-      window_length=window_length_samples)
-  mel_spectrogram = np.dot(spectrogram, spectrogram_to_mel_matrix(
-      num_spectrogram_bins=spectrogram.shape[1],
-      audio_sample_rate=audio_sample_rate, **kwargs))
-  return np.log(mel_spectrogram + log_offset)
+  frontend = LogMelFrontend(audio_sample_rate=audio_sample_rate,
+                            log_offset=log_offset,
+                            window_length_secs=window_length_secs,
+                            hop_length_secs=hop_length_secs,
+                            **kwargs)
+  return frontend.compute(data)
+
+
+class LogMelFrontend(object):
+  """Computes log mel spectrograms, optionally from streaming audio.
+
+  The analysis window and the mel weights matrix are calculated once when the
+  frontend is built, so reusing a frontend avoids that overhead for every clip.
+  compute() and compute_batch() convert whole clips, the latter passing the
+  frames of all clips to a single FFT call.  process() and process_examples()
+  accept successive chunks of one audio stream of arbitrary size, carrying
+  incomplete frames over to the next call, and return the log mel frames (or
+  example patches of frames) that became complete.  Concatenating their results
+  gives the same values as converting the whole stream at once.
+  """
+
+  def __init__(self,
+               audio_sample_rate=8000,
+               log_offset=0.0,
+               window_length_secs=0.025,
+               hop_length_secs=0.010,
+               example_window_length=None,
+               example_hop_length=None,
+               **kwargs):
+    """Constructs the frontend.
+
+    Args:
+      audio_sample_rate: The sampling rate of the audio data.
+      log_offset: Add this to values when taking log to avoid -Infs.
+      window_length_secs: Duration of each window to analyze.
+      hop_length_secs: Advance between successive analysis windows.
+      example_window_length: Number of log mel frames in each example patch
+        returned by process_examples().
+      example_hop_length: Advance (in frames) between successive example
+        patches.  Defaults to example_window_length.
+      **kwargs: Additional arguments to pass to spectrogram_to_mel_matrix.
+    """
+    self.log_offset = log_offset
+    self.window_length_samples = int(
+        round(audio_sample_rate * window_length_secs))
+    self.hop_length_samples = int(round(audio_sample_rate * hop_length_secs))
+    self.fft_length = 2 ** int(
+        np.ceil(np.log(self.window_length_samples) / np.log(2.0)))
+    self.window = periodic_hann(self.window_length_samples)
+    self.mel_matrix = spectrogram_to_mel_matrix(
+        num_spectrogram_bins=self.fft_length // 2 + 1,
+        audio_sample_rate=audio_sample_rate, **kwargs)
+    self.num_mel_bins = self.mel_matrix.shape[1]
+    self.example_window_length = example_window_length
+    self.example_hop_length = example_hop_length or example_window_length
+    self.reset()
+
+  def reset(self):
+    """Discards any buffered audio, e.g. to start a new stream."""
+    self._pending_samples = np.zeros(0)
+    self._pending_frames = np.zeros((0, self.num_mel_bins))
+
+  def _log_mel(self, frames):
+    """Converts (num_frames, window_length) samples to log mel frames."""
+    spectrogram = np.abs(np.fft.rfft(frames * self.window, self.fft_length))
+    return np.log(np.dot(spectrogram, self.mel_matrix) + self.log_offset)
+
+  def compute(self, data):
+    """Converts a whole waveform; see log_mel_spectrogram()."""
+    return self.compute_batch([data])[0]
+
+  def compute_batch(self, clips):
+    """Converts several waveforms with a single FFT call.
+
+    Args:
+      clips: List of 1D np.arrays of waveform data.
+
+    Returns:
+      List of 2D np.arrays of (num_frames, num_mel_bins), one per clip.
+    """
+    if not clips:
+      return []
+    frames = [frame(data, self.window_length_samples, self.hop_length_samples)
+              for data in clips]
+    log_mel = self._log_mel(np.concatenate(frames))
+    splits = np.cumsum([f.shape[0] for f in frames])[:-1]
+    return np.split(log_mel, splits)
+
+  def process(self, chunk):
+    """Adds a chunk of a stream and returns its newly completed frames.
+
+    Args:
+      chunk: 1D np.array of waveform data following the previous chunk.
+
+    Returns:
+      2D np.array of (num_frames, num_mel_bins), possibly with no rows.
+    """
+    samples = np.concatenate([self._pending_samples, chunk])
+    frames = frame(samples, self.window_length_samples,
+                   self.hop_length_samples)
+    # Keep the samples the next frame starts with.
+    self._pending_samples = samples[
+        frames.shape[0] * self.hop_length_samples:]
+    return self._log_mel(frames)
+
+  def process_examples(self, chunk):
+    """Adds a chunk of a stream and returns newly completed example patches.
+
+    Args:
+      chunk: 1D np.array of waveform data following the previous chunk.
+
+    Returns:
+      3D np.array of (num_examples, example_window_length, num_mel_bins),
+      possibly with no examples.
+
+    Raises:
+      ValueError: if the frontend was built without example_window_length.
+    """
+    if not self.example_window_length:
+      raise ValueError("example_window_length must be set to make examples")
+    log_mel = np.concatenate([self._pending_frames, self.process(chunk)])
+    examples = frame(log_mel, self.example_window_length,
+                     self.example_hop_length)
+    self._pending_frames = log_mel[
+        examples.shape[0] * self.example_hop_length:]
+    # Copy, since the examples are views into the carried-over frames.
+    return np.array(examples)
@@ -0,0 +1,76 @@
+# Copyright 2018 The TensorFlow Authors All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Tests for the LogMelFrontend of mel_features."""
+
+from __future__ import print_function
+
+import unittest
+
+import numpy as np
+
+import mel_features
+
+
+def _reference_log_mel(data, frontend):
+  """Computes a log mel spectrogram one clip at a time."""
+  spectrogram = mel_features.stft_magnitude(
+      data,
+      fft_length=frontend.fft_length,
+      hop_length=frontend.hop_length_samples,
+      window_length=frontend.window_length_samples)
+  return np.log(np.dot(spectrogram, frontend.mel_matrix) +
+                frontend.log_offset)
+
+
+class LogMelFrontendTest(unittest.TestCase):
+
+  def setUp(self):
+    rng = np.random.RandomState(0)
+    # The last clip is shorter than one window, so it has no frames.
+    self.clips = [rng.randn(length) for length in [8000, 1234, 555, 100]]
+    self.frontend = mel_features.LogMelFrontend(
+        audio_sample_rate=8000, log_offset=0.01, num_mel_bins=64,
+        example_window_length=10, example_hop_length=5)
+
+  def test_compute_batch_matches_per_clip(self):
+    results = self.frontend.compute_batch(self.clips)
+    self.assertEqual(len(results), len(self.clips))
+    for clip, result in zip(self.clips, results):
+      np.testing.assert_allclose(
+          result, _reference_log_mel(clip, self.frontend), rtol=1e-10)
+    self.assertEqual(results[-1].shape, (0, 64))
+
+  def test_compute_batch_of_no_clips(self):
+    self.assertEqual(self.frontend.compute_batch([]), [])
+
+  def test_process_matches_compute(self):
+    stream = np.concatenate(self.clips)
+    chunks = np.split(stream, [7, 100, 3000, 3001, 9000])
+    frames = np.concatenate([self.frontend.process(c) for c in chunks])
+    np.testing.assert_allclose(frames, self.frontend.compute(stream),
+                               rtol=1e-10)
+
+  def test_process_examples_matches_compute(self):
+    stream = np.concatenate(self.clips)
+    chunks = np.split(stream, [500, 4000, 4100])
+    examples = np.concatenate(
+        [self.frontend.process_examples(c) for c in chunks])
+    expected = mel_features.frame(self.frontend.compute(stream), 10, 5)
+    np.testing.assert_allclose(examples, expected, rtol=1e-10)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -24,6 +24,54 @@ import vggish_params
 import soundfile as sf
 
 
+_frontend = None
+
+
+def get_frontend():
+  """Returns a mel_features.LogMelFrontend configured for VGGish.
+
+  The frontend is built once and shared, so that the analysis window and mel
+  weights are not recalculated for every clip.  Its process_examples() method
+  can be used to compute examples from live audio at vggish_params.SAMPLE_RATE;
+  use a fresh frontend (e.g. copy.deepcopy of this one) per stream.
+  """
+  global _frontend
+  if _frontend is None:
+    features_sample_rate = 1.0 / vggish_params.STFT_HOP_LENGTH_SECONDS
+    _frontend = mel_features.LogMelFrontend(
+        audio_sample_rate=vggish_params.SAMPLE_RATE,
+        log_offset=vggish_params.LOG_OFFSET,
+        window_length_secs=vggish_params.STFT_WINDOW_LENGTH_SECONDS,
+        hop_length_secs=vggish_params.STFT_HOP_LENGTH_SECONDS,
+        example_window_length=int(round(
+            vggish_params.EXAMPLE_WINDOW_SECONDS * features_sample_rate)),
+        example_hop_length=int(round(
+            vggish_params.EXAMPLE_HOP_SECONDS * features_sample_rate)),
+        num_mel_bins=vggish_params.NUM_MEL_BINS,
+        lower_edge_hertz=vggish_params.MEL_MIN_HZ,
+        upper_edge_hertz=vggish_params.MEL_MAX_HZ)
+  return _frontend
+
+
+def _to_vggish_waveform(data, sample_rate):
+  """Converts audio to mono at the sample rate assumed by VGGish."""
+  # Convert to mono.
+  if len(data.shape) > 1:
+    data = np.mean(data, axis=1)
+  # Resample to the rate assumed by VGGish.
+  if sample_rate != vggish_params.SAMPLE_RATE:
+    data = resampy.resample(data, sample_rate, vggish_params.SAMPLE_RATE)
+  return data
+
+
+def _log_mel_to_examples(log_mel):
+  frontend = get_frontend()
+  return mel_features.frame(
+      log_mel,
+      window_length=frontend.example_window_length,
+      hop_length=frontend.example_hop_length)
+
+
 def waveform_to_examples(data, sample_rate):
   """Converts audio waveform into an array of examples for VGGish.
 
@@ -40,35 +88,24 @@ def waveform_to_examples(data, sample_rate):
     spectrogram, covering num_frames frames of audio and num_bands mel frequency
     bands, where the frame length is vggish_params.STFT_HOP_LENGTH_SECONDS.
   """
-  # Convert to mono.
-  if len(data.shape) > 1:
-    data = np.mean(data, axis=1)
-  # Resample to the rate assumed by VGGish.
-  if sample_rate != vggish_params.SAMPLE_RATE:
-    data = resampy.resample(data, sample_rate, vggish_params.SAMPLE_RATE)
+  data = _to_vggish_waveform(data, sample_rate)
+  # Compute log mel spectrogram features and frame them into examples.
+  return _log_mel_to_examples(get_frontend().compute(data))
 
-  # Compute log mel spectrogram features.
-  log_mel = mel_features.log_mel_spectrogram(
-      data,
-      audio_sample_rate=vggish_params.SAMPLE_RATE,
-      log_offset=vggish_params.LOG_OFFSET,
-      window_length_secs=vggish_params.STFT_WINDOW_LENGTH_SECONDS,
-      hop_length_secs=vggish_params.STFT_HOP_LENGTH_SECONDS,
-      num_mel_bins=vggish_params.NUM_MEL_BINS,
-      lower_edge_hertz=vggish_params.MEL_MIN_HZ,
-      upper_edge_hertz=vggish_params.MEL_MAX_HZ)
-
-  # Frame features into examples.
-  features_sample_rate = 1.0 / vggish_params.STFT_HOP_LENGTH_SECONDS
-  example_window_length = int(round(
-      vggish_params.EXAMPLE_WINDOW_SECONDS * features_sample_rate))
-  example_hop_length = int(round(
-      vggish_params.EXAMPLE_HOP_SECONDS * features_sample_rate))
-  log_mel_examples = mel_features.frame(
-      log_mel,
-      window_length=example_window_length,
-      hop_length=example_hop_length)
-  return log_mel_examples
+
+def waveforms_to_examples(clips):
+  """Like waveform_to_examples(), but for many clips with one FFT call.
+
+  Args:
+    clips: List of (data, sample_rate) pairs, see waveform_to_examples().
+
+  Returns:
+    List of examples arrays, one per clip, see waveform_to_examples().
+  """
+  waveforms = [_to_vggish_waveform(data, sample_rate)
+               for data, sample_rate in clips]
+  return [_log_mel_to_examples(log_mel)
+          for log_mel in get_frontend().compute_batch(waveforms)]
 
 
 def wavfile_to_examples(wav_file):
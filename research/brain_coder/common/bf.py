@@ -36,6 +36,19 @@ CHARS = INT_TO_CHAR = ['>', '<', '+', '-', '[', ']', '.', ',']
 CHAR_TO_INT = dict([(c, i) for i, c in enumerate(INT_TO_CHAR)])
 
 
+# Opcodes of compiled programs. See `compile_program`.
+OP_NOP, OP_ADD, OP_MOVE, OP_CLEAR, OP_OPEN, OP_CLOSE, OP_OUTPUT, OP_INPUT = (
+    range(8))
+
+# Number of compiled ops executed between two checks of the timeout.
+TIMEOUT_CHECK_INTERVAL = 1000
+
+
+CompiledProgram = namedtuple(
+    'CompiledProgram', ['code', 'bracemap', 'correct_syntax', 'ops', 'args',
+                        'costs', 'sources'])
+
+
 class LookAheadIterator(object):
   """Same API as Python iterator, with additional peek method."""
 
@@ -47,7 +60,7 @@ class LookAheadIterator(object):
 
   def _preload_next(self):
     try:
-      self._current_element = self._it.next()
+      self._current_element = next(self._it)
     except StopIteration:
       self._done = True
 
@@ -58,6 +71,8 @@ class LookAheadIterator(object):
     self._preload_next()
     return element
 
+  __next__ = next
+
   def peek(self, default_value=None):
     if self._done:
       if default_value is None:
@@ -101,6 +116,91 @@ def buildbracemap(code):
   return bracemap, correct_syntax
 
 
+def compile_program(code):
+  """Compile BF code into bytecode.
+
+  Runs of '+', '-', '>' and '<' are folded into a single op, '[-]' and '[+]'
+  become a single op which zeroes the current cell, and loop ops hold the
+  position of the op to jump to. Ignored characters and unmatched braces are
+  not emitted as ops, but their execution steps are charged to the next op so
+  that step counts match a character-by-character execution.
+
+  Args:
+    code: String or list of BF characters.
+
+  Returns:
+    CompiledProgram namedtuple containing
+      code: The code as a list of characters.
+      bracemap: See `buildbracemap`.
+      correct_syntax: See `buildbracemap`.
+      ops: List of opcodes (OP_* constants).
+      args: List of op arguments. Signed increment for OP_ADD, signed pointer
+          shift for OP_MOVE, increment of the loop body for OP_CLEAR, and
+          index of the op to jump to for OP_OPEN and OP_CLOSE.
+      costs: List of the number of execution steps charged to each op. For
+          OP_CLEAR the loop iterations are charged at runtime.
+      sources: List of positions in `code` where each op (including the
+          ignored characters charged to it) starts.
+  """
+  code = list(code)
+  bracemap, correct_syntax = buildbracemap(code)
+  ops, args, costs, sources = [], [], [], []
+  open_ops = []
+
+  pos = 0
+  skipped = 0  # Steps of ignored characters not yet charged to an op.
+  while pos < len(code):
+    command = code[pos]
+    if command not in CHAR_TO_INT or bracemap.get(pos) == pos:
+      skipped += 1
+      pos += 1
+      continue
+
+    sources.append(pos - skipped)
+    if command in '+-<>':
+      run = pos
+      while run < len(code) and code[run] == command:
+        run += 1
+      count = run - pos
+      sign = 1 if command in '+>' else -1
+      ops.append(OP_ADD if command in '+-' else OP_MOVE)
+      args.append(sign * count)
+      costs.append(skipped + count)
+      pos = run
+    elif (command == '[' and bracemap[pos] == pos + 2 and
+          code[pos + 1] in '+-'):
+      ops.append(OP_CLEAR)
+      args.append(1 if code[pos + 1] == '+' else -1)
+      costs.append(skipped + 1)  # Loop body is charged when executed.
+      pos += 3
+    else:
+      if command == '[':
+        ops.append(OP_OPEN)
+        open_ops.append(len(ops) - 1)
+        args.append(None)  # Filled in when the closing brace is found.
+      elif command == ']':
+        start = open_ops.pop()
+        args[start] = len(ops) + 1
+        ops.append(OP_CLOSE)
+        args.append(start + 1)
+      else:
+        ops.append(OP_OUTPUT if command == '.' else OP_INPUT)
+        args.append(None)
+      costs.append(skipped + 1)
+      pos += 1
+    skipped = 0
+
+  if skipped:
+    sources.append(pos - skipped)
+    ops.append(OP_NOP)
+    args.append(None)
+    costs.append(skipped)
+
+  return CompiledProgram(
+      code=code, bracemap=bracemap, correct_syntax=correct_syntax, ops=ops,
+      args=args, costs=costs, sources=sources)
+
+
 def evaluate(code, input_buffer=None, init_memory=None, base=256, timeout=1.0,
              max_steps=None, require_correct_syntax=True, output_memory=False,
              debug=False):
@@ -108,7 +208,8 @@ def evaluate(code, input_buffer=None, init_memory=None, base=256, timeout=1.0,
 
   Args:
     code: String or list of BF characters. Any character not in CHARS will be
-        ignored.
+        ignored. Can also be a CompiledProgram returned by `compile_program`,
+        which avoids compiling the same code again for every input.
     input_buffer: A list of ints which will be used as the program's input
         stream. Each read op "," will read an int from this list. 0's will be
         read once the end of the list is reached, or if no input buffer is
@@ -145,32 +246,127 @@ def evaluate(code, input_buffer=None, init_memory=None, base=256, timeout=1.0,
       memory: If `output_memory` is True, a list of memory cells up to the last
           one written to. otherwise, None.
   """
-  input_iter = (
-      LookAheadIterator(input_buffer) if input_buffer is not None
-      else LookAheadIterator([]))
-
-  # Null memory value. This is the value of an empty memory. Also the value
-  # returned by the read operation when the input buffer is empty, or the
-  # end of the buffer is reached.
-  null_value = 0
-
-  code = list(code)
-  bracemap, correct_syntax = buildbracemap(code)  # will modify code list
-  if require_correct_syntax and not correct_syntax:
+  start_time = time.time()
+  program = code if isinstance(code, CompiledProgram) else compile_program(code)
+  if require_correct_syntax and not program.correct_syntax:
     return EvalResult([], False, Status.SYNTAX_ERROR, 0, 0.0,
                       [] if output_memory else None, [] if debug else None)
 
+  input_buffer = list(input_buffer) if input_buffer is not None else []
+  cells = list(init_memory) if init_memory else [0]
   output_buffer = []
 
-  codeptr, cellptr = 0, 0
+  if debug:
+    # The program trace needs the state after every single character, so run
+    # the character-by-character interpreter from the start.
+    state = _evaluate_stepwise(
+        program, 0, 0, cells, LookAheadIterator(input_buffer), output_buffer,
+        base, timeout, max_steps, 0, start_time, debug=True)
+  else:
+    state = _evaluate_compiled(program, cells, input_buffer, output_buffer,
+                               base, timeout, max_steps, start_time)
+  steps, success, reason, program_trace = state
 
-  cells = list(init_memory) if init_memory else [0]
+  return EvalResult(
+      output=output_buffer,
+      success=success,
+      failure_reason=reason,
+      steps=steps,
+      time=time.time() - start_time,
+      memory=cells if output_memory else None,
+      program_trace=program_trace)
+
+
+def _evaluate_compiled(program, cells, input_buffer, output_buffer, base,
+                       timeout, max_steps, start_time):
+  """Runs compiled bytecode. See `evaluate`.
+
+  Falls back to `_evaluate_stepwise` from the current op when the step limit
+  would be reached in the middle of an op, or when a cell holds a value outside
+  of [0, base), so that results match a character-by-character execution.
+
+  Returns:
+    Tuple of (steps, success, failure_reason, program_trace).
+  """
+  ops, args, costs = program.ops, program.args, program.costs
+  num_ops = len(ops)
+  pc, cellptr, input_pos, steps = 0, 0, 0, 0
+  ops_since_check = 0
+  while pc < num_ops:
+    op = ops[pc]
+    arg = args[pc]
+    cost = costs[pc]
+    value = cells[cellptr]
+    in_range = 0 <= value < base
+
+    if op == OP_CLEAR and value != 0 and in_range:
+      # Two steps (body and closing brace) per loop iteration.
+      cost += 2 * (value if arg < 0 else base - value)
+
+    if ((max_steps is not None and steps + cost > max_steps) or
+        (not in_range and op in (OP_ADD, OP_CLEAR))):
+      return _evaluate_stepwise(
+          program, program.sources[pc], cellptr, cells,
+          LookAheadIterator(input_buffer[input_pos:]), output_buffer, base,
+          timeout, max_steps, steps, start_time)
+
+    pc += 1
+    if op == OP_ADD:
+      cells[cellptr] = (value + arg) % base
+    elif op == OP_MOVE:
+      cellptr += arg
+      if cellptr < 0:
+        cellptr = 0
+      elif cellptr >= len(cells):
+        cells.extend([0] * (cellptr + 1 - len(cells)))
+    elif op == OP_CLEAR:
+      cells[cellptr] = 0
+    elif op == OP_OPEN:
+      if value == 0: pc = arg
+    elif op == OP_CLOSE:
+      if value != 0: pc = arg
+    elif op == OP_OUTPUT:
+      output_buffer.append(value)
+    elif op == OP_INPUT:
+      if input_pos < len(input_buffer):
+        cells[cellptr] = input_buffer[input_pos]
+        input_pos += 1
+      else:
+        cells[cellptr] = 0
+    steps += cost
+
+    ops_since_check += 1
+    if ops_since_check >= TIMEOUT_CHECK_INTERVAL:
+      ops_since_check = 0
+      if timeout is not None and time.time() - start_time > timeout:
+        return steps, False, Status.TIMEOUT, None
+    if max_steps is not None and steps >= max_steps:
+      return steps, False, Status.STEP_LIMIT, None
+
+  if timeout is not None and time.time() - start_time > timeout:
+    return steps, False, Status.TIMEOUT, None
+  return steps, True, Status.SUCCESS, None
+
+
+def _evaluate_stepwise(program, codeptr, cellptr, cells, input_iter,
+                       output_buffer, base, timeout, max_steps, steps,
+                       start_time, debug=False):
+  """Interprets the program character by character. See `evaluate`.
 
+  Execution starts at position `codeptr` of the code, with the given state.
+
+  Returns:
+    Tuple of (steps, success, failure_reason, program_trace).
+  """
+  # Null memory value. This is the value of an empty memory. Also the value
+  # returned by the read operation when the input buffer is empty, or the
+  # end of the buffer is reached.
+  null_value = 0
+
+  code, bracemap = program.code, program.bracemap
   program_trace = [] if debug else None
   success = True
   reason = Status.SUCCESS
-  start_time = time.time()
-  steps = 0
   while codeptr < len(code):
     command = code[codeptr]
 
@@ -222,13 +418,4 @@ def evaluate(code, input_buffer=None, init_memory=None, base=256, timeout=1.0,
         next_input=input_iter.peek(null_value),
         output_buffer=list(output_buffer)))
 
-  return EvalResult(
-      output=output_buffer,
-      success=success,
-      failure_reason=reason,
-      steps=steps,
-      time=time.time() - start_time,
-      memory=cells if output_memory else None,
-      program_trace=program_trace)
-
-
+  return steps, success, reason, program_trace
@@ -102,6 +102,33 @@ class BfTest(tf.test.TestCase):
         (er.output, er.success, er.failure_reason))
     self.assertEqual([1, 2, 3, 4], er.memory)
 
+  def testCompileProgram(self):
+    program = bf.compile_program('+++>>[-]x<[.-]')
+    self.assertEqual(
+        [bf.OP_ADD, bf.OP_MOVE, bf.OP_CLEAR, bf.OP_MOVE, bf.OP_OPEN,
+         bf.OP_OUTPUT, bf.OP_ADD, bf.OP_CLOSE],
+        program.ops)
+    self.assertEqual([3, 2, -1, -1, 8, None, -1, 5], program.args)
+    self.assertEqual([3, 2, 1, 2, 1, 1, 1, 1], program.costs)
+    self.assertEqual([0, 3, 5, 8, 10, 11, 12, 13], program.sources)
+
+  def testCompiledProgramMatchesCode(self):
+    code = '>,[>,]<[.<]>>>[-]<[+]+++.'
+    program = bf.compile_program(code)
+    for max_steps in [None, 1, 5, 13, 40]:
+      self.assertEqual(
+          bf.evaluate(code, input_buffer=[4, 3, 2], max_steps=max_steps,
+                      output_memory=True)[:4],
+          bf.evaluate(program, input_buffer=[4, 3, 2], max_steps=max_steps,
+                      output_memory=True)[:4])
+
+  def testFoldedOpsStepCount(self):
+    # Folded ops must still count one step per executed character.
+    er = bf.evaluate('++++[-]abc>>><<.', input_buffer=[], timeout=None)
+    self.assertEqual(
+        ([0], True, bf.Status.SUCCESS, 4 + 1 + 2 * 4 + 3 + 5 + 1),
+        (er.output, er.success, er.failure_reason, er.steps))
+
   def testProgramTrace(self):
     es = bf.ExecutionSnapshot
     er = bf.evaluate(',[.>,].', base=256, input_buffer=[2, 1], debug=True)
@@ -5,8 +5,10 @@ from __future__ import print_function
 """Tasks for RL."""
 
 import abc
+import collections
 import copy
 import itertools
+import multiprocessing
 import random
 
 from absl import logging
@@ -20,12 +22,14 @@ from single_task import test_tasks  # brain coder
 
 
 MAX_EXECUTION_STEPS = 5000
+REWARD_CACHE_SIZE = 10000
 
 
 def make_task(task_name, override_kwargs=None, max_code_length=100,
               require_correct_syntax=False,
               do_code_simplification=False,
-              correct_bonus=2.0, code_length_bonus=1.0):
+              correct_bonus=2.0, code_length_bonus=1.0,
+              reward_cache_size=REWARD_CACHE_SIZE, num_eval_workers=0):
   """Make tasks with setting from paper."""
   logging.info('Making paper-config task.')
   n = 16  # Number of test cases.
@@ -108,7 +112,8 @@ def make_task(task_name, override_kwargs=None, max_code_length=100,
       task=task, correct_bonus=correct_bonus,
       code_length_bonus=code_length_bonus,
       max_code_length=max_code_length, min_code_length=min_code_length,
-      reward_fn=reward_fn, require_correct_syntax=require_correct_syntax)
+      reward_fn=reward_fn, require_correct_syntax=require_correct_syntax,
+      reward_cache_size=reward_cache_size, num_eval_workers=num_eval_workers)
 
 
 def concat(lists):
@@ -134,13 +139,106 @@ def clipped_linear(x, x0, y0, slope, y_range):
   return min(max(slope * (x - x0) + y0, min_y), max_y)
 
 
+_ScoringParams = collections.namedtuple('_ScoringParams', [
+    'base', 'max_execution_steps', 'require_correct_syntax', 'reward_fn',
+    'failure_reward', 'correct_bonus', 'code_length_bonus', 'min_code_length',
+    'max_code_length', 'time_penalty', 'best_reward', 'input_type',
+    'output_type'])
+
+
+def _evaluate_code(code, io_seqs, params):
+  """Runs test cases on code and computes its reward.
+
+  This is a function of picklable arguments, so that it can run in evaluation
+  worker processes however they are started.
+
+  Args:
+    code: A single BF code string.
+    io_seqs: List of (input sequence, expected output sequence) test cases.
+    params: A _ScoringParams of the task manager.
+
+  Returns:
+    misc.RewardInfo namedtuple instance. See MultiIOTaskManager._evaluate_code.
+  """
+  terminal_reward = 0.0
+  results = []
+  reason = 'correct'
+  program = bf.compile_program(code)  # Compiled once for all test cases.
+  for input_seq, output_seq in io_seqs:
+    eval_result = bf.evaluate(
+        program, input_buffer=input_seq, timeout=0.1,
+        max_steps=params.max_execution_steps,
+        base=params.base,
+        require_correct_syntax=params.require_correct_syntax)
+    result, success = eval_result.output, eval_result.success
+    if not success:
+      # Code execution timed out.
+      terminal_reward = params.failure_reward
+      results = []
+      reason = eval_result.failure_reason
+      break
+    else:
+      terminal_reward += params.reward_fn(result, output_seq, params.base)
+      if result == output_seq:
+        terminal_reward += params.correct_bonus  # Bonus for correct answer.
+
+        # Only add additional reward for shorter code. Subtracting reward
+        # interferes with the main objective. Only optimize for length once
+        # any solution is found.
+        if params.min_code_length == params.max_code_length:
+          terminal_reward += params.code_length_bonus
+        else:
+          terminal_reward += params.code_length_bonus * clipped_linear(
+              x=len(code), x0=params.min_code_length, y0=1.0,
+              slope=-params.time_penalty, y_range=(0.0, 1.0))
+
+        # reason remains 'correct' if it is already
+      elif reason == 'correct':
+        reason = 'wrong'
+    results.append(result)
+
+  # Return list of rewards, one for each char in the code. All are 0 except
+  # for the terminal reward.
+  terminal_reward /= params.best_reward
+  return misc.RewardInfo(
+      episode_rewards=[0.0] * (len(code) - 1) + [terminal_reward],
+      input_case=misc.IOTuple(i for i, o in io_seqs),
+      correct_output=misc.IOTuple(o for i, o in io_seqs),
+      code_output=misc.IOTuple(results),
+      input_type=params.input_type,
+      output_type=params.output_type,
+      reason=reason)
+
+
+# Test cases and scoring parameters of the evaluation worker processes.
+_worker_io_seqs = None
+_worker_params = None
+
+
+def _init_eval_worker(io_seqs, params):
+  global _worker_io_seqs, _worker_params
+  _worker_io_seqs = io_seqs
+  _worker_params = params
+
+
+def _evaluate_code_in_worker(code):
+  return _evaluate_code(code, _worker_io_seqs, _worker_params)
+
+
 class MultiIOTaskManager(object):
-  """Supports tasks which test the code with multiple I/O examples."""
+  """Supports tasks which test the code with multiple I/O examples.
+
+  Rewards of programs are kept in a bounded LRU cache, so that programs which
+  are sampled again are not executed again. Caching is disabled for tasks whose
+  test cases change every time they are made. When `num_eval_workers` > 1,
+  the programs of a batch are executed in a pool of worker processes.
+  """
 
   def __init__(self, task, max_code_length=32, min_code_length=0,
                max_execution_steps=MAX_EXECUTION_STEPS, correct_bonus=1.0,
                code_length_bonus=1.0, failure_reward=-2.0, reward_fn=None,
-               require_correct_syntax=False):
+               require_correct_syntax=False,
+               reward_cache_size=REWARD_CACHE_SIZE, num_eval_workers=0):
     assert isinstance(task, BaseTask)
     self.task = task
     self.max_code_length = max_code_length
@@ -162,6 +260,11 @@ class MultiIOTaskManager(object):
     self.output_type = (
         task.output_type if hasattr(task, 'output_type')
         else misc.IOType.integer)
+    self.reward_cache_size = (
+        reward_cache_size if task.deterministic_io else 0)
+    self.num_eval_workers = num_eval_workers
+    self._reward_cache = collections.OrderedDict()
+    self._eval_pool = None
     self._compute_best_reward()
 
   def _compute_best_reward(self):
@@ -175,10 +278,98 @@ class MultiIOTaskManager(object):
     self.good_reward = 0.75 * reward
     logging.info('Known best reward: %.4f', self.best_reward)
 
-  def _score_batch(self, code_strings):
-    return [self._score_code(code) for code in code_strings]
+  def _eval_worker_initargs(self):
+    # Only deterministic tasks are evaluated in the pool, so the test cases
+    # can be made once. Workers get picklable state rather than the task.
+    return self.task.make_io_set(), self._scoring_params()
+
+  def _get_eval_pool(self):
+    if self._eval_pool is None:
+      self._eval_pool = multiprocessing.Pool(
+          self.num_eval_workers, initializer=_init_eval_worker,
+          initargs=self._eval_worker_initargs())
+    return self._eval_pool
+
+  def close(self):
+    """Shuts down the evaluation worker processes, if any."""
+    if self._eval_pool is not None:
+      self._eval_pool.close()
+      self._eval_pool.join()
+      self._eval_pool = None
+
+  def _cache_lookup(self, code):
+    reward_info = self._reward_cache.pop(code, None)
+    if reward_info is not None:
+      self._reward_cache[code] = reward_info  # Move to most recently used.
+    return reward_info
+
+  def _cache_insert(self, code, reward_info):
+    if reward_info.reason == bf.Status.TIMEOUT:
+      return  # Timeouts depend on machine load, so they are not reused.
+    self._reward_cache[code] = reward_info
+    while len(self._reward_cache) > self.reward_cache_size:
+      self._reward_cache.popitem(last=False)
+
+  def score_batch(self, code_strings):
+    """Scores a batch of programs.
+
+    Each distinct program is executed at most once, and not at all if its
+    reward is already cached.
+
+    Args:
+      code_strings: List of BF code strings.
+
+    Returns:
+      List of misc.RewardInfo namedtuple instances, one for each code string.
+      See `_evaluate_code`.
+    """
+    if not self.reward_cache_size:
+      # Test cases are different for every program, so nothing can be reused.
+      return [self._evaluate_code(code) for code in code_strings]
+
+    reward_infos = {}
+    to_evaluate = []
+    for code in code_strings:
+      if code not in reward_infos:
+        reward_infos[code] = self._cache_lookup(code)
+        if reward_infos[code] is None:
+          to_evaluate.append(code)
+
+    if self.num_eval_workers > 1 and len(to_evaluate) > 1:
+      results = self._get_eval_pool().map(_evaluate_code_in_worker,
+                                          to_evaluate)
+    else:
+      results = [self._evaluate_code(code) for code in to_evaluate]
+    for code, reward_info in zip(to_evaluate, results):
+      reward_infos[code] = reward_info
+      self._cache_insert(code, reward_info)
+
+    # Callers get their own copy of the mutable rewards list.
+    return [
+        reward_infos[code]._replace(
+            episode_rewards=list(reward_infos[code].episode_rewards))
+        for code in code_strings]
 
   def _score_code(self, code):
+    return self.score_batch([code])[0]
+
+  def _scoring_params(self):
+    return _ScoringParams(
+        base=self.task.base,
+        max_execution_steps=self.max_execution_steps,
+        require_correct_syntax=self.require_correct_syntax,
+        reward_fn=self.reward_fn,
+        failure_reward=self.failure_reward,
+        correct_bonus=self.correct_bonus,
+        code_length_bonus=self.code_length_bonus,
+        min_code_length=self.min_code_length,
+        max_code_length=self.max_code_length,
+        time_penalty=self.time_penalty,
+        best_reward=self.best_reward,
+        input_type=self.input_type,
+        output_type=self.output_type)
+
+  def _evaluate_code(self, code):
     """Run test cases on code and compute reward.
 
     Args:
@@ -189,56 +380,8 @@ class MultiIOTaskManager(object):
           information, including inputs, expected outputs, code outputs, input
           and output types, and reason for the reward obtained.
     """
-    # Get list of 2-tuples, each containing an input sequence and an output
-    # sequence.
-    io_seqs = self.task.make_io_set()
-    terminal_reward = 0.0
-    results = []
-    reason = 'correct'
-    for input_seq, output_seq in io_seqs:
-      eval_result = bf.evaluate(
-          code, input_buffer=input_seq, timeout=0.1,
-          max_steps=self.max_execution_steps,
-          base=self.task.base,
-          require_correct_syntax=self.require_correct_syntax)
-      result, success = eval_result.output, eval_result.success
-      if not success:
-        # Code execution timed out.
-        terminal_reward = self.failure_reward
-        results = []
-        reason = eval_result.failure_reason
-        break
-      else:
-        terminal_reward += self.reward_fn(result, output_seq, self.task.base)
-        if result == output_seq:
-          terminal_reward += self.correct_bonus  # Bonus for correct answer.
-
-          # Only add additional reward for shorter code. Subtracting reward
-          # interferes with the main objective. Only optimize for length once
-          # any solution is found.
-          if self.min_code_length == self.max_code_length:
-            terminal_reward += self.code_length_bonus
-          else:
-            terminal_reward += self.code_length_bonus * clipped_linear(
-                x=len(code), x0=self.min_code_length, y0=1.0,
-                slope=-self.time_penalty, y_range=(0.0, 1.0))
-
-          # reason remains 'correct' if it is already
-        elif reason == 'correct':
-          reason = 'wrong'
-      results.append(result)
-
-    # Return list of rewards, one for each char in the code. All are 0 except
-    # for the terminal reward.
-    terminal_reward /= self.best_reward
-    return misc.RewardInfo(
-        episode_rewards=[0.0] * (len(code) - 1) + [terminal_reward],
-        input_case=misc.IOTuple(i for i, o in io_seqs),
-        correct_output=misc.IOTuple(o for i, o in io_seqs),
-        code_output=misc.IOTuple(results),
-        input_type=self.input_type,
-        output_type=self.output_type,
-        reason=reason)
+    return _evaluate_code(code, self.task.make_io_set(),
+                          self._scoring_params())
 
   def rl_batch(self, batch_size):
     """Produces list of reward functions. One for each program in the batch."""
@@ -258,6 +401,10 @@ class BaseTask(object):
   """
   __metaclass__ = abc.ABCMeta
 
+  # Whether `make_io_set` returns the same test cases every time. Rewards are
+  # only cached for such tasks.
+  deterministic_io = True
+
   def __init__(self, base=256):
     self.base = base  # All tasks must set the integer base that the expect.
 
@@ -395,6 +542,7 @@ class ReverseTaskV2(BaseTask):
         'static-bylen': self._io_static_by_len,
         # Random examples, one for each length.
         'rand-bylen': self._io_rand_by_len}[reward_type]
+    self.deterministic_io = reward_type == 'static-bylen'
 
   def _make_io_examples(self, sequences):
     outputs = [list(i) for i in sequences]
@@ -662,10 +810,11 @@ class KnownCodeBaseTask(BaseTask):
 
   def _test_case_generator(self, code_solution):
     rand = random.Random(self.seed)
+    program = bf.compile_program(code_solution)
     for _ in xrange(self.n):
       input_case = self.make_input_fn(rand)
       result = bf.evaluate(
-          code_solution, input_buffer=input_case, max_steps=self.max_steps,
+          program, input_buffer=input_case, max_steps=self.max_steps,
           base=self.base, require_correct_syntax=False)
       if not result.success:
         raise RuntimeError(
@@ -4,6 +4,8 @@ from __future__ import print_function
 
 """Tests for code_tasks."""
 
+import pickle
+
 import numpy as np
 import tensorflow as tf
 
@@ -103,6 +105,39 @@ class CodeTasksTest(tf.test.TestCase):
         r(pad(',>,[.,]<.,.', maxlen, padchr)).episode_rewards[-1],
         1.0)
 
+  def testScoreBatch(self):
+    codes = [',[>,]<[.<]', '+.', ',[.,]', '+.', ',[>,]<[.<]']
+    task = code_tasks.make_task('reverse')
+    uncached_task = code_tasks.make_task('reverse', reward_cache_size=0)
+    expected = [uncached_task._score_code(c).episode_rewards for c in codes]
+    results = task.score_batch(codes)
+    self.assertEqual(expected, [r.episode_rewards for r in results])
+    self.assertEqual(3, len(task._reward_cache))
+    # Cached results are returned again, and callers get separate copies.
+    results[0].episode_rewards.append(1.0)
+    self.assertEqual(expected, [r.episode_rewards
+                                for r in task.score_batch(codes)])
+
+  def testScoreBatchInWorkerPool(self):
+    codes = [',[>,]<[.<]', '+.', ',[.,]']
+    task = code_tasks.make_task('reverse', num_eval_workers=2)
+    expected = [task._score_code(c).episode_rewards for c in codes]
+    results = task.score_batch(codes)
+    self.assertEqual(expected, [r.episode_rewards for r in results])
+    task.close()
+    self.assertIsNone(task._eval_pool)
+
+  def testEvalWorkerStateIsPicklable(self):
+    # Workers get the test cases and scoring parameters rather than the task,
+    # so that the pool also works when worker processes are not forked.
+    task = code_tasks.make_task('reverse', num_eval_workers=2)
+    initargs = pickle.loads(pickle.dumps(task._eval_worker_initargs()))
+    code_tasks._init_eval_worker(*initargs)
+    for code in [',[>,]<[.<]', '+.', ',[.,]']:
+      self.assertEqual(
+          task._score_code(code).episode_rewards,
+          code_tasks._evaluate_code_in_worker(code).episode_rewards)
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -67,7 +67,9 @@ class DataManager(object):
         require_correct_syntax=env_config.correct_syntax,
         do_code_simplification=do_code_simplification,
         correct_bonus=env_config.task_manager_config.correct_bonus,
-        code_length_bonus=env_config.task_manager_config.code_length_bonus)
+        code_length_bonus=env_config.task_manager_config.code_length_bonus,
+        reward_cache_size=env_config.task_manager_config.reward_cache_size,
+        num_eval_workers=env_config.task_manager_config.num_eval_workers)
 
   def sample_rl_batch(self):
     """Create reward functions from the current task.
@@ -76,14 +78,25 @@ class DataManager(object):
       RLBatch namedtuple instance, which holds functions and information for
       a minibatch of episodes.
       * reward_fns: A reward function for each episode. Maps code string to
-          reward.
+          reward. Or a single function which maps the list of code strings
+          for the whole batch to their rewards.
       * batch_size: Number of episodes in this minibatch.
       * good_reward: Estimated threshold of rewards which indicate the algorithm
           is starting to solve the task. This is a heuristic that tries to
           reduce the amount of stuff written to disk.
     """
-    reward_fns = self.rl_task.rl_batch(self.batch_size)
+    if hasattr(self.rl_task, 'score_batch'):
+      # Score the whole batch at once, so that repeated programs are executed
+      # only once.
+      reward_fns = self.rl_task.score_batch
+    else:
+      reward_fns = self.rl_task.rl_batch(self.batch_size)
     return RLBatch(
         reward_fns=reward_fns,
         batch_size=self.batch_size,
         good_reward=self.rl_task.good_reward)
+
+  def close(self):
+    """Shuts down the evaluation worker processes of the task, if any."""
+    if hasattr(self.rl_task, 'close'):
+      self.rl_task.close()
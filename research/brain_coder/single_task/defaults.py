@@ -65,7 +65,11 @@ def default_config():
               # Reward recieved per test case. These bonuses will be scaled
               # based on how many test cases there are.
               correct_bonus=2.0,  # Bonus for code getting correct answer.
-              code_length_bonus=1.0),  # Maximum bonus for short code.
+              code_length_bonus=1.0,  # Maximum bonus for short code.
+              # Number of program rewards to remember. 0 disables caching.
+              reward_cache_size=10000,
+              # Processes used to run a batch of programs. 0 runs them inline.
+              num_eval_workers=0),
           correct_syntax=False,
       ),
       batch_size=64,
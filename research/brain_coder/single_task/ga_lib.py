@@ -83,6 +83,31 @@ def io_repr(result):
   return inputs, target_outputs, code_outputs
 
 
+def _to_data_list(single_or_tuple):
+  if isinstance(single_or_tuple, misc.IOTuple):
+    return list(single_or_tuple)
+  return [single_or_tuple]
+
+
+def _to_ga_type(rl_type):
+  if rl_type == misc.IOType.string:
+    return IOType.string
+  return IOType.integer
+
+
+def _to_ga_result(result, base):
+  """Converts a misc.RewardInfo from a task manager into a Result."""
+  return Result(
+      reward=sum(result.episode_rewards),
+      inputs=_to_data_list(result.input_case),
+      code_outputs=_to_data_list(result.code_output),
+      target_outputs=_to_data_list(result.correct_output),
+      type_in=_to_ga_type(result.input_type),
+      type_out=_to_ga_type(result.output_type),
+      correct=result.reason == 'correct',
+      base=base)
+
+
 def make_task_eval_fn(task_manager):
   """Returns a wrapper that converts an RL task into a GA task.
 
@@ -94,34 +119,34 @@ def make_task_eval_fn(task_manager):
     a Result namedtuple instance containing the reward and information about
     code execution.
   """
-  def to_data_list(single_or_tuple):
-    if isinstance(single_or_tuple, misc.IOTuple):
-      return list(single_or_tuple)
-    return [single_or_tuple]
-
-  def to_ga_type(rl_type):
-    if rl_type == misc.IOType.string:
-      return IOType.string
-    return IOType.integer
-
   # Wrapper function.
   def evalbf(bf_chars):
     result = task_manager._score_code(''.join(bf_chars))
-    reward = sum(result.episode_rewards)
-    correct = result.reason == 'correct'
-    return Result(
-        reward=reward,
-        inputs=to_data_list(result.input_case),
-        code_outputs=to_data_list(result.code_output),
-        target_outputs=to_data_list(result.correct_output),
-        type_in=to_ga_type(result.input_type),
-        type_out=to_ga_type(result.output_type),
-        correct=correct,
-        base=task_manager.task.base)
+    return _to_ga_result(result, task_manager.task.base)
 
   return evalbf
 
 
+def make_task_batch_eval_fn(task_manager):
+  """Like `make_task_eval_fn`, but evaluates a list of individuals at once.
+
+  Args:
+    task_manager: Is a task manager object from code_tasks.py which has a
+        `score_batch` method.
+
+  Returns:
+    A function that takes as input a list of lists of code chars, and outputs
+    a list of Result namedtuple instances, one for each.
+  """
+  def evalbf_batch(bf_chars_list):
+    results = task_manager.score_batch(
+        [''.join(bf_chars) for bf_chars in bf_chars_list])
+    return [_to_ga_result(result, task_manager.task.base)
+            for result in results]
+
+  return evalbf_batch
+
+
 def debug_str(individual, task_eval_fn):
   res = task_eval_fn(individual)
   input_str, target_output_str, code_output_str = io_repr(res)
@@ -258,7 +283,7 @@ def mutate_and_crossover(population, mutation_rate, crossover_rate):
 
 
 def ga_loop(population, cxpb, mutpb, ngen, task_eval_fn, halloffame=None,
-            checkpoint_writer=None):
+            checkpoint_writer=None, task_batch_eval_fn=None):
   """A bare bones genetic algorithm.
 
   Similar to chapter 7 of Back, Fogel and Michalewicz, "Evolutionary
@@ -277,6 +302,9 @@ def ga_loop(population, cxpb, mutpb, ngen, task_eval_fn, halloffame=None,
         Needs to have `write`, `load`, and `has_checkpoint` methods. Used to
         periodically save progress. In event of a restart, the population will
         be loaded from disk.
+    task_batch_eval_fn: (optional) a python function which maps a list of
+        Individuals to a list of Result namedtuples. If given, each
+        generation's offspring are evaluated with one call to this function.
 
   Returns:
     GaResult namedtuple instance. This contains information about the GA run,
@@ -331,6 +359,12 @@ def ga_loop(population, cxpb, mutpb, ngen, task_eval_fn, halloffame=None,
 
     # Evaluate the individuals with an invalid fitness
     invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
+    if task_batch_eval_fn is not None:
+      # The task manager dedups and caches programs itself.
+      eval_results = task_batch_eval_fn(invalid_ind)
+      for ind, eval_result in zip(invalid_ind, eval_results):
+        ind.fitness.values = (eval_result.reward,)
+      invalid_ind = []
     for ind in invalid_ind:
       str_repr = ''.join(ind)
       if program_reward_cache is not None and str_repr in program_reward_cache:
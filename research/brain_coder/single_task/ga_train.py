@@ -189,26 +189,32 @@ def run_training(config=None, tuner=None, logdir=None, trial_name=None,  # pylin
                                          population_size=config.batch_size)
 
     data_manager = data.DataManager(config, run_number=global_rep)
-    task_eval_fn = ga_lib.make_task_eval_fn(data_manager.rl_task)
-
-    if config.agent.algorithm == 'rand':
-      logging.info('Running random search.')
-      assert FLAGS.max_npe
-      result = run_random_search(
-          FLAGS.max_npe, run_dir, task_eval_fn, config.timestep_limit)
-    else:
-      assert config.agent.algorithm == 'ga'
-      logging.info('Running genetic algorithm.')
-      pop = ga_lib.make_population(
-          ga_lib.random_individual(config.timestep_limit),
-          n=config.batch_size)
-      hof = utils.MaxUniquePriorityQueue(2)  # Hall of fame.
-      result = ga_lib.ga_loop(
-          pop,
-          cxpb=config.agent.crossover_rate, mutpb=config.agent.mutation_rate,
-          task_eval_fn=task_eval_fn,
-          ngen=max_generations, halloffame=hof,
-          checkpoint_writer=checkpoint_writer)
+    try:
+      task_eval_fn = ga_lib.make_task_eval_fn(data_manager.rl_task)
+
+      if config.agent.algorithm == 'rand':
+        logging.info('Running random search.')
+        assert FLAGS.max_npe
+        result = run_random_search(
+            FLAGS.max_npe, run_dir, task_eval_fn, config.timestep_limit)
+      else:
+        assert config.agent.algorithm == 'ga'
+        logging.info('Running genetic algorithm.')
+        pop = ga_lib.make_population(
+            ga_lib.random_individual(config.timestep_limit),
+            n=config.batch_size)
+        hof = utils.MaxUniquePriorityQueue(2)  # Hall of fame.
+        result = ga_lib.ga_loop(
+            pop,
+            cxpb=config.agent.crossover_rate, mutpb=config.agent.mutation_rate,
+            task_eval_fn=task_eval_fn,
+            ngen=max_generations, halloffame=hof,
+            checkpoint_writer=checkpoint_writer,
+            task_batch_eval_fn=ga_lib.make_task_batch_eval_fn(
+                data_manager.rl_task))
+    finally:
+      # Shut down the reward evaluation processes, even if training failed.
+      data_manager.close()
 
     logging.info('Finished rep. Num gens: %d', result.generations)
 
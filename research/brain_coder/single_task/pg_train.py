@@ -548,115 +548,119 @@ def train(config, is_chief, tuner=None, run_dir=None, run_number=0,
       'server DNS name isn\'t resolving yet, or is misspecified.')
   should_retry = True
   supervisor_deadline_exceeded = False
-  while should_retry:
-    try:
-      with managed_session(
-          sv, FLAGS.master, max_wait_secs=60) as session, session.as_default():
-        should_retry = False
-        do_training = True
-
-        try:
-          trainer.initialize(session)
-          if session.run(trainer.run_number) != run_number:
-            # If we loaded existing model from disk, and the saved run number is
-            # different, throw an exception.
-            raise RuntimeError(
-                'Expecting to be on run %d, but is actually on run %d. '
-                'run_dir: "%s"'
-                % (run_number, session.run(trainer.run_number), run_dir))
-          global_step = trainer.cached_global_step
-          logging.info('Starting training at step=%d', global_step)
-          while do_training:
-            trainer.update_global_model(session)
-
-            if is_chief:
-              trainer.maybe_save_best_model(
-                  session, saver, best_model_checkpoint)
+  try:
+    while should_retry:
+      try:
+        with managed_session(sv, FLAGS.master,
+                             max_wait_secs=60) as session, session.as_default():
+          should_retry = False
+          do_training = True
+
+          try:
+            trainer.initialize(session)
+            if session.run(trainer.run_number) != run_number:
+              # If we loaded existing model from disk, and the saved run number
+              # is different, throw an exception.
+              raise RuntimeError(
+                  'Expecting to be on run %d, but is actually on run %d. '
+                  'run_dir: "%s"'
+                  % (run_number, session.run(trainer.run_number), run_dir))
             global_step = trainer.cached_global_step
-            global_npe = trainer.cached_global_npe
-
-            if time.time() - last_replay_save_time >= 30:
-              trainer.save_replay_buffer()
-              trainer.save_topk_buffer()
-              last_replay_save_time = time.time()
-
-            # Stopping conditions.
-            if tuner and tuner.should_trial_stop():
-              logging.info('Tuner requested early stopping. Finishing.')
-              do_training = False
-            if is_chief and FLAGS.stop_on_success:
-              found_solution = session.run(trainer.found_solution_flag)
-              if found_solution:
+            logging.info('Starting training at step=%d', global_step)
+            while do_training:
+              trainer.update_global_model(session)
+
+              if is_chief:
+                trainer.maybe_save_best_model(
+                    session, saver, best_model_checkpoint)
+              global_step = trainer.cached_global_step
+              global_npe = trainer.cached_global_npe
+
+              if time.time() - last_replay_save_time >= 30:
+                trainer.save_replay_buffer()
+                trainer.save_topk_buffer()
+                last_replay_save_time = time.time()
+
+              # Stopping conditions.
+              if tuner and tuner.should_trial_stop():
+                logging.info('Tuner requested early stopping. Finishing.')
+                do_training = False
+              if is_chief and FLAGS.stop_on_success:
+                found_solution = session.run(trainer.found_solution_flag)
+                if found_solution:
+                  do_training = False
+                  logging.info('Solution found. Finishing.')
+              if FLAGS.max_npe and global_npe >= FLAGS.max_npe:
+                # Max NPE (number of programs executed) reached.
+                logging.info('Max NPE reached. Finishing.')
+                do_training = False
+              if sv.should_stop():
+                logging.info('Supervisor issued stop. Finishing.')
                 do_training = False
-                logging.info('Solution found. Finishing.')
-            if FLAGS.max_npe and global_npe >= FLAGS.max_npe:
-              # Max NPE (number of programs executed) reached.
-              logging.info('Max NPE reached. Finishing.')
-              do_training = False
-            if sv.should_stop():
-              logging.info('Supervisor issued stop. Finishing.')
-              do_training = False
 
-        except tf.errors.NotFoundError:
-          # Catch "Error while reading resource variable".
-          # The chief worker likely destroyed the container, so do not retry.
-          logging.info('Caught NotFoundError. Quitting.')
-          do_training = False
-          should_retry = False
-          break
-        except tf.errors.InternalError as e:
-          # Catch "Invalid variable reference."
-          if str(e).startswith('Invalid variable reference.'):
-            # The chief worker likely destroyed the container, so do not
-            # retry.
-            logging.info(
-                'Caught "InternalError: Invalid variable reference.". '
-                'Quitting.')
+          except tf.errors.NotFoundError:
+            # Catch "Error while reading resource variable".
+            # The chief worker likely destroyed the container, so do not retry.
+            logging.info('Caught NotFoundError. Quitting.')
             do_training = False
             should_retry = False
             break
-          else:
-            # Pass exception through.
-            raise
-
-        # Exited training loop. Write results to disk.
-        if is_chief and results_writer:
-          assert not should_retry
-          with tf.gfile.FastGFile(status_file, 'w') as f:
-            f.write('done')
-          (program_count,
-           found_solution,
-           code_solution,
-           best_reward,
-           global_step) = session.run(
-               [trainer.program_count,
-                trainer.found_solution_flag,
-                trainer.code_solution_variable,
-                trainer.global_best_reward,
-                trainer.global_step])
-          results_dict = {
-              'max_npe': FLAGS.max_npe,
-              'batch_size': config.batch_size,
-              'max_batches': FLAGS.max_npe // config.batch_size,
-              'npe': program_count,
-              'max_global_repetitions': FLAGS.num_repetitions,
-              'max_local_repetitions': FLAGS.num_repetitions,
-              'code_solution': code_solution,
-              'best_reward': best_reward,
-              'num_batches': global_step,
-              'found_solution': found_solution,
-              'task': trainer.data_manager.task_name,
-              'global_rep': run_number}
-          logging.info('results_dict: %s', results_dict)
-          results_writer.append(results_dict)
-
-    except tf.errors.AbortedError:
-      # Catch "Graph handle is not found" error due to preempted jobs.
-      logging.info('Caught AbortedError. Retying.')
-      should_retry = True
-    except tf.errors.DeadlineExceededError:
-      supervisor_deadline_exceeded = True
-      should_retry = False
+          except tf.errors.InternalError as e:
+            # Catch "Invalid variable reference."
+            if str(e).startswith('Invalid variable reference.'):
+              # The chief worker likely destroyed the container, so do not
+              # retry.
+              logging.info(
+                  'Caught "InternalError: Invalid variable reference.". '
+                  'Quitting.')
+              do_training = False
+              should_retry = False
+              break
+            else:
+              # Pass exception through.
+              raise
+
+          # Exited training loop. Write results to disk.
+          if is_chief and results_writer:
+            assert not should_retry
+            with tf.gfile.FastGFile(status_file, 'w') as f:
+              f.write('done')
+            (program_count,
+             found_solution,
+             code_solution,
+             best_reward,
+             global_step) = session.run(
+                 [trainer.program_count,
+                  trainer.found_solution_flag,
+                  trainer.code_solution_variable,
+                  trainer.global_best_reward,
+                  trainer.global_step])
+            results_dict = {
+                'max_npe': FLAGS.max_npe,
+                'batch_size': config.batch_size,
+                'max_batches': FLAGS.max_npe // config.batch_size,
+                'npe': program_count,
+                'max_global_repetitions': FLAGS.num_repetitions,
+                'max_local_repetitions': FLAGS.num_repetitions,
+                'code_solution': code_solution,
+                'best_reward': best_reward,
+                'num_batches': global_step,
+                'found_solution': found_solution,
+                'task': trainer.data_manager.task_name,
+                'global_rep': run_number}
+            logging.info('results_dict: %s', results_dict)
+            results_writer.append(results_dict)
+
+      except tf.errors.AbortedError:
+        # Catch "Graph handle is not found" error due to preempted jobs.
+        logging.info('Caught AbortedError. Retying.')
+        should_retry = True
+      except tf.errors.DeadlineExceededError:
+        supervisor_deadline_exceeded = True
+        should_retry = False
+  finally:
+    # Shut down the reward evaluation processes, even if training failed.
+    trainer.data_manager.close()
 
   if is_chief:
     logging.info('This is chief worker. Stopping all workers.')
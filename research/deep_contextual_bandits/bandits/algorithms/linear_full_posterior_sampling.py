@@ -20,10 +20,10 @@ from __future__ import division
 from __future__ import print_function
 
 import numpy as np
-from scipy.stats import invgamma
 
 from bandits.core.bandit_algorithm import BanditAlgorithm
 from bandits.core.contextual_dataset import ContextualDataset
+from bandits.core.linear_posterior import LinearPosterior
 
 
 class LinearFullPosteriorSampling(BanditAlgorithm):
@@ -48,25 +48,14 @@ class LinearFullPosteriorSampling(BanditAlgorithm):
     # Gaussian prior for each beta_i
     self._lambda_prior = self.hparams.lambda_prior
 
-    self.mu = [
-        np.zeros(self.hparams.context_dim + 1)
-        for _ in range(self.hparams.num_actions)
-    ]
-
-    self.cov = [(1.0 / self.lambda_prior) * np.eye(self.hparams.context_dim + 1)
-                for _ in range(self.hparams.num_actions)]
-
-    self.precision = [
-        self.lambda_prior * np.eye(self.hparams.context_dim + 1)
-        for _ in range(self.hparams.num_actions)
-    ]
-
     # Inverse Gamma prior for each sigma2_i
     self._a0 = self.hparams.a0
     self._b0 = self.hparams.b0
 
-    self.a = [self._a0 for _ in range(self.hparams.num_actions)]
-    self.b = [self._b0 for _ in range(self.hparams.num_actions)]
+    # Posterior of each arm, intercept is last component of beta
+    self.posterior = LinearPosterior(self.hparams.context_dim + 1,
+                                     self.hparams.num_actions,
+                                     self.lambda_prior, self.a0, self.b0)
 
     self.t = 0
     self.data_h = ContextualDataset(hparams.context_dim,
@@ -87,32 +76,11 @@ class LinearFullPosteriorSampling(BanditAlgorithm):
     if self.t < self.hparams.num_actions * self.hparams.initial_pulls:
       return self.t % self.hparams.num_actions
 
-    # Sample sigma2, and beta conditional on sigma2
-    sigma2_s = [
-        self.b[i] * invgamma.rvs(self.a[i])
-        for i in range(self.hparams.num_actions)
-    ]
-
-    try:
-      beta_s = [
-          np.random.multivariate_normal(self.mu[i], sigma2_s[i] * self.cov[i])
-          for i in range(self.hparams.num_actions)
-      ]
-    except np.linalg.LinAlgError as e:
-      # Sampling could fail if covariance is not positive definite
-      print('Exception when sampling from {}.'.format(self.name))
-      print('Details: {} | {}.'.format(e.message, e.args))
-      d = self.hparams.context_dim + 1
-      beta_s = [
-          np.random.multivariate_normal(np.zeros((d)), np.eye(d))
-          for i in range(self.hparams.num_actions)
-      ]
+    # Sample sigma2, and beta conditional on sigma2, for all arms at once
+    beta_s = self.posterior.sample()
 
     # Compute sampled expected values, intercept is last component of beta
-    vals = [
-        np.dot(beta_s[i][:-1], context.T) + beta_s[i][-1]
-        for i in range(self.hparams.num_actions)
-    ]
+    vals = np.dot(beta_s[:, :-1], np.ravel(context)) + beta_s[:, -1]
 
     return np.argmax(vals)
 
@@ -129,27 +97,28 @@ class LinearFullPosteriorSampling(BanditAlgorithm):
     self.data_h.add(context, action, reward)
 
     # Update posterior of action with formulas: \beta | x,y ~ N(mu_q, cov_q)
-    x, y = self.data_h.get_data(action)
-
-    # The algorithm could be improved with sequential update formulas (cheaper)
-    s = np.dot(x.T, x)
-
-    # Some terms are removed as we assume prior mu_0 = 0.
-    precision_a = s + self.lambda_prior * np.eye(self.hparams.context_dim + 1)
-    cov_a = np.linalg.inv(precision_a)
-    mu_a = np.dot(cov_a, np.dot(x.T, y))
-
-    # Inverse Gamma posterior update
-    a_post = self.a0 + x.shape[0] / 2.0
-    b_upd = 0.5 * (np.dot(y.T, y) - np.dot(mu_a.T, np.dot(precision_a, mu_a)))
-    b_post = self.b0 + b_upd
-
-    # Store new posterior distributions
-    self.mu[action] = mu_a
-    self.cov[action] = cov_a
-    self.precision[action] = precision_a
-    self.a[action] = a_post
-    self.b[action] = b_post
+    x = np.append(np.ravel(context), 1.0)
+    self.posterior.add(x, action, reward)
+
+  @property
+  def mu(self):
+    return self.posterior.mu
+
+  @property
+  def cov(self):
+    return self.posterior.cov
+
+  @property
+  def precision(self):
+    return self.posterior.precision
+
+  @property
+  def a(self):
+    return self.posterior.a
+
+  @property
+  def b(self):
+    return self.posterior.b
 
   @property
   def a0(self):
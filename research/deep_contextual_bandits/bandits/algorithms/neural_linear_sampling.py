@@ -20,10 +20,10 @@ from __future__ import division
 from __future__ import print_function
 
 import numpy as np
-from scipy.stats import invgamma
 
 from bandits.core.bandit_algorithm import BanditAlgorithm
 from bandits.core.contextual_dataset import ContextualDataset
+from bandits.core.linear_posterior import LinearPosterior
 from bandits.algorithms.neural_bandit_model import NeuralBanditModel
 
 
@@ -39,25 +39,18 @@ class NeuralLinearPosteriorSampling(BanditAlgorithm):
     # Gaussian prior for each beta_i
     self._lambda_prior = self.hparams.lambda_prior
 
-    self.mu = [
-        np.zeros(self.latent_dim)
-        for _ in range(self.hparams.num_actions)
-    ]
-
-    self.cov = [(1.0 / self.lambda_prior) * np.eye(self.latent_dim)
-                for _ in range(self.hparams.num_actions)]
-
-    self.precision = [
-        self.lambda_prior * np.eye(self.latent_dim)
-        for _ in range(self.hparams.num_actions)
-    ]
-
     # Inverse Gamma prior for each sigma2_i
     self._a0 = self.hparams.a0
     self._b0 = self.hparams.b0
 
-    self.a = [self._a0 for _ in range(self.hparams.num_actions)]
-    self.b = [self._b0 for _ in range(self.hparams.num_actions)]
+    self.posterior = LinearPosterior(self.latent_dim,
+                                     self.hparams.num_actions,
+                                     self.lambda_prior, self.a0, self.b0)
+
+    # Latent points not yet folded into the posterior, and whether the
+    # representation changed since the posterior was last fitted.
+    self._num_pending = 0
+    self._needs_refit = False
 
     # Regression and NN Update Frequency
     self.update_freq_lr = hparams.training_freq
@@ -82,26 +75,8 @@ class NeuralLinearPosteriorSampling(BanditAlgorithm):
     if self.t < self.hparams.num_actions * self.hparams.initial_pulls:
       return self.t % self.hparams.num_actions
 
-    # Sample sigma2, and beta conditional on sigma2
-    sigma2_s = [
-        self.b[i] * invgamma.rvs(self.a[i])
-        for i in range(self.hparams.num_actions)
-    ]
-
-    try:
-      beta_s = [
-          np.random.multivariate_normal(self.mu[i], sigma2_s[i] * self.cov[i])
-          for i in range(self.hparams.num_actions)
-      ]
-    except np.linalg.LinAlgError as e:
-      # Sampling could fail if covariance is not positive definite
-      print('Exception when sampling for {}.'.format(self.name))
-      print('Details: {} | {}.'.format(e.message, e.args))
-      d = self.latent_dim
-      beta_s = [
-          np.random.multivariate_normal(np.zeros((d)), np.eye(d))
-          for i in range(self.hparams.num_actions)
-      ]
+    # Sample sigma2, and beta conditional on sigma2, for all arms at once
+    beta_s = self.posterior.sample()
 
     # Compute last-layer representation for the current context
     with self.bnn.graph.as_default():
@@ -109,9 +84,7 @@ class NeuralLinearPosteriorSampling(BanditAlgorithm):
       z_context = self.bnn.sess.run(self.bnn.nn, feed_dict={self.bnn.x: c})
 
     # Apply Thompson Sampling to last-layer representation
-    vals = [
-        np.dot(beta_s[i], z_context.T) for i in range(self.hparams.num_actions)
-    ]
+    vals = np.dot(beta_s, np.ravel(z_context))
     return np.argmax(vals)
 
   def update(self, context, action, reward):
@@ -134,38 +107,48 @@ class NeuralLinearPosteriorSampling(BanditAlgorithm):
       new_z = self.bnn.sess.run(self.bnn.nn,
                                 feed_dict={self.bnn.x: self.data_h.contexts})
       self.latent_h.replace_data(contexts=new_z)
+      self._needs_refit = True
+    self._num_pending += 1
 
     # Update the Bayesian Linear Regression
     if self.t % self.update_freq_lr == 0:
 
-      # Find all the actions to update
-      actions_to_update = self.latent_h.actions[:-self.update_freq_lr]
-
-      for action_v in np.unique(actions_to_update):
+      if self._needs_refit:
+        # The representation changed, so refit every arm on the new latents.
+        self.posterior.fit(self.latent_h.contexts, self.latent_h.actions,
+                           self.latent_h.rewards[
+                               np.arange(self.latent_h.num_points()),
+                               self.latent_h.actions])
+        self._needs_refit = False
+      else:
+        # Fold the latest points in with rank-one posterior updates.
+        n = self.latent_h.num_points()
+        z = self.latent_h.contexts[n - self._num_pending:]
+        actions = self.latent_h.actions[n - self._num_pending:]
+        rewards = self.latent_h.rewards[n - self._num_pending:]
+        for z_i, action_i, reward_i in zip(z, actions, rewards):
+          self.posterior.add(z_i, action_i, reward_i[action_i])
+      self._num_pending = 0
 
-        # Update action posterior with formulas: \beta | z,y ~ N(mu_q, cov_q)
-        z, y = self.latent_h.get_data(action_v)
+  @property
+  def mu(self):
+    return self.posterior.mu
 
-        # The algorithm could be improved with sequential formulas (cheaper)
-        s = np.dot(z.T, z)
+  @property
+  def cov(self):
+    return self.posterior.cov
 
-        # Some terms are removed as we assume prior mu_0 = 0.
-        precision_a = s + self.lambda_prior * np.eye(self.latent_dim)
-        cov_a = np.linalg.inv(precision_a)
-        mu_a = np.dot(cov_a, np.dot(z.T, y))
+  @property
+  def precision(self):
+    return self.posterior.precision
 
-        # Inverse Gamma posterior update
-        a_post = self.a0 + z.shape[0] / 2.0
-        b_upd = 0.5 * np.dot(y.T, y)
-        b_upd -= 0.5 * np.dot(mu_a.T, np.dot(precision_a, mu_a))
-        b_post = self.b0 + b_upd
+  @property
+  def a(self):
+    return self.posterior.a
 
-        # Store new posterior distributions
-        self.mu[action_v] = mu_a
-        self.cov[action_v] = cov_a
-        self.precision[action_v] = precision_a
-        self.a[action_v] = a_post
-        self.b[action_v] = b_post
+  @property
+  def b(self):
+    return self.posterior.b
 
   @property
   def a0(self):
@@ -23,9 +23,16 @@ import numpy as np
 
 
 class ContextualDataset(object):
-  """The buffer is able to append new data, and sample random minibatches."""
+  """The buffer is able to append new data, and sample random minibatches.
 
-  def __init__(self, context_dim, num_actions, buffer_s=-1, intercept=False):
+  Observations are stored in preallocated arrays whose capacity doubles when
+  full, so appending a new triplet is amortized O(1). The rows where each
+  action was played are tracked separately, so `get_data` does not need to
+  scan the whole history.
+  """
+
+  def __init__(self, context_dim, num_actions, buffer_s=-1, intercept=False,
+               initial_capacity=64):
     """Creates a ContextualDataset object.
 
     The data is stored in attributes: contexts and rewards.
@@ -38,16 +45,45 @@ class ContextualDataset(object):
         returned as minibatch. If buffer_s = -1, all data will be used.
       intercept: If True, it adds a constant (1.0) dimension to each context X,
         at the end.
+      initial_capacity: Number of rows preallocated before the first resize.
     """
 
     self._context_dim = context_dim
     self._num_actions = num_actions
+    self._capacity = max(1, initial_capacity)
+    self._num_points = 0
     self._contexts = None
     self._rewards = None
-    self.actions = []
+    self._actions = None
+    self._action_rows = [[] for _ in range(num_actions)]
     self.buffer_s = buffer_s
     self.intercept = intercept
 
+  def _allocate(self, capacity):
+    """Moves the stored data into arrays with room for capacity rows."""
+    d = self.context_dim + 1 if self.intercept else self.context_dim
+    if self._contexts is not None:
+      d = self._contexts.shape[1]
+    contexts = np.zeros((capacity, d))
+    rewards = np.zeros((capacity, self.num_actions))
+    actions = np.zeros(capacity, dtype=np.int64)
+    n = self._num_points
+    if self._contexts is not None and n:
+      contexts[:n] = self._contexts[:n]
+      rewards[:n] = self._rewards[:n]
+      actions[:n] = self._actions[:n]
+    self._contexts = contexts
+    self._rewards = rewards
+    self._actions = actions
+    self._capacity = capacity
+
+  def _index_action_rows(self):
+    """Rebuilds the rows where each action was played from the actions."""
+    actions = self._actions[:self._num_points]
+    self._action_rows = [
+        np.flatnonzero(actions == a).tolist() for a in range(self.num_actions)
+    ]
+
   def add(self, context, action, reward):
     """Adds a new triplet (context, action, reward) to the dataset.
 
@@ -59,25 +95,24 @@ class ContextualDataset(object):
       reward: Real number representing the reward for the (context, action).
     """
 
-    if self.intercept:
-      c = np.array(context[:])
-      c = np.append(c, 1.0).reshape((1, self.context_dim + 1))
-    else:
-      c = np.array(context[:]).reshape((1, self.context_dim))
+    if self._contexts is None:
+      self._allocate(self._capacity)
+    elif self._num_points == self._contexts.shape[0]:
+      self._allocate(2 * self._contexts.shape[0])
 
-    if self.contexts is None:
-      self.contexts = c
-    else:
-      self.contexts = np.vstack((self.contexts, c))
-
-    r = np.zeros((1, self.num_actions))
-    r[0, action] = reward
-    if self.rewards is None:
-      self.rewards = r
+    n = self._num_points
+    c = np.asarray(context).reshape(-1)
+    if self.intercept:
+      self._contexts[n, :-1] = c
+      self._contexts[n, -1] = 1.0
     else:
-      self.rewards = np.vstack((self.rewards, r))
+      self._contexts[n] = c
 
-    self.actions.append(action)
+    self._rewards[n] = 0.0
+    self._rewards[n, action] = reward
+    self._actions[n] = action
+    self._action_rows[action].append(n)
+    self._num_points += 1
 
   def replace_data(self, contexts=None, actions=None, rewards=None):
     if contexts is not None:
@@ -87,51 +122,46 @@ class ContextualDataset(object):
     if rewards is not None:
       self.rewards = rewards
 
-  def get_batch(self, batch_size):
-    """Returns a random minibatch of (contexts, rewards) with batch_size."""
-    n, _ = self.contexts.shape
+  def _sample_indices(self, batch_size):
+    """Returns batch_size random row indices from the training buffer."""
+    n = self._num_points
     if self.buffer_s == -1:
       # use all the data
-      ind = np.random.choice(range(n), batch_size)
-    else:
-      # use only buffer (last buffer_s observations)
-      ind = np.random.choice(range(max(0, n - self.buffer_s), n), batch_size)
-    return self.contexts[ind, :], self.rewards[ind, :]
+      return np.random.choice(n, batch_size)
+    # use only buffer (last buffer_s observations)
+    start = max(0, n - self.buffer_s)
+    return start + np.random.choice(n - start, batch_size)
+
+  def _one_hot(self, actions):
+    weights = np.zeros((len(actions), self.num_actions))
+    weights[np.arange(len(actions)), actions] = 1.0
+    return weights
+
+  def get_batch(self, batch_size):
+    """Returns a random minibatch of (contexts, rewards) with batch_size."""
+    ind = self._sample_indices(batch_size)
+    return self._contexts[ind, :], self._rewards[ind, :]
 
   def get_data(self, action):
     """Returns all (context, reward) where the action was played."""
-    n, _ = self.contexts.shape
-    ind = np.array([i for i in range(n) if self.actions[i] == action])
-    return self.contexts[ind, :], self.rewards[ind, action]
+    ind = np.array(self._action_rows[action], dtype=np.int64)
+    return self._contexts[ind, :], self._rewards[ind, action]
 
   def get_data_with_weights(self):
     """Returns all observations with one-hot weights for actions."""
-    weights = np.zeros((self.contexts.shape[0], self.num_actions))
-    a_ind = np.array([(i, val) for i, val in enumerate(self.actions)])
-    weights[a_ind[:, 0], a_ind[:, 1]] = 1.0
-    return self.contexts, self.rewards, weights
+    return self.contexts, self.rewards, self._one_hot(self.actions)
 
   def get_batch_with_weights(self, batch_size):
     """Returns a random mini-batch with one-hot weights for actions."""
-    n, _ = self.contexts.shape
-    if self.buffer_s == -1:
-      # use all the data
-      ind = np.random.choice(range(n), batch_size)
-    else:
-      # use only buffer (last buffer_s obs)
-      ind = np.random.choice(range(max(0, n - self.buffer_s), n), batch_size)
-
-    weights = np.zeros((batch_size, self.num_actions))
-    sampled_actions = np.array(self.actions)[ind]
-    a_ind = np.array([(i, val) for i, val in enumerate(sampled_actions)])
-    weights[a_ind[:, 0], a_ind[:, 1]] = 1.0
-    return self.contexts[ind, :], self.rewards[ind, :], weights
+    ind = self._sample_indices(batch_size)
+    weights = self._one_hot(self._actions[ind])
+    return self._contexts[ind, :], self._rewards[ind, :], weights
 
   def num_points(self, f=None):
     """Returns number of points in the buffer (after applying function f)."""
     if f is not None:
-      return f(self.contexts.shape[0])
-    return self.contexts.shape[0]
+      return f(self._num_points)
+    return self._num_points
 
   @property
   def context_dim(self):
@@ -143,24 +173,63 @@ class ContextualDataset(object):
 
   @property
   def contexts(self):
-    return self._contexts
+    if self._contexts is None:
+      return None
+    return self._contexts[:self._num_points]
 
   @contexts.setter
   def contexts(self, value):
-    self._contexts = value
+    if value is None:
+      self._contexts = None
+      self._rewards = None
+      self._actions = None
+      self._num_points = 0
+      self._action_rows = [[] for _ in range(self.num_actions)]
+      return
+    value = np.asarray(value, dtype=np.float64)
+    if self._contexts is None:
+      self._num_points = value.shape[0]
+      self._allocate(max(self._capacity, value.shape[0]))
+      self._index_action_rows()
+    elif value.shape[0] != self._num_points:
+      raise ValueError('Expected {} contexts, got {}.'.format(
+          self._num_points, value.shape[0]))
+    capacity = self._contexts.shape[0]
+    self._contexts = np.zeros((capacity, value.shape[1]))
+    self._contexts[:self._num_points] = value
 
   @property
   def actions(self):
-    return self._actions
+    if self._actions is None:
+      return np.zeros(0, dtype=np.int64)
+    return self._actions[:self._num_points]
 
   @actions.setter
   def actions(self, value):
-    self._actions = value
+    value = np.asarray(value, dtype=np.int64)
+    if self._contexts is None:
+      self._num_points = value.shape[0]
+      self._allocate(max(self._capacity, value.shape[0]))
+    elif value.shape[0] != self._num_points:
+      raise ValueError('Expected {} actions, got {}.'.format(
+          self._num_points, value.shape[0]))
+    self._actions[:self._num_points] = value
+    self._index_action_rows()
 
   @property
   def rewards(self):
-    return self._rewards
+    if self._rewards is None:
+      return None
+    return self._rewards[:self._num_points]
 
   @rewards.setter
   def rewards(self, value):
-    self._rewards = value
+    value = np.asarray(value, dtype=np.float64)
+    if self._contexts is None:
+      self._num_points = value.shape[0]
+      self._allocate(max(self._capacity, value.shape[0]))
+      self._index_action_rows()
+    elif value.shape[0] != self._num_points:
+      raise ValueError('Expected {} rewards, got {}.'.format(
+          self._num_points, value.shape[0]))
+    self._rewards[:self._num_points] = value
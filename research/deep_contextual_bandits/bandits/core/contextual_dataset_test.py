@@ -0,0 +1,92 @@
+# Copyright 2018 The TensorFlow Authors All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Tests for bandits.core.contextual_dataset."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+import numpy as np
+
+from bandits.core.contextual_dataset import ContextualDataset
+
+
+class ContextualDatasetTest(unittest.TestCase):
+
+  def _random_data(self, num_points, context_dim, num_actions):
+    rng = np.random.RandomState(0)
+    contexts = rng.randn(num_points, context_dim)
+    actions = rng.randint(num_actions, size=num_points)
+    rewards = rng.randn(num_points)
+    return contexts, actions, rewards
+
+  def test_add_past_capacity(self):
+    contexts, actions, rewards = self._random_data(37, 3, 4)
+    dataset = ContextualDataset(3, 4, intercept=True, initial_capacity=2)
+    for context, action, reward in zip(contexts, actions, rewards):
+      dataset.add(context, action, reward)
+
+    self.assertEqual(dataset.num_points(), 37)
+    np.testing.assert_array_equal(dataset.contexts[:, :-1], contexts)
+    np.testing.assert_array_equal(dataset.contexts[:, -1], np.ones(37))
+    np.testing.assert_array_equal(dataset.actions, actions)
+    expected_rewards = np.zeros((37, 4))
+    expected_rewards[np.arange(37), actions] = rewards
+    np.testing.assert_array_equal(dataset.rewards, expected_rewards)
+
+  def test_get_data_per_action(self):
+    contexts, actions, rewards = self._random_data(50, 2, 3)
+    dataset = ContextualDataset(2, 3, initial_capacity=4)
+    for context, action, reward in zip(contexts, actions, rewards):
+      dataset.add(context, action, reward)
+
+    for action in range(3):
+      action_contexts, action_rewards = dataset.get_data(action)
+      np.testing.assert_array_equal(action_contexts,
+                                    contexts[actions == action])
+      np.testing.assert_array_equal(action_rewards, rewards[actions == action])
+
+  def test_replace_data_reindexes_actions(self):
+    contexts, actions, rewards = self._random_data(20, 2, 3)
+    dataset = ContextualDataset(2, 3)
+    for context, action, reward in zip(contexts, actions, rewards):
+      dataset.add(context, action, reward)
+
+    new_actions = (actions + 1) % 3
+    dataset.replace_data(actions=new_actions)
+    for action in range(3):
+      action_contexts, _ = dataset.get_data(action)
+      np.testing.assert_array_equal(action_contexts,
+                                    contexts[new_actions == action])
+
+  def test_set_contexts_of_empty_dataset(self):
+    contexts, _, _ = self._random_data(10, 2, 3)
+    dataset = ContextualDataset(2, 3)
+    dataset.contexts = contexts
+
+    np.testing.assert_array_equal(dataset.actions, np.zeros(10))
+    action_contexts, _ = dataset.get_data(0)
+    np.testing.assert_array_equal(action_contexts, contexts)
+    self.assertEqual(dataset.get_data(1)[0].shape, (0, 2))
+
+    dataset.add(np.ones(2), 1, 1.0)
+    self.assertEqual(dataset.num_points(), 11)
+    np.testing.assert_array_equal(dataset.get_data(1)[0], np.ones((1, 2)))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,159 @@
+# Copyright 2018 The TensorFlow Authors All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Bayesian linear regression posteriors updated from sufficient statistics."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+from scipy.stats import invgamma
+
+
+def cholesky_rank_one_update(chol, x, sign=1.0):
+  """Updates in place a lower Cholesky factor L to that of L L^T + sign x x^T.
+
+  Args:
+    chol: Lower triangular (d, d) matrix, modified in place.
+    x: Vector of length d.
+    sign: 1.0 for an update, -1.0 for a downdate.
+
+  Returns:
+    The updated factor.
+
+  Raises:
+    np.linalg.LinAlgError: If a downdate makes the matrix not positive definite.
+  """
+  x = np.array(x, dtype=np.float64)
+  d = x.shape[0]
+  for k in range(d):
+    r2 = chol[k, k]**2 + sign * x[k]**2
+    if r2 <= 0.0:
+      raise np.linalg.LinAlgError('Matrix is not positive definite.')
+    r = np.sqrt(r2)
+    c = r / chol[k, k]
+    s = x[k] / chol[k, k]
+    chol[k, k] = r
+    if k + 1 < d:
+      chol[k + 1:, k] = (chol[k + 1:, k] + sign * s * x[k + 1:]) / c
+      x[k + 1:] = c * x[k + 1:] - s * chol[k + 1:, k]
+  return chol
+
+
+class LinearPosterior(object):
+  """Per-arm Normal-Inverse-Gamma posteriors kept as sufficient statistics.
+
+  For each arm i we assume reward = x^T beta_i + noise, with prior
+  beta_i ~ N(0, sigma2_i / lambda I) and sigma2_i ~ IG(a0, b0). Instead of
+  refitting from all data, the precision X^T X + lambda I, the vector X^T y and
+  y^T y are accumulated, and the covariance and its Cholesky factor are kept up
+  to date with rank-one (Sherman-Morrison) updates, so that adding a point
+  costs O(d^2).
+  """
+
+  def __init__(self, dim, num_actions, lambda_prior, a0, b0):
+    """Initializes every arm at the prior.
+
+    Args:
+      dim: Dimension of the regression inputs.
+      num_actions: Number of arms.
+      lambda_prior: Precision of the Gaussian prior on beta (scaled by sigma2).
+      a0: Shape of the Inverse Gamma prior on sigma2.
+      b0: Scale of the Inverse Gamma prior on sigma2.
+    """
+    self.dim = dim
+    self.num_actions = num_actions
+    self.lambda_prior = lambda_prior
+    self.a0 = a0
+    self.b0 = b0
+    self.reset()
+
+  def reset(self):
+    """Sets all arms back to the prior."""
+    d, k = self.dim, self.num_actions
+    eye = np.eye(d)
+    self.precision = np.tile(self.lambda_prior * eye, (k, 1, 1))
+    self.cov = np.tile(eye / self.lambda_prior, (k, 1, 1))
+    self.chol_cov = np.tile(eye / np.sqrt(self.lambda_prior), (k, 1, 1))
+    self.xy = np.zeros((k, d))
+    self.yy = np.zeros(k)
+    self.n = np.zeros(k)
+    self.mu = np.zeros((k, d))
+    self.a = np.full(k, self.a0, dtype=np.float64)
+    self.b = np.full(k, self.b0, dtype=np.float64)
+
+  def _refresh_arm(self, action):
+    """Recomputes the posterior parameters of an arm from its statistics."""
+    self.mu[action] = np.dot(self.cov[action], self.xy[action])
+    self.a[action] = self.a0 + self.n[action] / 2.0
+    # Since precision * mu = X^T y, mu^T precision mu = mu^T X^T y.
+    self.b[action] = self.b0 + 0.5 * (
+        self.yy[action] - np.dot(self.mu[action], self.xy[action]))
+
+  def _refactor_arm(self, action):
+    """Recomputes covariance and its Cholesky factor from the precision."""
+    self.cov[action] = np.linalg.inv(self.precision[action])
+    self.chol_cov[action] = np.linalg.cholesky(self.cov[action])
+
+  def add(self, x, action, y):
+    """Adds one observation (x, y) to the posterior of the given arm."""
+    x = np.asarray(x, dtype=np.float64).reshape(-1)
+    self.precision[action] += np.outer(x, x)
+    self.xy[action] += y * x
+    self.yy[action] += y * y
+    self.n[action] += 1
+
+    # Sherman-Morrison: cov' = cov - v v^T, with v = cov x / sqrt(1 + x^T cov x)
+    cov_x = np.dot(self.cov[action], x)
+    v = cov_x / np.sqrt(1.0 + np.dot(x, cov_x))
+    self.cov[action] -= np.outer(v, v)
+    try:
+      cholesky_rank_one_update(self.chol_cov[action], v, sign=-1.0)
+    except np.linalg.LinAlgError:
+      # Accumulated round-off; rebuild this arm from its precision matrix.
+      self._refactor_arm(action)
+    self._refresh_arm(action)
+
+  def fit(self, x, actions, y):
+    """Recomputes all arms from scratch using every observation.
+
+    Args:
+      x: Inputs, array of shape (n, dim).
+      actions: Arm played for each input, array of shape (n,).
+      y: Observed reward for each input, array of shape (n,).
+    """
+    self.reset()
+    actions = np.asarray(actions)
+    for action in np.unique(actions):
+      ind = actions == action
+      x_a, y_a = x[ind], y[ind]
+      self.precision[action] += np.dot(x_a.T, x_a)
+      self.xy[action] = np.dot(x_a.T, y_a)
+      self.yy[action] = np.dot(y_a, y_a)
+      self.n[action] = x_a.shape[0]
+      self._refactor_arm(action)
+      self._refresh_arm(action)
+
+  def sample(self):
+    """Draws (sigma2, beta) for all arms at once.
+
+    Returns:
+      beta: Array of shape (num_actions, dim) with one sampled beta per arm.
+    """
+    sigma2 = self.b * invgamma.rvs(self.a)
+    z = np.random.standard_normal((self.num_actions, self.dim))
+    noise = np.einsum('kij,kj->ki', self.chol_cov, z)
+    return self.mu + np.sqrt(sigma2)[:, np.newaxis] * noise
@@ -0,0 +1,99 @@
+# Copyright 2018 The TensorFlow Authors All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Tests for bandits.core.linear_posterior."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+import numpy as np
+
+from bandits.core.linear_posterior import cholesky_rank_one_update
+from bandits.core.linear_posterior import LinearPosterior
+
+
+class CholeskyRankOneUpdateTest(unittest.TestCase):
+
+  def setUp(self):
+    rng = np.random.RandomState(0)
+    a = rng.randn(6, 6)
+    self.matrix = np.dot(a, a.T) + 6 * np.eye(6)
+    self.x = rng.randn(6)
+
+  def test_update(self):
+    chol = np.linalg.cholesky(self.matrix)
+    cholesky_rank_one_update(chol, self.x)
+    np.testing.assert_allclose(
+        chol, np.linalg.cholesky(self.matrix + np.outer(self.x, self.x)))
+
+  def test_downdate(self):
+    updated = self.matrix + np.outer(self.x, self.x)
+    chol = np.linalg.cholesky(updated)
+    cholesky_rank_one_update(chol, self.x, sign=-1.0)
+    np.testing.assert_allclose(chol, np.linalg.cholesky(self.matrix))
+
+  def test_downdate_not_positive_definite(self):
+    chol = np.eye(2)
+    with self.assertRaises(np.linalg.LinAlgError):
+      cholesky_rank_one_update(chol, np.array([2.0, 0.0]), sign=-1.0)
+
+
+class LinearPosteriorTest(unittest.TestCase):
+
+  def test_add_matches_fit(self):
+    rng = np.random.RandomState(0)
+    x = rng.randn(200, 5)
+    actions = rng.randint(3, size=200)
+    y = np.dot(x, rng.randn(5)) + 0.1 * rng.randn(200)
+
+    incremental = LinearPosterior(5, 3, lambda_prior=0.25, a0=6.0, b0=6.0)
+    for x_i, action, y_i in zip(x, actions, y):
+      incremental.add(x_i, action, y_i)
+    refit = LinearPosterior(5, 3, lambda_prior=0.25, a0=6.0, b0=6.0)
+    refit.fit(x, actions, y)
+
+    for name in ['precision', 'xy', 'yy', 'n', 'a']:
+      np.testing.assert_allclose(getattr(incremental, name),
+                                 getattr(refit, name), err_msg=name)
+    for name in ['cov', 'chol_cov', 'mu', 'b']:
+      np.testing.assert_allclose(getattr(incremental, name),
+                                 getattr(refit, name), rtol=1e-6, atol=1e-9,
+                                 err_msg=name)
+
+  def test_fit_matches_direct_posterior(self):
+    rng = np.random.RandomState(1)
+    x = rng.randn(50, 4)
+    y = rng.randn(50)
+    posterior = LinearPosterior(4, 1, lambda_prior=0.5, a0=2.0, b0=3.0)
+    posterior.fit(x, np.zeros(50, dtype=np.int64), y)
+
+    precision = np.dot(x.T, x) + 0.5 * np.eye(4)
+    cov = np.linalg.inv(precision)
+    mu = np.dot(cov, np.dot(x.T, y))
+    b = 3.0 + 0.5 * (np.dot(y, y) - np.dot(mu, np.dot(precision, mu)))
+    np.testing.assert_allclose(posterior.cov[0], cov)
+    np.testing.assert_allclose(posterior.mu[0], mu)
+    self.assertAlmostEqual(posterior.a[0], 2.0 + 25.0)
+    self.assertAlmostEqual(posterior.b[0], b)
+
+  def test_sample_shape(self):
+    posterior = LinearPosterior(4, 3, lambda_prior=0.5, a0=2.0, b0=3.0)
+    self.assertEqual(posterior.sample().shape, (3, 4))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -15,6 +15,7 @@
 
 """Converts ADE20K data to TFRecord file format with Example protos."""
 
+import functools
 import math
 import os
 import random
@@ -72,39 +73,55 @@ def _convert_dataset(dataset_split, dataset_dir, dataset_label_dir):
     seg = os.path.join(dataset_label_dir, basename+'.png')
     seg_names.append(seg)
 
+  build_data.run_shard_conversion(
+      functools.partial(_convert_shard, dataset_split, img_names, seg_names),
+      _NUM_SHARDS)
+
+
+def _convert_shard(dataset_split, img_names, seg_names, shard_id):
+  """Converts one shard of a dataset split into tfrecord format.
+
+  Args:
+    dataset_split: Dataset split (e.g., train, val).
+    img_names: Image file names of the dataset split.
+    seg_names: Annotation file names, aligned with img_names.
+    shard_id: Index of the shard to write.
+
+  Raises:
+    RuntimeError: If loaded image and label have different shape.
+  """
   num_images = len(img_names)
   num_per_shard = int(math.ceil(num_images / float(_NUM_SHARDS)))
 
   image_reader = build_data.ImageReader('jpeg', channels=3)
   label_reader = build_data.ImageReader('png', channels=1)
 
-  for shard_id in range(_NUM_SHARDS):
-    output_filename = os.path.join(
-        FLAGS.output_dir,
-        '%s-%05d-of-%05d.tfrecord' % (dataset_split, shard_id, _NUM_SHARDS))
-    with tf.python_io.TFRecordWriter(output_filename) as tfrecord_writer:
-      start_idx = shard_id * num_per_shard
-      end_idx = min((shard_id + 1) * num_per_shard, num_images)
-      for i in range(start_idx, end_idx):
-        sys.stdout.write('\r>> Converting image %d/%d shard %d' % (
-            i + 1, num_images, shard_id))
-        sys.stdout.flush()
-        # Read the image.
-        image_filename = img_names[i]
-        image_data = tf.gfile.FastGFile(image_filename, 'r').read()
-        height, width = image_reader.read_image_dims(image_data)
-        # Read the semantic segmentation annotation.
-        seg_filename = seg_names[i]
-        seg_data = tf.gfile.FastGFile(seg_filename, 'r').read()
-        seg_height, seg_width = label_reader.read_image_dims(seg_data)
-        if height != seg_height or width != seg_width:
-          raise RuntimeError('Shape mismatched between image and label.')
-        # Convert to tf example.
-        example = build_data.image_seg_to_tfexample(
-            image_data, img_names[i], height, width, seg_data)
-        tfrecord_writer.write(example.SerializeToString())
-    sys.stdout.write('\n')
-    sys.stdout.flush()
+  output_filename = os.path.join(
+      FLAGS.output_dir,
+      '%s-%05d-of-%05d.tfrecord' % (dataset_split, shard_id, _NUM_SHARDS))
+  with tf.python_io.TFRecordWriter(output_filename) as tfrecord_writer:
+    start_idx = shard_id * num_per_shard
+    end_idx = min((shard_id + 1) * num_per_shard, num_images)
+    for i in range(start_idx, end_idx):
+      sys.stdout.write('\r>> Converting image %d/%d shard %d' % (
+          i + 1, num_images, shard_id))
+      sys.stdout.flush()
+      # Read the image.
+      image_filename = img_names[i]
+      image_data = tf.gfile.FastGFile(image_filename, 'r').read()
+      height, width = image_reader.read_image_dims(image_data)
+      # Read the semantic segmentation annotation.
+      seg_filename = seg_names[i]
+      seg_data = tf.gfile.FastGFile(seg_filename, 'r').read()
+      seg_height, seg_width = label_reader.read_image_dims(seg_data)
+      if height != seg_height or width != seg_width:
+        raise RuntimeError('Shape mismatched between image and label.')
+      # Convert to tf example.
+      example = build_data.image_seg_to_tfexample(
+          image_data, img_names[i], height, width, seg_data)
+      tfrecord_writer.write(example.SerializeToString())
+  sys.stdout.write('\n')
+  sys.stdout.flush()
 
 
 def main(unused_argv):
@@ -59,6 +59,7 @@ The Example proto contains the following fields:
   image/segmentation/class/encoded: encoded semantic segmentation content.
   image/segmentation/class/format: semantic segmentation file format.
 """
+import functools
 import glob
 import math
 import os.path
@@ -123,54 +124,70 @@ def _get_files(data, dataset_split):
   return sorted(filenames)
 
 
-def _convert_dataset(dataset_split):
-  """Converts the specified dataset split to TFRecord format.
+def _convert_shard(dataset_split, image_files, label_files, shard_id):
+  """Converts one shard of a dataset split to TFRecord format.
 
   Args:
     dataset_split: The dataset split (e.g., train, val).
+    image_files: Sorted image file names of the dataset split.
+    label_files: Sorted label file names of the dataset split.
+    shard_id: Index of the shard to write.
 
   Raises:
     RuntimeError: If loaded image and label have different shape, or if the
       image file with specified postfix could not be found.
   """
-  image_files = _get_files('image', dataset_split)
-  label_files = _get_files('label', dataset_split)
-
   num_images = len(image_files)
   num_per_shard = int(math.ceil(num_images / float(_NUM_SHARDS)))
 
   image_reader = build_data.ImageReader('png', channels=3)
   label_reader = build_data.ImageReader('png', channels=1)
 
-  for shard_id in range(_NUM_SHARDS):
-    shard_filename = '%s-%05d-of-%05d.tfrecord' % (
-        dataset_split, shard_id, _NUM_SHARDS)
-    output_filename = os.path.join(FLAGS.output_dir, shard_filename)
-    with tf.python_io.TFRecordWriter(output_filename) as tfrecord_writer:
-      start_idx = shard_id * num_per_shard
-      end_idx = min((shard_id + 1) * num_per_shard, num_images)
-      for i in range(start_idx, end_idx):
-        sys.stdout.write('\r>> Converting image %d/%d shard %d' % (
-            i + 1, num_images, shard_id))
-        sys.stdout.flush()
-        # Read the image.
-        image_data = tf.gfile.FastGFile(image_files[i], 'rb').read()
-        height, width = image_reader.read_image_dims(image_data)
-        # Read the semantic segmentation annotation.
-        seg_data = tf.gfile.FastGFile(label_files[i], 'rb').read()
-        seg_height, seg_width = label_reader.read_image_dims(seg_data)
-        if height != seg_height or width != seg_width:
-          raise RuntimeError('Shape mismatched between image and label.')
-        # Convert to tf example.
-        re_match = _IMAGE_FILENAME_RE.search(image_files[i])
-        if re_match is None:
-          raise RuntimeError('Invalid image filename: ' + image_files[i])
-        filename = os.path.basename(re_match.group(1))
-        example = build_data.image_seg_to_tfexample(
-            image_data, filename, height, width, seg_data)
-        tfrecord_writer.write(example.SerializeToString())
-    sys.stdout.write('\n')
-    sys.stdout.flush()
+  shard_filename = '%s-%05d-of-%05d.tfrecord' % (
+      dataset_split, shard_id, _NUM_SHARDS)
+  output_filename = os.path.join(FLAGS.output_dir, shard_filename)
+  with tf.python_io.TFRecordWriter(output_filename) as tfrecord_writer:
+    start_idx = shard_id * num_per_shard
+    end_idx = min((shard_id + 1) * num_per_shard, num_images)
+    for i in range(start_idx, end_idx):
+      sys.stdout.write('\r>> Converting image %d/%d shard %d' % (
+          i + 1, num_images, shard_id))
+      sys.stdout.flush()
+      # Read the image.
+      image_data = tf.gfile.FastGFile(image_files[i], 'rb').read()
+      height, width = image_reader.read_image_dims(image_data)
+      # Read the semantic segmentation annotation.
+      seg_data = tf.gfile.FastGFile(label_files[i], 'rb').read()
+      seg_height, seg_width = label_reader.read_image_dims(seg_data)
+      if height != seg_height or width != seg_width:
+        raise RuntimeError('Shape mismatched between image and label.')
+      # Convert to tf example.
+      re_match = _IMAGE_FILENAME_RE.search(image_files[i])
+      if re_match is None:
+        raise RuntimeError('Invalid image filename: ' + image_files[i])
+      filename = os.path.basename(re_match.group(1))
+      example = build_data.image_seg_to_tfexample(
+          image_data, filename, height, width, seg_data)
+      tfrecord_writer.write(example.SerializeToString())
+  sys.stdout.write('\n')
+  sys.stdout.flush()
+
+
+def _convert_dataset(dataset_split):
+  """Converts the specified dataset split to TFRecord format.
+
+  Args:
+    dataset_split: The dataset split (e.g., train, val).
+
+  Raises:
+    RuntimeError: If loaded image and label have different shape, or if the
+      image file with specified postfix could not be found.
+  """
+  image_files = _get_files('image', dataset_split)
+  label_files = _get_files('label', dataset_split)
+  build_data.run_shard_conversion(
+      functools.partial(_convert_shard, dataset_split, image_files,
+                        label_files), _NUM_SHARDS)
 
 
 def main(unused_argv):
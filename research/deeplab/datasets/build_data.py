@@ -30,6 +30,8 @@ The Example proto contains the following fields:
   image/segmentation/class/format: semantic segmentation file format.
 """
 import collections
+import multiprocessing
+import struct
 import six
 import tensorflow as tf
 
@@ -41,6 +43,10 @@ tf.app.flags.DEFINE_enum('image_format', 'png', ['jpg', 'jpeg', 'png'],
 tf.app.flags.DEFINE_enum('label_format', 'png', ['png'],
                          'Segmentation label format.')
 
+tf.app.flags.DEFINE_integer('num_workers', 1,
+                            'Number of processes writing output shards in '
+                            'parallel.')
+
 # A map from image format to expected data format.
 _IMAGE_FORMAT_MAP = {
     'jpg': 'jpeg',
@@ -49,6 +55,139 @@ _IMAGE_FORMAT_MAP = {
 }
 
 
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Number of channels decoded from a PNG of each color type. Palette images are
+# decoded to RGB.
+_PNG_COLOR_TYPE_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+
+# JPEG start-of-frame markers, i.e. 0xC0-0xCF except DHT, JPG and DAC.
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - frozenset([0xC4, 0xC8, 0xCC])
+
+# JPEG markers without a length field.
+_JPEG_STANDALONE_MARKERS = frozenset([0x01] + list(range(0xD0, 0xD9)))
+
+# Numbers of components of JPEGs: grayscale, YCbCr or RGB, and CMYK or YCCK.
+_JPEG_CHANNELS = frozenset([1, 3, 4])
+
+
+def _read_png_dims(image_data):
+  """Returns (height, width, channels) from the IHDR chunk of a PNG.
+
+  Raises:
+    ValueError: if the IHDR chunk is truncated or invalid.
+  """
+  if len(image_data) < 26:
+    raise ValueError('Truncated PNG header.')
+  if image_data[12:16] != b'IHDR':
+    raise ValueError('PNG does not start with an IHDR chunk.')
+  width, height = struct.unpack_from('>II', image_data, 16)
+  color_type = six.indexbytes(image_data, 25)
+  if color_type not in _PNG_COLOR_TYPE_CHANNELS:
+    raise ValueError('Invalid PNG color type {}.'.format(color_type))
+  if not height or not width:
+    raise ValueError('Invalid PNG size {}x{}.'.format(width, height))
+  return height, width, _PNG_COLOR_TYPE_CHANNELS[color_type]
+
+
+def _read_jpeg_dims(image_data):
+  """Returns (height, width, channels) from the start-of-frame of a JPEG.
+
+  Segments are skipped using their lengths until a SOF marker is found, so only
+  the headers are read and the entropy-coded data is never touched.
+
+  Returns:
+    (height, width, channels), or None if the height is only defined after the
+    first scan.
+
+  Raises:
+    ValueError: if the headers are truncated or invalid.
+  """
+  offset = 2
+  data_size = len(image_data)
+  while offset + 4 <= data_size:
+    if six.indexbytes(image_data, offset) != 0xFF:
+      raise ValueError('Invalid JPEG marker at offset {}.'.format(offset))
+    marker = six.indexbytes(image_data, offset + 1)
+    if marker == 0xFF:
+      # Fill byte.
+      offset += 1
+      continue
+    if marker in _JPEG_STANDALONE_MARKERS:
+      offset += 2
+      continue
+    if marker == 0xDA:
+      raise ValueError('JPEG has no frame header before its scan.')
+    if marker in _JPEG_SOF_MARKERS:
+      if offset + 10 > data_size:
+        break
+      height, width = struct.unpack_from('>HH', image_data, offset + 5)
+      channels = six.indexbytes(image_data, offset + 9)
+      if channels not in _JPEG_CHANNELS:
+        raise ValueError('Invalid number of JPEG components {}.'.format(
+            channels))
+      if not width:
+        raise ValueError('Invalid JPEG width 0.')
+      # A zero height is defined later by a DNL marker.
+      return (height, width, channels) if height else None
+    segment_length, = struct.unpack_from('>H', image_data, offset + 2)
+    if segment_length < 2:
+      raise ValueError('Invalid JPEG segment length at offset {}.'.format(
+          offset))
+    offset += 2 + segment_length
+  raise ValueError('Truncated JPEG header.')
+
+
+def read_image_dims_from_header(image_data):
+  """Reads the dimensions of a PNG or JPEG image from its header.
+
+  Args:
+    image_data: string of image data.
+
+  Returns:
+    (image_height, image_width, image_channels), where image_channels is the
+    number of channels decoded when not converting them, or None if the image
+    height is not in the header.
+
+  Raises:
+    ValueError: if the data is not a PNG or JPEG, or its header is truncated or
+      invalid.
+  """
+  if image_data[:8] == _PNG_SIGNATURE:
+    return _read_png_dims(image_data)
+  if image_data[:2] == b'\xff\xd8':
+    return _read_jpeg_dims(image_data)
+  raise ValueError('Image data is neither a PNG nor a JPEG.')
+
+
+def run_shard_conversion(convert_shard_fn, num_shards, num_workers=None):
+  """Calls convert_shard_fn(shard_id) for every shard.
+
+  Shards are independent output files, so they are written by a pool of
+  processes when num_workers > 1. convert_shard_fn must be picklable, e.g. a
+  module level function or a functools.partial of one, and should create its
+  own ImageReader.
+
+  Args:
+    convert_shard_fn: function writing the shard with the given id.
+    num_shards: number of shards.
+    num_workers: number of processes. Defaults to --num_workers.
+  """
+  if num_workers is None:
+    num_workers = FLAGS.num_workers
+  num_workers = min(num_workers, num_shards)
+  if num_workers <= 1:
+    for shard_id in range(num_shards):
+      convert_shard_fn(shard_id)
+    return
+  pool = multiprocessing.Pool(num_workers)
+  try:
+    pool.map(convert_shard_fn, range(num_shards))
+  finally:
+    pool.close()
+    pool.join()
+
+
 class ImageReader(object):
   """Helper class that provides TensorFlow image coding utilities."""
 
@@ -59,28 +198,47 @@ class ImageReader(object):
       image_format: Image format. Only 'jpeg', 'jpg', or 'png' are supported.
       channels: Image channels.
     """
+    self._image_format = image_format
+    self._channels = channels
+    self._session = None
+
+  def _build_decoder(self):
+    """Builds the decoding graph and session on first use."""
     with tf.Graph().as_default():
       self._decode_data = tf.placeholder(dtype=tf.string)
-      self._image_format = image_format
       self._session = tf.Session()
       if self._image_format in ('jpeg', 'jpg'):
         self._decode = tf.image.decode_jpeg(self._decode_data,
-                                            channels=channels)
+                                            channels=self._channels)
       elif self._image_format == 'png':
         self._decode = tf.image.decode_png(self._decode_data,
-                                           channels=channels)
+                                           channels=self._channels)
 
   def read_image_dims(self, image_data):
     """Reads the image dimensions.
 
+    The dimensions are read from the PNG or JPEG header, and the image is only
+    decoded if its height is not in the header.
+
     Args:
       image_data: string of image data.
 
     Returns:
       image_height and image_width.
+
+    Raises:
+      ValueError: if the data is not a PNG or JPEG, its header is truncated or
+        invalid, or the image channels are not supported.
     """
-    image = self.decode_image(image_data)
-    return image.shape[:2]
+    dims = read_image_dims_from_header(image_data)
+    if dims is None:
+      image = self.decode_image(image_data)
+      return image.shape[:2]
+    height, width, channels = dims
+    # Same check as decode_image, on the channels the decoder would return.
+    if (self._channels or channels) not in (1, 3):
+      raise ValueError('The image channels not supported.')
+    return height, width
 
   def decode_image(self, image_data):
     """Decodes the image data string.
@@ -94,6 +252,8 @@ class ImageReader(object):
     Raises:
       ValueError: Value of image channels not supported.
     """
+    if self._session is None:
+      self._build_decoder()
     image = self._session.run(self._decode,
                               feed_dict={self._decode_data: image_data})
     if len(image.shape) != 3 or image.shape[2] not in (1, 3):
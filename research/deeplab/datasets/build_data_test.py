@@ -0,0 +1,108 @@
+# Copyright 2018 The TensorFlow Authors All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Tests for build_data.py."""
+
+import io
+
+import numpy as np
+from PIL import Image
+import tensorflow as tf
+
+from deeplab.datasets import build_data
+
+
+def _encode(mode, size, image_format, **save_kwargs):
+  """Returns the bytes of a random PIL image of the given mode and size."""
+  width, height = size
+  pixels = np.random.RandomState(0).randint(
+      256, size=(height, width, 3)).astype(np.uint8)
+  image = Image.fromarray(pixels).convert(mode)
+  output = io.BytesIO()
+  image.save(output, format=image_format, **save_kwargs)
+  return output.getvalue()
+
+
+class ReadImageDimsFromHeaderTest(tf.test.TestCase):
+
+  def _assertPILDims(self, image_data, channels):
+    width, height = Image.open(io.BytesIO(image_data)).size
+    self.assertEqual((height, width, channels),
+                     build_data.read_image_dims_from_header(image_data))
+
+  def testPNG(self):
+    for mode, channels in [('L', 1), ('LA', 2), ('P', 3), ('RGB', 3),
+                           ('RGBA', 4)]:
+      self._assertPILDims(_encode(mode, (37, 21), 'PNG'), channels)
+
+  def testBaselineJPEG(self):
+    self._assertPILDims(_encode('RGB', (37, 21), 'JPEG'), 3)
+    self._assertPILDims(_encode('L', (300, 2), 'JPEG'), 1)
+
+  def testProgressiveJPEG(self):
+    image_data = _encode('RGB', (37, 21), 'JPEG', progressive=True)
+    self.assertIn(b'\xff\xc2', image_data)
+    self._assertPILDims(image_data, 3)
+
+  def testJPEGWithExifBeforeFrame(self):
+    exif = Image.Exif()
+    exif[0x010e] = 'description ' * 100
+    image_data = _encode('RGB', (37, 21), 'JPEG', exif=exif.tobytes())
+    self.assertLess(image_data.index(b'Exif'), image_data.index(b'\xff\xc0'))
+    self._assertPILDims(image_data, 3)
+
+  def testCMYKJPEG(self):
+    self._assertPILDims(_encode('CMYK', (37, 21), 'JPEG'), 4)
+
+  def testTruncatedImages(self):
+    png_data = _encode('RGB', (37, 21), 'PNG')
+    jpeg_data = _encode('RGB', (37, 21), 'JPEG')
+    for image_data in [png_data[:20], jpeg_data[:20],
+                       jpeg_data[:jpeg_data.index(b'\xff\xc0') + 6]]:
+      with self.assertRaisesRegexp(ValueError, 'Truncated'):
+        build_data.read_image_dims_from_header(image_data)
+
+  def testNotAnImage(self):
+    for image_data in [b'', b'GIF89a', b'\xff\xd8\x00\x00\x00\x00']:
+      with self.assertRaises(ValueError):
+        build_data.read_image_dims_from_header(image_data)
+
+
+class ImageReaderTest(tf.test.TestCase):
+
+  def testReadImageDims(self):
+    image_reader = build_data.ImageReader('jpeg', channels=3)
+    self.assertEqual(
+        (21, 37),
+        image_reader.read_image_dims(_encode('CMYK', (37, 21), 'JPEG')))
+    self.assertEqual(
+        (21, 37), image_reader.read_image_dims(_encode('L', (37, 21), 'PNG')))
+
+  def testUnsupportedChannels(self):
+    image_reader = build_data.ImageReader('png', channels=0)
+    self.assertEqual(
+        (21, 37),
+        image_reader.read_image_dims(_encode('RGB', (37, 21), 'PNG')))
+    with self.assertRaisesRegexp(ValueError, 'channels'):
+      image_reader.read_image_dims(_encode('RGBA', (37, 21), 'PNG'))
+
+  def testNotAnImage(self):
+    image_reader = build_data.ImageReader('jpeg', channels=3)
+    with self.assertRaisesRegexp(ValueError, 'neither a PNG nor a JPEG'):
+      image_reader.read_image_dims(b'not an image')
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -50,6 +50,7 @@ The Example proto contains the following fields:
   image/segmentation/class/encoded: encoded semantic segmentation content.
   image/segmentation/class/format: semantic segmentation file format.
 """
+import functools
 import math
 import os.path
 import sys
@@ -81,54 +82,68 @@ tf.app.flags.DEFINE_string(
 _NUM_SHARDS = 4
 
 
-def _convert_dataset(dataset_split):
-  """Converts the specified dataset split to TFRecord format.
+def _convert_shard(dataset, filenames, shard_id):
+  """Converts one shard of a dataset split to TFRecord format.
 
   Args:
-    dataset_split: The dataset split (e.g., train, test).
+    dataset: The dataset split name (e.g., train, test).
+    filenames: Names of all images of the dataset split.
+    shard_id: Index of the shard to write.
 
   Raises:
     RuntimeError: If loaded image and label have different shape.
   """
-  dataset = os.path.basename(dataset_split)[:-4]
-  sys.stdout.write('Processing ' + dataset)
-  filenames = [x.strip('\n') for x in open(dataset_split, 'r')]
   num_images = len(filenames)
   num_per_shard = int(math.ceil(num_images / float(_NUM_SHARDS)))
 
   image_reader = build_data.ImageReader('jpeg', channels=3)
   label_reader = build_data.ImageReader('png', channels=1)
 
-  for shard_id in range(_NUM_SHARDS):
-    output_filename = os.path.join(
-        FLAGS.output_dir,
-        '%s-%05d-of-%05d.tfrecord' % (dataset, shard_id, _NUM_SHARDS))
-    with tf.python_io.TFRecordWriter(output_filename) as tfrecord_writer:
-      start_idx = shard_id * num_per_shard
-      end_idx = min((shard_id + 1) * num_per_shard, num_images)
-      for i in range(start_idx, end_idx):
-        sys.stdout.write('\r>> Converting image %d/%d shard %d' % (
-            i + 1, len(filenames), shard_id))
-        sys.stdout.flush()
-        # Read the image.
-        image_filename = os.path.join(
-            FLAGS.image_folder, filenames[i] + '.' + FLAGS.image_format)
-        image_data = tf.gfile.FastGFile(image_filename, 'rb').read()
-        height, width = image_reader.read_image_dims(image_data)
-        # Read the semantic segmentation annotation.
-        seg_filename = os.path.join(
-            FLAGS.semantic_segmentation_folder,
-            filenames[i] + '.' + FLAGS.label_format)
-        seg_data = tf.gfile.FastGFile(seg_filename, 'rb').read()
-        seg_height, seg_width = label_reader.read_image_dims(seg_data)
-        if height != seg_height or width != seg_width:
-          raise RuntimeError('Shape mismatched between image and label.')
-        # Convert to tf example.
-        example = build_data.image_seg_to_tfexample(
-            image_data, filenames[i], height, width, seg_data)
-        tfrecord_writer.write(example.SerializeToString())
-    sys.stdout.write('\n')
-    sys.stdout.flush()
+  output_filename = os.path.join(
+      FLAGS.output_dir,
+      '%s-%05d-of-%05d.tfrecord' % (dataset, shard_id, _NUM_SHARDS))
+  with tf.python_io.TFRecordWriter(output_filename) as tfrecord_writer:
+    start_idx = shard_id * num_per_shard
+    end_idx = min((shard_id + 1) * num_per_shard, num_images)
+    for i in range(start_idx, end_idx):
+      sys.stdout.write('\r>> Converting image %d/%d shard %d' % (
+          i + 1, len(filenames), shard_id))
+      sys.stdout.flush()
+      # Read the image.
+      image_filename = os.path.join(
+          FLAGS.image_folder, filenames[i] + '.' + FLAGS.image_format)
+      image_data = tf.gfile.FastGFile(image_filename, 'rb').read()
+      height, width = image_reader.read_image_dims(image_data)
+      # Read the semantic segmentation annotation.
+      seg_filename = os.path.join(
+          FLAGS.semantic_segmentation_folder,
+          filenames[i] + '.' + FLAGS.label_format)
+      seg_data = tf.gfile.FastGFile(seg_filename, 'rb').read()
+      seg_height, seg_width = label_reader.read_image_dims(seg_data)
+      if height != seg_height or width != seg_width:
+        raise RuntimeError('Shape mismatched between image and label.')
+      # Convert to tf example.
+      example = build_data.image_seg_to_tfexample(
+          image_data, filenames[i], height, width, seg_data)
+      tfrecord_writer.write(example.SerializeToString())
+  sys.stdout.write('\n')
+  sys.stdout.flush()
+
+
+def _convert_dataset(dataset_split):
+  """Converts the specified dataset split to TFRecord format.
+
+  Args:
+    dataset_split: The dataset split (e.g., train, test).
+
+  Raises:
+    RuntimeError: If loaded image and label have different shape.
+  """
+  dataset = os.path.basename(dataset_split)[:-4]
+  sys.stdout.write('Processing ' + dataset)
+  filenames = [x.strip('\n') for x in open(dataset_split, 'r')]
+  build_data.run_shard_conversion(
+      functools.partial(_convert_shard, dataset, filenames), _NUM_SHARDS)
 
 
 def main(unused_argv):
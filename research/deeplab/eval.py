@@ -18,11 +18,13 @@ See model.py for more details and usage.
 """
 
 import math
+import os
 import six
 import tensorflow as tf
 from deeplab import common
 from deeplab import model
 from deeplab.datasets import segmentation_dataset
+from deeplab.utils import confusion_matrix
 from deeplab.utils import input_generator
 
 slim = tf.contrib.slim
@@ -67,6 +69,24 @@ flags.DEFINE_multi_float('eval_scales', [1.0],
 flags.DEFINE_bool('add_flipped_images', False,
                   'Add flipped images for evaluation or not.')
 
+# Evaluate several configurations in one pass over the data, e.g.
+# --eval_configs=1.0 --eval_configs=0.5,1.0,1.5:flipped. Each configuration is
+# a comma-separated list of scales, optionally followed by ':flipped'. When
+# set, the confusion matrices are accumulated in numpy, per-class IoU,
+# precision and recall are reported, and eval_scales/add_flipped_images are
+# ignored.
+flags.DEFINE_multi_string('eval_configs', None,
+                          'Eval configurations to evaluate in a single pass.')
+
+# With eval_configs, evaluation can be split over several workers, each reading
+# a subset of the dataset files. Their confusion matrices, saved in eval_logdir,
+# are merged with confusion_matrix.merge_files.
+flags.DEFINE_integer('num_eval_shards', 1,
+                     'Number of workers the evaluation is split over.')
+
+flags.DEFINE_integer('eval_shard_index', 0,
+                     'Index of the dataset shard evaluated by this worker.')
+
 # Dataset settings.
 
 flags.DEFINE_string('dataset', 'pascal_voc_seg',
@@ -82,11 +102,116 @@ flags.DEFINE_integer('max_number_of_evaluations', 0,
                      'indefinitely upon nonpositive values.')
 
 
+def _parse_eval_config(eval_config):
+  """Parses an --eval_configs value into (eval_scales, add_flipped_images)."""
+  scales, _, flipped = eval_config.partition(':')
+  if flipped not in ('', 'flipped'):
+    raise ValueError('Invalid eval config: %s' % eval_config)
+  eval_scales = tuple(float(scale) for scale in scales.split(','))
+  return eval_scales, bool(flipped)
+
+
+def _predictions_tag(eval_scales, add_flipped_images):
+  predictions_tag = 'miou'
+  for eval_scale in eval_scales:
+    predictions_tag += '_' + str(eval_scale)
+  if add_flipped_images:
+    predictions_tag += '_flipped'
+  return predictions_tag
+
+
+def _shard_dataset(dataset, num_shards, shard_index):
+  """Returns a copy of dataset reading only one shard of its files."""
+  data_sources = sorted(tf.gfile.Glob(dataset.data_sources))
+  if len(data_sources) < num_shards:
+    raise ValueError('Cannot split %d files over %d eval shards.' %
+                     (len(data_sources), num_shards))
+  kwargs = dict(vars(dataset))
+  kwargs['data_sources'] = data_sources[shard_index::num_shards]
+  return slim.dataset.Dataset(**kwargs)
+
+
+def _evaluate_configs(dataset, samples, model_options, eval_configs):
+  """Evaluates several eval configs with numpy confusion matrices.
+
+  Every new checkpoint is evaluated on the whole (shard of the) dataset. The
+  per-class metrics of every config are written as summaries to eval_logdir,
+  together with the confusion matrices, which can be merged across shards.
+
+  Args:
+    dataset: An instance of slim Dataset.
+    samples: A dictionary of batched Tensors from input_generator.get.
+    model_options: A ModelOptions instance to configure models.
+    eval_configs: A list of (eval_scales, add_flipped_images) tuples.
+  """
+  configs_to_predictions = model.predict_labels_multi_config(
+      samples[common.IMAGE], model_options, eval_configs)
+  fetches = {
+      'labels': samples[common.LABEL],
+      'predictions': [predictions[common.OUTPUT_TYPE]
+                      for predictions in configs_to_predictions],
+  }
+  tags = [_predictions_tag(*eval_config) for eval_config in eval_configs]
+  global_step = tf.train.get_or_create_global_step()
+  saver = tf.train.Saver(slim.get_variables_to_restore())
+  summary_writer = tf.summary.FileWriter(FLAGS.eval_logdir)
+
+  num_evaluations = 0
+  for checkpoint_path in tf.contrib.training.checkpoints_iterator(
+      FLAGS.checkpoint_dir, min_interval_secs=FLAGS.eval_interval_secs):
+    matrices = [
+        confusion_matrix.ConfusionMatrix(dataset.num_classes,
+                                         dataset.ignore_label)
+        for _ in eval_configs
+    ]
+    with tf.Session(FLAGS.master) as sess:
+      sess.run(tf.local_variables_initializer())
+      saver.restore(sess, checkpoint_path)
+      step = sess.run(global_step)
+      coord = tf.train.Coordinator()
+      threads = tf.train.start_queue_runners(sess, coord=coord)
+      try:
+        while not coord.should_stop():
+          results = sess.run(fetches)
+          for matrix, predictions in zip(matrices, results['predictions']):
+            matrix.update(results['labels'], predictions)
+      except tf.errors.OutOfRangeError:
+        pass
+      finally:
+        coord.request_stop()
+        coord.join(threads)
+
+    summary = tf.Summary()
+    for tag, matrix in zip(tags, matrices):
+      for metric_name, value in sorted(six.iteritems(matrix.metrics())):
+        if metric_name == 'miou':
+          summary_tag = tag
+          tf.logging.info('%s: %f', tag, value)
+        else:
+          summary_tag = '%s/%s' % (tag, metric_name)
+        summary.value.add(tag=summary_tag, simple_value=value)
+      matrix.save(os.path.join(
+          FLAGS.eval_logdir, 'confusion_matrix_%s-%d-%05d-of-%05d.npy' %
+          (tag, step, FLAGS.eval_shard_index, FLAGS.num_eval_shards)))
+    summary_writer.add_summary(summary, step)
+    summary_writer.flush()
+
+    num_evaluations += 1
+    if num_evaluations == FLAGS.max_number_of_evaluations:
+      break
+
+
 def main(unused_argv):
   tf.logging.set_verbosity(tf.logging.INFO)
   # Get dataset-dependent information.
   dataset = segmentation_dataset.get_dataset(
       FLAGS.dataset, FLAGS.eval_split, dataset_dir=FLAGS.dataset_dir)
+  if FLAGS.num_eval_shards > 1:
+    if not FLAGS.eval_configs:
+      # The mean_iou of a shard cannot be merged with the other shards.
+      raise ValueError('--num_eval_shards > 1 requires --eval_configs.')
+    dataset = _shard_dataset(dataset, FLAGS.num_eval_shards,
+                             FLAGS.eval_shard_index)
 
   tf.gfile.MakeDirs(FLAGS.eval_logdir)
   tf.logging.info('Evaluating on %s set', FLAGS.eval_split)
@@ -109,6 +234,14 @@ def main(unused_argv):
         atrous_rates=FLAGS.atrous_rates,
         output_stride=FLAGS.output_stride)
 
+    if FLAGS.eval_configs:
+      eval_configs = [_parse_eval_config(eval_config)
+                      for eval_config in FLAGS.eval_configs]
+      tf.logging.info('Evaluating %d configs in a single pass.',
+                      len(eval_configs))
+      _evaluate_configs(dataset, samples, model_options, eval_configs)
+      return
+
     if tuple(FLAGS.eval_scales) == (1.0,):
       tf.logging.info('Performing single-scale test.')
       predictions = model.predict_labels(samples[common.IMAGE], model_options,
@@ -131,11 +264,8 @@ def main(unused_argv):
     labels = tf.where(
         tf.equal(labels, dataset.ignore_label), tf.zeros_like(labels), labels)
 
-    predictions_tag = 'miou'
-    for eval_scale in FLAGS.eval_scales:
-      predictions_tag += '_' + str(eval_scale)
-    if FLAGS.add_flipped_images:
-      predictions_tag += '_flipped'
+    predictions_tag = _predictions_tag(FLAGS.eval_scales,
+                                       FLAGS.add_flipped_images)
 
     # Define the evaluation metric.
     metric_map = {}
@@ -161,6 +161,72 @@ def predict_labels_multi_scale(images,
   return outputs_to_predictions
 
 
+def predict_labels_multi_config(images, model_options, eval_configs):
+  """Predicts segmentation labels for several eval configurations at once.
+
+  Each (scale, flipped) pair needed by any configuration is run through the
+  network once, and its softmax probabilities are shared by all configurations
+  using it, so that e.g. single-scale and multi-scale results can be computed
+  in one pass over the data.
+
+  Args:
+    images: A tensor of size [batch, height, width, channels].
+    model_options: A ModelOptions instance to configure models.
+    eval_configs: A list of (eval_scales, add_flipped_images) tuples, where
+      eval_scales is a sequence of scales and add_flipped_images a boolean,
+      with the same meaning as for predict_labels_multi_scale.
+
+  Returns:
+    A list with one dictionary per eval config, in the order of eval_configs.
+      Each dictionary maps output_type (e.g., semantic prediction) to a Tensor
+      of predictions (argmax over channels) of size [batch, height, width].
+  """
+  scale_flips = set()
+  for eval_scales, add_flipped_images in eval_configs:
+    for image_scale in eval_scales:
+      scale_flips.add((image_scale, False))
+      if add_flipped_images:
+        scale_flips.add((image_scale, True))
+
+  scale_flip_to_probabilities = {}
+  for i, (image_scale, flipped) in enumerate(sorted(scale_flips)):
+    with tf.variable_scope(tf.get_variable_scope(), reuse=True if i else None):
+      outputs_to_scales_to_logits = multi_scale_logits(
+          tf.reverse_v2(images, [2]) if flipped else images,
+          model_options=model_options,
+          image_pyramid=[image_scale],
+          is_training=False,
+          fine_tune_batch_norm=False)
+    outputs_to_probabilities = {}
+    for output in sorted(outputs_to_scales_to_logits):
+      logits = outputs_to_scales_to_logits[output][MERGED_LOGITS_SCOPE]
+      if flipped:
+        logits = tf.reverse_v2(logits, [2])
+      logits = tf.image.resize_bilinear(
+          logits, tf.shape(images)[1:3], align_corners=True)
+      outputs_to_probabilities[output] = tf.expand_dims(
+          tf.nn.softmax(logits), 4)
+    scale_flip_to_probabilities[(image_scale, flipped)] = (
+        outputs_to_probabilities)
+
+  configs_to_predictions = []
+  for eval_scales, add_flipped_images in eval_configs:
+    keys = []
+    for image_scale in eval_scales:
+      keys.append((image_scale, False))
+      if add_flipped_images:
+        keys.append((image_scale, True))
+    outputs_to_predictions = {}
+    for output in sorted(model_options.outputs_to_num_classes):
+      predictions = [scale_flip_to_probabilities[key][output] for key in keys]
+      # Compute average prediction across different scales and flipped images.
+      predictions = tf.reduce_mean(tf.concat(predictions, 4), axis=4)
+      outputs_to_predictions[output] = tf.argmax(predictions, 3)
+    configs_to_predictions.append(outputs_to_predictions)
+
+  return configs_to_predictions
+
+
 def predict_labels(images, model_options, image_pyramid=None):
   """Predicts segmentation labels.
 
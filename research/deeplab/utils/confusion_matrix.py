@@ -0,0 +1,192 @@
+# Copyright 2018 The TensorFlow Authors All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Streaming confusion matrix for semantic segmentation evaluation.
+
+The confusion matrix is accumulated in numpy from batches of labels and
+predictions fetched from the session, so that several prediction tensors (e.g.
+different eval scales or flipping) can be evaluated in a single pass over the
+data. Matrices of sharded eval workers can be saved and merged.
+"""
+
+import io
+
+import numpy as np
+import tensorflow as tf
+
+
+class ConfusionMatrix(object):
+  """Accumulates a [num_classes, num_classes] confusion matrix.
+
+  Entry [i, j] counts the pixels with groundtruth label i predicted as j.
+  """
+
+  def __init__(self, num_classes, ignore_label=None):
+    """Constructor.
+
+    Args:
+      num_classes: Integer, number of classes.
+      ignore_label: Integer, label of pixels that are not evaluated. Pixels with
+        a label outside [0, num_classes) are not evaluated either.
+    """
+    self.num_classes = num_classes
+    self.ignore_label = ignore_label
+    self.matrix = np.zeros((num_classes, num_classes), dtype=np.int64)
+
+  def reset(self):
+    self.matrix[:] = 0
+
+  def update(self, labels, predictions):
+    """Adds a batch of labels and predictions.
+
+    Args:
+      labels: Integer array of groundtruth labels, e.g. of shape [batch,
+        height, width] or [batch, height, width, 1].
+      predictions: Integer array of predicted labels with the same number of
+        elements as labels.
+
+    Raises:
+      ValueError: If labels and predictions have different sizes, or if a
+        prediction is outside [0, num_classes).
+    """
+    labels = np.asarray(labels).reshape(-1)
+    predictions = np.asarray(predictions).reshape(-1)
+    if labels.size != predictions.size:
+      raise ValueError('labels and predictions have different sizes: '
+                       '%d vs %d' % (labels.size, predictions.size))
+    valid = (labels >= 0) & (labels < self.num_classes)
+    if self.ignore_label is not None:
+      valid &= labels != self.ignore_label
+    if not valid.all():
+      labels = labels[valid]
+      predictions = predictions[valid]
+    if predictions.size and (predictions.min() < 0 or
+                             predictions.max() >= self.num_classes):
+      raise ValueError('Predictions must be in [0, %d).' % self.num_classes)
+    counts = np.bincount(
+        labels.astype(np.int64) * self.num_classes + predictions,
+        minlength=self.num_classes * self.num_classes)
+    self.matrix += counts.reshape(self.num_classes, self.num_classes)
+
+  def merge(self, other):
+    """Adds the counts of another ConfusionMatrix or count array."""
+    other_matrix = getattr(other, 'matrix', other)
+    if np.shape(other_matrix) != self.matrix.shape:
+      raise ValueError('Cannot merge confusion matrices of shapes %s and %s.' %
+                       (np.shape(other_matrix), self.matrix.shape))
+    self.matrix += other_matrix
+    return self
+
+  def save(self, path):
+    """Saves the counts to a .npy file, which may be on GCS."""
+    with tf.gfile.GFile(path, 'wb') as f:
+      np.save(f, self.matrix)
+
+  def true_positives(self):
+    return np.diag(self.matrix)
+
+  def per_class_iou(self):
+    """Returns the IoU of every class, with NaN for absent classes."""
+    true_positives = self.true_positives()
+    union = (self.matrix.sum(axis=0) + self.matrix.sum(axis=1) -
+             true_positives)
+    return _safe_divide(true_positives, union)
+
+  def per_class_precision(self):
+    """Returns the precision of every class, with NaN if never predicted."""
+    return _safe_divide(self.true_positives(), self.matrix.sum(axis=0))
+
+  def per_class_recall(self):
+    """Returns the recall of every class, with NaN if absent from labels."""
+    return _safe_divide(self.true_positives(), self.matrix.sum(axis=1))
+
+  def mean_iou(self):
+    """Returns the mean IoU over classes present in labels or predictions.
+
+    This is the same value as tf.metrics.mean_iou.
+    """
+    iou = self.per_class_iou()
+    if np.all(np.isnan(iou)):
+      return 0.0
+    return float(np.nanmean(iou))
+
+  def pixel_accuracy(self):
+    total = self.matrix.sum()
+    return float(self.true_positives().sum()) / total if total else 0.0
+
+  def metrics(self, class_names=None):
+    """Returns a dictionary of summary metrics.
+
+    Args:
+      class_names: Optional list of class names used in per-class metric
+        names. Class indices are used by default.
+
+    Returns:
+      A dictionary with the mean IoU, the pixel accuracy and the per-class IoU,
+      precision and recall. Per-class metrics are omitted for classes that do
+      not appear in labels nor predictions.
+    """
+    if class_names is None:
+      class_names = [str(i) for i in range(self.num_classes)]
+    result = {
+        'miou': self.mean_iou(),
+        'pixel_accuracy': self.pixel_accuracy(),
+    }
+    per_class = {
+        'iou': self.per_class_iou(),
+        'precision': self.per_class_precision(),
+        'recall': self.per_class_recall(),
+    }
+    for metric_name, values in per_class.items():
+      for class_name, value in zip(class_names, values):
+        if not np.isnan(value):
+          result['%s/%s' % (metric_name, class_name)] = float(value)
+    return result
+
+
+def _safe_divide(numerator, denominator):
+  result = np.full(numerator.shape, np.nan)
+  nonzero = denominator > 0
+  result[nonzero] = numerator[nonzero] / denominator[nonzero].astype(np.float64)
+  return result
+
+
+def load(path, ignore_label=None):
+  """Loads a ConfusionMatrix saved with ConfusionMatrix.save."""
+  with tf.gfile.GFile(path, 'rb') as f:
+    matrix = np.load(io.BytesIO(f.read()))
+  confusion_matrix = ConfusionMatrix(matrix.shape[0], ignore_label)
+  confusion_matrix.matrix[:] = matrix
+  return confusion_matrix
+
+
+def merge_files(paths, ignore_label=None):
+  """Sums the confusion matrices saved by several eval workers.
+
+  Args:
+    paths: List of .npy files written by ConfusionMatrix.save.
+    ignore_label: Integer, label of pixels that are not evaluated.
+
+  Returns:
+    A ConfusionMatrix with the summed counts.
+
+  Raises:
+    ValueError: If paths is empty or the matrices have different shapes.
+  """
+  if not paths:
+    raise ValueError('No confusion matrix to merge.')
+  result = load(paths[0], ignore_label)
+  for path in paths[1:]:
+    result.merge(load(path))
+  return result
@@ -0,0 +1,67 @@
+# Copyright 2018 The TensorFlow Authors All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Tests for confusion_matrix.py."""
+
+import os
+import numpy as np
+import tensorflow as tf
+
+from deeplab.utils import confusion_matrix
+
+
+class ConfusionMatrixTest(tf.test.TestCase):
+
+  def testUpdateIgnoresLabels(self):
+    """Test that ignored and out of range labels are not counted."""
+    matrix = confusion_matrix.ConfusionMatrix(3, ignore_label=255)
+    labels = np.array([[0, 1, 2, 255], [1, 1, 7, 0]])
+    predictions = np.array([[0, 2, 2, 1], [1, 0, 0, 0]])
+    matrix.update(labels, predictions)
+    self.assertTrue(np.array_equal(
+        [[2, 0, 0], [1, 1, 1], [0, 0, 1]], matrix.matrix))
+
+  def testPerClassMetrics(self):
+    """Test the per-class metrics and that absent classes are skipped."""
+    matrix = confusion_matrix.ConfusionMatrix(3)
+    matrix.update([0, 0, 1, 1], [0, 1, 1, 1])
+    self.assertAllClose([0.5, 2. / 3, np.nan], matrix.per_class_iou())
+    self.assertAllClose([1., 2. / 3, np.nan], matrix.per_class_precision())
+    self.assertAllClose([0.5, 1., np.nan], matrix.per_class_recall())
+    metrics = matrix.metrics(class_names=['a', 'b', 'c'])
+    self.assertAlmostEqual(7. / 12, metrics['miou'])
+    self.assertAlmostEqual(0.75, metrics['pixel_accuracy'])
+    self.assertNotIn('iou/c', metrics)
+    self.assertAlmostEqual(0.5, metrics['recall/a'])
+
+  def testMergeFiles(self):
+    """Test that matrices of sharded workers sum to the full matrix."""
+    labels = np.random.randint(0, 4, size=(2, 16, 16))
+    predictions = np.random.randint(0, 4, size=(2, 16, 16))
+    full = confusion_matrix.ConfusionMatrix(4)
+    full.update(labels, predictions)
+    paths = []
+    for i in range(2):
+      shard = confusion_matrix.ConfusionMatrix(4)
+      shard.update(labels[i], predictions[i])
+      paths.append(os.path.join(self.get_temp_dir(), 'shard%d.npy' % i))
+      shard.save(paths[i])
+    merged = confusion_matrix.merge_files(paths)
+    self.assertTrue(np.array_equal(full.matrix, merged.matrix))
+    self.assertAlmostEqual(full.mean_iou(), merged.mean_iou())
+
+
+if __name__ == '__main__':
+  tf.test.main()
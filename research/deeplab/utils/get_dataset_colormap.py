@@ -42,6 +42,9 @@ _DATASET_MAX_ENTRIES = {
     _PASCAL: 256,
 }
 
+# Colormaps already created by create_label_colormap, keyed by (dataset, dtype).
+_COLORMAP_CACHE = {}
+
 
 def create_ade20k_label_colormap():
   """Creates a label colormap used in ADE20K segmentation benchmark.
@@ -379,6 +382,36 @@ def create_label_colormap(dataset=_PASCAL):
     raise ValueError('Unsupported dataset.')
 
 
+def get_colormap_lut(dataset=_PASCAL, dtype=np.uint8):
+  """Returns the dataset colormap as a lookup table, creating it only once.
+
+  Args:
+    dataset: The colormap used in the dataset.
+    dtype: The dtype of the returned colormap.
+
+  Returns:
+    A read-only numpy array of shape [max_entries, 3].
+
+  Raises:
+    ValueError: If the dataset is not supported.
+  """
+  key = (dataset, np.dtype(dtype))
+  colormap = _COLORMAP_CACHE.get(key)
+  if colormap is None:
+    colormap = create_label_colormap(dataset).astype(dtype)
+    colormap.flags.writeable = False
+    _COLORMAP_CACHE[key] = colormap
+  return colormap
+
+
+def _check_label(label, dataset):
+  if label.ndim != 2:
+    raise ValueError('Expect 2-D input label')
+
+  if np.max(label) >= _DATASET_MAX_ENTRIES[dataset]:
+    raise ValueError('label value too large.')
+
+
 def label_to_color_image(label, dataset=_PASCAL):
   """Adds color defined by the dataset colormap to the label.
 
@@ -395,11 +428,27 @@ def label_to_color_image(label, dataset=_PASCAL):
     ValueError: If label is not of rank 2 or its value is larger than color
       map maximum entry.
   """
-  if label.ndim != 2:
-    raise ValueError('Expect 2-D input label')
+  _check_label(label, dataset)
+  colormap = get_colormap_lut(dataset, dtype=int)
+  return colormap[label]
 
-  if np.max(label) >= _DATASET_MAX_ENTRIES[dataset]:
-    raise ValueError('label value too large.')
 
-  colormap = create_label_colormap(dataset)
-  return colormap[label]
+def label_to_uint8_color_image(label, dataset=_PASCAL):
+  """Same as label_to_color_image, but returns a uint8 image.
+
+  The lookup goes through a cached uint8 colormap, so the result can be
+  encoded directly without a conversion of the full image.
+
+  Args:
+    label: A 2D array with integer type, storing the segmentation label.
+    dataset: The colormap used in the dataset.
+
+  Returns:
+    A uint8 array of shape [height, width, 3].
+
+  Raises:
+    ValueError: If label is not of rank 2 or its value is larger than color
+      map maximum entry.
+  """
+  _check_label(label, dataset)
+  return np.take(get_colormap_lut(dataset), label, axis=0)
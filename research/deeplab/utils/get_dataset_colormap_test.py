@@ -91,6 +91,19 @@ class VisualizationUtilTest(tf.test.TestCase):
     self.assertTrue(np.array_equal([190, 153, 153], colormap[3, :]))
     self.assertTrue(np.array_equal([102, 102, 156], colormap[6, :]))
 
+  def testLabelToUint8ColorImageMatchesLabelToColorImage(self):
+    label = np.array([[0, 16, 16], [52, 7, 255]])
+    colored_label = get_dataset_colormap.label_to_uint8_color_image(
+        label, get_dataset_colormap.get_pascal_name())
+    self.assertEqual(colored_label.dtype, np.uint8)
+    self.assertTrue(np.array_equal(
+        colored_label,
+        get_dataset_colormap.label_to_color_image(
+            label, get_dataset_colormap.get_pascal_name())))
+    with self.assertRaises(ValueError):
+      get_dataset_colormap.label_to_uint8_color_image(
+          label, get_dataset_colormap.get_cityscapes_name())
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -18,6 +18,9 @@ This script saves an annotation as one png image, and has the option to add
 colormap to the png image for better visualization.
 """
 
+from multiprocessing.pool import ThreadPool
+import threading
+
 import numpy as np
 import PIL.Image as img
 import tensorflow as tf
@@ -42,11 +45,79 @@ def save_annotation(label,
   """
   # Add colormap for visualizing the prediction.
   if add_colormap:
-    colored_label = get_dataset_colormap.label_to_color_image(
+    colored_label = get_dataset_colormap.label_to_uint8_color_image(
         label, colormap_type)
   else:
     colored_label = label
 
-  pil_image = img.fromarray(colored_label.astype(dtype=np.uint8))
+  pil_image = img.fromarray(colored_label.astype(dtype=np.uint8, copy=False))
   with tf.gfile.Open('%s/%s.png' % (save_dir, filename), mode='w') as f:
     pil_image.save(f, 'PNG')
+
+
+class AsyncAnnotationWriter(object):
+  """Saves annotations with save_annotation on a pool of threads.
+
+  Colormap lookup, PNG encoding and file writing are moved off the calling
+  thread, so that they overlap with the computation of the next batch. At most
+  max_pending annotations are queued; save_annotation blocks beyond that.
+  Arrays passed to save_annotation must not be modified afterwards.
+  """
+
+  def __init__(self, num_threads=4, max_pending=64):
+    """Constructor.
+
+    Args:
+      num_threads: Number of writer threads.
+      max_pending: Maximum number of annotations waiting to be written.
+    """
+    self._pool = ThreadPool(num_threads)
+    self._pending = threading.BoundedSemaphore(max_pending)
+    self._lock = threading.Lock()
+    self._error = None
+
+  def _save(self, args, kwargs):
+    try:
+      save_annotation(*args, **kwargs)
+    except Exception as e:  # pylint: disable=broad-except
+      with self._lock:
+        if self._error is None:
+          self._error = e
+    finally:
+      self._pending.release()
+
+  def _raise_error(self):
+    with self._lock:
+      error, self._error = self._error, None
+    if error is not None:
+      raise error
+
+  def save_annotation(self, *args, **kwargs):
+    """Queues save_annotation(*args, **kwargs).
+
+    Raises:
+      Exception: the first error raised by a previously queued annotation.
+    """
+    self._raise_error()
+    self._pending.acquire()
+    self._pool.apply_async(self._save, (args, kwargs))
+
+  def close(self):
+    """Waits until all queued annotations are written.
+
+    Raises:
+      Exception: the first error raised by a queued annotation.
+    """
+    self._pool.close()
+    self._pool.join()
+    self._raise_error()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, unused_value, unused_traceback):
+    if exc_type is None:
+      self.close()
+    else:
+      self._pool.close()
+      self._pool.join()
@@ -86,6 +86,11 @@ flags.DEFINE_enum('colormap_type', 'pascal', ['pascal', 'cityscapes'],
 flags.DEFINE_boolean('also_save_raw_predictions', False,
                      'Also save raw predictions.')
 
+flags.DEFINE_integer('num_writer_threads', 4,
+                     'Number of threads encoding and writing the results in '
+                     'the background. If 0, results are written in the main '
+                     'thread.')
+
 flags.DEFINE_integer('max_number_of_iterations', 0,
                      'Maximum number of visualization iterations. Will loop '
                      'indefinitely upon nonpositive values.')
@@ -122,16 +127,17 @@ def _convert_train_id_to_eval_id(prediction, train_id_to_eval_id):
   Returns:
     Semantic segmentation prediction whose labels have been changed.
   """
-  converted_prediction = prediction.copy()
-  for train_id, eval_id in enumerate(train_id_to_eval_id):
-    converted_prediction[prediction == train_id] = eval_id
-
-  return converted_prediction
+  # Lookup table mapping every label to itself, except for the train ids.
+  table_size = max(len(train_id_to_eval_id), int(np.max(prediction)) + 1)
+  lookup_table = np.arange(table_size, dtype=prediction.dtype)
+  lookup_table[:len(train_id_to_eval_id)] = train_id_to_eval_id
+  return lookup_table[prediction]
 
 
 def _process_batch(sess, original_images, semantic_predictions, image_names,
                    image_heights, image_widths, image_id_offset, save_dir,
-                   raw_save_dir, train_id_to_eval_id=None):
+                   raw_save_dir, train_id_to_eval_id=None,
+                   save_annotation_fn=save_annotation.save_annotation):
   """Evaluates one single batch qualitatively.
 
   Args:
@@ -145,6 +151,8 @@ def _process_batch(sess, original_images, semantic_predictions, image_names,
     save_dir: The directory where the predictions will be saved.
     raw_save_dir: The directory where the raw predictions will be saved.
     train_id_to_eval_id: A list mapping from train id to eval id.
+    save_annotation_fn: Function used to save the images and predictions, with
+      the signature of save_annotation.save_annotation.
   """
   (original_images,
    semantic_predictions,
@@ -162,12 +170,12 @@ def _process_batch(sess, original_images, semantic_predictions, image_names,
     crop_semantic_prediction = semantic_prediction[:image_height, :image_width]
 
     # Save image.
-    save_annotation.save_annotation(
+    save_annotation_fn(
         original_image, save_dir, _IMAGE_FORMAT % (image_id_offset + i),
         add_colormap=False)
 
     # Save prediction.
-    save_annotation.save_annotation(
+    save_annotation_fn(
         crop_semantic_prediction, save_dir,
         _PREDICTION_FORMAT % (image_id_offset + i), add_colormap=True,
         colormap_type=FLAGS.colormap_type)
@@ -179,7 +187,7 @@ def _process_batch(sess, original_images, semantic_predictions, image_names,
         crop_semantic_prediction = _convert_train_id_to_eval_id(
             crop_semantic_prediction,
             train_id_to_eval_id)
-      save_annotation.save_annotation(
+      save_annotation_fn(
           crop_semantic_prediction, raw_save_dir, image_filename,
           add_colormap=False)
 
@@ -290,6 +298,13 @@ def main(unused_argv):
         sv.start_queue_runners(sess)
         sv.saver.restore(sess, last_checkpoint)
 
+        annotation_writer = None
+        save_annotation_fn = save_annotation.save_annotation
+        if FLAGS.num_writer_threads > 0:
+          annotation_writer = save_annotation.AsyncAnnotationWriter(
+              FLAGS.num_writer_threads)
+          save_annotation_fn = annotation_writer.save_annotation
+
         image_id_offset = 0
         for batch in range(num_batches):
           tf.logging.info('Visualizing batch %d / %d', batch + 1, num_batches)
@@ -302,8 +317,11 @@ def main(unused_argv):
                          image_id_offset=image_id_offset,
                          save_dir=save_dir,
                          raw_save_dir=raw_save_dir,
-                         train_id_to_eval_id=train_id_to_eval_id)
+                         train_id_to_eval_id=train_id_to_eval_id,
+                         save_annotation_fn=save_annotation_fn)
           image_id_offset += FLAGS.vis_batch_size
+        if annotation_writer is not None:
+          annotation_writer.close()
 
       tf.logging.info(
           'Finished visualization at ' + time.strftime('%Y-%m-%d-%H:%M:%S',
@@ -33,6 +33,7 @@ from __future__ import division
 from __future__ import print_function
 
 import math
+import multiprocessing
 import os
 import sys
 
@@ -63,6 +64,19 @@ flags.DEFINE_integer(
     'teachers', None,
     'Number of teachers (if unspecified, derived from the counts file).')
 
+flags.DEFINE_string(
+    'ls_cache_dir', None,
+    'Directory for caching local sensitivity tables across runs (if '
+    'unspecified, tables are not cached on disk).')
+flags.DEFINE_integer('ls_cache_size', 100000,
+                     'Maximum number of cached local sensitivity tables.')
+flags.DEFINE_integer(
+    'num_workers', 1,
+    'Number of processes used to compute local sensitivity tables.')
+flags.DEFINE_integer(
+    'ls_batch_size', 1000,
+    'Number of queries whose local sensitivity tables are computed at once.')
+
 flags.mark_flag_as_required('counts_file')
 flags.mark_flag_as_required('sigma2')
 
@@ -150,7 +164,7 @@ def _compute_rdp(votes, baseline, threshold, sigma1, sigma2, delta, orders,
 
 def _find_optimal_smooth_sensitivity_parameters(
     votes, baseline, num_teachers, threshold, sigma1, sigma2, delta, ind_step1,
-    ind_step2, order):
+    ind_step2, order, ls_cache=None, pool=None, ls_batch_size=1000):
   """Optimizes smooth sensitivity parameters by minimizing a cost function.
 
   The cost function is
@@ -160,6 +174,9 @@ def _find_optimal_smooth_sensitivity_parameters(
 
   Since optimization is done with full view of sensitive data, the results
   cannot be released.
+
+  Local sensitivity tables are computed ls_batch_size queries at a time, using
+  the optional on-disk ls_cache and process pool.
   """
   rdp_cum = 0
   answered_cum = 0
@@ -170,6 +187,19 @@ def _find_optimal_smooth_sensitivity_parameters(
   cost_delta = math.log(1 / delta) / (order - 1)
 
   for i, v in enumerate(votes):
+    if i % ls_batch_size == 0:
+      # Local sensitivity tables for the next batch of queries.
+      batch = slice(i, i + ls_batch_size)
+      if threshold is not None and not ind_step1:
+        ls_step1_batch = (
+            pate_ss.compute_local_sensitivity_bounds_threshold_batch(
+                votes[batch] - baseline[batch], num_teachers, threshold,
+                sigma1, order))
+      if not ind_step2:
+        ls_step2_batch = pate_ss.compute_local_sensitivity_bounds_gnmax_batch(
+            votes[batch], num_teachers, sigma2, order, cache=ls_cache,
+            pool=pool)
+
     if threshold is None:
       log_pr_answered = 0
       rdp1 = 0
@@ -182,8 +212,7 @@ def _find_optimal_smooth_sensitivity_parameters(
         ls_step1 = np.zeros(num_teachers)
       else:
         rdp1 = pate.compute_rdp_threshold(log_pr_answered, sigma1, order)
-        ls_step1 = pate_ss.compute_local_sensitivity_bounds_threshold(
-            v - baseline[i,], num_teachers, threshold, sigma1, order)
+        ls_step1 = ls_step1_batch[i % ls_batch_size]
 
     pr_answered = math.exp(log_pr_answered)
     answered_cum += pr_answered
@@ -195,8 +224,7 @@ def _find_optimal_smooth_sensitivity_parameters(
       logq_step2 = pate.compute_logq_gaussian(v, sigma2)
       rdp2 = pate.rdp_gaussian(logq_step2, sigma2, order)
       # Compute smooth sensitivity.
-      ls_step2 = pate_ss.compute_local_sensitivity_bounds_gnmax(
-          v, num_teachers, sigma2, order)
+      ls_step2 = ls_step2_batch[i % ls_batch_size]
 
     rdp_cum += rdp1 + pr_answered * rdp2
     ls_cum += ls_step1 + pr_answered * ls_step2  # Expected local sensitivity.
@@ -346,9 +374,24 @@ def main(argv):
   if not _check_conditions(FLAGS.sigma2, num_classes, [order]):
     return  # Quit early: sufficient conditions for correctness fail to hold.
 
-  beta_opt, ss_opt, sigma_ss_opt = _find_optimal_smooth_sensitivity_parameters(
-      votes, baseline, num_teachers, FLAGS.threshold, FLAGS.sigma1,
-      FLAGS.sigma2, FLAGS.delta, ind_step1, ind_step2, order)
+  ls_cache = None
+  if FLAGS.ls_cache_dir is not None:
+    ls_cache = pate_ss.LocalSensitivityCache(FLAGS.ls_cache_dir,
+                                             FLAGS.ls_cache_size)
+  pool = None
+  if FLAGS.num_workers > 1:
+    pool = multiprocessing.Pool(FLAGS.num_workers)
+
+  try:
+    (beta_opt, ss_opt,
+     sigma_ss_opt) = _find_optimal_smooth_sensitivity_parameters(
+         votes, baseline, num_teachers, FLAGS.threshold, FLAGS.sigma1,
+         FLAGS.sigma2, FLAGS.delta, ind_step1, ind_step2, order,
+         ls_cache=ls_cache, pool=pool, ls_batch_size=FLAGS.ls_batch_size)
+  finally:
+    if pool is not None:
+      pool.close()
+      pool.join()
 
   print('Optimal beta = {:.4f}, E[SS_beta] = {:.4}, sigma_ss = {:.2f}'.format(
       beta_opt, ss_opt, sigma_ss_opt))
@@ -27,6 +27,7 @@ import math
 
 from absl import app
 import numpy as np
+import scipy.special
 import scipy.stats
 
 
@@ -362,6 +363,213 @@ def rdp_pure_eps(logq, pure_eps, orders):
     return ret
 
 
+##################################################
+# VECTORIZED RDP ANALYSIS OVER QUERIES AND ORDERS #
+##################################################
+
+# The functions below are array versions of the ones above. They take a
+# [num_queries, num_classes] matrix of votes (one query per row) and a vector
+# of orders, and return results of shape [num_queries] or
+# [num_queries, num_orders], so that the analysis of many queries does not
+# require a Python loop.
+
+
+def _log1mexp_vec(x):
+  """Elementwise numerically stable computation of log(1-exp(x))."""
+  x = np.asarray(x, dtype=float)
+  if np.any(x > 0):
+    raise ValueError("Argument must be non-positive.")
+  with np.errstate(divide="ignore", invalid="ignore"):
+    return np.where(x < -1, np.log1p(-np.exp(np.minimum(x, -1))),
+                    np.log(-np.expm1(x)))
+
+
+def _logq_union_bound(log_pr, counts):
+  """Sums probabilities (in log space) over all but the argmax of each row."""
+  num_queries, num_classes = counts.shape
+  idx_max = np.argmax(counts, axis=1)
+  log_pr[np.arange(num_queries), idx_max] = -np.inf  # exclude one index
+  logq = scipy.special.logsumexp(log_pr, axis=1)
+  return np.minimum(logq, math.log(1 - (1 / num_classes)))
+
+
+def compute_eps_from_delta_vec(orders, rdp, delta):
+  """Translates between RDP and (eps, delta)-DP for many RDP curves at once.
+
+  Args:
+    orders: An array of orders of length num_orders.
+    rdp: An array of RDP guarantees of shape [num_queries, num_orders].
+    delta: Target delta.
+
+  Returns:
+    Pair of arrays of length num_queries: (eps, optimal_order).
+
+  Raises:
+    ValueError: If input is malformed.
+  """
+  orders = np.atleast_1d(orders)
+  rdp = np.atleast_2d(rdp)
+  if rdp.shape[1] != len(orders):
+    raise ValueError("Input lists must have the same length.")
+  eps = rdp - math.log(delta) / (orders - 1)
+  idx_opt = np.argmin(eps, axis=1)
+  return eps[np.arange(eps.shape[0]), idx_opt], orders[idx_opt]
+
+
+def compute_logq_gaussian_vec(counts, sigma):
+  """Array version of compute_logq_gaussian.
+
+  Args:
+    counts: A numpy array of scores of shape [num_queries, num_classes].
+    sigma: The standard deviation of the Gaussian noise in the GNMax mechanism.
+
+  Returns:
+    Array of length num_queries with the natural log of the probability that
+    the outcome is different from argmax.
+  """
+  counts = np.atleast_2d(counts).astype(float)
+  counts_normalized = np.max(counts, axis=1, keepdims=True) - counts
+  log_pr = scipy.stats.norm.logsf(counts_normalized,
+                                  scale=math.sqrt(2 * sigma**2))
+  return _logq_union_bound(log_pr, counts)
+
+
+def rdp_gaussian_vec(logq, sigma, orders):
+  """Array version of rdp_gaussian.
+
+  Args:
+    logq: Array of length num_queries of upper bounds on the log probability
+      of a non-argmax outcome.
+    sigma: Standard deviation of Gaussian noise.
+    orders: An array_like list of Renyi orders.
+
+  Returns:
+    Upper bound on RDP of shape [num_queries, num_orders].
+
+  Raises:
+    ValueError: If the input is malformed.
+  """
+  logq = np.atleast_1d(logq).astype(float)
+  orders = np.atleast_1d(orders).astype(float)
+  if np.any(logq > 0) or sigma < 0 or np.any(orders <= 1):
+    raise ValueError("Inputs are malformed.")
+
+  variance = sigma**2
+  ret = np.tile(orders / variance, (len(logq), 1))
+
+  # Queries whose output is fixed have 0-DP and are excluded from the rest.
+  fixed = np.isneginf(logq)
+  ret[fixed] = 0.
+
+  with np.errstate(divide="ignore", invalid="ignore"):
+    mu_hi2 = np.sqrt(variance * -logq)
+    mu_hi1 = mu_hi2 + 1
+    rdp_hi1 = mu_hi1 / variance
+    rdp_hi2 = mu_hi2 / variance
+    log_a2 = (mu_hi2 - 1) * rdp_hi2
+
+    mask = np.logical_and(mu_hi1[:, np.newaxis] > orders,
+                          (mu_hi2 > 1)[:, np.newaxis])
+    mask[fixed] = False
+
+    # Make sure q is in the increasing wrt q range and A is positive.
+    valid = np.any(mask, axis=1)
+    valid &= logq <= log_a2 - mu_hi2 * (
+        np.log(1 + 1 / (mu_hi1 - 1)) + np.log(1 + 1 / (mu_hi2 - 1)))
+    valid &= -logq > rdp_hi2
+    if not np.any(valid):
+      return ret
+
+    logq_v = logq[valid, np.newaxis]
+    mu_hi1_v = mu_hi1[valid, np.newaxis]
+    mu_hi2_v = mu_hi2[valid, np.newaxis]
+    rdp_hi1_v = rdp_hi1[valid, np.newaxis]
+    rdp_hi2_v = rdp_hi2[valid, np.newaxis]
+
+    log1q = _log1mexp_vec(logq_v)  # log1q = log(1-q)
+    log_a = (orders - 1) * (
+        log1q - _log1mexp_vec((logq_v + rdp_hi2_v) * (1 - 1 / mu_hi2_v)))
+    log_b = (orders - 1) * (rdp_hi1_v - logq_v / (mu_hi1_v - 1))
+    log_s = np.logaddexp(log1q + log_a, logq_v + log_b)
+
+  ret_v = ret[valid]
+  ret[valid] = np.where(mask[valid], np.minimum(ret_v, log_s / (orders - 1)),
+                        ret_v)
+  assert np.all(ret >= 0)
+  return ret
+
+
+def compute_logpr_answered_vec(t, sigma, counts):
+  """Array version of compute_logpr_answered.
+
+  Args:
+    t: The threshold.
+    sigma: The stdev of the Gaussian noise added to the threshold.
+    counts: An array of votes of shape [num_queries, num_classes].
+
+  Returns:
+    Array of length num_queries with the natural log of the probability that
+    max is larger than a noisy threshold.
+  """
+  counts = np.atleast_2d(counts)
+  return scipy.stats.norm.logsf(t - np.round(np.max(counts, axis=1)),
+                                scale=sigma)
+
+
+def compute_rdp_threshold_vec(log_pr_answered, sigma, orders):
+  """Array version of compute_rdp_threshold, returns [num_queries, orders]."""
+  log_pr_answered = np.atleast_1d(log_pr_answered)
+  logq = np.minimum(log_pr_answered, _log1mexp_vec(log_pr_answered))
+  return rdp_gaussian_vec(logq, 2**.5 * sigma, orders)
+
+
+def compute_logq_laplace_vec(counts, lmbd):
+  """Array version of compute_logq_laplace.
+
+  Args:
+    counts: An array of scores of shape [num_queries, num_classes].
+    lmbd: The lambda parameter of the Laplace distribution ~exp(-|x| / lambda).
+
+  Returns:
+    Array of length num_queries with the natural log of the probability that
+    the outcome is different from argmax.
+  """
+  counts = np.atleast_2d(counts).astype(float)
+  counts_normalized = (counts - np.max(counts, axis=1, keepdims=True)) / lmbd
+  log_pr = np.log(2 - counts_normalized) + math.log(.25) + counts_normalized
+  return _logq_union_bound(log_pr, counts)
+
+
+def rdp_pure_eps_vec(logq, pure_eps, orders):
+  """Array version of rdp_pure_eps.
+
+  Args:
+    logq: Array of length num_queries of natural logarithms of the probability
+      of a non-optimal outcome.
+    pure_eps: eps parameter for DP
+    orders: array_like list of moments to compute.
+
+  Returns:
+    Array of upper bounds on rdp of shape [num_queries, num_orders].
+  """
+  logq = np.atleast_1d(logq).astype(float)
+  orders_vec = np.atleast_1d(orders).astype(float)
+  q = np.exp(logq)
+  log_t = np.full((len(logq), len(orders_vec)), np.inf)
+  small_q = q <= 1 / (math.exp(pure_eps) + 1)
+  if np.any(small_q):
+    logq_s = logq[small_q, np.newaxis]
+    log1q = np.log1p(-np.exp(logq_s))
+    logt_one = log1q + (log1q - _log1mexp_vec(pure_eps + logq_s)) * (
+        orders_vec - 1)
+    logt_two = logq_s + pure_eps * (orders_vec - 1)
+    log_t[small_q] = np.logaddexp(logt_one, logt_two)
+
+  return np.minimum(
+      np.minimum(0.5 * pure_eps * pure_eps * orders_vec,
+                 log_t / (orders_vec - 1)), pure_eps)
+
+
 def main(argv):
   del argv  # Unused.
 
@@ -119,6 +119,42 @@ class PateTest(unittest.TestCase):
     self._test_compute_eps_from_delta_value_error()
     self._test_compute_eps_from_delta_monotonicity()
 
+  def test_vectorized_matches_scalar(self):
+    # Array versions must agree with the per-query functions.
+    np.random.seed(0)
+    orders = np.array([1.1, 2.5, 10., 32., 250.])
+    votes = np.random.multinomial(
+        250, np.random.dirichlet(0.1 * np.ones(10)), size=50).astype(float)
+    votes[0] = [250] + [0] * 9  # Unanimous query.
+    for sigma in [5., 40., 150.]:
+      logq = pate.compute_logq_gaussian_vec(votes, sigma)
+      rdp = pate.rdp_gaussian_vec(logq, sigma, orders)
+      logpr = pate.compute_logpr_answered_vec(150, sigma, votes)
+      rdp_threshold = pate.compute_rdp_threshold_vec(logpr, sigma, orders)
+      logq_lap = pate.compute_logq_laplace_vec(votes, sigma)
+      rdp_lap = pate.rdp_pure_eps_vec(logq_lap, 2. / sigma, orders)
+      for i, v in enumerate(votes):
+        logq_i = pate.compute_logq_gaussian(v, sigma)
+        self.assertAlmostEqual(logq[i], logq_i)
+        np.testing.assert_allclose(
+            rdp[i], pate.rdp_gaussian(logq_i, sigma, orders))
+        logpr_i = pate.compute_logpr_answered(150, sigma, v)
+        self.assertAlmostEqual(logpr[i], logpr_i)
+        np.testing.assert_allclose(
+            rdp_threshold[i], pate.compute_rdp_threshold(logpr_i, sigma,
+                                                         orders))
+        logq_lap_i = pate.compute_logq_laplace(v, sigma)
+        self.assertAlmostEqual(logq_lap[i], logq_lap_i)
+        np.testing.assert_allclose(
+            rdp_lap[i], pate.rdp_pure_eps(logq_lap_i, 2. / sigma, orders))
+
+      rdp_cum = np.cumsum(rdp, axis=0)
+      eps, order_opt = pate.compute_eps_from_delta_vec(orders, rdp_cum, 1e-6)
+      for i in range(len(votes)):
+        eps_i, order_i = pate.compute_eps_from_delta(orders, rdp_cum[i], 1e-6)
+        self.assertAlmostEqual(eps[i], eps_i)
+        self.assertEqual(order_opt[i], order_i)
+
 
 if __name__ == "__main__":
   unittest.main()
@@ -24,7 +24,11 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import hashlib
 import math
+import os
+import tempfile
+
 from absl import app
 import numpy as np
 import scipy
@@ -233,6 +237,126 @@ def compute_local_sensitivity_bounds_gnmax(votes, num_teachers, sigma, order):
   return res
 
 
+class LocalSensitivityCache(object):
+  """A bounded on-disk cache of local sensitivity tables.
+
+  Tables are stored one per file, named by a hash of the key. When the number
+  of stored tables exceeds max_entries, the least recently used ones (by file
+  modification time) are removed.
+  """
+
+  def __init__(self, cache_dir, max_entries=100000):
+    self._cache_dir = os.path.expanduser(cache_dir)
+    self._max_entries = max_entries
+    if not os.path.isdir(self._cache_dir):
+      os.makedirs(self._cache_dir)
+    self._num_entries = len(self._list_entries())
+
+  def _list_entries(self):
+    return [
+        os.path.join(self._cache_dir, f)
+        for f in os.listdir(self._cache_dir)
+        if f.endswith(".npy")
+    ]
+
+  def _path(self, key):
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+    return os.path.join(self._cache_dir, digest + ".npy")
+
+  def get(self, key):
+    """Returns the table stored under key, or None if it is not cached."""
+    path = self._path(key)
+    try:
+      value = np.load(path)
+    except (IOError, ValueError):
+      return None
+    os.utime(path, None)  # Mark as recently used.
+    return value
+
+  def put(self, key, value):
+    """Stores a table under key, evicting old entries if the cache is full."""
+    path = self._path(key)
+    existed = os.path.exists(path)
+    # Write to a temporary file first so that readers never see partial files.
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self._cache_dir)
+    with os.fdopen(fd, "wb") as f:
+      np.save(f, value)
+    os.rename(tmp_path, path)
+    if not existed:
+      self._num_entries += 1
+    if self._num_entries > self._max_entries:
+      self._evict()
+
+  def _evict(self):
+    entries = sorted(self._list_entries(), key=os.path.getmtime)
+    # Leave some headroom to avoid evicting on every insertion.
+    num_to_keep = int(.9 * self._max_entries)
+    for path in entries[:max(0, len(entries) - num_to_keep)]:
+      try:
+        os.remove(path)
+      except OSError:
+        pass  # Removed concurrently.
+    self._num_entries = min(len(entries), num_to_keep)
+
+
+def _local_sensitivity_bounds_gnmax_worker(args):
+  return compute_local_sensitivity_bounds_gnmax(*args)
+
+
+def compute_local_sensitivity_bounds_gnmax_batch(votes, num_teachers, sigma,
+                                                 order, cache=None, pool=None):
+  """Computes max-LS-at-distance-d tables for many GNMax queries.
+
+  The table of a query depends only on its sorted vote profile. Queries with
+  the same profile are computed once, tables are looked up in and added to an
+  optional on-disk cache, and missing tables are computed in parallel when a
+  process pool is given.
+
+  Args:
+    votes: A numpy array of votes of shape [num_queries, num_classes].
+    num_teachers: Total number of voting teachers.
+    sigma: Standard deviation of the Guassian noise.
+    order: The Renyi order.
+    cache: An optional LocalSensitivityCache.
+    pool: An optional multiprocessing.Pool used to compute missing tables.
+
+  Returns:
+    A numpy array of shape [num_queries, num_teachers], where row i holds the
+    local sensitivities at distances d, 0 <= d < num_teachers, for query i.
+  """
+  votes = np.atleast_2d(votes)
+  profiles = -np.sort(-votes, axis=1)  # Non-increasing order.
+  unique_profiles, inverse = np.unique(
+      profiles, axis=0, return_inverse=True)
+  inverse = inverse.reshape(-1)
+
+  res = np.empty((unique_profiles.shape[0], num_teachers))
+  keys = [(sigma, order, num_teachers, tuple(p.tolist()))
+          for p in unique_profiles]
+  missing = []
+  for i, key in enumerate(keys):
+    table = cache.get(key) if cache is not None else None
+    if table is None:
+      missing.append(i)
+    else:
+      res[i] = table
+
+  if missing:
+    # Warms the module-level caches, which workers forked later will inherit.
+    _compute_logq1(sigma, order, votes.shape[1])
+    args = [(unique_profiles[i], num_teachers, sigma, order) for i in missing]
+    if pool is not None and len(missing) > 1:
+      tables = pool.map(_local_sensitivity_bounds_gnmax_worker, args)
+    else:
+      tables = [_local_sensitivity_bounds_gnmax_worker(a) for a in args]
+    for i, table in zip(missing, tables):
+      res[i] = table
+      if cache is not None:
+        cache.put(keys[i], table)
+
+  return res[inverse]
+
+
 ##################################################
 # SMOOTH SENSITIVITY FOR THE THRESHOLD MECHANISM #
 ##################################################
@@ -259,26 +383,44 @@ def _compute_rdp_list_threshold(num_teachers, threshold, sigma, order):
 def compute_local_sensitivity_bounds_threshold(counts, num_teachers, threshold,
                                                sigma, order):
   """Computes a list of max-LS-at-distance-d for the threshold mechanism."""
+  return compute_local_sensitivity_bounds_threshold_batch(
+      np.atleast_2d(counts), num_teachers, threshold, sigma, order)[0]
+
 
-  def _compute_ls(v):
-    ls_step_up, ls_step_down = None, None
-    if v > 0:
-      ls_step_down = abs(rdp_list[v - 1] - rdp_list[v])
-    if v < num_teachers:
-      ls_step_up = abs(rdp_list[v + 1] - rdp_list[v])
-    return max(ls_step_down, ls_step_up)  # Rely on max(x, None) = x.
+def compute_local_sensitivity_bounds_threshold_batch(counts, num_teachers,
+                                                     threshold, sigma, order):
+  """Computes max-LS-at-distance-d tables for many threshold queries.
+
+  Args:
+    counts: A numpy array of votes of shape [num_queries, num_classes].
+    num_teachers: Total number of voting teachers.
+    threshold: The cut-off threshold.
+    sigma: Standard deviation of the Gaussian noise.
+    order: The Renyi order.
 
-  cur_max = int(round(max(counts)))
+  Returns:
+    A numpy array of shape [num_queries, num_teachers], where row i holds the
+    local sensitivities at distances d, 0 <= d < num_teachers, for query i.
+  """
   rdp_list = _compute_rdp_list_threshold(num_teachers, threshold, sigma, order)
 
-  ls = np.zeros(num_teachers)
-  for d in range(max(cur_max, num_teachers - cur_max)):
-    ls_up, ls_down = None, None
-    if cur_max + d <= num_teachers:
-      ls_up = _compute_ls(cur_max + d)
-    if cur_max - d >= 0:
-      ls_down = _compute_ls(cur_max - d)
-    ls[d] = max(ls_up, ls_down)
+  # Local sensitivity at each possible value v of max(votes), taken over the
+  # steps to v - 1 and v + 1.
+  steps = np.abs(np.diff(rdp_list))
+  ls_at_v = np.maximum(np.concatenate(([-np.inf], steps)),
+                       np.concatenate((steps, [-np.inf])))
+
+  cur_max = np.round(np.max(np.atleast_2d(counts), axis=1)).astype(int)
+  cur_max = cur_max[:, np.newaxis]
+  d = np.arange(num_teachers)
+
+  def _lookup(v):
+    valid = np.logical_and(v >= 0, v <= num_teachers)
+    return np.where(valid, ls_at_v[np.clip(v, 0, num_teachers)], -np.inf)
+
+  ls = np.maximum(_lookup(cur_max + d), _lookup(cur_max - d))
+  ls[d >= np.maximum(cur_max, num_teachers - cur_max)] = 0.
+  ls[np.isneginf(ls)] = 0.
   return ls
 
 
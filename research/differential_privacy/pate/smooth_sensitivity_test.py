@@ -19,6 +19,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import shutil
+import tempfile
 import unittest
 import numpy as np
 
@@ -121,6 +123,26 @@ class PateSmoothSensitivityTest(unittest.TestCase):
     ] + [0] * 6 + [0.000536304908, 0.0172181073, 0.041909870] + [0] * 10)
     self._assert_all_close(out4, answer4)
 
+  def test_compute_local_sensitivity_bounds_gnmax_batch(self):
+    np.random.seed(0)
+    num_teachers = 50
+    votes = np.random.multinomial(
+        num_teachers, np.random.dirichlet(0.3 * np.ones(4)), size=10)
+    votes = np.vstack((votes, votes[:, ::-1]))  # Same profiles, permuted.
+
+    cache_dir = tempfile.mkdtemp()
+    try:
+      cache = pate_ss.LocalSensitivityCache(cache_dir, max_entries=5)
+      for _ in range(2):  # The second pass reads from the cache.
+        out = pate_ss.compute_local_sensitivity_bounds_gnmax_batch(
+            votes, num_teachers, 5., 10., cache=cache)
+        for v, ls in zip(votes, out):
+          self._assert_all_close(
+              ls, pate_ss.compute_local_sensitivity_bounds_gnmax(
+                  v, num_teachers, 5., 10.))
+    finally:
+      shutil.rmtree(cache_dir)
+
 
 if __name__ == "__main__":
   unittest.main()
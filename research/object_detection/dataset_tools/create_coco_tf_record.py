@@ -31,11 +31,11 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import functools
 import hashlib
 import io
 import json
 import os
-import contextlib2
 import numpy as np
 import PIL.Image
 
@@ -64,6 +64,8 @@ tf.flags.DEFINE_string('val_annotations_file', '',
 tf.flags.DEFINE_string('testdev_annotations_file', '',
                        'Test-dev annotations JSON file.')
 tf.flags.DEFINE_string('output_dir', '/tmp/', 'Output data directory.')
+tf.flags.DEFINE_integer('num_workers', 1,
+                        'Number of processes converting images in parallel.')
 
 FLAGS = flags.FLAGS
 
@@ -191,8 +193,17 @@ def create_tf_example(image,
   return key, example, num_annotations_skipped
 
 
+def _create_tf_example_from_item(item, image_dir, category_index,
+                                 include_masks):
+  image, annotations_list = item
+  _, tf_example, num_annotations_skipped = create_tf_example(
+      image, annotations_list, image_dir, category_index, include_masks)
+  return tf_example, num_annotations_skipped
+
+
 def _create_tf_record_from_coco_annotations(
-    annotations_file, image_dir, output_path, include_masks, num_shards):
+    annotations_file, image_dir, output_path, include_masks, num_shards,
+    num_workers=1):
   """Loads COCO annotation json files and converts to tf.Record format.
 
   Args:
@@ -202,46 +213,44 @@ def _create_tf_record_from_coco_annotations(
     include_masks: Whether to include instance segmentations masks
       (PNG encoded) in the result. default: False.
     num_shards: number of output file shards.
+    num_workers: number of processes converting images in parallel.
   """
-  with contextlib2.ExitStack() as tf_record_close_stack, \
-      tf.gfile.GFile(annotations_file, 'r') as fid:
-    output_tfrecords = tf_record_creation_util.open_sharded_output_tfrecords(
-        tf_record_close_stack, output_path, num_shards)
+  with tf.gfile.GFile(annotations_file, 'r') as fid:
     groundtruth_data = json.load(fid)
-    images = groundtruth_data['images']
-    category_index = label_map_util.create_category_index(
-        groundtruth_data['categories'])
+  images = groundtruth_data['images']
+  category_index = label_map_util.create_category_index(
+      groundtruth_data['categories'])
 
-    annotations_index = {}
-    if 'annotations' in groundtruth_data:
-      tf.logging.info(
-          'Found groundtruth annotations. Building annotations index.')
-      for annotation in groundtruth_data['annotations']:
-        image_id = annotation['image_id']
-        if image_id not in annotations_index:
-          annotations_index[image_id] = []
-        annotations_index[image_id].append(annotation)
-    missing_annotation_count = 0
-    for image in images:
-      image_id = image['id']
+  annotations_index = {}
+  if 'annotations' in groundtruth_data:
+    tf.logging.info(
+        'Found groundtruth annotations. Building annotations index.')
+    for annotation in groundtruth_data['annotations']:
+      image_id = annotation['image_id']
       if image_id not in annotations_index:
-        missing_annotation_count += 1
         annotations_index[image_id] = []
-    tf.logging.info('%d images are missing annotations.',
-                    missing_annotation_count)
+      annotations_index[image_id].append(annotation)
+  del groundtruth_data
+  missing_annotation_count = 0
+  for image in images:
+    image_id = image['id']
+    if image_id not in annotations_index:
+      missing_annotation_count += 1
+      annotations_index[image_id] = []
+  tf.logging.info('%d images are missing annotations.',
+                  missing_annotation_count)
 
-    total_num_annotations_skipped = 0
-    for idx, image in enumerate(images):
-      if idx % 100 == 0:
-        tf.logging.info('On image %d of %d', idx, len(images))
-      annotations_list = annotations_index[image['id']]
-      _, tf_example, num_annotations_skipped = create_tf_example(
-          image, annotations_list, image_dir, category_index, include_masks)
-      total_num_annotations_skipped += num_annotations_skipped
-      shard_idx = idx % num_shards
-      output_tfrecords[shard_idx].write(tf_example.SerializeToString())
-    tf.logging.info('Finished writing, skipped %d annotations.',
-                    total_num_annotations_skipped)
+  items = [(image, annotations_index.pop(image['id'])) for image in images]
+  total_num_annotations_skipped = (
+      tf_record_creation_util.write_sharded_tfrecords(
+          items,
+          functools.partial(_create_tf_example_from_item,
+                            image_dir=image_dir,
+                            category_index=category_index,
+                            include_masks=include_masks),
+          output_path, num_shards, num_workers=num_workers, log_every_n=100))
+  tf.logging.info('Finished writing, skipped %d annotations.',
+                  total_num_annotations_skipped)
 
 
 def main(_):
@@ -263,19 +272,22 @@ def main(_):
       FLAGS.train_image_dir,
       train_output_path,
       FLAGS.include_masks,
-      num_shards=100)
+      num_shards=100,
+      num_workers=FLAGS.num_workers)
   _create_tf_record_from_coco_annotations(
       FLAGS.val_annotations_file,
       FLAGS.val_image_dir,
       val_output_path,
       FLAGS.include_masks,
-      num_shards=10)
+      num_shards=10,
+      num_workers=FLAGS.num_workers)
   _create_tf_record_from_coco_annotations(
       FLAGS.testdev_annotations_file,
       FLAGS.test_image_dir,
       testdev_output_path,
       FLAGS.include_masks,
-      num_shards=100)
+      num_shards=100,
+      num_workers=FLAGS.num_workers)
 
 
 if __name__ == '__main__':
@@ -36,9 +36,9 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import functools
 import os
 
-import contextlib2
 import pandas as pd
 import tensorflow as tf
 
@@ -59,10 +59,29 @@ tf.flags.DEFINE_string(
     'Path to the output TFRecord. The shard index and the number of shards '
     'will be appended for each output shard.')
 tf.flags.DEFINE_integer('num_shards', 100, 'Number of TFRecord shards')
+tf.flags.DEFINE_integer('num_workers', 1,
+                        'Number of processes converting images in parallel.')
 
 FLAGS = tf.flags.FLAGS
 
 
+def _create_tf_example(image_data, annotations, label_map, images_directory):
+  image_id, rows = image_data
+  image_annotations = annotations.iloc[rows]
+  # In OID image file names are formed by appending ".jpg" to the image ID.
+  image_path = os.path.join(images_directory, image_id + '.jpg')
+  with tf.gfile.Open(image_path) as image_file:
+    encoded_image = image_file.read()
+
+  tf_example = oid_tfrecord_creation.tf_example_from_annotations_data_frame(
+      image_annotations, label_map, encoded_image)
+  return tf_example, 0
+
+
+def _image_id_shard(num_shards, unused_idx, image_data):
+  return int(image_data[0], 16) % num_shards
+
+
 def main(_):
   tf.logging.set_verbosity(tf.logging.INFO)
 
@@ -91,26 +110,17 @@ def main(_):
 
   tf.logging.log(tf.logging.INFO, 'Found %d images...', len(all_image_ids))
 
-  with contextlib2.ExitStack() as tf_record_close_stack:
-    output_tfrecords = tf_record_creation_util.open_sharded_output_tfrecords(
-        tf_record_close_stack, FLAGS.output_tf_record_path_prefix,
-        FLAGS.num_shards)
-
-    for counter, image_data in enumerate(all_annotations.groupby('ImageID')):
-      tf.logging.log_every_n(tf.logging.INFO, 'Processed %d images...', 1000,
-                             counter)
-
-      image_id, image_annotations = image_data
-      # In OID image file names are formed by appending ".jpg" to the image ID.
-      image_path = os.path.join(FLAGS.input_images_directory, image_id + '.jpg')
-      with tf.gfile.Open(image_path) as image_file:
-        encoded_image = image_file.read()
-
-      tf_example = oid_tfrecord_creation.tf_example_from_annotations_data_frame(
-          image_annotations, label_map, encoded_image)
-      if tf_example:
-        shard_idx = int(image_id, 16) % FLAGS.num_shards
-        output_tfrecords[shard_idx].write(tf_example.SerializeToString())
+  # The workers get the row positions of the annotations of every image and
+  # slice them, so that the per-image DataFrames are not all built upfront.
+  image_rows = sorted(all_annotations.groupby('ImageID').indices.items())
+  tf_record_creation_util.write_sharded_tfrecords(
+      image_rows,
+      functools.partial(_create_tf_example, annotations=all_annotations,
+                        label_map=label_map,
+                        images_directory=FLAGS.input_images_directory),
+      FLAGS.output_tf_record_path_prefix, FLAGS.num_shards,
+      shard_fn=functools.partial(_image_id_shard, FLAGS.num_shards),
+      num_workers=FLAGS.num_workers)
 
 
 if __name__ == '__main__':
@@ -20,11 +20,16 @@ Example usage:
         --data_dir=/home/user/VOCdevkit \
         --year=VOC2012 \
         --output_path=/home/user/pascal.record
+
+With --num_shards > 1 the output is split into shards named
+<output_path>-<shard>-of-<num_shards>, which --num_workers processes write in
+parallel.
 """
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import functools
 import hashlib
 import io
 import logging
@@ -34,6 +39,7 @@ from lxml import etree
 import PIL.Image
 import tensorflow as tf
 
+from object_detection.dataset_tools import tf_record_creation_util
 from object_detection.utils import dataset_util
 from object_detection.utils import label_map_util
 
@@ -50,6 +56,9 @@ flags.DEFINE_string('label_map_path', 'data/pascal_label_map.pbtxt',
                     'Path to label map proto')
 flags.DEFINE_boolean('ignore_difficult_instances', False, 'Whether to ignore '
                      'difficult instances')
+flags.DEFINE_integer('num_shards', 1, 'Number of output TFRecord shards.')
+flags.DEFINE_integer('num_workers', 1, 'Number of processes converting images '
+                     'in parallel. At most one per shard is used.')
 FLAGS = flags.FLAGS
 
 SETS = ['train', 'val', 'trainval', 'test']
@@ -144,6 +153,19 @@ def dict_to_tf_example(data,
   return example
 
 
+def _annotation_file_to_tf_example(path, dataset_directory, label_map_dict,
+                                   ignore_difficult_instances):
+  """Reads a PASCAL XML annotation file and converts it to a tf.Example."""
+  with tf.gfile.GFile(path, 'r') as fid:
+    xml_str = fid.read()
+  xml = etree.fromstring(xml_str)
+  data = dataset_util.recursive_parse_xml_to_dict(xml)['annotation']
+
+  tf_example = dict_to_tf_example(data, dataset_directory, label_map_dict,
+                                  ignore_difficult_instances)
+  return tf_example, 0
+
+
 def main(_):
   if FLAGS.set not in SETS:
     raise ValueError('set must be in : {}'.format(SETS))
@@ -155,28 +177,35 @@ def main(_):
   if FLAGS.year != 'merged':
     years = [FLAGS.year]
 
-  writer = tf.python_io.TFRecordWriter(FLAGS.output_path)
-
   label_map_dict = label_map_util.get_label_map_dict(FLAGS.label_map_path)
 
+  annotation_paths = []
   for year in years:
     logging.info('Reading from PASCAL %s dataset.', year)
     examples_path = os.path.join(data_dir, year, 'ImageSets', 'Main',
                                  'aeroplane_' + FLAGS.set + '.txt')
     annotations_dir = os.path.join(data_dir, year, FLAGS.annotations_dir)
     examples_list = dataset_util.read_examples_list(examples_path)
-    for idx, example in enumerate(examples_list):
-      if idx % 100 == 0:
-        logging.info('On image %d of %d', idx, len(examples_list))
-      path = os.path.join(annotations_dir, example + '.xml')
-      with tf.gfile.GFile(path, 'r') as fid:
-        xml_str = fid.read()
-      xml = etree.fromstring(xml_str)
-      data = dataset_util.recursive_parse_xml_to_dict(xml)['annotation']
-
-      tf_example = dict_to_tf_example(data, FLAGS.data_dir, label_map_dict,
-                                      FLAGS.ignore_difficult_instances)
-      writer.write(tf_example.SerializeToString())
+    annotation_paths.extend(
+        os.path.join(annotations_dir, example + '.xml')
+        for example in examples_list)
+
+  make_example_fn = functools.partial(
+      _annotation_file_to_tf_example, dataset_directory=FLAGS.data_dir,
+      label_map_dict=label_map_dict,
+      ignore_difficult_instances=FLAGS.ignore_difficult_instances)
+  if FLAGS.num_shards > 1:
+    tf_record_creation_util.write_sharded_tfrecords(
+        annotation_paths, make_example_fn, FLAGS.output_path, FLAGS.num_shards,
+        num_workers=FLAGS.num_workers, log_every_n=100)
+    return
+
+  writer = tf.python_io.TFRecordWriter(FLAGS.output_path)
+  for idx, path in enumerate(annotation_paths):
+    if idx % 100 == 0:
+      logging.info('On image %d of %d', idx, len(annotation_paths))
+    tf_example, _ = make_example_fn(path)
+    writer.write(tf_example.SerializeToString())
 
   writer.close()
 
@@ -21,13 +21,27 @@ oid_hierarchical_labels_expansion.py \
 --input_annotations=<input csv file> \
 --output_annotations=<output csv file> \
 --annotation_type=<1 (for boxes) or 2 (for image-level labels)>
+
+The input CSV is streamed in chunks of --chunk_size rows, and every chunk is
+expanded with the precomputed ancestor/descendant lists of all classes. Rows
+are copied verbatim apart from the label. Annotations that are already loaded in
+pandas can be expanded without per-row Python code with
+OIDHierarchicalLabelsExpansion.expand_boxes_dataframe and
+expand_labels_dataframe.
 """
 
 from __future__ import print_function
 
 import argparse
+import itertools
 import json
 
+import numpy as np
+import pandas as pd
+
+_LABEL_COLUMN = 'LabelName'
+_CONFIDENCE_COLUMN = 'Confidence'
+
 
 def _update_dict(initial_dict, update):
   """Updates dictionary with update content.
@@ -37,7 +51,7 @@ def _update_dict(initial_dict, update):
    update: updated dictionary.
   """
 
-  for key, value_list in update.iteritems():
+  for key, value_list in update.items():
     if key in initial_dict:
       initial_dict[key].extend(value_list)
     else:
@@ -72,13 +86,58 @@ def _build_plain_hierarchy(hierarchy, skip_root=False):
   if not skip_root:
     all_keyed_parent[hierarchy['LabelName']] = all_children
     all_children = [hierarchy['LabelName']] + all_children
-    for child, _ in all_keyed_child.iteritems():
+    for child in all_keyed_child:
       all_keyed_child[child].append(hierarchy['LabelName'])
     all_keyed_child[hierarchy['LabelName']] = []
 
   return all_keyed_parent, all_keyed_child, all_children
 
 
+def _build_expansion_csr(class_names, keyed_relatives):
+  """Builds the expansion lists of all classes in CSR form.
+
+  Args:
+    class_names: list of class names, defining the class indices.
+    keyed_relatives: dictionary from class name to the list of related class
+      names (parents or children) that an annotation expands to.
+
+  Returns:
+    indptr: int64 array of shape [num_classes + 1].
+    indices: int64 array; indices[indptr[i]:indptr[i + 1]] are class i itself
+      followed by its related classes, in the order of keyed_relatives.
+  """
+  name_to_index = {name: index for index, name in enumerate(class_names)}
+  lengths = np.zeros(len(class_names) + 1, dtype=np.int64)
+  indices = []
+  for index, name in enumerate(class_names):
+    relatives = keyed_relatives.get(name, [])
+    lengths[index + 1] = 1 + len(relatives)
+    indices.append(index)
+    indices.extend(name_to_index[relative] for relative in relatives)
+  return np.cumsum(lengths), np.array(indices, dtype=np.int64)
+
+
+def _expand_rows(codes, indptr, indices):
+  """Expands every row to the classes of its CSR row.
+
+  Args:
+    codes: int array of shape [num_rows] with a CSR row index per input row.
+    indptr: CSR row pointers.
+    indices: CSR column indices.
+
+  Returns:
+    row_index: index of the input row of every output row.
+    class_index: class index of every output row.
+  """
+  starts = indptr[codes]
+  counts = indptr[codes + 1] - starts
+  row_index = np.repeat(np.arange(len(codes)), counts)
+  # Position of every output row within its expansion list.
+  output_starts = np.cumsum(counts) - counts
+  offsets = np.arange(counts.sum()) - np.repeat(output_starts, counts)
+  return row_index, indices[np.repeat(starts, counts) + offsets]
+
+
 class OIDHierarchicalLabelsExpansion(object):
   """ Main class to perform labels hierachical expansion."""
 
@@ -92,6 +151,109 @@ class OIDHierarchicalLabelsExpansion(object):
     self._hierarchy_keyed_parent, self._hierarchy_keyed_child, _ = (
         _build_plain_hierarchy(hierarchy, skip_root=True))
 
+    # Class names are indexed once, and the expansion of every class (itself,
+    # then its parents or its children) is kept as a CSR matrix, so that whole
+    # columns of labels can be expanded with numpy indexing.
+    self._class_names = sorted(
+        set(self._hierarchy_keyed_child) | set(self._hierarchy_keyed_parent))
+    self._class_index = pd.Index(self._class_names)
+    self._num_classes = len(self._class_names)
+    up_indptr, up_indices = _build_expansion_csr(self._class_names,
+                                                 self._hierarchy_keyed_child)
+    down_indptr, down_indices = _build_expansion_csr(
+        self._class_names, self._hierarchy_keyed_parent)
+    # Rows [0, num_classes) expand to ancestors, rows [num_classes,
+    # 2 * num_classes) to descendants.
+    self._indptr = np.concatenate([up_indptr, down_indptr[1:] + up_indptr[-1]])
+    self._indices = np.concatenate([up_indices, down_indices])
+    self._class_names = np.array(self._class_names, dtype=object)
+    # The same lists keyed by name, for expanding CSV text line by line.
+    self._expansions = [{
+        name: list(self._class_names[self._indices[
+            self._indptr[offset + i]:self._indptr[offset + i + 1]]])
+        for i, name in enumerate(self._class_names)
+    } for offset in (0, self._num_classes)]
+
+  def expand_csv_lines(self, lines, labels_file=False):
+    """Expands CSV lines of boxes or image-level labels.
+
+    Equivalent to concatenating expand_boxes_from_csv (or
+    expand_labels_from_csv) of every line, but each line is split only once.
+
+    Args:
+      lines: iterable of CSV lines (without the header), with the label name in
+        the third column and, for image-level labels, the confidence in the
+        fourth.
+      labels_file: whether the lines are image-level labels instead of boxes.
+
+    Returns:
+      A string with the expanded lines.
+    """
+    up, down = self._expansions
+    result = []
+    for line in lines:
+      image_id, source, label, tail = line.split(',', 3)
+      if labels_file and int(tail) != 1:
+        expansion = down[label]
+      else:
+        expansion = up[label]
+      head = image_id + ',' + source + ','
+      tail = ',' + tail
+      result.append(head + (tail + head).join(expansion) + tail)
+    return ''.join(result)
+
+  def _label_codes(self, labels):
+    """Returns the class indices of a column of label names."""
+    codes = self._class_index.get_indexer(labels)
+    if np.any(codes < 0):
+      unknown = np.unique(np.asarray(labels)[codes < 0])
+      raise ValueError('Labels not in the hierarchy: {}'.format(
+          ', '.join(str(label) for label in unknown[:10])))
+    return codes
+
+  def _expand_dataframe(self, data, codes):
+    row_index, class_index = _expand_rows(codes, self._indptr, self._indices)
+    result = data.iloc[row_index].reset_index(drop=True)
+    result[_LABEL_COLUMN] = self._class_names[class_index]
+    return result
+
+  def expand_boxes_dataframe(self, data):
+    """Expands all bounding boxes of a DataFrame at once.
+
+    Equivalent to expand_boxes_from_csv applied to every row: each box is
+    followed by copies of it labeled with every ancestor of its class.
+
+    Args:
+      data: pandas DataFrame with Open Images box annotations.
+
+    Returns:
+      The expanded DataFrame, with a new RangeIndex.
+
+    Raises:
+      ValueError: if a label is not in the hierarchy.
+    """
+    return self._expand_dataframe(data, self._label_codes(data[_LABEL_COLUMN]))
+
+  def expand_labels_dataframe(self, data):
+    """Expands all image-level labels of a DataFrame at once.
+
+    Equivalent to expand_labels_from_csv applied to every row: positive labels
+    are followed by their ancestors, negative labels by their descendants.
+
+    Args:
+      data: pandas DataFrame with Open Images image-level label annotations.
+
+    Returns:
+      The expanded DataFrame, with a new RangeIndex.
+
+    Raises:
+      ValueError: if a label is not in the hierarchy.
+    """
+    codes = self._label_codes(data[_LABEL_COLUMN])
+    negative = data[_CONFIDENCE_COLUMN].astype(int).values != 1
+    codes[negative] += self._num_classes
+    return self._expand_dataframe(data, codes)
+
   def expand_boxes_from_csv(self, csv_row):
     """Expands a row containing bounding boxes from CSV file.
 
@@ -160,17 +322,12 @@ def main(parsed_args):
     return -1
   with open(parsed_args.input_annotations, 'r') as source:
     with open(parsed_args.output_annotations, 'w') as target:
-      header = None
-      for line in source:
-        if not header:
-          header = line
-          target.writelines(header)
-          continue
-        if labels_file:
-          expanded_lines = expansion_generator.expand_labels_from_csv(line)
-        else:
-          expanded_lines = expansion_generator.expand_boxes_from_csv(line)
-        target.writelines(expanded_lines)
+      target.write(source.readline())
+      while True:
+        lines = list(itertools.islice(source, parsed_args.chunk_size))
+        if not lines:
+          break
+        target.write(expansion_generator.expand_csv_lines(lines, labels_file))
 
 
 if __name__ == '__main__':
@@ -197,5 +354,11 @@ if __name__ == '__main__':
       help="""Type of the input annotations: 1 - boxes, 2 - image-level
       labels"""
   )
+  parser.add_argument(
+      '--chunk_size',
+      type=int,
+      default=1000000,
+      help="""Number of input rows expanded at once; bounds the memory
+      use.""")
   args = parser.parse_args()
   main(args)
@@ -18,6 +18,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import pandas as pd
 import tensorflow as tf
 
 from object_detection.dataset_tools import oid_hierarchical_labels_expansion
@@ -84,5 +85,44 @@ class HierarchicalLabelsExpansionTest(tf.test.TestCase):
         '124,verification,c,1'
     ], all_result_rows)
 
+  def test_dataframe_expansion_matches_row_expansion(self):
+    hierarchy, bbox_rows, label_rows = create_test_data()
+    expansion_generator = (
+        oid_hierarchical_labels_expansion.OIDHierarchicalLabelsExpansion(
+            hierarchy))
+    bbox_columns = ['ImageID', 'Source', 'LabelName', 'Confidence', 'XMin',
+                    'XMax', 'YMin', 'YMax', 'IsOccluded', 'IsTruncated',
+                    'IsGroupOf', 'IsDepiction', 'IsInside']
+    label_columns = ['ImageID', 'Source', 'LabelName', 'Confidence']
+    for rows, columns, expand_row, expand_dataframe in [
+        (bbox_rows, bbox_columns, expansion_generator.expand_boxes_from_csv,
+         expansion_generator.expand_boxes_dataframe),
+        (label_rows, label_columns, expansion_generator.expand_labels_from_csv,
+         expansion_generator.expand_labels_dataframe)]:
+      expected_rows = []
+      for row in rows:
+        expected_rows.extend(expand_row(row))
+      data = pd.DataFrame([row.split(',') for row in rows], columns=columns)
+      result = expand_dataframe(data)
+      self.assertEqual(expected_rows,
+                       [','.join(row) for row in result.values.tolist()])
+      self.assertEqual(
+          ''.join(row + '\n' for row in expected_rows),
+          expansion_generator.expand_csv_lines(
+              [row + '\n' for row in rows],
+              labels_file=(columns == label_columns)))
+
+  def test_dataframe_expansion_rejects_unknown_labels(self):
+    hierarchy, _, _ = create_test_data()
+    expansion_generator = (
+        oid_hierarchical_labels_expansion.OIDHierarchicalLabelsExpansion(
+            hierarchy))
+    data = pd.DataFrame([['123', 'verification', 'z', '1']],
+                        columns=['ImageID', 'Source', 'LabelName',
+                                 'Confidence'])
+    with self.assertRaises(ValueError):
+      expansion_generator.expand_labels_dataframe(data)
+
+
 if __name__ == '__main__':
   tf.test.main()
@@ -18,9 +18,17 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import multiprocessing
+import time
+
+from six.moves import queue
 import tensorflow as tf
 
 
+def _shard_path(base_path, shard_idx, num_shards):
+  return '{}-{:05d}-of-{:05d}'.format(base_path, shard_idx, num_shards)
+
+
 def open_sharded_output_tfrecords(exit_stack, base_path, num_shards):
   """Opens all TFRecord shards for writing and adds them to an exit stack.
 
@@ -34,8 +42,7 @@ def open_sharded_output_tfrecords(exit_stack, base_path, num_shards):
     The list of opened TFRecords. Position k in the list corresponds to shard k.
   """
   tf_record_output_filenames = [
-      '{}-{:05d}-of-{:05d}'.format(base_path, idx, num_shards)
-      for idx in range(num_shards)
+      _shard_path(base_path, idx, num_shards) for idx in range(num_shards)
   ]
 
   tfrecords = [
@@ -44,3 +51,147 @@ def open_sharded_output_tfrecords(exit_stack, base_path, num_shards):
   ]
 
   return tfrecords
+
+
+class _ThroughputLogger(object):
+  """Logs the number of converted items and the conversion rate."""
+
+  def __init__(self, num_items, log_every_n):
+    self._num_items = num_items
+    self._log_every_n = log_every_n
+    self._next_log = log_every_n
+    self._count = 0
+    self._start_time = time.time()
+
+  def add(self, count):
+    self._count += count
+    if self._count >= self._next_log:
+      self._next_log += self._log_every_n
+      tf.logging.info('Converted %d of %d items (%.1f items/sec)', self._count,
+                      self._num_items,
+                      self._count / (time.time() - self._start_time))
+
+
+def _write_shards(shard_indices, shard_items, make_example_fn, base_path,
+                  num_shards, progress):
+  """Converts the items of the given shards and writes each shard in order.
+
+  Args:
+    shard_indices: Indices of the shards to write.
+    shard_items: List with the items of each shard in shard_indices.
+    make_example_fn: See write_sharded_tfrecords.
+    base_path: The base path for all shards.
+    num_shards: The total number of shards.
+    progress: A multiprocessing.Queue the number of converted items is put on,
+      or a _ThroughputLogger.
+
+  Returns:
+    The sum of the skip counts returned by make_example_fn.
+  """
+  report = progress.put if hasattr(progress, 'put') else progress.add
+  num_skipped = 0
+  pending_count = 0
+  for shard_idx, items in zip(shard_indices, shard_items):
+    with tf.python_io.TFRecordWriter(
+        _shard_path(base_path, shard_idx, num_shards)) as writer:
+      for item in items:
+        tf_example, item_num_skipped = make_example_fn(item)
+        num_skipped += item_num_skipped
+        if tf_example is not None:
+          writer.write(tf_example.SerializeToString())
+        pending_count += 1
+        if pending_count == 100:
+          report(pending_count)
+          pending_count = 0
+  if pending_count:
+    report(pending_count)
+  return num_skipped
+
+
+def _write_shards_worker(shard_indices, shard_items, make_example_fn,
+                         base_path, num_shards, progress_queue):
+  num_skipped = None
+  try:
+    num_skipped = _write_shards(shard_indices, shard_items, make_example_fn,
+                                base_path, num_shards, progress_queue)
+  finally:
+    # Tells the parent this worker is done; None means it failed.
+    progress_queue.put(('done', num_skipped))
+
+
+def write_sharded_tfrecords(items, make_example_fn, base_path, num_shards,
+                            shard_fn=None, num_workers=1, log_every_n=1000):
+  """Converts items to TF examples and writes them to sharded TFRecords.
+
+  With num_workers > 1, the conversion runs in that many processes. Each
+  process owns a subset of the output shards and is the only one writing to
+  them, so the output is the same as with a single process: every shard holds
+  its items in the order they appear in `items`.
+
+  Args:
+    items: A list of inputs, one per example, e.g. an image with its
+      annotations. The items are handed to the worker processes, so this
+      should hold only what is needed to create the examples.
+    make_example_fn: A function mapping an item to a tuple (tf_example,
+      num_skipped), where tf_example is None if nothing should be written for
+      the item and num_skipped is a count to report, e.g. of skipped
+      annotations. Must be picklable if processes are not forked.
+    base_path: The base path for all shards.
+    num_shards: The number of shards.
+    shard_fn: Optional function mapping (item index, item) to its shard
+      index. Items are assigned to shards round robin by default.
+    num_workers: The number of worker processes.
+    log_every_n: How often to log progress and throughput, in items.
+
+  Returns:
+    The sum of the num_skipped counts returned by make_example_fn.
+
+  Raises:
+    RuntimeError: if a worker process failed.
+  """
+  items_by_shard = [[] for _ in range(num_shards)]
+  for idx, item in enumerate(items):
+    shard_idx = shard_fn(idx, item) if shard_fn else idx % num_shards
+    items_by_shard[shard_idx].append(item)
+
+  progress = _ThroughputLogger(len(items), log_every_n)
+  num_workers = max(1, min(num_workers, num_shards))
+  if num_workers == 1:
+    return _write_shards(range(num_shards), items_by_shard, make_example_fn,
+                         base_path, num_shards, progress)
+
+  progress_queue = multiprocessing.Queue()
+  workers = []
+  for worker_idx in range(num_workers):
+    shard_indices = range(worker_idx, num_shards, num_workers)
+    worker = multiprocessing.Process(
+        target=_write_shards_worker,
+        args=(shard_indices, [items_by_shard[i] for i in shard_indices],
+              make_example_fn, base_path, num_shards, progress_queue))
+    worker.start()
+    workers.append(worker)
+
+  num_skipped = 0
+  num_running = num_workers
+  failed = False
+  while num_running:
+    try:
+      message = progress_queue.get(timeout=10)
+    except queue.Empty:
+      if not any(worker.is_alive() for worker in workers):
+        failed = True  # A worker was killed before it could report.
+        break
+      continue
+    if isinstance(message, tuple):
+      num_running -= 1
+      if message[1] is None:
+        failed = True
+      else:
+        num_skipped += message[1]
+    else:
+      progress.add(message)
+  for worker in workers:
+    worker.join()
+  if failed or any(worker.exitcode for worker in workers):
+    raise RuntimeError('A TFRecord conversion worker failed.')
+  return num_skipped
@@ -21,6 +21,14 @@ import tensorflow as tf
 from object_detection.dataset_tools import tf_record_creation_util
 
 
+def _make_example(item):
+  if item % 5 == 0:
+    return None, 1
+  return tf.train.Example(features=tf.train.Features(feature={
+      'item': tf.train.Feature(int64_list=tf.train.Int64List(value=[item]))
+  })), 0
+
+
 class OpenOutputTfrecordsTests(tf.test.TestCase):
 
   def test_sharded_tfrecord_writes(self):
@@ -38,5 +46,30 @@ class OpenOutputTfrecordsTests(tf.test.TestCase):
       self.assertAllEqual(records, ['test_{}'.format(idx)])
 
 
+class WriteShardedTfrecordsTests(tf.test.TestCase):
+
+  def _read_items(self, base_path, num_shards):
+    shards = []
+    for idx in range(num_shards):
+      tf_record_path = '{}-{:05d}-of-{:05d}'.format(base_path, idx, num_shards)
+      shard = []
+      for record in tf.python_io.tf_record_iterator(tf_record_path):
+        example = tf.train.Example.FromString(record)
+        shard.append(example.features.feature['item'].int64_list.value[0])
+      shards.append(shard)
+    return shards
+
+  def test_parallel_matches_serial(self):
+    base_path = os.path.join(tf.test.get_temp_dir(), 'test_sharded.tfrec')
+    items = list(range(50))
+    for num_workers in [1, 3]:
+      num_skipped = tf_record_creation_util.write_sharded_tfrecords(
+          items, _make_example, base_path, 4, num_workers=num_workers)
+      self.assertEqual(num_skipped, 10)
+      self.assertAllEqual(
+          self._read_items(base_path, 4),
+          [[i for i in items[shard::4] if i % 5] for shard in range(4)])
+
+
 if __name__ == '__main__':
   tf.test.main()
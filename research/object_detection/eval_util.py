@@ -78,7 +78,8 @@ def visualize_detection_results(result_dict,
                                 max_num_predictions=20,
                                 skip_scores=False,
                                 skip_labels=False,
-                                keep_image_id_for_visualization_export=False):
+                                keep_image_id_for_visualization_export=False,
+                                use_numpy_renderer=False):
   """Visualizes detection results and writes visualizations to image summaries.
 
   This function visualizes an image with its detected bounding boxes and writes
@@ -124,6 +125,9 @@ def visualize_detection_results(result_dict,
     skip_labels: whether to skip label when drawing a single detection
     keep_image_id_for_visualization_export: whether to keep image identifier in
       filename when exported to export_dir
+    use_numpy_renderer: whether to draw with the numpy renderer of
+      visualization_utils, which is much faster than drawing through PIL but
+      not pixel-identical to it.
   Raises:
     ValueError: if result_dict does not contain the expected keys (i.e.,
       'original_image', 'detection_boxes', 'detection_scores',
@@ -168,7 +172,8 @@ def visualize_detection_results(result_dict,
         keypoints=groundtruth_keypoints,
         use_normalized_coordinates=False,
         max_boxes_to_draw=None,
-        groundtruth_box_visualization_color=groundtruth_box_visualization_color)
+        groundtruth_box_visualization_color=groundtruth_box_visualization_color,
+        use_numpy_renderer=use_numpy_renderer)
   vis_utils.visualize_boxes_and_labels_on_image_array(
       image,
       detection_boxes,
@@ -183,7 +188,8 @@ def visualize_detection_results(result_dict,
       min_score_thresh=min_score_thresh,
       agnostic_mode=agnostic_mode,
       skip_scores=skip_scores,
-      skip_labels=skip_labels)
+      skip_labels=skip_labels,
+      use_numpy_renderer=use_numpy_renderer)
 
   if export_dir:
     if keep_image_id_for_visualization_export and result_dict[fields.
@@ -209,6 +215,36 @@ def visualize_detection_results(result_dict,
                   tag)
 
 
+def _visualize_detection_results_or_log(*args, **kwargs):
+  try:
+    visualize_detection_results(*args, **kwargs)
+  except Exception as e:  # pylint: disable=broad-except
+    tf.logging.error('Failed to visualize detection results: %s', e)
+
+
+def visualize_detection_results_async(pool, result_dict, tag, global_step,
+                                      **kwargs):
+  """Runs visualize_detection_results on a thread pool.
+
+  Rendering and PNG encoding mostly release the GIL, so moving them off the
+  evaluation loop lets the next batch run while visualizations are drawn.
+  Errors are logged instead of raised.
+
+  Args:
+    pool: a multiprocessing.pool.ThreadPool.
+    result_dict: see visualize_detection_results. It must not be modified by
+      the caller after this call since the image is drawn in place.
+    tag: tensorboard tag (string) to associate with image.
+    global_step: global step at which the visualization are generated.
+    **kwargs: additional keyword arguments to visualize_detection_results.
+
+  Returns:
+    A multiprocessing.pool.AsyncResult.
+  """
+  return pool.apply_async(_visualize_detection_results_or_log,
+                          (result_dict, tag, global_step), kwargs)
+
+
 def _run_checkpoint_once(tensor_dict,
                          evaluators=None,
                          batch_processor=None,
@@ -50,6 +50,64 @@ def build_input(tfrecord_paths):
   return serialized_example_tensor, image_tensor
 
 
+def build_batched_input(tfrecord_paths, batch_size, num_parallel_calls=4,
+                        prefetch_batches=2):
+  """Builds a tf.data input that decodes and batches images in the background.
+
+  Images of different sizes within a batch are zero padded at the bottom and
+  right to the largest height and width in the batch. Note that the detector
+  then sees the padded image, so detections can differ slightly from running
+  images one at a time; use batch_size=1 (or inputs of equal size) for
+  identical results.
+
+  Args:
+    tfrecord_paths: List of paths to the input TFRecords
+    batch_size: Maximum number of images per batch. The last batch may be
+        smaller.
+    num_parallel_calls: Number of examples to parse and decode in parallel.
+    prefetch_batches: Number of batches to prepare ahead of inference.
+
+  Returns:
+    serialized_examples_tensor: The serialized examples of the batch. String
+        tensor, shape=[batch]
+    images_tensor: The decoded and padded images. Uint8 tensor,
+        shape=[batch, None, None, 3]
+    image_shapes_tensor: Height and width of each image before padding. Int32
+        tensor, shape=[batch, 2]
+  """
+  def decode(serialized_example):
+    features = tf.parse_single_example(
+        serialized_example,
+        features={
+            standard_fields.TfExampleFields.image_encoded:
+                tf.FixedLenFeature([], tf.string),
+        })
+    encoded_image = features[standard_fields.TfExampleFields.image_encoded]
+    image = tf.image.decode_image(encoded_image, channels=3)
+    image.set_shape([None, None, 3])
+    return serialized_example, image, tf.shape(image)[:2]
+
+  dataset = tf.data.TFRecordDataset(tfrecord_paths)
+  dataset = dataset.map(decode, num_parallel_calls=num_parallel_calls)
+  dataset = dataset.padded_batch(
+      batch_size, padded_shapes=([], [None, None, 3], [2]))
+  dataset = dataset.prefetch(prefetch_batches)
+  return dataset.make_one_shot_iterator().get_next()
+
+
+def _import_inference_graph(image_tensor, inference_graph_path):
+  """Imports the inference graph with `image_tensor` as its input."""
+  with tf.gfile.Open(inference_graph_path, 'r') as graph_def_file:
+    graph_content = graph_def_file.read()
+  graph_def = tf.GraphDef()
+  graph_def.MergeFromString(graph_content)
+
+  tf.import_graph_def(
+      graph_def, name='', input_map={'image_tensor': image_tensor})
+
+  return tf.get_default_graph()
+
+
 def build_inference_graph(image_tensor, inference_graph_path):
   """Loads the inference graph and connects it to the input image.
 
@@ -65,15 +123,7 @@ def build_inference_graph(image_tensor, inference_graph_path):
     detected_labels_tensor: Detected labels. Int64 tensor,
         shape=[num_detections]
   """
-  with tf.gfile.Open(inference_graph_path, 'r') as graph_def_file:
-    graph_content = graph_def_file.read()
-  graph_def = tf.GraphDef()
-  graph_def.MergeFromString(graph_content)
-
-  tf.import_graph_def(
-      graph_def, name='', input_map={'image_tensor': image_tensor})
-
-  g = tf.get_default_graph()
+  g = _import_inference_graph(image_tensor, inference_graph_path)
 
   num_detections_tensor = tf.squeeze(
       g.get_tensor_by_name('num_detections:0'), 0)
@@ -95,6 +145,46 @@ def build_inference_graph(image_tensor, inference_graph_path):
   return detected_boxes_tensor, detected_scores_tensor, detected_labels_tensor
 
 
+def build_batched_inference_graph(images_tensor, image_shapes_tensor,
+                                  inference_graph_path):
+  """Loads the inference graph and connects it to a batch of padded images.
+
+  Args:
+    images_tensor: The input images. uint8 tensor, shape=[batch, None, None, 3]
+    image_shapes_tensor: Height and width of each image before padding. Int32
+        tensor, shape=[batch, 2]
+    inference_graph_path: Path to the inference graph with embedded weights
+
+  Returns:
+    num_detections_tensor: Number of detections per image. Int32 tensor,
+        shape=[batch]
+    detected_boxes_tensor: Detected boxes, normalized with respect to the
+        unpadded images. Float tensor, shape=[batch, max_detections, 4]
+    detected_scores_tensor: Detected scores. Float tensor,
+        shape=[batch, max_detections]
+    detected_labels_tensor: Detected labels. Int64 tensor,
+        shape=[batch, max_detections]
+  """
+  g = _import_inference_graph(images_tensor, inference_graph_path)
+
+  num_detections_tensor = tf.cast(
+      g.get_tensor_by_name('num_detections:0'), tf.int32)
+
+  # Boxes are normalized to the padded images; rescale them to the originals.
+  padded_shape = tf.cast(tf.shape(images_tensor)[1:3], tf.float32)
+  box_scale = padded_shape / tf.cast(image_shapes_tensor, tf.float32)
+  box_scale = tf.expand_dims(tf.tile(box_scale, [1, 2]), 1)
+  detected_boxes_tensor = tf.minimum(
+      g.get_tensor_by_name('detection_boxes:0') * box_scale, 1.0)
+
+  detected_scores_tensor = g.get_tensor_by_name('detection_scores:0')
+  detected_labels_tensor = tf.cast(
+      g.get_tensor_by_name('detection_classes:0'), tf.int64)
+
+  return (num_detections_tensor, detected_boxes_tensor, detected_scores_tensor,
+          detected_labels_tensor)
+
+
 def infer_detections_and_add_to_example(
     serialized_example_tensor, detected_boxes_tensor, detected_scores_tensor,
     detected_labels_tensor, discard_image_pixels):
@@ -118,9 +208,55 @@ def infer_detections_and_add_to_example(
        serialized_example_tensor, detected_boxes_tensor, detected_scores_tensor,
        detected_labels_tensor
    ])
-  detected_boxes = detected_boxes.T
-
   tf_example.ParseFromString(serialized_example)
+  _add_detections_to_example(tf_example, detected_boxes, detected_scores,
+                             detected_classes, discard_image_pixels)
+  return tf_example
+
+
+def infer_detections_batch_and_add_to_examples(
+    serialized_examples_tensor, num_detections_tensor, detected_boxes_tensor,
+    detected_scores_tensor, detected_labels_tensor, discard_image_pixels):
+  """Runs the supplied batched tensors and adds detections to the examples.
+
+  Args:
+    serialized_examples_tensor: Serialized TF examples. String tensor,
+        shape=[batch]
+    num_detections_tensor: Number of detections per image. Int32 tensor,
+        shape=[batch]
+    detected_boxes_tensor: Detected boxes. Float tensor,
+        shape=[batch, max_detections, 4]
+    detected_scores_tensor: Detected scores. Float tensor,
+        shape=[batch, max_detections]
+    detected_labels_tensor: Detected labels. Int64 tensor,
+        shape=[batch, max_detections]
+    discard_image_pixels: If true, discards the images from the results
+  Returns:
+    List of the de-serialized TF examples of the batch, augmented with the
+    inferred detections.
+  """
+  (serialized_examples, num_detections, detected_boxes, detected_scores,
+   detected_classes) = tf.get_default_session().run([
+       serialized_examples_tensor, num_detections_tensor, detected_boxes_tensor,
+       detected_scores_tensor, detected_labels_tensor
+   ])
+
+  tf_examples = []
+  for i, serialized_example in enumerate(serialized_examples):
+    n = num_detections[i]
+    tf_example = tf.train.Example()
+    tf_example.ParseFromString(serialized_example)
+    _add_detections_to_example(tf_example, detected_boxes[i, :n],
+                               detected_scores[i, :n], detected_classes[i, :n],
+                               discard_image_pixels)
+    tf_examples.append(tf_example)
+  return tf_examples
+
+
+def _add_detections_to_example(tf_example, detected_boxes, detected_scores,
+                               detected_classes, discard_image_pixels):
+  """Writes detections of shape [num_detections(, 4)] into tf_example."""
+  detected_boxes = detected_boxes.T
   feature = tf_example.features.feature
   feature[standard_fields.TfExampleFields.
           detection_score].float_list.value[:] = detected_scores
@@ -137,5 +273,3 @@ def infer_detections_and_add_to_example(
 
   if discard_image_pixels:
     del feature[standard_fields.TfExampleFields.image_encoded]
-
-  return tf_example
@@ -171,6 +171,53 @@ class InferDetectionsTests(tf.test.TestCase):
             value { float_list { value: [1.0, 2.0, 3.0, 4.0] } } } }
     """, tf_example)
 
+  def test_batched(self):
+    create_mock_graph()
+    create_mock_tfrecord()
+
+    (serialized_examples_tensor, images_tensor,
+     image_shapes_tensor) = detection_inference.build_batched_input(
+         [get_mock_tfrecord_path()], batch_size=2)
+    (num_detections_tensor, detected_boxes_tensor, detected_scores_tensor,
+     detected_labels_tensor) = (
+         detection_inference.build_batched_inference_graph(
+             images_tensor, image_shapes_tensor, get_mock_graph_path()))
+
+    with self.test_session(use_gpu=False) as sess:
+      sess.run(tf.global_variables_initializer())
+
+      tf_examples = (
+          detection_inference.infer_detections_batch_and_add_to_examples(
+              serialized_examples_tensor, num_detections_tensor,
+              detected_boxes_tensor, detected_scores_tensor,
+              detected_labels_tensor, True))
+
+    self.assertEqual(len(tf_examples), 1)
+    self.assertProtoEquals(r"""
+        features {
+          feature {
+            key: "image/detection/bbox/ymin"
+            value { float_list { value: [0.0, 0.1] } } }
+          feature {
+            key: "image/detection/bbox/xmin"
+            value { float_list { value: [0.8, 0.2] } } }
+          feature {
+            key: "image/detection/bbox/ymax"
+            value { float_list { value: [0.7, 0.8] } } }
+          feature {
+            key: "image/detection/bbox/xmax"
+            value { float_list { value: [1.0, 0.9] } } }
+          feature {
+            key: "image/detection/label"
+            value { int64_list { value: [123, 246] } } }
+          feature {
+            key: "image/detection/score"
+            value { float_list { value: [0.1, 0.2] } } }
+          feature {
+            key: "test_field"
+            value { float_list { value: [1.0, 2.0, 3.0, 4.0] } } } }
+    """, tf_examples[0])
+
 
 if __name__ == '__main__':
   tf.test.main()
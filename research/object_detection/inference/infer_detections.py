@@ -32,11 +32,29 @@ The script can also discard the image pixels in the output. This greatly
 reduces the output size and can potentially accelerate reading data in
 subsequent processing steps that don't require the images (e.g. computing
 metrics).
+
+For throughput, images are decoded by a tf.data pipeline and passed to the
+graph in batches of --batch_size, and output records are written by a
+background thread. With --num_workers > 1, the input files are split between
+that many processes, each with its own session, writing to
+<output_tfrecord_path>-<worker>-of-<num_workers>.
+
+With --output_columnar_dir, the detections and groundtruth of every output
+example are also written to a columnar store (see metrics/columnar_store.py)
+that offline_eval_map_corloc can evaluate without parsing the TFRecords.
 """
 
-import itertools
+import multiprocessing
+import os
+import threading
+import time
+
+from six.moves import queue
 import tensorflow as tf
+from object_detection.core import standard_fields
 from object_detection.inference import detection_inference
+from object_detection.metrics import columnar_store
+from object_detection.metrics import tf_example_parser
 
 tf.flags.DEFINE_string('input_tfrecord_paths', None,
                        'A comma separated list of paths to input TFRecords.')
@@ -49,10 +67,160 @@ tf.flags.DEFINE_boolean('discard_image_pixels', False,
                         ' significantly reduces the output size and is useful'
                         ' if the subsequent tools don\'t need access to the'
                         ' images (e.g. when computing evaluation measures).')
+tf.flags.DEFINE_integer('batch_size', 1,
+                        'Number of images per inference call. Images of a'
+                        ' batch are zero padded to the same size, which can'
+                        ' change the detections slightly unless all images'
+                        ' have the same size.')
+tf.flags.DEFINE_integer('num_parallel_decodes', 4,
+                        'Number of images decoded in parallel.')
+tf.flags.DEFINE_integer('prefetch_batches', 2,
+                        'Number of batches decoded ahead of inference.')
+tf.flags.DEFINE_integer('num_workers', 1,
+                        'Number of processes the input files are split'
+                        ' between.')
+tf.flags.DEFINE_integer('writer_queue_size', 1024,
+                        'Maximum number of output records waiting to be'
+                        ' written.')
+tf.flags.DEFINE_integer('log_every_n_images', 1000,
+                        'How often to log throughput.')
+tf.flags.DEFINE_string('output_columnar_dir', None,
+                       'Optional directory to also write the detections and'
+                       ' groundtruth to as a columnar store. With'
+                       ' --num_workers > 1 each worker writes a subdirectory.')
 
 FLAGS = tf.flags.FLAGS
 
 
+class AsyncRecordWriter(object):
+  """Writes serialized records to a TFRecord file from a background thread."""
+
+  def __init__(self, path, max_queue_size):
+    self._queue = queue.Queue(maxsize=max_queue_size)
+    self._writer = tf.python_io.TFRecordWriter(path)
+    self._lock = threading.Lock()
+    self._error = None
+    self._thread = threading.Thread(target=self._run)
+    self._thread.daemon = True
+    self._thread.start()
+
+  def _run(self):
+    failed = False
+    try:
+      while True:
+        record = self._queue.get()
+        if record is None:
+          break
+        if not failed:
+          try:
+            self._writer.write(record)
+          except Exception as e:  # pylint: disable=broad-except
+            # Keep draining the queue, so that write() and close() don't block.
+            failed = True
+            with self._lock:
+              self._error = e
+    finally:
+      try:
+        self._writer.close()
+      except Exception as e:  # pylint: disable=broad-except
+        with self._lock:
+          if self._error is None:
+            self._error = e
+
+  def _raise_error(self):
+    with self._lock:
+      error, self._error = self._error, None
+    if error is not None:
+      raise error
+
+  def write(self, record):
+    """Queues a serialized record.
+
+    Raises:
+      Exception: the first error raised while writing a queued record.
+    """
+    self._raise_error()
+    self._queue.put(record)
+
+  def close(self):
+    """Waits until all queued records are written and closes the file.
+
+    Raises:
+      Exception: the first error raised while writing or closing the file.
+    """
+    self._queue.put(None)
+    self._thread.join()
+    self._raise_error()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, unused_value, unused_traceback):
+    if exc_type is None:
+      self.close()
+    else:
+      self._queue.put(None)
+      self._thread.join()
+
+
+def run_inference(input_tfrecord_paths, output_tfrecord_path,
+                  output_columnar_dir=None):
+  """Runs inference on the given input files and writes the output file."""
+  with tf.Graph().as_default(), tf.Session() as sess:
+    tf.logging.info('Reading input from %d files', len(input_tfrecord_paths))
+    (serialized_examples_tensor, images_tensor,
+     image_shapes_tensor) = detection_inference.build_batched_input(
+         input_tfrecord_paths, FLAGS.batch_size,
+         num_parallel_calls=FLAGS.num_parallel_decodes,
+         prefetch_batches=FLAGS.prefetch_batches)
+    tf.logging.info('Reading graph and building model...')
+    (num_detections_tensor, detected_boxes_tensor, detected_scores_tensor,
+     detected_labels_tensor) = (
+         detection_inference.build_batched_inference_graph(
+             images_tensor, image_shapes_tensor, FLAGS.inference_graph))
+
+    tf.logging.info('Running inference and writing output to {}'.format(
+        output_tfrecord_path))
+    sess.run(tf.local_variables_initializer())
+    num_images = 0
+    next_log = FLAGS.log_every_n_images
+    start_time = time.time()
+    store_writer = None
+    if output_columnar_dir:
+      store_writer = columnar_store.ColumnarStoreWriter(output_columnar_dir)
+    data_parser = tf_example_parser.TfExampleDetectionAndGTParser()
+    key_field = standard_fields.DetectionResultFields.key
+    with AsyncRecordWriter(output_tfrecord_path,
+                           FLAGS.writer_queue_size) as tf_record_writer:
+      try:
+        while True:
+          tf_examples = (
+              detection_inference.infer_detections_batch_and_add_to_examples(
+                  serialized_examples_tensor, num_detections_tensor,
+                  detected_boxes_tensor, detected_scores_tensor,
+                  detected_labels_tensor, FLAGS.discard_image_pixels))
+          for tf_example in tf_examples:
+            tf_record_writer.write(tf_example.SerializeToString())
+            if store_writer:
+              decoded_dict = data_parser.parse(tf_example)
+              if decoded_dict:
+                store_writer.add(decoded_dict[key_field], decoded_dict,
+                                 skip_fields=[key_field])
+          num_images += len(tf_examples)
+          if num_images >= next_log:
+            next_log += FLAGS.log_every_n_images
+            tf.logging.info('Processed %d images (%.1f images/sec)', num_images,
+                            num_images / (time.time() - start_time))
+      except tf.errors.OutOfRangeError:
+        tf.logging.info('Finished processing %d records (%.1f images/sec)',
+                        num_images,
+                        num_images / max(time.time() - start_time, 1e-6))
+    if store_writer:
+      store_writer.close()
+      tf.logging.info('Wrote %d images to columnar store %s',
+                      store_writer.num_images, output_columnar_dir)
+
+
 def main(_):
   tf.logging.set_verbosity(tf.logging.INFO)
 
@@ -62,34 +230,33 @@ def main(_):
     if not getattr(FLAGS, flag_name):
       raise ValueError('Flag --{} is required'.format(flag_name))
 
-  with tf.Session() as sess:
-    input_tfrecord_paths = [
-        v for v in FLAGS.input_tfrecord_paths.split(',') if v]
-    tf.logging.info('Reading input from %d files', len(input_tfrecord_paths))
-    serialized_example_tensor, image_tensor = detection_inference.build_input(
-        input_tfrecord_paths)
-    tf.logging.info('Reading graph and building model...')
-    (detected_boxes_tensor, detected_scores_tensor,
-     detected_labels_tensor) = detection_inference.build_inference_graph(
-         image_tensor, FLAGS.inference_graph)
+  input_tfrecord_paths = [
+      v for v in FLAGS.input_tfrecord_paths.split(',') if v]
+  num_workers = min(FLAGS.num_workers, len(input_tfrecord_paths))
+  if num_workers <= 1:
+    run_inference(input_tfrecord_paths, FLAGS.output_tfrecord_path,
+                  FLAGS.output_columnar_dir)
+    return
 
-    tf.logging.info('Running inference and writing output to {}'.format(
-        FLAGS.output_tfrecord_path))
-    sess.run(tf.local_variables_initializer())
-    tf.train.start_queue_runners()
-    with tf.python_io.TFRecordWriter(
-        FLAGS.output_tfrecord_path) as tf_record_writer:
-      try:
-        for counter in itertools.count():
-          tf.logging.log_every_n(tf.logging.INFO, 'Processed %d images...', 10,
-                                 counter)
-          tf_example = detection_inference.infer_detections_and_add_to_example(
-              serialized_example_tensor, detected_boxes_tensor,
-              detected_scores_tensor, detected_labels_tensor,
-              FLAGS.discard_image_pixels)
-          tf_record_writer.write(tf_example.SerializeToString())
-      except tf.errors.OutOfRangeError:
-        tf.logging.info('Finished processing records')
+  workers = []
+  for i in range(num_workers):
+    output_path = '{}-{:05d}-of-{:05d}'.format(
+        FLAGS.output_tfrecord_path, i, num_workers)
+    output_columnar_dir = None
+    if FLAGS.output_columnar_dir:
+      output_columnar_dir = os.path.join(
+          FLAGS.output_columnar_dir, '{:05d}-of-{:05d}'.format(i, num_workers))
+    worker = multiprocessing.Process(
+        target=run_inference,
+        args=(input_tfrecord_paths[i::num_workers], output_path,
+              output_columnar_dir))
+    worker.start()
+    workers.append(worker)
+  for worker in workers:
+    worker.join()
+  failed = [i for i, worker in enumerate(workers) if worker.exitcode != 0]
+  if failed:
+    raise RuntimeError('Inference workers {} failed'.format(failed))
 
 
 if __name__ == '__main__':
@@ -18,7 +18,9 @@ This file provides a generic evaluation method that can be used to evaluate a
 DetectionModel.
 """
 
+import functools
 import logging
+from multiprocessing.pool import ThreadPool
 import tensorflow as tf
 
 from object_detection import eval_util
@@ -186,6 +188,10 @@ def evaluate(create_input_dict_fn, create_model_fn, eval_config, categories,
       create_input_dict_fn=create_input_dict_fn,
       ignore_groundtruth=eval_config.ignore_groundtruth)
 
+  visualization_pool = None
+  if eval_config.num_visualization_threads and eval_config.num_visualizations:
+    visualization_pool = ThreadPool(eval_config.num_visualization_threads)
+
   def _process_batch(tensor_dict, sess, batch_index, counters,
                      losses_dict=None):
     """Evaluates tensors in tensor_dict, losses_dict and visualizes examples.
@@ -221,7 +227,12 @@ def evaluate(create_input_dict_fn, create_model_fn, eval_config, categories,
     global_step = tf.train.global_step(sess, tf.train.get_global_step())
     if batch_index < eval_config.num_visualizations:
       tag = 'image-{}'.format(batch_index)
-      eval_util.visualize_detection_results(
+      if visualization_pool is not None:
+        visualize_fn = functools.partial(
+            eval_util.visualize_detection_results_async, visualization_pool)
+      else:
+        visualize_fn = eval_util.visualize_detection_results
+      visualize_fn(
           result_dict,
           tag,
           global_step,
@@ -236,7 +247,8 @@ def evaluate(create_input_dict_fn, create_model_fn, eval_config, categories,
           skip_scores=eval_config.skip_scores,
           skip_labels=eval_config.skip_labels,
           keep_image_id_for_visualization_export=eval_config.
-          keep_image_id_for_visualization_export)
+          keep_image_id_for_visualization_export,
+          use_numpy_renderer=eval_config.use_numpy_renderer)
     return result_dict, result_losses_dict
 
   if graph_hook_fn: graph_hook_fn()
@@ -276,4 +288,7 @@ def evaluate(create_input_dict_fn, create_model_fn, eval_config, categories,
       losses_dict=losses_dict,
       eval_export_path=eval_config.export_path)
 
+  if visualization_pool is not None:
+    visualization_pool.close()
+    visualization_pool.join()
   return metrics
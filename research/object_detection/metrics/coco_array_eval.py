@@ -0,0 +1,517 @@
+# Copyright 2018 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""COCO box detection metrics computed on numpy arrays.
+
+This is a reimplementation of the box metrics of the pycocotools COCOeval class
+that keeps groundtruth and detections in columnar numpy arrays instead of one
+python dictionary per box. Matching of detections to groundtruth is done for
+all images, categories, area ranges and IOU thresholds at once, one detection
+rank at a time, and accumulation is vectorized per category. The results are
+the same as those of coco_tools.COCOEvalWrapper.ComputeMetrics for boxes:
+
+  evaluator = coco_array_eval.CocoArrayEval(categories)
+  evaluator.add_groundtruth(image_id, groundtruth_boxes, groundtruth_classes)
+  evaluator.add_detections(image_id, detection_boxes, detection_scores,
+                           detection_classes)
+  metrics, per_category_ap = evaluator.ComputeMetrics()
+
+Boxes are given as [ymin, xmin, ymax, xmax] in absolute image coordinates.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from collections import OrderedDict
+
+import numpy as np
+
+# Evaluation parameters, as in pycocotools.cocoeval.Params for boxes.
+IOU_THRESHOLDS = np.linspace(.5, 0.95, 10)
+RECALL_THRESHOLDS = np.linspace(.0, 1.00, 101)
+MAX_DETECTIONS = [1, 10, 100]
+AREA_RANGES = np.array([[0, 1e5 ** 2], [0, 32 ** 2], [32 ** 2, 96 ** 2],
+                        [96 ** 2, 1e5 ** 2]])
+
+# Maximum number of elements of the boolean arrays used while matching, which
+# have shape [num_pairs, num_area_ranges, num_iou_thresholds, num_gt].
+_MAX_MATCHING_ARRAY_SIZE = 1 << 22
+
+
+def _summary_stats(precision, recall):
+  """Computes the 12 COCO summary metrics like COCOeval.summarize.
+
+  Args:
+    precision: array of shape [T, R, K, A, M], -1 where undefined.
+    recall: array of shape [T, K, A, M], -1 where undefined.
+
+  Returns:
+    numpy array with the 12 summary metrics.
+  """
+  def mean(s):
+    s = s[s > -1]
+    return np.mean(s) if s.size else -1.0
+
+  all_areas, small, medium, large = range(4)
+  return np.array([
+      mean(precision[:, :, :, all_areas, 2]),
+      mean(precision[0, :, :, all_areas, 2]),
+      mean(precision[5, :, :, all_areas, 2]),
+      mean(precision[:, :, :, small, 2]),
+      mean(precision[:, :, :, medium, 2]),
+      mean(precision[:, :, :, large, 2]),
+      mean(recall[:, :, all_areas, 0]),
+      mean(recall[:, :, all_areas, 1]),
+      mean(recall[:, :, all_areas, 2]),
+      mean(recall[:, :, small, 2]),
+      mean(recall[:, :, medium, 2]),
+      mean(recall[:, :, large, 2]),
+  ])
+
+
+def _pad_by_pair(pair, values, num_pairs, fill_value):
+  """Scatters rows sorted by pair into an array padded per pair.
+
+  Args:
+    pair: int array [N] with the (sorted) pair index of each row.
+    values: array of shape [N, ...].
+    num_pairs: number of pairs.
+    fill_value: value of padding entries.
+
+  Returns:
+    padded: array of shape [num_pairs, max_rows_per_pair, ...].
+    rank: int array [N] with the position of each row within its pair.
+  """
+  starts = np.searchsorted(pair, np.arange(num_pairs))
+  rank = np.arange(pair.size) - starts[pair]
+  max_rows = rank.max() + 1 if rank.size else 0
+  padded = np.full((num_pairs, max_rows) + values.shape[1:], fill_value,
+                   dtype=values.dtype)
+  padded[pair, rank] = values
+  return padded, rank
+
+
+def _box_iou(detections, groundtruth, is_crowd):
+  """Pairwise IOU of padded boxes like pycocotools maskUtils.iou.
+
+  Args:
+    detections: float array [P, D, 4] of [x, y, width, height] boxes.
+    groundtruth: float array [P, G, 4] of [x, y, width, height] boxes.
+    is_crowd: bool array [P, G]. For crowd groundtruth, the intersection is
+      divided by the detection area instead of the union.
+
+  Returns:
+    float array [P, D, G].
+  """
+  dx, dy, dw, dh = [detections[:, :, None, i] for i in range(4)]
+  gx, gy, gw, gh = [groundtruth[:, None, :, i] for i in range(4)]
+  w = np.minimum(dx + dw, gx + gw) - np.maximum(dx, gx)
+  h = np.minimum(dy + dh, gy + gh) - np.maximum(dy, gy)
+  intersection = np.where((w > 0) & (h > 0), w * h, 0.0)
+  detection_area = dw * dh
+  union = np.where(is_crowd[:, None, :], detection_area,
+                   detection_area + gw * gh - intersection)
+  with np.errstate(divide='ignore', invalid='ignore'):
+    return np.where(intersection > 0, intersection / union, 0.0)
+
+
+def _last_argmax(values):
+  """Index of the last maximum along the last axis."""
+  return values.shape[-1] - 1 - np.argmax(values[..., ::-1], axis=-1)
+
+
+class CocoArrayEval(object):
+  """Accumulates boxes in arrays and computes COCO detection metrics."""
+
+  def __init__(self, categories, agnostic_mode=False):
+    """Constructor.
+
+    Args:
+      categories: A list of dicts, each of which has the following keys -
+        'id': (required) an integer id uniquely identifying this category.
+        'name': (required) string representing category name e.g., 'cat', 'dog'.
+      agnostic_mode: boolean (default: False).  If True, evaluation ignores
+        class labels, treating all detections as proposals.
+    """
+    self._categories = sorted(categories, key=lambda cat: cat['id'])
+    self._category_ids = np.array([cat['id'] for cat in self._categories])
+    self._agnostic_mode = agnostic_mode
+    self.clear()
+
+  def clear(self):
+    """Removes all groundtruth and detections."""
+    self._image_ids = []
+    self._image_index = {}
+    # Columns of the groundtruth and detection tables. Every add_* call appends
+    # one array per column; they are concatenated when computing metrics.
+    self._groundtruth_columns = {'image': [], 'category': [], 'box': [],
+                                 'area': [], 'is_crowd': []}
+    self._detection_columns = {'image': [], 'category': [], 'box': [],
+                               'score': []}
+    self.num_groundtruth_boxes = 0
+    self.num_detection_boxes = 0
+
+  def _get_image_index(self, image_id):
+    if image_id not in self._image_index:
+      self._image_index[image_id] = len(self._image_ids)
+      self._image_ids.append(image_id)
+    return self._image_index[image_id]
+
+  def _valid_category_mask(self, classes):
+    return np.isin(classes, self._category_ids)
+
+  def add_groundtruth(self, image_id, groundtruth_boxes, groundtruth_classes,
+                      groundtruth_is_crowd=None):
+    """Adds the groundtruth of an image.
+
+    Groundtruth with classes which are not in `categories` is dropped. Every
+    image with groundtruth added (possibly none) is part of the evaluation.
+
+    Args:
+      image_id: a unique image identifier either of type integer or string.
+      groundtruth_boxes: numpy array (float32) with shape [num_gt_boxes, 4]
+      groundtruth_classes: numpy array (int) with shape [num_gt_boxes]
+      groundtruth_is_crowd: optional numpy array (int) with shape [num_gt_boxes]
+        indicating whether groundtruth boxes are crowd.
+
+    Raises:
+      ValueError: if the shapes of the arrays are invalid.
+    """
+    _check_shapes(image_id, 'groundtruth', groundtruth_boxes,
+                  groundtruth_classes)
+    if (groundtruth_is_crowd is not None and
+        len(groundtruth_is_crowd.shape) != 1):
+      raise ValueError('groundtruth_is_crowd is expected to be of rank 1.')
+    image_index = self._get_image_index(image_id)
+    keep = self._valid_category_mask(groundtruth_classes)
+    boxes = groundtruth_boxes[keep]
+    # Computed in the precision of the input, like the COCO export.
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    if groundtruth_is_crowd is None:
+      is_crowd = np.zeros(boxes.shape[0], dtype=bool)
+    else:
+      is_crowd = groundtruth_is_crowd[keep].astype(bool)
+    self._append(self._groundtruth_columns, image_index,
+                 groundtruth_classes[keep], boxes,
+                 area=area.astype(np.float64), is_crowd=is_crowd)
+    self.num_groundtruth_boxes += boxes.shape[0]
+
+  def add_detections(self, image_id, detection_boxes, detection_scores,
+                     detection_classes):
+    """Adds the detections of an image.
+
+    Detections with classes which are not in `categories` are dropped.
+
+    Args:
+      image_id: a unique image identifier either of type integer or string.
+      detection_boxes: float numpy array of shape [num_detections, 4].
+      detection_scores: float numpy array of shape [num_detections].
+      detection_classes: integer numpy array of shape [num_detections].
+
+    Raises:
+      ValueError: if the shapes of the arrays are invalid, or no groundtruth
+        was added for the image.
+    """
+    if image_id not in self._image_index:
+      raise ValueError('Missing groundtruth for image id: {}'.format(image_id))
+    _check_shapes(image_id, 'detection', detection_boxes, detection_classes)
+    if detection_scores.shape != detection_classes.shape:
+      raise ValueError('detection_scores and detection_classes should have '
+                       'the same shape.')
+    keep = self._valid_category_mask(detection_classes)
+    self._append(self._detection_columns, self._image_index[image_id],
+                 detection_classes[keep], detection_boxes[keep],
+                 score=detection_scores[keep].astype(np.float64))
+    self.num_detection_boxes += np.count_nonzero(keep)
+
+  def _append(self, columns, image_index, classes, boxes, **other_columns):
+    num_boxes = boxes.shape[0]
+    columns['image'].append(np.full(num_boxes, image_index, dtype=np.int64))
+    columns['category'].append(
+        np.searchsorted(self._category_ids, classes).astype(np.int64))
+    # [x, y, width, height] as exported to COCO: widths and heights are
+    # computed in the precision of the input.
+    columns['box'].append(np.stack(
+        [boxes[:, 1], boxes[:, 0], boxes[:, 3] - boxes[:, 1],
+         boxes[:, 2] - boxes[:, 0]], axis=1).astype(np.float64))
+    for name, value in other_columns.items():
+      columns[name].append(value)
+
+  def _table(self, columns):
+    if not columns['image']:
+      return {'image': np.zeros(0, np.int64),
+              'category': np.zeros(0, np.int64),
+              'box': np.zeros((0, 4)),
+              'area': np.zeros(0), 'is_crowd': np.zeros(0, bool),
+              'score': np.zeros(0)}
+    return {name: np.concatenate(values) for name, values in columns.items()}
+
+  def ExportDetections(self):
+    """Returns the detections as a list of dicts in the COCO format."""
+    detections = self._table(self._detection_columns)
+    return [{
+        'image_id': self._image_ids[image],
+        'category_id': int(self._category_ids[category]),
+        'bbox': list(box),
+        'score': score
+    } for image, category, box, score in zip(
+        detections['image'], detections['category'],
+        detections['box'].tolist(), detections['score'].tolist())]
+
+  def GetCategoryIdList(self):
+    """Returns list of valid category ids."""
+    return list(self._category_ids)
+
+  def Evaluate(self):
+    """Computes precision and recall like COCOeval.evaluate and accumulate.
+
+    Returns:
+      precision: array [T, R, K, A, M] of precisions for every IOU threshold,
+        recall threshold, category, area range and maximum number of
+        detections; -1 where there is no groundtruth.
+      recall: array [T, K, A, M] of recalls; -1 where there is no groundtruth.
+    """
+    groundtruth = self._table(self._groundtruth_columns)
+    detections = self._table(self._detection_columns)
+    detections['area'] = detections['box'][:, 2] * detections['box'][:, 3]
+
+    # Images are evaluated in order of their sorted ids, like pycocotools.
+    image_order = np.argsort(np.argsort(np.array(self._image_ids),
+                                        kind='mergesort'))
+    num_categories = 1 if self._agnostic_mode else len(self._category_ids)
+    for table in (groundtruth, detections):
+      category = (np.zeros_like(table['category']) if self._agnostic_mode
+                  else table['category'])
+      table['pair'] = image_order[table['image']] * num_categories + category
+
+    # Within each image and category pair, groundtruth is kept in insertion
+    # order and detections are sorted by decreasing score. In agnostic mode,
+    # pycocotools first concatenates the boxes of a pair in category order, so
+    # that order breaks ties.
+    gt_order = np.lexsort((np.arange(groundtruth['pair'].size),
+                           groundtruth['category'], groundtruth['pair']))
+    by_category = np.lexsort((np.arange(detections['pair'].size),
+                              detections['category'], detections['pair']))
+    category_order = np.empty_like(by_category)
+    category_order[by_category] = np.arange(by_category.size)
+    dt_order = np.lexsort((category_order, -detections['score'],
+                           detections['pair']))
+    groundtruth = {k: v[gt_order] for k, v in groundtruth.items()}
+    detections = {k: v[dt_order] for k, v in detections.items()}
+
+    # Keep the top scoring detections of every image and category.
+    pairs, pair_index = np.unique(
+        np.concatenate([groundtruth['pair'], detections['pair']]),
+        return_inverse=True)
+    gt_pair = pair_index[:groundtruth['pair'].size]
+    dt_pair = pair_index[groundtruth['pair'].size:]
+    dt_starts = np.searchsorted(dt_pair, np.arange(pairs.size))
+    dt_rank = np.arange(dt_pair.size) - dt_starts[dt_pair]
+    keep = dt_rank < MAX_DETECTIONS[-1]
+    detections = {k: v[keep] for k, v in detections.items()}
+    dt_pair, dt_rank = dt_pair[keep], dt_rank[keep]
+
+    gt_ignore = (groundtruth['is_crowd'][:, None] |
+                 (groundtruth['area'][:, None] < AREA_RANGES[None, :, 0]) |
+                 (groundtruth['area'][:, None] > AREA_RANGES[None, :, 1]))
+    dt_out_of_range = (
+        (detections['area'][:, None] < AREA_RANGES[None, :, 0]) |
+        (detections['area'][:, None] > AREA_RANGES[None, :, 1]))
+    dt_matched, dt_ignored = self._match(
+        pairs.size, gt_pair, groundtruth['box'], groundtruth['is_crowd'],
+        gt_ignore, dt_pair, detections['box'], dt_out_of_range)
+
+    category = pairs % num_categories
+    return self._accumulate(
+        num_categories, category[gt_pair], gt_ignore, category[dt_pair],
+        dt_rank, detections['score'], dt_matched, dt_ignored)
+
+  def _match(self, num_pairs, gt_pair, gt_boxes, gt_is_crowd, gt_ignore,
+             dt_pair, dt_boxes, dt_out_of_range):
+    """Greedily matches detections to groundtruth like COCOeval.evaluateImg.
+
+    Args:
+      num_pairs: number of (image, category) pairs.
+      gt_pair: int array [N] with the sorted pair index of each groundtruth.
+      gt_boxes: float array [N, 4] of [x, y, width, height].
+      gt_is_crowd: bool array [N].
+      gt_ignore: bool array [N, A], whether groundtruth is ignored for each
+        area range.
+      dt_pair: int array [D] with the sorted pair index of each detection.
+      dt_boxes: float array [D, 4] of [x, y, width, height].
+      dt_out_of_range: bool array [D, A], whether the detection area is outside
+        of each area range.
+
+    Returns:
+      dt_matched: bool array [D, A, T], whether each detection is matched.
+      dt_ignored: bool array [D, A, T], whether each detection is ignored.
+    """
+    num_areas = AREA_RANGES.shape[0]
+    num_thresholds = IOU_THRESHOLDS.size
+    gt_padded, gt_rank = _pad_by_pair(gt_pair, gt_boxes, num_pairs, 0.0)
+    gt_exists, _ = _pad_by_pair(gt_pair, np.ones(gt_pair.size, bool),
+                                num_pairs, False)
+    crowd_padded, _ = _pad_by_pair(gt_pair, gt_is_crowd, num_pairs, False)
+    ignore_padded, _ = _pad_by_pair(gt_pair, gt_ignore, num_pairs, False)
+    dt_padded, dt_rank = _pad_by_pair(dt_pair, dt_boxes, num_pairs, 0.0)
+    num_gt, num_dt = gt_padded.shape[1], dt_padded.shape[1]
+
+    dt_matched = np.zeros((num_pairs, num_dt, num_areas, num_thresholds), bool)
+    dt_matched_ignored = np.zeros_like(dt_matched)
+    if num_gt and num_dt:
+      chunk_size = max(1, _MAX_MATCHING_ARRAY_SIZE //
+                       (num_areas * num_thresholds * num_gt))
+      for start in range(0, num_pairs, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        self._match_chunk(
+            gt_padded[chunk], gt_exists[chunk], crowd_padded[chunk],
+            ignore_padded[chunk], dt_padded[chunk], dt_matched[chunk],
+            dt_matched_ignored[chunk])
+    dt_matched = dt_matched[dt_pair, dt_rank]
+    dt_ignored = (dt_matched_ignored[dt_pair, dt_rank] |
+                  (~dt_matched & dt_out_of_range[:, :, None]))
+    return dt_matched, dt_ignored
+
+  def _match_chunk(self, gt_boxes, gt_exists, gt_is_crowd, gt_ignore,
+                   dt_boxes, dt_matched, dt_matched_ignored):
+    """Matches the padded detections of a chunk of pairs, in place."""
+    ious = _box_iou(dt_boxes, gt_boxes, gt_is_crowd)
+    ious[~np.broadcast_to(gt_exists[:, None, :], ious.shape)] = -1.0
+    num_pairs, num_areas = gt_ignore.shape[0], gt_ignore.shape[2]
+    shape = (num_pairs, num_areas, IOU_THRESHOLDS.size, gt_boxes.shape[1])
+    gt_matched = np.zeros(shape, bool)
+    ignore = np.transpose(gt_ignore, (0, 2, 1))[:, :, None, :]
+    thresholds = IOU_THRESHOLDS[None, None, :, None]
+    for d in range(dt_boxes.shape[1]):
+      # Only pairs where the detection overlaps some groundtruth enough.
+      active = np.flatnonzero(ious[:, d].max(axis=-1) >= IOU_THRESHOLDS[0])
+      if not active.size:
+        continue
+      iou = ious[active, d, None, None, :]
+      active_gt_matched = gt_matched[active]
+      candidates = ((iou >= thresholds) &
+                    (gt_is_crowd[active, None, None, :] | ~active_gt_matched))
+      # Groundtruth which is not ignored is preferred. Among the candidates,
+      # the one with the largest IOU wins, the last one in case of ties.
+      active_ignore = ignore[active]
+      regular = candidates & ~active_ignore
+      has_regular = regular.any(axis=-1)
+      best_regular = _last_argmax(np.where(regular, iou, -1.0))
+      ignored = candidates & active_ignore
+      has_ignored = ignored.any(axis=-1)
+      best_ignored = _last_argmax(np.where(ignored, iou, -1.0))
+      matched = has_regular | has_ignored
+      best = np.where(has_regular, best_regular, best_ignored)
+      pair_idx, area_idx, threshold_idx = np.nonzero(matched)
+      active_gt_matched[pair_idx, area_idx, threshold_idx,
+                        best[matched]] = True
+      gt_matched[active] = active_gt_matched
+      dt_matched[active, d] = matched
+      dt_matched_ignored[active, d] = matched & ~has_regular
+
+  def _accumulate(self, num_categories, gt_category, gt_ignore, dt_category,
+                  dt_rank, dt_score, dt_matched, dt_ignored):
+    """Computes precision and recall like COCOeval.accumulate."""
+    num_thresholds = IOU_THRESHOLDS.size
+    num_areas = AREA_RANGES.shape[0]
+    precision = -np.ones((num_thresholds, RECALL_THRESHOLDS.size,
+                          num_categories, num_areas, len(MAX_DETECTIONS)))
+    recall = -np.ones((num_thresholds, num_categories, num_areas,
+                       len(MAX_DETECTIONS)))
+    num_not_ignored = np.zeros((num_categories, num_areas))
+    np.add.at(num_not_ignored, gt_category, ~gt_ignore)
+
+    # Detections are sorted by image, then by decreasing score in each image.
+    for k in range(num_categories):
+      in_category = dt_category == k
+      for m, max_detections in enumerate(MAX_DETECTIONS):
+        selected = in_category & (dt_rank < max_detections)
+        order = np.argsort(-dt_score[selected], kind='mergesort')
+        # [A, T, D] arrays.
+        matched = np.transpose(dt_matched[selected][order], (1, 2, 0))
+        ignored = np.transpose(dt_ignored[selected][order], (1, 2, 0))
+        tp_sum = np.cumsum(matched & ~ignored, axis=-1).astype(float)
+        fp_sum = np.cumsum(~matched & ~ignored, axis=-1).astype(float)
+        num_dt = tp_sum.shape[-1]
+        for a in range(num_areas):
+          npig = num_not_ignored[k, a]
+          if npig == 0:
+            continue
+          rc = tp_sum[a] / npig
+          pr = tp_sum[a] / (fp_sum[a] + tp_sum[a] + np.spacing(1))
+          recall[:, k, a, m] = rc[:, -1] if num_dt else 0
+          # Make precision monotonically decreasing.
+          pr = np.maximum.accumulate(pr[:, ::-1], axis=-1)[:, ::-1]
+          for t in range(num_thresholds):
+            inds = np.searchsorted(rc[t], RECALL_THRESHOLDS, side='left')
+            q = np.zeros(RECALL_THRESHOLDS.size)
+            valid = inds < num_dt
+            q[valid] = pr[t, inds[valid]]
+            precision[t, :, k, a, m] = q
+    return precision, recall
+
+  def ComputeMetrics(self,
+                     include_metrics_per_category=False,
+                     all_metrics_per_category=False):
+    """Computes detection metrics.
+
+    Args:
+      include_metrics_per_category: If True, will include metrics per category.
+      all_metrics_per_category: If true, include all the summery metrics for
+        each category in per_category_ap.
+
+    Returns:
+      summary_metrics and per_category_ap dictionaries with the same keys as
+      coco_tools.COCOEvalWrapper.ComputeMetrics.
+    """
+    precision, recall = self.Evaluate()
+    stats = _summary_stats(precision, recall)
+    summary_metrics = OrderedDict(
+        zip(_SUMMARY_METRIC_NAMES, [float(s) for s in stats]))
+    per_category_ap = OrderedDict([])
+    if not include_metrics_per_category or self._agnostic_mode:
+      return summary_metrics, per_category_ap
+    for k, category in enumerate(self._categories):
+      category_stats = _summary_stats(precision[:, :, k:k + 1],
+                                      recall[:, k:k + 1])
+      name = category['name']
+      # Kept for backward compatilbility
+      per_category_ap['PerformanceByCategory/mAP/{}'.format(
+          name)] = category_stats[0]
+      if all_metrics_per_category:
+        for metric_name, value in zip(_SUMMARY_METRIC_NAMES, category_stats):
+          per_category_ap['{} ByCategory/{}'.format(
+              metric_name.replace('/', ' '), name)] = value
+    return summary_metrics, per_category_ap
+
+
+_SUMMARY_METRIC_NAMES = [
+    'Precision/mAP', 'Precision/mAP@.50IOU', 'Precision/mAP@.75IOU',
+    'Precision/mAP (small)', 'Precision/mAP (medium)', 'Precision/mAP (large)',
+    'Recall/AR@1', 'Recall/AR@10', 'Recall/AR@100', 'Recall/AR@100 (small)',
+    'Recall/AR@100 (medium)', 'Recall/AR@100 (large)'
+]
+
+
+def _check_shapes(image_id, name, boxes, classes):
+  if len(classes.shape) != 1:
+    raise ValueError('{}_classes is expected to be of rank 1.'.format(name))
+  if len(boxes.shape) != 2:
+    raise ValueError('{}_boxes is expected to be of rank 2.'.format(name))
+  if boxes.shape[1] != 4:
+    raise ValueError('{}_boxes should have shape[1] == 4.'.format(name))
+  if classes.shape[0] != boxes.shape[0]:
+    raise ValueError('Corresponding entries in {0}_classes and {0}_boxes '
+                     'should have compatible shapes (i.e., agree on the 0th '
+                     'dimension). Image ID: {1}'.format(name, image_id))
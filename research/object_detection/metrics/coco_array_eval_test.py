@@ -0,0 +1,111 @@
+# Copyright 2018 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for tensorflow_models.object_detection.metrics.coco_array_eval."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import tensorflow as tf
+from object_detection.metrics import coco_array_eval
+
+
+def _get_categories_list():
+  return [{
+      'id': 1,
+      'name': 'person'
+  }, {
+      'id': 2,
+      'name': 'dog'
+  }, {
+      'id': 3,
+      'name': 'cat'
+  }]
+
+
+class CocoArrayEvalTest(tf.test.TestCase):
+
+  def _add_image(self, evaluator, image_id, groundtruth_boxes,
+                 groundtruth_classes, detection_boxes, detection_scores,
+                 detection_classes, groundtruth_is_crowd=None):
+    evaluator.add_groundtruth(image_id, np.array(groundtruth_boxes),
+                              np.array(groundtruth_classes),
+                              groundtruth_is_crowd)
+    evaluator.add_detections(image_id, np.array(detection_boxes),
+                             np.array(detection_scores),
+                             np.array(detection_classes))
+
+  def testPerfectDetections(self):
+    evaluator = coco_array_eval.CocoArrayEval(_get_categories_list())
+    self._add_image(evaluator, 'image1', [[100., 100., 200., 200.]], [1],
+                    [[100., 100., 200., 200.]], [.8], [1])
+    self._add_image(evaluator, 'image2', [[50., 50., 100., 100.]], [3],
+                    [[50., 50., 100., 100.]], [.7], [3])
+    self._add_image(evaluator, 'image3',
+                    [[25., 25., 50., 50.], [10., 10., 15., 15.]], [2, 2],
+                    [[25., 25., 50., 50.], [10., 10., 15., 15.],
+                     [10., 10., 15., 15.]], [.95, .9, .9], [2, 2, 2])
+    metrics, per_category_ap = evaluator.ComputeMetrics(
+        include_metrics_per_category=True)
+    self.assertAlmostEqual(metrics['Precision/mAP'], 1.0)
+    self.assertAlmostEqual(metrics['Precision/mAP (small)'], 1.0)
+    self.assertAlmostEqual(metrics['Recall/AR@1'], 0.83333333)
+    self.assertAlmostEqual(metrics['Recall/AR@100'], 1.0)
+    self.assertAlmostEqual(per_category_ap['PerformanceByCategory/mAP/dog'],
+                           1.0)
+
+  def testCrowdGroundtruthIsIgnored(self):
+    evaluator = coco_array_eval.CocoArrayEval(_get_categories_list())
+    self._add_image(evaluator, 'image1',
+                    [[100., 100., 200., 200.], [99., 99., 200., 200.]], [1, 1],
+                    [[100., 100., 200., 200.], [99., 99., 200., 200.]],
+                    [.8, .9], [1, 1], groundtruth_is_crowd=np.array([0, 1]))
+    metrics, _ = evaluator.ComputeMetrics()
+    self.assertAlmostEqual(metrics['Precision/mAP'], 1.0)
+
+  def testFalsePositiveAndMissedGroundtruth(self):
+    evaluator = coco_array_eval.CocoArrayEval(_get_categories_list())
+    self._add_image(evaluator, 'image1',
+                    [[0., 0., 100., 100.], [200., 200., 300., 300.]], [1, 1],
+                    [[0., 0., 100., 100.], [0., 150., 100., 250.]],
+                    [.6, .9], [1, 1])
+    metrics, _ = evaluator.ComputeMetrics()
+    # The highest scoring detection is a false positive, then precision is 1/2
+    # up to recall 1/2.
+    self.assertAlmostEqual(metrics['Precision/mAP'], 51. / 101 * 0.5)
+    self.assertAlmostEqual(metrics['Recall/AR@1'], 0.0)
+    self.assertAlmostEqual(metrics['Recall/AR@10'], 0.5)
+
+  def testUnknownClassesAreDropped(self):
+    evaluator = coco_array_eval.CocoArrayEval(_get_categories_list())
+    self._add_image(evaluator, 'image1', [[0., 0., 10., 10.], [0., 0., 5., 5.]],
+                    [1, 7], [[0., 0., 10., 10.], [0., 0., 5., 5.]],
+                    [.5, .5], [1, 7])
+    self.assertEqual(evaluator.num_groundtruth_boxes, 1)
+    self.assertEqual(evaluator.num_detection_boxes, 1)
+    self.assertEqual(evaluator.ExportDetections(),
+                     [{'image_id': 'image1', 'category_id': 1,
+                       'bbox': [0., 0., 10., 10.], 'score': .5}])
+
+  def testExceptionRaisedWithMissingGroundtruth(self):
+    evaluator = coco_array_eval.CocoArrayEval(_get_categories_list())
+    with self.assertRaises(ValueError):
+      evaluator.add_detections('image1', np.array([[0., 0., 1., 1.]]),
+                               np.array([.5]), np.array([1]))
+
+
+if __name__ == '__main__':
+  tf.test.main()
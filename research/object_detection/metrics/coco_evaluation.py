@@ -17,13 +17,18 @@ import numpy as np
 import tensorflow as tf
 
 from object_detection.core import standard_fields
+from object_detection.metrics import coco_array_eval
 from object_detection.metrics import coco_tools
 from object_detection.utils import json_utils
 from object_detection.utils import object_detection_evaluation
 
 
 class CocoDetectionEvaluator(object_detection_evaluation.DetectionEvaluator):
-  """Class to evaluate COCO detection metrics."""
+  """Class to evaluate COCO detection metrics.
+
+  Boxes are kept in numpy arrays and the metrics are computed by
+  coco_array_eval, which gives the same results as pycocotools.
+  """
 
   def __init__(self,
                categories,
@@ -45,10 +50,7 @@ class CocoDetectionEvaluator(object_detection_evaluation.DetectionEvaluator):
     # _image_ids is a dictionary that maps unique image ids to Booleans which
     # indicate whether a corresponding detection has been added.
     self._image_ids = {}
-    self._groundtruth_list = []
-    self._detection_boxes_list = []
-    self._category_id_set = set([cat['id'] for cat in self._categories])
-    self._annotation_id = 1
+    self._box_evaluation = coco_array_eval.CocoArrayEval(self._categories)
     self._metrics = None
     self._include_metrics_per_category = include_metrics_per_category
     self._all_metrics_per_category = all_metrics_per_category
@@ -56,8 +58,7 @@ class CocoDetectionEvaluator(object_detection_evaluation.DetectionEvaluator):
   def clear(self):
     """Clears the state to prepare for a fresh evaluation."""
     self._image_ids.clear()
-    self._groundtruth_list = []
-    self._detection_boxes_list = []
+    self._box_evaluation.clear()
 
   def add_single_ground_truth_image_info(self,
                                          image_id,
@@ -89,18 +90,13 @@ class CocoDetectionEvaluator(object_detection_evaluation.DetectionEvaluator):
     if groundtruth_is_crowd is not None and not groundtruth_is_crowd.shape[0]:
       groundtruth_is_crowd = None
 
-    self._groundtruth_list.extend(
-        coco_tools.ExportSingleImageGroundtruthToCoco(
-            image_id=image_id,
-            next_annotation_id=self._annotation_id,
-            category_id_set=self._category_id_set,
-            groundtruth_boxes=groundtruth_dict[
-                standard_fields.InputDataFields.groundtruth_boxes],
-            groundtruth_classes=groundtruth_dict[
-                standard_fields.InputDataFields.groundtruth_classes],
-            groundtruth_is_crowd=groundtruth_is_crowd))
-    self._annotation_id += groundtruth_dict[standard_fields.InputDataFields.
-                                            groundtruth_boxes].shape[0]
+    self._box_evaluation.add_groundtruth(
+        image_id,
+        groundtruth_boxes=groundtruth_dict[
+            standard_fields.InputDataFields.groundtruth_boxes],
+        groundtruth_classes=groundtruth_dict[
+            standard_fields.InputDataFields.groundtruth_classes],
+        groundtruth_is_crowd=groundtruth_is_crowd)
     # Boolean to indicate whether a detection has been added for this image.
     self._image_ids[image_id] = False
 
@@ -134,19 +130,17 @@ class CocoDetectionEvaluator(object_detection_evaluation.DetectionEvaluator):
                          'previously added', image_id)
       return
 
-    self._detection_boxes_list.extend(
-        coco_tools.ExportSingleImageDetectionBoxesToCoco(
-            image_id=image_id,
-            category_id_set=self._category_id_set,
-            detection_boxes=detections_dict[standard_fields.
-                                            DetectionResultFields
-                                            .detection_boxes],
-            detection_scores=detections_dict[standard_fields.
-                                             DetectionResultFields.
-                                             detection_scores],
-            detection_classes=detections_dict[standard_fields.
-                                              DetectionResultFields.
-                                              detection_classes]))
+    self._box_evaluation.add_detections(
+        image_id,
+        detection_boxes=detections_dict[standard_fields.
+                                        DetectionResultFields
+                                        .detection_boxes],
+        detection_scores=detections_dict[standard_fields.
+                                         DetectionResultFields.
+                                         detection_scores],
+        detection_classes=detections_dict[standard_fields.
+                                          DetectionResultFields.
+                                          detection_classes])
     self._image_ids[image_id] = True
 
   def dump_detections_to_json_file(self, json_output_path):
@@ -160,7 +154,8 @@ class CocoDetectionEvaluator(object_detection_evaluation.DetectionEvaluator):
       with tf.gfile.GFile(json_output_path, 'w') as fid:
         tf.logging.info('Dumping detections to output json file.')
         json_utils.Dump(
-            obj=self._detection_boxes_list, fid=fid, float_digits=4, indent=2)
+            obj=self._box_evaluation.ExportDetections(), fid=fid,
+            float_digits=4, indent=2)
 
   def evaluate(self):
     """Evaluates the detection boxes and returns a dictionary of coco metrics.
@@ -197,17 +192,7 @@ class CocoDetectionEvaluator(object_detection_evaluation.DetectionEvaluator):
       'PerformanceByCategory' is included in the output regardless of
       all_metrics_per_category.
     """
-    groundtruth_dict = {
-        'annotations': self._groundtruth_list,
-        'images': [{'id': image_id} for image_id in self._image_ids],
-        'categories': self._categories
-    }
-    coco_wrapped_groundtruth = coco_tools.COCOWrapper(groundtruth_dict)
-    coco_wrapped_detections = coco_wrapped_groundtruth.LoadAnnotations(
-        self._detection_boxes_list)
-    box_evaluator = coco_tools.COCOEvalWrapper(
-        coco_wrapped_groundtruth, coco_wrapped_detections, agnostic_mode=False)
-    box_metrics, box_per_category_ap = box_evaluator.ComputeMetrics(
+    box_metrics, box_per_category_ap = self._box_evaluation.ComputeMetrics(
         include_metrics_per_category=self._include_metrics_per_category,
         all_metrics_per_category=self._all_metrics_per_category)
     box_metrics.update(box_per_category_ap)
@@ -166,7 +166,7 @@ class CocoDetectionEvaluationTest(tf.test.TestCase):
         standard_fields.InputDataFields.groundtruth_classes:
             groundtruth_class_labels1
     })
-    groundtruth_lists_len = len(coco_evaluator._groundtruth_list)
+    groundtruth_lists_len = coco_evaluator._box_evaluation.num_groundtruth_boxes
 
     # Add groundtruth with the same image id.
     coco_evaluator.add_single_ground_truth_image_info(image_key1, {
@@ -176,7 +176,7 @@ class CocoDetectionEvaluationTest(tf.test.TestCase):
             groundtruth_class_labels1
     })
     self.assertEqual(groundtruth_lists_len,
-                     len(coco_evaluator._groundtruth_list))
+                     coco_evaluator._box_evaluation.num_groundtruth_boxes)
 
   def testRejectionOnDuplicateDetections(self):
     """Tests that detections cannot be added more than once for an image."""
@@ -200,7 +200,7 @@ class CocoDetectionEvaluationTest(tf.test.TestCase):
             standard_fields.DetectionResultFields.detection_classes:
             np.array([1])
         })
-    detections_lists_len = len(coco_evaluator._detection_boxes_list)
+    detections_lists_len = coco_evaluator._box_evaluation.num_detection_boxes
     coco_evaluator.add_single_detected_image_info(
         image_id='image1',  # Note that this image id was previously added.
         detections_dict={
@@ -212,7 +212,7 @@ class CocoDetectionEvaluationTest(tf.test.TestCase):
             np.array([1])
         })
     self.assertEqual(detections_lists_len,
-                     len(coco_evaluator._detection_boxes_list))
+                     coco_evaluator._box_evaluation.num_detection_boxes)
 
   def testExceptionRaisedWithMissingGroundtruth(self):
     """Tests that exception is raised for detection with missing groundtruth."""
@@ -304,8 +304,8 @@ class CocoEvaluationPyFuncTest(tf.test.TestCase):
     self.assertAlmostEqual(metrics['DetectionBoxes_Recall/AR@100 (medium)'],
                            1.0)
     self.assertAlmostEqual(metrics['DetectionBoxes_Recall/AR@100 (small)'], 1.0)
-    self.assertFalse(coco_evaluator._groundtruth_list)
-    self.assertFalse(coco_evaluator._detection_boxes_list)
+    self.assertFalse(coco_evaluator._box_evaluation.num_groundtruth_boxes)
+    self.assertFalse(coco_evaluator._box_evaluation.num_detection_boxes)
     self.assertFalse(coco_evaluator._image_ids)
 
   def testGetOneMAPWithMatchingGroundtruthAndDetectionsIsAnnotated(self):
@@ -397,8 +397,8 @@ class CocoEvaluationPyFuncTest(tf.test.TestCase):
     self.assertAlmostEqual(metrics['DetectionBoxes_Recall/AR@100 (medium)'],
                            1.0)
     self.assertAlmostEqual(metrics['DetectionBoxes_Recall/AR@100 (small)'], 1.0)
-    self.assertFalse(coco_evaluator._groundtruth_list)
-    self.assertFalse(coco_evaluator._detection_boxes_list)
+    self.assertFalse(coco_evaluator._box_evaluation.num_groundtruth_boxes)
+    self.assertFalse(coco_evaluator._box_evaluation.num_detection_boxes)
     self.assertFalse(coco_evaluator._image_ids)
 
   def testGetOneMAPWithMatchingGroundtruthAndDetectionsPadded(self):
@@ -493,8 +493,8 @@ class CocoEvaluationPyFuncTest(tf.test.TestCase):
     self.assertAlmostEqual(metrics['DetectionBoxes_Recall/AR@100 (medium)'],
                            1.0)
     self.assertAlmostEqual(metrics['DetectionBoxes_Recall/AR@100 (small)'], 1.0)
-    self.assertFalse(coco_evaluator._groundtruth_list)
-    self.assertFalse(coco_evaluator._detection_boxes_list)
+    self.assertFalse(coco_evaluator._box_evaluation.num_groundtruth_boxes)
+    self.assertFalse(coco_evaluator._box_evaluation.num_detection_boxes)
     self.assertFalse(coco_evaluator._image_ids)
 
   def testGetOneMAPWithMatchingGroundtruthAndDetectionsBatched(self):
@@ -555,8 +555,8 @@ class CocoEvaluationPyFuncTest(tf.test.TestCase):
     self.assertAlmostEqual(metrics['DetectionBoxes_Recall/AR@100 (medium)'],
                            1.0)
     self.assertAlmostEqual(metrics['DetectionBoxes_Recall/AR@100 (small)'], 1.0)
-    self.assertFalse(coco_evaluator._groundtruth_list)
-    self.assertFalse(coco_evaluator._detection_boxes_list)
+    self.assertFalse(coco_evaluator._box_evaluation.num_groundtruth_boxes)
+    self.assertFalse(coco_evaluator._box_evaluation.num_detection_boxes)
     self.assertFalse(coco_evaluator._image_ids)
 
   def testGetOneMAPWithMatchingGroundtruthAndDetectionsPaddedBatches(self):
@@ -621,8 +621,8 @@ class CocoEvaluationPyFuncTest(tf.test.TestCase):
           })
 
     # Check the number of bounding boxes added.
-    self.assertEqual(len(coco_evaluator._groundtruth_list), 4)
-    self.assertEqual(len(coco_evaluator._detection_boxes_list), 5)
+    self.assertEqual(coco_evaluator._box_evaluation.num_groundtruth_boxes, 4)
+    self.assertEqual(coco_evaluator._box_evaluation.num_detection_boxes, 5)
 
     metrics = {}
     for key, (value_op, _) in eval_metric_ops.iteritems():
@@ -642,8 +642,8 @@ class CocoEvaluationPyFuncTest(tf.test.TestCase):
     self.assertAlmostEqual(metrics['DetectionBoxes_Recall/AR@100 (medium)'],
                            1.0)
     self.assertAlmostEqual(metrics['DetectionBoxes_Recall/AR@100 (small)'], 1.0)
-    self.assertFalse(coco_evaluator._groundtruth_list)
-    self.assertFalse(coco_evaluator._detection_boxes_list)
+    self.assertFalse(coco_evaluator._box_evaluation.num_groundtruth_boxes)
+    self.assertFalse(coco_evaluator._box_evaluation.num_detection_boxes)
     self.assertFalse(coco_evaluator._image_ids)
 
 
@@ -0,0 +1,320 @@
+# Copyright 2018 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+r"""Columnar on-disk store for per-image detection results and groundtruth.
+
+Offline evaluation tools used to re-parse tf.Examples or CSV files each time
+they ran. This module stores the parsed per-image numpy arrays once, so that
+evaluations with different settings can reuse them without parsing.
+
+A store is a directory with one column per field:
+  <field>.bin          values of all images concatenated along axis 0, as raw
+                       bytes that are memory-mapped when reading.
+  <field>.offsets.npy  int64 array of shape [num_images + 1]; the values of
+                       image i are rows offsets[i]:offsets[i + 1].
+  <field>.present.npy  bool array of shape [num_images], False for images
+                       where the field was None.
+  keys.npy             the image keys (e.g. source ids).
+  manifest.json        number of images, dtype/shape of every field and
+                       optional metadata, e.g. describing the inputs.
+
+Example usage:
+  with columnar_store.ColumnarStoreWriter(store_dir) as writer:
+    for key, result_dict in results:
+      writer.add(key, result_dict)
+
+  columnar_store.feed_evaluator(evaluator, [store_dir])
+  metrics = evaluator.evaluate()
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+import os
+
+import numpy as np
+
+_MANIFEST = 'manifest.json'
+_KEYS = 'keys.npy'
+
+
+def _column_paths(store_dir, field):
+  prefix = os.path.join(store_dir, field)
+  return prefix + '.bin', prefix + '.offsets.npy', prefix + '.present.npy'
+
+
+def _to_text(key):
+  if isinstance(key, bytes):
+    return key.decode('utf-8')
+  return key
+
+
+class _ColumnWriter(object):
+  """Appends the values of one field to its data file."""
+
+  def __init__(self, store_dir, field, first_value, num_previous_images):
+    value = np.asarray(first_value)
+    self.dtype = value.dtype
+    self.shape = value.shape[1:]
+    self._field = field
+    data_path, self._offsets_path, self._present_path = _column_paths(
+        store_dir, field)
+    self._file = open(data_path, 'wb')
+    self._offsets = [0] * (num_previous_images + 1)
+    self._present = [False] * num_previous_images
+
+  def append(self, value):
+    """Appends the values of the next image, or marks them absent if None."""
+    if value is None:
+      self._offsets.append(self._offsets[-1])
+      self._present.append(False)
+      return
+    value = np.asarray(value)
+    if value.shape[1:] != self.shape:
+      raise ValueError('Field {} has shape {} but was first written with '
+                       'shape {}.'.format(self._field, value.shape[1:],
+                                          self.shape))
+    # Empty arrays often get numpy's default float dtype, but hold no values
+    # that could be cast wrongly.
+    if value.size and not np.can_cast(value.dtype, self.dtype, 'same_kind'):
+      raise ValueError('Field {} has dtype {} but was first written with '
+                       'dtype {}.'.format(self._field, value.dtype,
+                                          self.dtype))
+    value = np.ascontiguousarray(value, dtype=self.dtype)
+    self._file.write(value.tobytes())
+    self._offsets.append(self._offsets[-1] + value.shape[0])
+    self._present.append(True)
+
+  def close(self):
+    self._file.close()
+    np.save(self._offsets_path, np.array(self._offsets, dtype=np.int64))
+    np.save(self._present_path, np.array(self._present, dtype=bool))
+
+
+class ColumnarStoreWriter(object):
+  """Writes per-image dictionaries of numpy arrays to a columnar store.
+
+  Every value is an array whose first dimension indexes the boxes (or labels)
+  of the image; scalars are not supported. Fields may be None or missing for
+  some images.
+  """
+
+  def __init__(self, store_dir, metadata=None):
+    """Constructor.
+
+    Args:
+      store_dir: directory to write the store to. Created if needed. A store
+        already there is overwritten.
+      metadata: optional JSON serializable object saved in the manifest, e.g.
+        to tell whether the store is up to date with the files it was built
+        from.
+    """
+    if not os.path.isdir(store_dir):
+      os.makedirs(store_dir)
+    manifest_path = os.path.join(store_dir, _MANIFEST)
+    if os.path.isfile(manifest_path):
+      # The columns are overwritten, so the old store is no longer complete.
+      os.remove(manifest_path)
+    self._store_dir = store_dir
+    self._metadata = metadata
+    self._keys = []
+    self._columns = {}
+
+  @property
+  def num_images(self):
+    return len(self._keys)
+
+  def add(self, key, result_dict, skip_fields=()):
+    """Adds the arrays of one image.
+
+    Args:
+      key: image key, a string.
+      result_dict: a dictionary from field name to numpy array or None.
+      skip_fields: names of fields not to store, e.g. the image key itself.
+
+    Raises:
+      ValueError: if a field does not have the shape it was first written with,
+        or has a dtype that cannot be cast to it without changing its kind.
+    """
+    num_previous_images = len(self._keys)
+    for field, value in result_dict.items():
+      if field in skip_fields:
+        continue
+      if field not in self._columns:
+        if value is None:
+          continue
+        self._columns[field] = _ColumnWriter(self._store_dir, field, value,
+                                             num_previous_images)
+      self._columns[field].append(value)
+    for field, column in self._columns.items():
+      if field not in result_dict or field in skip_fields:
+        column.append(None)
+    self._keys.append(_to_text(key))
+
+  def close(self):
+    """Flushes all columns and writes the manifest."""
+    manifest = {
+        'num_images': len(self._keys),
+        'fields': {},
+        'metadata': self._metadata
+    }
+    for field, column in self._columns.items():
+      column.close()
+      manifest['fields'][field] = {
+          'dtype': column.dtype.str,
+          'shape': list(column.shape)
+      }
+    np.save(os.path.join(self._store_dir, _KEYS),
+            np.array(self._keys, dtype=np.dtype('U')))
+    with open(os.path.join(self._store_dir, _MANIFEST), 'w') as fid:
+      json.dump(manifest, fid)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, unused_value, unused_traceback):
+    if exc_type is None:
+      self.close()
+    else:
+      # Without a manifest the partial store is not picked up by readers.
+      for column in self._columns.values():
+        column.close()
+
+
+class ColumnarStoreReader(object):
+  """Reads a store written by ColumnarStoreWriter.
+
+  Columns are memory-mapped, so opening a store is cheap and the arrays
+  returned for an image are views into the mapped files.
+  """
+
+  def __init__(self, store_dir, mmap=True):
+    """Constructor.
+
+    Args:
+      store_dir: directory of the store.
+      mmap: whether to memory-map the columns instead of reading them.
+    """
+    with open(os.path.join(store_dir, _MANIFEST)) as fid:
+      manifest = json.load(fid)
+    self.num_images = manifest['num_images']
+    self.metadata = manifest.get('metadata')
+    self.keys = np.load(os.path.join(store_dir, _KEYS))
+    self._columns = {}
+    for field, spec in manifest['fields'].items():
+      data_path, offsets_path, present_path = _column_paths(store_dir, field)
+      dtype = np.dtype(str(spec['dtype']))
+      offsets = np.load(offsets_path)
+      shape = (int(offsets[-1]),) + tuple(spec['shape'])
+      if not offsets[-1]:
+        values = np.zeros(shape, dtype=dtype)
+      elif mmap:
+        values = np.memmap(data_path, dtype=dtype, mode='r', shape=shape)
+      else:
+        values = np.fromfile(data_path, dtype=dtype).reshape(shape)
+      self._columns[field] = (values, offsets, np.load(present_path))
+
+  @property
+  def field_names(self):
+    return sorted(self._columns)
+
+  def column(self, field):
+    """Returns (values, offsets, present) of a field for all images."""
+    return self._columns[field]
+
+  def get(self, index):
+    """Returns the dictionary of arrays of an image.
+
+    Args:
+      index: index of the image in the store.
+
+    Returns:
+      A dictionary from field name to numpy array, with None for fields that
+      were absent for this image.
+    """
+    result = {}
+    for field, (values, offsets, present) in self._columns.items():
+      if present[index]:
+        result[field] = values[offsets[index]:offsets[index + 1]]
+      else:
+        result[field] = None
+    return result
+
+  def __len__(self):
+    return self.num_images
+
+  def __iter__(self):
+    """Yields (key, dictionary of arrays) for every image."""
+    for index in range(self.num_images):
+      yield self.keys[index], self.get(index)
+
+
+def is_store(path):
+  """Returns whether path is a complete store written by ColumnarStoreWriter."""
+  return os.path.isfile(os.path.join(path, _MANIFEST))
+
+
+def read_metadata(path):
+  """Returns the metadata of the store at path, or None if it has none."""
+  if not is_store(path):
+    return None
+  with open(os.path.join(path, _MANIFEST)) as fid:
+    return json.load(fid).get('metadata')
+
+
+def list_stores(path):
+  """Returns the stores at path: path itself or its subdirectories that are.
+
+  infer_detections writes one store per worker into subdirectories of the
+  requested directory, so a directory of stores is read as their union.
+
+  Args:
+    path: a store directory or a directory containing store directories.
+
+  Returns:
+    A sorted list of store directories, empty if there are none.
+  """
+  if is_store(path):
+    return [path]
+  if not os.path.isdir(path):
+    return []
+  return sorted(
+      os.path.join(path, name) for name in os.listdir(path)
+      if is_store(os.path.join(path, name)))
+
+
+def feed_evaluator(evaluator, store_dirs, add_groundtruth=True,
+                   add_detections=True):
+  """Adds all images of the given stores to a DetectionEvaluator.
+
+  Args:
+    evaluator: an object_detection_evaluation.DetectionEvaluator.
+    store_dirs: list of store directories.
+    add_groundtruth: whether to call add_single_ground_truth_image_info.
+    add_detections: whether to call add_single_detected_image_info.
+
+  Returns:
+    The number of images added.
+  """
+  num_images = 0
+  for store_dir in store_dirs:
+    for key, result_dict in ColumnarStoreReader(store_dir):
+      if add_groundtruth:
+        evaluator.add_single_ground_truth_image_info(key, result_dict)
+      if add_detections:
+        evaluator.add_single_detected_image_info(key, result_dict)
+      num_images += 1
+  return num_images
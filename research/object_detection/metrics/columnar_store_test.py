@@ -0,0 +1,150 @@
+# Copyright 2018 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for tensorflow_models.object_detection.metrics.columnar_store."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+import numpy as np
+import tensorflow as tf
+
+from object_detection.core import standard_fields
+from object_detection.metrics import columnar_store
+
+
+class _RecordingEvaluator(object):
+
+  def __init__(self):
+    self.groundtruth = {}
+    self.detections = {}
+
+  def add_single_ground_truth_image_info(self, image_id, groundtruth_dict):
+    self.groundtruth[image_id] = groundtruth_dict
+
+  def add_single_detected_image_info(self, image_id, detections_dict):
+    self.detections[image_id] = detections_dict
+
+
+class ColumnarStoreTest(tf.test.TestCase):
+
+  def _write_store(self, store_dir):
+    input_fields = standard_fields.InputDataFields
+    detection_fields = standard_fields.DetectionResultFields
+    with columnar_store.ColumnarStoreWriter(store_dir) as writer:
+      writer.add('image1', {
+          detection_fields.key: 'image1',
+          input_fields.groundtruth_boxes: np.array([[0., 0., 1., 1.]]),
+          input_fields.groundtruth_classes: np.array([1]),
+          input_fields.groundtruth_difficult: None,
+          detection_fields.detection_scores: np.array([.5, .25]),
+      }, skip_fields=[detection_fields.key])
+      writer.add(b'image2', {
+          input_fields.groundtruth_boxes: np.zeros([0, 4]),
+          input_fields.groundtruth_classes: np.zeros([0], dtype=np.int64),
+          input_fields.groundtruth_difficult: np.array([1, 0]),
+      })
+
+  def testRoundTrip(self):
+    input_fields = standard_fields.InputDataFields
+    detection_fields = standard_fields.DetectionResultFields
+    store_dir = os.path.join(self.get_temp_dir(), 'store')
+    self._write_store(store_dir)
+    self.assertTrue(columnar_store.is_store(store_dir))
+
+    reader = columnar_store.ColumnarStoreReader(store_dir)
+    self.assertEqual(len(reader), 2)
+    self.assertEqual(list(reader.keys), ['image1', 'image2'])
+    self.assertEqual(reader.field_names, sorted([
+        input_fields.groundtruth_boxes, input_fields.groundtruth_classes,
+        input_fields.groundtruth_difficult, detection_fields.detection_scores
+    ]))
+    image1 = reader.get(0)
+    self.assertAllEqual(image1[input_fields.groundtruth_boxes],
+                        [[0., 0., 1., 1.]])
+    self.assertAllEqual(image1[detection_fields.detection_scores], [.5, .25])
+    self.assertIsNone(image1[input_fields.groundtruth_difficult])
+    image2 = reader.get(1)
+    self.assertEqual(image2[input_fields.groundtruth_boxes].shape, (0, 4))
+    self.assertAllEqual(image2[input_fields.groundtruth_difficult], [1, 0])
+    self.assertIsNone(image2[detection_fields.detection_scores])
+
+  def testFeedEvaluatorReadsAllStores(self):
+    input_fields = standard_fields.InputDataFields
+    base_dir = os.path.join(self.get_temp_dir(), 'stores')
+    self._write_store(os.path.join(base_dir, '00000-of-00002'))
+    with columnar_store.ColumnarStoreWriter(
+        os.path.join(base_dir, '00001-of-00002')) as writer:
+      writer.add('image3', {input_fields.groundtruth_classes: np.array([2])})
+
+    evaluator = _RecordingEvaluator()
+    store_dirs = columnar_store.list_stores(base_dir)
+    self.assertEqual(len(store_dirs), 2)
+    num_images = columnar_store.feed_evaluator(evaluator, store_dirs,
+                                               add_detections=False)
+    self.assertEqual(num_images, 3)
+    self.assertEqual(sorted(evaluator.groundtruth),
+                     ['image1', 'image2', 'image3'])
+    self.assertFalse(evaluator.detections)
+    self.assertAllEqual(
+        evaluator.groundtruth['image3'][input_fields.groundtruth_classes], [2])
+
+  def testMetadata(self):
+    store_dir = os.path.join(self.get_temp_dir(), 'metadata')
+    self.assertIsNone(columnar_store.read_metadata(store_dir))
+    metadata = {'sources': [{'path': '/data/a.csv', 'size': 10}]}
+    with columnar_store.ColumnarStoreWriter(store_dir, metadata) as writer:
+      writer.add('image1', {'boxes': np.zeros([1, 4])})
+    self.assertEqual(columnar_store.read_metadata(store_dir), metadata)
+    self.assertEqual(
+        columnar_store.ColumnarStoreReader(store_dir).metadata, metadata)
+
+    # Rewriting the store invalidates it until the new one is complete.
+    writer = columnar_store.ColumnarStoreWriter(store_dir)
+    self.assertFalse(columnar_store.is_store(store_dir))
+    writer.close()
+    self.assertIsNone(columnar_store.read_metadata(store_dir))
+
+  def testFailedWriteIsNotAStore(self):
+    store_dir = os.path.join(self.get_temp_dir(), 'failed')
+    with self.assertRaises(ValueError):
+      with columnar_store.ColumnarStoreWriter(store_dir) as writer:
+        writer.add('image1', {'boxes': np.zeros([1, 4])})
+        writer.add('image2', {'boxes': np.zeros([1, 3])})
+    self.assertFalse(columnar_store.is_store(store_dir))
+    self.assertEqual(columnar_store.list_stores(store_dir), [])
+
+  def testMixedDtypes(self):
+    store_dir = os.path.join(self.get_temp_dir(), 'mixed_dtypes')
+    with columnar_store.ColumnarStoreWriter(store_dir) as writer:
+      writer.add('image1', {'classes': np.array([1, 2], dtype=np.int32),
+                            'scores': np.array([.5], dtype=np.float32)})
+      writer.add('image2', {'classes': np.array([3], dtype=np.int64),
+                            'scores': np.array([.25], dtype=np.float64)})
+      writer.add('image3', {'classes': np.zeros([0]),
+                            'scores': np.array([1], dtype=np.int64)})
+      with self.assertRaisesRegexp(ValueError, 'dtype'):
+        writer.add('image4', {'classes': np.array([.5])})
+    reader = columnar_store.ColumnarStoreReader(store_dir)
+    self.assertEqual(reader.column('classes')[0].dtype, np.int32)
+    self.assertEqual(reader.column('scores')[0].dtype, np.float32)
+    self.assertAllEqual(reader.get(1)['classes'], [3])
+    self.assertAllEqual(reader.get(2)['scores'], [1.])
+
+
+if __name__ == '__main__':
+  tf.test.main()
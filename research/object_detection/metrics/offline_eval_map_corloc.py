@@ -30,14 +30,24 @@ Example usage:
         --eval_dir=path/to/eval_dir \
         --eval_config_path=path/to/evaluation/configuration/file \
         --input_config_path=path/to/input/configuration/file
+
+If --columnar_store_dir is given, the parsed groundtruth and detections are
+cached there as a columnar store (see metrics/columnar_store.py) the first time
+and read from it in later runs, so that repeated evaluations do not parse the
+tf_records again. The cache is rebuilt when the input config or the size or
+modification time of an input file changed. infer_detections
+--output_columnar_dir writes such stores directly; they carry no description
+of their inputs and are always used.
 """
 import csv
 import os
 import re
 import tensorflow as tf
+from google.protobuf import text_format
 
 from object_detection.core import standard_fields
 from object_detection.legacy import evaluator
+from object_detection.metrics import columnar_store
 from object_detection.metrics import tf_example_parser
 from object_detection.utils import config_util
 from object_detection.utils import label_map_util
@@ -50,6 +60,10 @@ flags.DEFINE_string('eval_config_path', None,
                     'Path to an eval_pb2.EvalConfig config file.')
 flags.DEFINE_string('input_config_path', None,
                     'Path to an eval_pb2.InputConfig config file.')
+flags.DEFINE_string('columnar_store_dir', None,
+                    'Optional directory of a columnar store with the parsed '
+                    'input. Read instead of the input tf_records if it exists, '
+                    'written while reading them otherwise.')
 
 FLAGS = flags.FLAGS
 
@@ -73,7 +87,44 @@ def _generate_filenames(filenames):
   return result
 
 
-def read_data_and_evaluate(input_config, eval_config):
+def _describe_inputs(input_config, input_paths):
+  """Returns the input config and the path, size and mtime of input files."""
+  sources = []
+  for path in input_paths:
+    stat = tf.gfile.Stat(path)
+    sources.append({
+        'path': path,
+        'size': stat.length,
+        'mtime': stat.mtime_nsec
+    })
+  return {
+      'input_config': text_format.MessageToString(input_config),
+      'sources': sources
+  }
+
+
+def _read_stores(store_dir, inputs):
+  """Returns the stores in store_dir that can be used for the given inputs.
+
+  Args:
+    store_dir: directory of a columnar store or of a set of stores.
+    inputs: the description of the inputs returned by _describe_inputs.
+
+  Returns:
+    The list of store directories, empty if there are none or if they were
+    built from other inputs.
+  """
+  store_dirs = columnar_store.list_stores(store_dir)
+  for path in store_dirs:
+    metadata = columnar_store.read_metadata(path)
+    # Stores written by infer_detections do not describe their inputs.
+    if metadata is not None and metadata != inputs:
+      tf.logging.info('Columnar store {0} is out of date.'.format(path))
+      return []
+  return store_dirs
+
+
+def read_data_and_evaluate(input_config, eval_config, columnar_store_dir=None):
   """Reads pre-computed object detections and groundtruth from tf_record.
 
   Args:
@@ -81,6 +132,10 @@ def read_data_and_evaluate(input_config, eval_config):
       object_detection.protos.InputReader.
     eval_config: evaluation config proto of type
       object_detection.protos.EvalConfig.
+    columnar_store_dir: optional directory of a columnar store. If it holds
+      stores built from the current input_config and input files, they are
+      evaluated instead of the input tf_records; otherwise the parsed
+      tf_records are also written to it.
 
   Returns:
     Evaluated detections metrics.
@@ -89,7 +144,8 @@ def read_data_and_evaluate(input_config, eval_config):
     ValueError: if input_reader type is not supported or metric type is unknown.
   """
   if input_config.WhichOneof('input_reader') == 'tf_record_input_reader':
-    input_paths = input_config.tf_record_input_reader.input_path
+    input_paths = _generate_filenames(
+        input_config.tf_record_input_reader.input_path)
 
     categories = label_map_util.create_categories_from_labelmap(
         input_config.label_map_path)
@@ -99,9 +155,21 @@ def read_data_and_evaluate(input_config, eval_config):
     # Support a single evaluator
     object_detection_evaluator = object_detection_evaluators[0]
 
+    if columnar_store_dir:
+      inputs = _describe_inputs(input_config, input_paths)
+      store_dirs = _read_stores(columnar_store_dir, inputs)
+      if store_dirs:
+        tf.logging.info('Reading columnar stores: {0}'.format(store_dirs))
+        columnar_store.feed_evaluator(object_detection_evaluator, store_dirs)
+        return object_detection_evaluator.evaluate()
+      store_writer = columnar_store.ColumnarStoreWriter(columnar_store_dir,
+                                                        inputs)
+    else:
+      store_writer = None
+
     skipped_images = 0
     processed_images = 0
-    for input_path in _generate_filenames(input_paths):
+    for input_path in input_paths:
       tf.logging.info('Processing file: {0}'.format(input_path))
 
       record_iterator = tf.python_io.tf_record_iterator(path=input_path)
@@ -123,10 +191,17 @@ def read_data_and_evaluate(input_config, eval_config):
           object_detection_evaluator.add_single_detected_image_info(
               decoded_dict[standard_fields.DetectionResultFields.key],
               decoded_dict)
+          if store_writer:
+            store_writer.add(
+                decoded_dict[standard_fields.DetectionResultFields.key],
+                decoded_dict,
+                skip_fields=[standard_fields.DetectionResultFields.key])
         else:
           skipped_images += 1
           tf.logging.info('Skipped images: {0}'.format(skipped_images))
 
+    if store_writer:
+      store_writer.close()
     return object_detection_evaluator.evaluate()
 
   raise ValueError('Unsupported input_reader_config.')
@@ -161,7 +236,8 @@ def main(argv):
   eval_config = configs['eval_config']
   input_config = configs['eval_input_config']
 
-  metrics = read_data_and_evaluate(input_config, eval_config)
+  metrics = read_data_and_evaluate(input_config, eval_config,
+                                   FLAGS.columnar_store_dir)
 
   # Save metrics
   write_metrics(metrics, FLAGS.eval_dir)
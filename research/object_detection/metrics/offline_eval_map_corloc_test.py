@@ -14,9 +14,14 @@
 # ==============================================================================
 """Tests for utilities in offline_eval_map_corloc binary."""
 
+import os
+
+import numpy as np
 import tensorflow as tf
 
+from object_detection.metrics import columnar_store
 from object_detection.metrics import offline_eval_map_corloc as offline_eval
+from object_detection.protos import input_reader_pb2
 
 
 class OfflineEvalMapCorlocTest(tf.test.TestCase):
@@ -53,6 +58,39 @@ class OfflineEvalMapCorlocTest(tf.test.TestCase):
         '/path/to/-00001-of-00003.record', '/path/to/-00002-of-00003.record'
     ])
 
+  def test_readStoresChecksInputs(self):
+    input_path = os.path.join(self.get_temp_dir(), 'input.record')
+    with tf.gfile.Open(input_path, 'w') as f:
+      f.write('records')
+    input_config = input_reader_pb2.InputReader()
+    input_config.tf_record_input_reader.input_path.append(input_path)
+    inputs = offline_eval._describe_inputs(input_config, [input_path])
+
+    store_dir = os.path.join(self.get_temp_dir(), 'store')
+    self.assertEqual(offline_eval._read_stores(store_dir, inputs), [])
+    with columnar_store.ColumnarStoreWriter(store_dir, inputs) as writer:
+      writer.add('image1', {'boxes': np.zeros([1, 4])})
+    self.assertEqual(offline_eval._read_stores(store_dir, inputs), [store_dir])
+
+    input_config.label_map_path = 'label_map.pbtxt'
+    self.assertEqual(offline_eval._read_stores(
+        store_dir, offline_eval._describe_inputs(input_config, [input_path])),
+                     [])
+    with tf.gfile.Open(input_path, 'w') as f:
+      f.write('more records')
+    self.assertEqual(offline_eval._read_stores(
+        store_dir, offline_eval._describe_inputs(input_config, [input_path])),
+                     [])
+
+  def test_readStoresUsesStoresWithoutMetadata(self):
+    store_dir = os.path.join(self.get_temp_dir(), 'inferred')
+    with columnar_store.ColumnarStoreWriter(
+        os.path.join(store_dir, '0')) as writer:
+      writer.add('image1', {'boxes': np.zeros([1, 4])})
+    self.assertEqual(
+        offline_eval._read_stores(store_dir, {'sources': []}),
+        [os.path.join(store_dir, '0')])
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -27,6 +27,11 @@ can be downloaded from the Open Images Challenge website:
 https://storage.googleapis.com/openimages/web/challenge.html
 The format of the input csv and the metrics itself are described on the
 challenge website.
+
+With --columnar_cache_dir, the per-image groundtruth and predictions built from
+the CSVs are saved as columnar stores (see metrics/columnar_store.py) the first
+time, and later runs read them instead of the CSVs. A store is rebuilt when the
+path, size or modification time of one of its input files changed.
 """
 
 from __future__ import absolute_import
@@ -34,9 +39,12 @@ from __future__ import division
 from __future__ import print_function
 
 import argparse
+import os
+
 import pandas as pd
 from google.protobuf import text_format
 
+from object_detection.metrics import columnar_store
 from object_detection.metrics import io_utils
 from object_detection.metrics import oid_od_challenge_evaluation_utils as utils
 from object_detection.protos import string_int_label_map_pb2
@@ -66,32 +74,88 @@ def _load_labelmap(labelmap_path):
   return labelmap_dict, categories
 
 
-def main(parsed_args):
+def _read_groundtruth(parsed_args, class_label_map):
+  """Yields (image_id, groundtruth dictionary) from the annotation CSVs."""
   all_box_annotations = pd.read_csv(parsed_args.input_annotations_boxes)
   all_label_annotations = pd.read_csv(parsed_args.input_annotations_labels)
   all_label_annotations.rename(
       columns={'Confidence': 'ConfidenceImageLabel'}, inplace=True)
   all_annotations = pd.concat([all_box_annotations, all_label_annotations])
 
-  class_label_map, categories = _load_labelmap(parsed_args.input_class_labelmap)
-  challenge_evaluator = (
-      object_detection_evaluation.OpenImagesDetectionChallengeEvaluator(
-          categories))
-
   for _, groundtruth in enumerate(all_annotations.groupby('ImageID')):
     image_id, image_groundtruth = groundtruth
-    groundtruth_dictionary = utils.build_groundtruth_boxes_dictionary(
+    yield image_id, utils.build_groundtruth_boxes_dictionary(
         image_groundtruth, class_label_map)
-    challenge_evaluator.add_single_ground_truth_image_info(
-        image_id, groundtruth_dictionary)
 
+
+def _read_predictions(parsed_args, class_label_map):
+  """Yields (image_id, predictions dictionary) from the predictions CSV."""
   all_predictions = pd.read_csv(parsed_args.input_predictions)
   for _, prediction_data in enumerate(all_predictions.groupby('ImageID')):
     image_id, image_predictions = prediction_data
-    prediction_dictionary = utils.build_predictions_dictionary(
+    yield image_id, utils.build_predictions_dictionary(
         image_predictions, class_label_map)
-    challenge_evaluator.add_single_detected_image_info(image_id,
-                                                       prediction_dictionary)
+
+
+def _describe_sources(paths):
+  """Returns the absolute path, size and modification time of input files."""
+  sources = []
+  for path in paths:
+    stat = os.stat(path)
+    sources.append({
+        'path': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime
+    })
+  return {'sources': sources}
+
+
+def _add_to_evaluator(add_fn, image_dictionaries, store_dir, source_paths):
+  """Adds images to an evaluator, through a columnar store if requested.
+
+  Args:
+    add_fn: the evaluator method to call with (image_id, dictionary).
+    image_dictionaries: callable returning an iterable of (image_id,
+      dictionary) built from the CSVs.
+    store_dir: columnar store directory or None. If the store exists and was
+      built from the current source_paths, it is read instead of calling
+      image_dictionaries; otherwise it is (re)written.
+    source_paths: paths of the files the dictionaries are built from.
+  """
+  if not store_dir:
+    for image_id, dictionary in image_dictionaries():
+      add_fn(image_id, dictionary)
+    return
+  sources = _describe_sources(source_paths)
+  if columnar_store.read_metadata(store_dir) == sources:
+    for image_id, dictionary in columnar_store.ColumnarStoreReader(store_dir):
+      add_fn(image_id, dictionary)
+    return
+  with columnar_store.ColumnarStoreWriter(store_dir, sources) as writer:
+    for image_id, dictionary in image_dictionaries():
+      add_fn(image_id, dictionary)
+      writer.add(image_id, dictionary)
+
+
+def main(parsed_args):
+  class_label_map, categories = _load_labelmap(parsed_args.input_class_labelmap)
+  challenge_evaluator = (
+      object_detection_evaluation.OpenImagesDetectionChallengeEvaluator(
+          categories))
+
+  cache_dir = parsed_args.columnar_cache_dir
+  _add_to_evaluator(
+      challenge_evaluator.add_single_ground_truth_image_info,
+      lambda: _read_groundtruth(parsed_args, class_label_map),
+      os.path.join(cache_dir, 'groundtruth') if cache_dir else None,
+      [parsed_args.input_annotations_boxes,
+       parsed_args.input_annotations_labels,
+       parsed_args.input_class_labelmap])
+  _add_to_evaluator(
+      challenge_evaluator.add_single_detected_image_info,
+      lambda: _read_predictions(parsed_args, class_label_map),
+      os.path.join(cache_dir, 'predictions') if cache_dir else None,
+      [parsed_args.input_predictions, parsed_args.input_class_labelmap])
 
   metrics = challenge_evaluator.evaluate()
 
@@ -123,6 +187,11 @@ if __name__ == '__main__':
       help='Open Images Challenge labelmap.')
   parser.add_argument(
       '--output_metrics', required=True, help='Output file with csv metrics')
+  parser.add_argument(
+      '--columnar_cache_dir',
+      default=None,
+      help="""Optional directory where the parsed groundtruth and predictions
+      are cached. They are parsed again when an input file changes.""")
 
   args = parser.parse_args()
   main(args)
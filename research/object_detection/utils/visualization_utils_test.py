@@ -85,6 +85,40 @@ class VisualizationUtilsTest(tf.test.TestCase):
     self.assertEqual(width_original, width_final)
     self.assertEqual(height_original, height_final)
 
+  def test_draw_bounding_box_on_image_array_numpy(self):
+    test_image = np.zeros([100, 200, 3], dtype=np.uint8)
+    visualization_utils.draw_bounding_box_on_image_array_numpy(
+        test_image, 20, 40, 80, 160, color='Red', thickness=2,
+        display_str_list=['dog: 90%'], use_normalized_coordinates=False)
+    red = [255, 0, 0]
+    self.assertAllEqual(test_image[50, 39], red)
+    self.assertAllEqual(test_image[50, 160], red)
+    self.assertAllEqual(test_image[79, 100], red)
+    self.assertAllEqual(test_image[50, 100], [0, 0, 0])
+    # The label is drawn just above the top edge, starting at its left end.
+    self.assertAllEqual(test_image[18, 40], red)
+    self.assertAllEqual(test_image[0, 199], [0, 0, 0])
+
+  def test_visualize_boxes_and_labels_on_image_batch(self):
+    images = np.stack([self.create_colorful_test_image()] * 3)
+    expected_images = images.copy()
+    boxes = np.array([[[0.25, 0.4, 0.75, 0.6], [0.1, 0.1, 0.9, 0.9]]] * 3)
+    classes = np.array([[1, 2]] * 3)
+    scores = np.array([[0.9, 0.8]] * 3)
+    category_index = {1: {'id': 1, 'name': 'dog'},
+                      2: {'id': 2, 'name': 'cat'}}
+    for image, image_boxes, image_classes, image_scores in zip(
+        expected_images, boxes, classes, scores):
+      visualization_utils.visualize_boxes_and_labels_on_image_array(
+          image, image_boxes, image_classes, image_scores, category_index,
+          use_normalized_coordinates=True, use_numpy_renderer=True)
+
+    visualization_utils.visualize_boxes_and_labels_on_image_batch(
+        images, boxes, classes, scores, category_index, num_threads=2,
+        use_normalized_coordinates=True)
+    self.assertAllEqual(images, expected_images)
+    self.assertFalse(np.all(images == self.create_colorful_test_image()))
+
   def test_draw_bounding_boxes_on_image(self):
     test_image = self.create_colorful_test_image()
     test_image = Image.fromarray(test_image)
@@ -210,6 +244,17 @@ class VisualizationUtilsTest(tf.test.TestCase):
                                                  color='Blue', alpha=.5)
     self.assertAllEqual(test_image, expected_result)
 
+  def test_draw_mask_on_image_array_matches_pil_composite(self):
+    test_image = np.random.randint(0, 256, [20, 30, 3]).astype(np.uint8)
+    mask = np.random.randint(0, 2, [20, 30]).astype(np.uint8)
+    solid_color = Image.new('RGBA', (30, 20), 'Chartreuse')
+    pil_mask = Image.fromarray(np.uint8(255.0 * 0.4 * mask)).convert('L')
+    expected_result = np.array(Image.composite(
+        solid_color, Image.fromarray(test_image), pil_mask).convert('RGB'))
+    visualization_utils.draw_mask_on_image_array(test_image, mask,
+                                                 color='Chartreuse', alpha=.4)
+    self.assertAllEqual(test_image, expected_result)
+
   def test_add_cdf_image_summary(self):
     values = [0.1, 0.2, 0.3, 0.4, 0.42, 0.44, 0.46, 0.48, 0.50]
     visualization_utils.add_cdf_image_summary(values, 'PositiveAnchorLoss')
@@ -81,14 +81,20 @@ Note that the length of xmin is identical to the length of xmax, ymin and ymax
 for each example.
 
 Running this script using 16 threads may take around ~2.5 hours on a HP Z420.
+Decoding is bound by the Python GIL when using threads; set --num_processes to
+convert the shards in a pool of processes instead, each with its own
+ImageCoder. The shard layout only depends on --num_threads, so both modes write
+the same files. --max_image_side downscales large images during conversion.
 """
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
 from datetime import datetime
+import multiprocessing
 import os
 import random
+import struct
 import sys
 import threading
 
@@ -112,6 +118,14 @@ tf.app.flags.DEFINE_integer('validation_shards', 128,
 tf.app.flags.DEFINE_integer('num_threads', 8,
                             'Number of threads to preprocess the images.')
 
+tf.app.flags.DEFINE_integer('num_processes', 0,
+                            'If positive, number of processes to preprocess '
+                            'the images with instead of threads.')
+
+tf.app.flags.DEFINE_integer('max_image_side', 0,
+                            'If positive, images whose longer side exceeds it '
+                            'are downscaled to that size.')
+
 # The labels file contains a list of valid labels are held in this file.
 # Assumes that the file contains entries as such:
 #   n01440764
@@ -247,6 +261,15 @@ class ImageCoder(object):
     self._decode_jpeg_data = tf.placeholder(dtype=tf.string)
     self._decode_jpeg = tf.image.decode_jpeg(self._decode_jpeg_data, channels=3)
 
+    # Initializes function that resizes JPEG data.
+    self._resize_jpeg_data = tf.placeholder(dtype=tf.string)
+    self._resize_jpeg_size = tf.placeholder(dtype=tf.int32, shape=[2])
+    image = tf.image.decode_jpeg(self._resize_jpeg_data, channels=3)
+    image = tf.image.resize_images(image, self._resize_jpeg_size,
+                                   method=tf.image.ResizeMethod.AREA)
+    image = tf.saturate_cast(tf.round(image), tf.uint8)
+    self._resize_jpeg = tf.image.encode_jpeg(image, format='rgb', quality=100)
+
   def png_to_jpeg(self, image_data):
     return self._sess.run(self._png_to_jpeg,
                           feed_dict={self._png_data: image_data})
@@ -262,82 +285,196 @@ class ImageCoder(object):
     assert image.shape[2] == 3
     return image
 
+  def resize_jpeg(self, image_data, height, width):
+    return self._sess.run(self._resize_jpeg,
+                          feed_dict={self._resize_jpeg_data: image_data,
+                                     self._resize_jpeg_size: [height, width]})
+
 
-def _is_png(filename):
-  """Determine if a file contains a PNG format image.
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# JPEG start of frame markers, whose segment holds the image size and number of
+# color components. 0xC4, 0xC8 and 0xCC are other segments in the same range.
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - frozenset([0xC4, 0xC8, 0xCC])
+
+
+def _is_png(image_data):
+  """Determine if image data is a PNG format image.
 
   Args:
-    filename: string, path of the image file.
+    image_data: bytes, content of the image file.
 
   Returns:
     boolean indicating if the image is a PNG.
   """
-  # File list from:
-  # https://groups.google.com/forum/embed/?place=forum/torch7#!topic/torch7/fOSTXHIESSU
-  return 'n02105855_2933.JPEG' in filename
+  # 1 ImageNet image, n02105855_2933.JPEG, is a PNG.
+  return image_data[:len(_PNG_SIGNATURE)] == _PNG_SIGNATURE
 
 
-def _is_cmyk(filename):
-  """Determine if file contains a CMYK JPEG format image.
+def _read_jpeg_header(image_data):
+  """Reads the size and number of channels from the frame header of a JPEG.
 
   Args:
-    filename: string, path of the image file.
+    image_data: bytes, content of the image file.
 
   Returns:
-    boolean indicating if the image is a JPEG encoded with CMYK color space.
+    (height, width, channels) tuple, or None if image_data is not a JPEG or its
+    frame header could not be found.
   """
-  # File list from:
-  # https://github.com/cytsai/ilsvrc-cmyk-image-list
-  blacklist = ['n01739381_1309.JPEG', 'n02077923_14822.JPEG',
-               'n02447366_23489.JPEG', 'n02492035_15739.JPEG',
-               'n02747177_10752.JPEG', 'n03018349_4028.JPEG',
-               'n03062245_4620.JPEG', 'n03347037_9675.JPEG',
-               'n03467068_12171.JPEG', 'n03529860_11437.JPEG',
-               'n03544143_17228.JPEG', 'n03633091_5218.JPEG',
-               'n03710637_5125.JPEG', 'n03961711_5286.JPEG',
-               'n04033995_2932.JPEG', 'n04258138_17003.JPEG',
-               'n04264628_27969.JPEG', 'n04336792_7448.JPEG',
-               'n04371774_5854.JPEG', 'n04596742_4225.JPEG',
-               'n07583066_647.JPEG', 'n13037406_4650.JPEG']
-  return filename.split('/')[-1] in blacklist
-
-
-def _process_image(filename, coder):
+  image_data = bytearray(image_data)
+  if image_data[:2] != b'\xff\xd8':
+    return None
+  offset = 2
+  while offset + 4 <= len(image_data):
+    if image_data[offset] != 0xFF:
+      return None
+    marker = image_data[offset + 1]
+    if marker == 0xFF:
+      # Fill byte.
+      offset += 1
+      continue
+    if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+      # Markers without a segment.
+      offset += 2
+      continue
+    length, = struct.unpack('>H', image_data[offset + 2:offset + 4])
+    if marker in _JPEG_SOF_MARKERS:
+      if offset + 10 > len(image_data):
+        return None
+      height, width = struct.unpack('>HH', image_data[offset + 5:offset + 9])
+      if not height:
+        # The height is defined later in the stream by a DNL marker.
+        return None
+      return height, width, image_data[offset + 9]
+    offset += 2 + length
+  return None
+
+
+def _process_image(filename, coder, max_image_side=0):
   """Process a single image file.
 
+  PNG and CMYK JPEG images are detected from the image data and converted to
+  RGB JPEG. The image size is read from the JPEG header, so that images are
+  only decoded when they need to be converted.
+
   Args:
     filename: string, path to an image file e.g., '/path/to/example.JPG'.
     coder: instance of ImageCoder to provide TensorFlow image coding utils.
+    max_image_side: integer, if positive, images whose longer side exceeds it
+      are downscaled, keeping their aspect ratio, so that it does not.
   Returns:
     image_buffer: string, JPEG encoding of RGB image.
     height: integer, image height in pixels.
     width: integer, image width in pixels.
   """
   # Read the image file.
-  image_data = tf.gfile.FastGFile(filename, 'r').read()
+  image_data = tf.gfile.FastGFile(filename, 'rb').read()
 
   # Clean the dirty data.
-  if _is_png(filename):
-    # 1 image is a PNG.
+  if _is_png(image_data):
     print('Converting PNG to JPEG for %s' % filename)
     image_data = coder.png_to_jpeg(image_data)
-  elif _is_cmyk(filename):
-    # 22 JPEG images are in CMYK colorspace.
+  header = _read_jpeg_header(image_data)
+  if header is not None and header[2] == 4:
+    # 22 ImageNet JPEG images are in CMYK colorspace.
     print('Converting CMYK to RGB for %s' % filename)
     image_data = coder.cmyk_to_rgb(image_data)
+    header = _read_jpeg_header(image_data)
 
-  # Decode the RGB JPEG.
-  image = coder.decode_jpeg(image_data)
+  if header is None:
+    # Decode the RGB JPEG.
+    image = coder.decode_jpeg(image_data)
+    height, width = image.shape[:2]
+  else:
+    height, width = header[:2]
 
-  # Check that image converted to RGB
-  assert len(image.shape) == 3
-  height = image.shape[0]
-  width = image.shape[1]
-  assert image.shape[2] == 3
+  if max_image_side > 0 and max(height, width) > max_image_side:
+    scale = max_image_side / max(height, width)
+    height = max(1, int(round(height * scale)))
+    width = max(1, int(round(width * scale)))
+    image_data = coder.resize_jpeg(image_data, height, width)
 
   return image_data, height, width
 
 
+def _shard_ranges(num_files, num_batches, num_shards):
+  """Splits the images into shards.
+
+  The images are split into num_batches contiguous batches, each of which is
+  split into num_shards / num_batches shards.
+
+  Args:
+    num_files: integer number of images.
+    num_batches: integer number of batches, e.g. the number of threads.
+    num_shards: integer number of shards for this data set.
+
+  Returns:
+    List of num_shards pairs of integers [start, end) specifying the images of
+    each shard.
+  """
+  assert not num_shards % num_batches
+  num_shards_per_batch = int(num_shards / num_batches)
+  spacing = np.linspace(0, num_files, num_batches + 1).astype(int)
+  ranges = []
+  for i in xrange(num_batches):
+    shard_spacing = np.linspace(spacing[i], spacing[i + 1],
+                                num_shards_per_batch + 1).astype(int)
+    for s in xrange(num_shards_per_batch):
+      ranges.append((shard_spacing[s], shard_spacing[s + 1]))
+  return ranges
+
+
+def _write_shard(coder, name, shard, num_shards, filenames, synsets, labels,
+                 humans, bboxes, output_directory, max_image_side=0):
+  """Processes and saves the images of a shard as a TFRecord file.
+
+  Args:
+    coder: instance of ImageCoder to provide TensorFlow image coding utils.
+    name: string, unique identifier specifying the data set
+    shard: integer index of the shard.
+    num_shards: integer number of shards for this data set.
+    filenames: list of strings; paths to the image files of the shard.
+    synsets: list of strings; each string is a unique WordNet ID
+    labels: list of integer; each integer identifies the ground truth
+    humans: list of strings; each string is a human-readable label
+    bboxes: list of bounding boxes for each image of the shard.
+    output_directory: string, directory to write the shard to.
+    max_image_side: integer, if positive, maximum size of the longer side of
+      the images.
+
+  Returns:
+    Path of the written file.
+  """
+  # Generate a sharded version of the file name, e.g. 'train-00002-of-00010'
+  output_filename = '%s-%.5d-of-%.5d' % (name, shard, num_shards)
+  output_file = os.path.join(output_directory, output_filename)
+  writer = tf.python_io.TFRecordWriter(output_file)
+  for filename, label, synset, human, bbox in zip(filenames, labels, synsets,
+                                                  humans, bboxes):
+    image_buffer, height, width = _process_image(filename, coder,
+                                                 max_image_side)
+
+    example = _convert_to_example(filename, image_buffer, label,
+                                  synset, human, bbox,
+                                  height, width)
+    writer.write(example.SerializeToString())
+  writer.close()
+  return output_file
+
+
+# ImageCoder of a worker process of the pool, created by _init_worker_process.
+_WORKER_CODER = None
+
+
+def _init_worker_process():
+  global _WORKER_CODER
+  _WORKER_CODER = ImageCoder()
+
+
+def _write_shard_in_worker_process(args):
+  return len(args[3]), _write_shard(_WORKER_CODER, *args)
+
+
 def _process_image_files_batch(coder, thread_index, ranges, name, filenames,
                                synsets, labels, humans, bboxes, num_shards):
   """Processes and saves list of images as TFRecord in 1 thread.
@@ -345,8 +482,8 @@ def _process_image_files_batch(coder, thread_index, ranges, name, filenames,
   Args:
     coder: instance of ImageCoder to provide TensorFlow image coding utils.
     thread_index: integer, unique batch to run index is within [0, len(ranges)).
-    ranges: list of pairs of integers specifying ranges of each batches to
-      analyze in parallel.
+    ranges: list of pairs of integers specifying the range of images of each
+      shard, as returned by _shard_ranges.
     name: string, unique identifier specifying the data set
     filenames: list of strings; each string is a path to an image file
     synsets: list of strings; each string is a unique WordNet ID
@@ -360,53 +497,22 @@ def _process_image_files_batch(coder, thread_index, ranges, name, filenames,
   # Each thread produces N shards where N = int(num_shards / num_threads).
   # For instance, if num_shards = 128, and the num_threads = 2, then the first
   # thread would produce shards [0, 64).
-  num_threads = len(ranges)
-  assert not num_shards % num_threads
-  num_shards_per_batch = int(num_shards / num_threads)
-
-  shard_ranges = np.linspace(ranges[thread_index][0],
-                             ranges[thread_index][1],
-                             num_shards_per_batch + 1).astype(int)
-  num_files_in_thread = ranges[thread_index][1] - ranges[thread_index][0]
+  num_shards_per_batch = int(num_shards / FLAGS.num_threads)
 
   counter = 0
   for s in xrange(num_shards_per_batch):
-    # Generate a sharded version of the file name, e.g. 'train-00002-of-00010'
     shard = thread_index * num_shards_per_batch + s
-    output_filename = '%s-%.5d-of-%.5d' % (name, shard, num_shards)
-    output_file = os.path.join(FLAGS.output_directory, output_filename)
-    writer = tf.python_io.TFRecordWriter(output_file)
-
-    shard_counter = 0
-    files_in_shard = np.arange(shard_ranges[s], shard_ranges[s + 1], dtype=int)
-    for i in files_in_shard:
-      filename = filenames[i]
-      label = labels[i]
-      synset = synsets[i]
-      human = humans[i]
-      bbox = bboxes[i]
-
-      image_buffer, height, width = _process_image(filename, coder)
-
-      example = _convert_to_example(filename, image_buffer, label,
-                                    synset, human, bbox,
-                                    height, width)
-      writer.write(example.SerializeToString())
-      shard_counter += 1
-      counter += 1
-
-      if not counter % 1000:
-        print('%s [thread %d]: Processed %d of %d images in thread batch.' %
-              (datetime.now(), thread_index, counter, num_files_in_thread))
-        sys.stdout.flush()
-
-    writer.close()
+    start, end = ranges[shard]
+    output_file = _write_shard(
+        coder, name, shard, num_shards, filenames[start:end],
+        synsets[start:end], labels[start:end], humans[start:end],
+        bboxes[start:end], FLAGS.output_directory, FLAGS.max_image_side)
+    counter += end - start
     print('%s [thread %d]: Wrote %d images to %s' %
-          (datetime.now(), thread_index, shard_counter, output_file))
+          (datetime.now(), thread_index, end - start, output_file))
     sys.stdout.flush()
-    shard_counter = 0
   print('%s [thread %d]: Wrote %d images to %d shards.' %
-        (datetime.now(), thread_index, counter, num_files_in_thread))
+        (datetime.now(), thread_index, counter, num_shards_per_batch))
   sys.stdout.flush()
 
 
@@ -430,15 +536,16 @@ def _process_image_files(name, filenames, synsets, labels, humans,
   assert len(filenames) == len(humans)
   assert len(filenames) == len(bboxes)
 
-  # Break all images into batches with a [ranges[i][0], ranges[i][1]].
-  spacing = np.linspace(0, len(filenames), FLAGS.num_threads + 1).astype(np.int)
-  ranges = []
-  threads = []
-  for i in xrange(len(spacing) - 1):
-    ranges.append([spacing[i], spacing[i+1]])
+  # Break all images into shards with a [ranges[i][0], ranges[i][1]].
+  ranges = _shard_ranges(len(filenames), FLAGS.num_threads, num_shards)
+
+  if FLAGS.num_processes > 0:
+    _process_image_files_in_processes(name, filenames, synsets, labels, humans,
+                                      bboxes, num_shards, ranges)
+    return
 
   # Launch a thread for each batch.
-  print('Launching %d threads for spacings: %s' % (FLAGS.num_threads, ranges))
+  print('Launching %d threads for %d shards.' % (FLAGS.num_threads, num_shards))
   sys.stdout.flush()
 
   # Create a mechanism for monitoring when all threads are finished.
@@ -448,7 +555,7 @@ def _process_image_files(name, filenames, synsets, labels, humans,
   coder = ImageCoder()
 
   threads = []
-  for thread_index in xrange(len(ranges)):
+  for thread_index in xrange(FLAGS.num_threads):
     args = (coder, thread_index, ranges, name, filenames,
             synsets, labels, humans, bboxes, num_shards)
     t = threading.Thread(target=_process_image_files_batch, args=args)
@@ -462,6 +569,49 @@ def _process_image_files(name, filenames, synsets, labels, humans,
   sys.stdout.flush()
 
 
+def _process_image_files_in_processes(name, filenames, synsets, labels, humans,
+                                      bboxes, num_shards, ranges):
+  """Process and save list of images as TFRecord using a pool of processes.
+
+  Args:
+    name: string, unique identifier specifying the data set
+    filenames: list of strings; each string is a path to an image file
+    synsets: list of strings; each string is a unique WordNet ID
+    labels: list of integer; each integer identifies the ground truth
+    humans: list of strings; each string is a human-readable label
+    bboxes: list of bounding boxes for each image.
+    num_shards: integer number of shards for this data set.
+    ranges: list of pairs of integers specifying the range of images of each
+      shard, as returned by _shard_ranges.
+  """
+  print('Launching %d processes for %d shards.' %
+        (FLAGS.num_processes, num_shards))
+  sys.stdout.flush()
+  shards_args = []
+  for shard, (start, end) in enumerate(ranges):
+    shards_args.append(
+        (name, shard, num_shards, filenames[start:end], synsets[start:end],
+         labels[start:end], humans[start:end], bboxes[start:end],
+         FLAGS.output_directory, FLAGS.max_image_side))
+
+  pool = multiprocessing.Pool(FLAGS.num_processes,
+                              initializer=_init_worker_process)
+  try:
+    counter = 0
+    for num_images, output_file in pool.imap_unordered(
+        _write_shard_in_worker_process, shards_args):
+      counter += num_images
+      print('%s: Wrote %d images to %s (%d of %d images).' %
+            (datetime.now(), num_images, output_file, counter, len(filenames)))
+      sys.stdout.flush()
+  finally:
+    pool.close()
+    pool.join()
+  print('%s: Finished writing all %d images in data set.' %
+        (datetime.now(), len(filenames)))
+  sys.stdout.flush()
+
+
 def _find_image_files(data_dir, labels_file):
   """Build a list of all images files and labels in the data set.
 